@@ -1,6 +1,9 @@
 # app/ai_client_gemini.py
 import os
+from functools import lru_cache
+
 import google.generativeai as genai
+from google.ai import generativelanguage as glm
 
 MODEL = os.getenv("GEMINI_MODEL_ID", "gemini-2.5-flash-lite")
 
@@ -11,3 +14,31 @@ def generate_text(prompt: str, **kwargs) -> str:
     m = genai.GenerativeModel(MODEL)
     resp = m.generate_content(prompt, **kwargs)
     return (resp.text or "").strip()
+
+@lru_cache(maxsize=None)
+def _client_for(api_key: str) -> glm.GenerativeServiceClient:
+    return glm.GenerativeServiceClient(client_options={"api_key": api_key})
+
+def _schema(schema: dict) -> glm.Schema:
+    # The dict schemas of app/ai_response.py, as the API's Schema message
+    fields = {k: v for k, v in schema.items() if k not in ("type", "properties", "items")}
+    fields["type_"] = glm.Type[schema["type"]]
+    if "properties" in schema:
+        fields["properties"] = {name: _schema(prop) for name, prop in schema["properties"].items()}
+    if "items" in schema:
+        fields["items"] = _schema(schema["items"])
+    return glm.Schema(**fields)
+
+def generate_text_with_key(prompt: str, api_key: str, generation_config: dict = None) -> str:
+    # configure_api() is process-wide; this uses a client bound to one key, so several threads can call at once
+    config = dict(generation_config or {})
+    if "response_schema" in config:
+        config["response_schema"] = _schema(config["response_schema"])
+    request = glm.GenerateContentRequest(
+        model=f"models/{MODEL}",
+        contents=[glm.Content(role="user", parts=[glm.Part(text=prompt)])],
+        generation_config=glm.GenerationConfig(**config),
+    )
+    resp = _client_for(api_key).generate_content(request)
+    parts = resp.candidates[0].content.parts if resp.candidates else []
+    return "".join(part.text for part in parts).strip()
@@ -6,12 +6,16 @@ import json
 import logging
 from urllib.parse import urlparse
 import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path 
-from typing import Any, Dict, List, Optional, Tuple, ClassVar
+from typing import Any, Callable, Dict, List, Optional, Tuple, ClassVar
 
-from .config import AI_API_KEYS, SCHEDULE_CONFIG
+from .config import AI_API_KEYS, AI_GENERATION_CONFIG, CHUNKING_CONFIG, SCHEDULE_CONFIG
 from .exceptions import AIProcessorError, AllKeysFailedError
 from . import ai_client_gemini as ai_client
+from .debug_recorder import shared_recorder
+from . import ai_response, chunking, metrics
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +31,24 @@ Somente produzir o conteúdo jornalístico reescrito do artigo principal.
 Se algum desses itens aparecer no texto de origem, exclua-os do resultado.
 """
 
+# Appended to the prompt when a long article is rewritten in sections (app/chunking.py)
+METADATA_MODE = """
+---
+MODO METADADOS: este artigo é longo e o corpo será reescrito à parte, em trechos.
+Gere todos os campos do JSON a partir do texto completo, mas retorne "conteudo_final" como string vazia ("").
+"""
+
+SECTION_MODE = """
+---
+MODO TRECHO {index} DE {total}: o conteúdo acima é apenas um trecho de um artigo longo; título, SEO e tags são gerados à parte.
+Reescreva somente este trecho seguindo as regras do "conteudo_final", sem título, introdução ou conclusão próprios, mantendo os intertítulos <h2>/<h3> do trecho.
+Crie no máximo {links} link(s) interno(s) neste trecho.
+Responda apenas com o objeto JSON {{"conteudo_final": "<p>...</p>"}}.
+"""
+
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 60  # seconds
+
 
 class AIProcessor:
     """
@@ -73,6 +95,13 @@ class AIProcessor:
                 raise AIProcessorError("Prompt template file not found.")
         return cls._prompt_template
 
+    @staticmethod
+    def _record(kind: str, article_id: Optional[int], key_index: int, prompt: str,
+                response_text: Optional[str], error: Optional[str] = None) -> None:
+        """Hands an answer to the debug recorder (app/debug_recorder.py): sampled, or in full on failure."""
+        shared_recorder().record(kind, article_id, response=response_text, failed=error is not None,
+                                 prompt=prompt, error=error, key_index=key_index)
+
     @staticmethod
     def _safe_format_prompt(template: str, fields: Dict[str, Any]) -> str:
         """
@@ -107,9 +136,6 @@ class AIProcessor:
         """
         from google.api_core.exceptions import ResourceExhausted
 
-        MAX_RETRIES = 3
-        BACKOFF_FACTOR = 60  # seconds
-
         prompt_template = self._load_prompt_template()
 
         # Prepare prompt fields
@@ -136,6 +162,14 @@ class AIProcessor:
             "videos_list": "\n".join([v.get("embed_url", "") for v in videos if isinstance(v, dict) and v.get("embed_url")]) or "Nenhum",
             "imagens_list": "\n".join(images) if images else "Nenhuma",
         }
+        article_id = kwargs.get("article_id")
+        tokens = chunking.estimate_tokens(fields["content"])
+        if CHUNKING_CONFIG['enabled'] and tokens > CHUNKING_CONFIG['threshold_tokens']:
+            sections = chunking.split_sections(fields["content"])
+            if len(sections) > 1:
+                logger.info(f"Long article (~{tokens} tokens): rewriting it in {len(sections)} sections.")
+                return self._rewrite_chunked(prompt_template, fields, sections, article_id)
+
         prompt = self._safe_format_prompt(prompt_template, fields)
 
         last_error = "Unknown error"
@@ -147,18 +181,24 @@ class AIProcessor:
             
             retries = 0
             while retries < MAX_RETRIES:
+                response_text = None
                 try:
                     logger.info(f"Sending content to AI. Key index: {self.current_key_index}, Attempt: {retries + 1}/{MAX_RETRIES}")
                     
-                    generation_config = {"response_mime_type": "application/json"}
-                    response_text = ai_client.generate_text(prompt, generation_config=generation_config)
+                    generation_config = {
+                        "response_mime_type": "application/json",
+                        "response_schema": ai_response.RESPONSE_SCHEMA,
+                    }
+                    with metrics.timed(metrics.GEMINI_LATENCY, f"#{self.current_key_index} ...{api_key[-4:]}"):
+                        response_text = ai_client.generate_text(prompt, generation_config=generation_config)
                     
                     parsed_data = self._parse_response(response_text)
 
                     if not parsed_data:
                         raise AIProcessorError("Failed to parse or validate AI response.")
 
-                    if "erro" in parsed_data:
+                    self._record("rewrite", article_id, self.current_key_index, prompt, response_text)
+                    if parsed_data.get("erro"):
                         logger.warning(f"AI returned a handled error: {parsed_data['erro']}")
                         return None, parsed_data["erro"]
 
@@ -180,6 +220,7 @@ class AIProcessor:
                 except Exception as e:
                     last_error = str(e)
                     logger.error(f"An unexpected error occurred with key index {self.current_key_index}: {last_error}")
+                    self._record("rewrite", article_id, self.current_key_index, prompt, response_text, last_error)
                     # For non-rate-limit errors, fail over immediately
                     break 
 
@@ -192,66 +233,141 @@ class AIProcessor:
         logger.critical(final_reason)
         return None, final_reason
 
-    @staticmethod
-    def _parse_response(text: str) -> Optional[Dict[str, Any]]:
+    def _rewrite_chunked(self, prompt_template: str, fields: Dict[str, Any], sections: List[str],
+                         article_id: Optional[int] = None) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
         """
-        Parses the JSON response from the AI and validates its structure.
+        Rewrites a long article as one request for the metadata fields plus one per
+        section, run concurrently, each starting on its own key, then stitches the
+        sections back in order.
         """
-        try:
-            clean_text = text.strip()
-            if clean_text.startswith("```json"):
-                clean_text = clean_text[7:-3].strip()
-            elif clean_text.startswith("```"):
-                clean_text = clean_text[3:-3].strip()
+        total = len(sections)
+        links = max(1, 4 // total)
+        calls: List[Tuple[str, str, Dict[str, Any], Callable[[str], Optional[Dict[str, Any]]]]] = [
+            ("metadata", self._safe_format_prompt(prompt_template, fields) + METADATA_MODE,
+             ai_response.RESPONSE_SCHEMA, partial(self._parse_response, require_content=False))
+        ]
+        for index, section in enumerate(sections, 1):
+            prompt = self._safe_format_prompt(prompt_template, dict(fields, content=section))
+            calls.append((f"section {index}/{total}", prompt + SECTION_MODE.format(index=index, total=total, links=links),
+                          ai_response.SECTION_SCHEMA, self._parse_section))
+
+        workers = max(1, min(CHUNKING_CONFIG['max_workers'], len(self.api_keys), len(calls)))
+        first = self.current_key_index
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='rewrite') as executor:
+            futures = [executor.submit(self._generate_on_keys, prompt, schema, parse, first + i, kind, article_id)
+                       for i, (kind, prompt, schema, parse) in enumerate(calls)]
+            results = [future.result() for future in futures]
+
+        metadata, error = results[0]
+        if metadata is None:
+            return None, error
+        if metadata.get("erro"):
+            logger.warning(f"AI returned a handled error: {metadata['erro']}")
+            return None, metadata["erro"]
+        rewritten = []
+        for index, (section, error) in enumerate(results[1:], 1):
+            if section is None:
+                return None, f"Section {index}/{total} failed: {error}"
+            rewritten.append(section["conteudo_final"])
+        logger.info(f"Successfully processed a long article in {total} sections.")
+        return chunking.stitch(metadata, rewritten), None
+
+    def _generate_on_keys(self, prompt: str, schema: Dict[str, Any], parse: Callable[[str], Optional[Dict[str, Any]]],
+                          first_key_index: int, kind: str = "rewrite",
+                          article_id: Optional[int] = None) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        One request of a chunked rewrite, starting on `first_key_index` and failing
+        over through the other keys. Uses per-key clients, so it is safe from
+        several threads; `current_key_index` is left alone.
+        """
+        from google.api_core.exceptions import ResourceExhausted
+
+        generation_config = {
+            "response_mime_type": "application/json",
+            "response_schema": schema,
+            "max_output_tokens": AI_GENERATION_CONFIG['max_output_tokens'],
+        }
+        last_error = "Unknown error"
+        for offset in range(len(self.api_keys)):
+            key_index = (first_key_index + offset) % len(self.api_keys)
+            api_key = self.api_keys[key_index]
+            for attempt in range(MAX_RETRIES):
+                response_text = None
+                try:
+                    with metrics.timed(metrics.GEMINI_LATENCY, f"#{key_index} ...{api_key[-4:]}"):
+                        response_text = ai_client.generate_text_with_key(prompt, api_key, generation_config)
+                    parsed_data = parse(response_text)
+                    if not parsed_data:
+                        raise AIProcessorError("Failed to parse or validate AI response.")
+                    self._record(kind, article_id, key_index, prompt, response_text)
+                    return parsed_data, None
+                except ResourceExhausted as e:
+                    last_error = str(e)
+                    if attempt + 1 >= MAX_RETRIES:
+                        logger.warning(f"Rate limit exhausted for key index {key_index} after {MAX_RETRIES} retries. Failing over.")
+                        break
+                    wait_time = BACKOFF_FACTOR * (2 ** attempt)
+                    logger.warning(f"Rate limit hit (429) on key index {key_index}. Waiting for {wait_time}s.")
+                    time.sleep(wait_time)
+                except Exception as e:
+                    last_error = str(e)
+                    logger.error(f"An unexpected error occurred with key index {key_index}: {last_error}")
+                    self._record(kind, article_id, key_index, prompt, response_text, last_error)
+                    break
+        return None, f"All available API keys failed after retries. Last error: {last_error}"
 
-            # Debug: Save raw response to a file
-            debug_dir = Path("debug")
-            debug_dir.mkdir(exist_ok=True)
-            timestamp = time.strftime("%Y%m%d-%H%M%S")
-            with open(debug_dir / f"ai_response_{timestamp}.json", "w", encoding="utf-8") as f:
-                f.write(clean_text)
+    @staticmethod
+    def _parse_section(text: str) -> Optional[Dict[str, Any]]:
+        """Parses a section rewrite: a JSON object with a non-empty 'conteudo_final'."""
+        data, repaired = ai_response.loads_lenient(text)
+        if not isinstance(data, dict) or not isinstance(data.get("conteudo_final"), str):
+            logger.error("AI section response has no 'conteudo_final'.")
+            metrics.incr(metrics.AI_RESPONSE, 'rejected')
+            return None
+        if repaired:
+            data["conteudo_final"] = ai_response.trim_partial_html(data["conteudo_final"])
+        if not data["conteudo_final"].strip():
+            logger.error("AI section response has an empty 'conteudo_final'.")
+            metrics.incr(metrics.AI_RESPONSE, 'rejected')
+            return None
+        metrics.incr(metrics.AI_RESPONSE, 'repaired' if repaired else 'clean')
+        return data
 
-            data = json.loads(clean_text)
+    @staticmethod
+    def _parse_response(text: str, require_content: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Parses the JSON response from the AI, repairing malformed or truncated JSON
+        and filling derivable fields locally (app/ai_response.py) instead of
+        rejecting the answer and paying for another call.
+        """
+        try:
+            data, repaired = ai_response.loads_lenient(text)
 
             if not isinstance(data, dict):
-                logger.error(f"AI response is not a dictionary. Received type: {type(data)}")
+                logger.error(f"AI response is not a JSON object. Received type: {type(data)}")
+                logger.debug(f"Received text: {text[:500]}...")
+                metrics.incr(metrics.AI_RESPONSE, 'rejected')
                 return None
 
-            if "erro" in data:
+            if data.get("erro"):
                 logger.warning(f"AI returned a rejection error: {data['erro']}")
                 return data
 
-            required_keys = [
-                "titulo_final", "conteudo_final", "meta_description",
-                "focus_keyphrase", "tags_sugeridas", "yoast_meta"
-            ]
-            missing_keys = [key for key in required_keys if key not in data]
-
-            if missing_keys:
-                logger.error(f"AI response is missing required keys: {', '.join(missing_keys)}")
+            reason, filled = ai_response.complete_article(data, require_content=require_content, repaired=repaired)
+            if reason:
+                logger.error(f"AI response is unusable: {reason}")
                 logger.debug(f"Received data: {data}")
+                metrics.incr(metrics.AI_RESPONSE, 'rejected')
                 return None
-
-            if 'yoast_meta' in data and isinstance(data['yoast_meta'], dict):
-                required_yoast_keys = [
-                    "_yoast_wpseo_title", "_yoast_wpseo_metadesc",
-                    "_yoast_wpseo_focuskw", "_yoast_news_keywords"
-                ]
-                missing_yoast_keys = [key for key in required_yoast_keys if key not in data['yoast_meta']]
-                if missing_yoast_keys:
-                    logger.error(f"AI response 'yoast_meta' is missing keys: {', '.join(missing_yoast_keys)}")
-                    return None
-            else:
-                logger.error("AI response is missing 'yoast_meta' object or it's not a dictionary.")
-                return None
+            if repaired:
+                logger.warning("AI response was malformed or truncated; repaired it locally.")
+            if filled:
+                logger.info(f"Filled AI response fields locally: {', '.join(filled)}")
+            metrics.incr(metrics.AI_RESPONSE, 'repaired' if repaired else 'filled' if filled else 'clean')
 
             logger.info("Successfully parsed and validated AI response.")
             return data
 
-        except json.JSONDecodeError as e:
-            logger.error(f"Error decoding JSON from AI response: {e}")
-            logger.debug(f"Received text: {text[:500]}...")
-            return None
         except Exception as e:
             logger.error(f"An unexpected error occurred while parsing AI response: {e}")
             logger.debug(f"Received text: {text[:500]}...")
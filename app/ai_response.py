@@ -0,0 +1,248 @@
+"""
+Gemini response schema and tolerant parsing.
+
+`AIProcessor._parse_response` used to slice code fences off, `json.loads`
+the rest and reject the whole answer when any required or Yoast key was
+missing; every rejection paid for another call on the next key. Now:
+
+- the request carries `RESPONSE_SCHEMA` (`SECTION_SCHEMA` for the sections of
+  a chunked rewrite), so Gemini's structured output returns the fields the
+  pipeline reads;
+- `loads_lenient` finds the JSON object in the text, accepts raw control
+  characters and trailing commas, and repairs a truncated answer by closing
+  the open string and brackets, or else by cutting back to the last complete
+  element (a body cut off mid-paragraph is trimmed to its last whole block);
+- `complete_article` derives what can be derived locally (slug from the
+  title, the Yoast fields from meta_description/focus_keyphrase/tags, and the
+  other way around, the meta description from the first paragraph) and only
+  rejects answers without a title or body.
+"""
+
+import json
+import logging
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from bs4 import BeautifulSoup
+from slugify import slugify
+
+logger = logging.getLogger(__name__)
+
+# Gemini's OpenAPI subset; types are upper-case as the API's Type enum.
+# image_alt_texts is a list here (the schema has no free-form maps) and becomes
+# the {filename: alt} dict the pipeline reads in `complete_article`.
+RESPONSE_SCHEMA: Dict[str, Any] = {
+    'type': 'OBJECT',
+    'properties': {
+        'erro': {'type': 'STRING', 'nullable': True},
+        'titulo_final': {'type': 'STRING'},
+        'conteudo_final': {'type': 'STRING'},
+        'meta_description': {'type': 'STRING'},
+        'focus_keyphrase': {'type': 'STRING'},
+        'related_keyphrases': {'type': 'ARRAY', 'items': {'type': 'STRING'}},
+        'slug': {'type': 'STRING'},
+        'categorias': {
+            'type': 'ARRAY',
+            'items': {
+                'type': 'OBJECT',
+                'properties': {
+                    'nome': {'type': 'STRING'},
+                    'grupo': {'type': 'STRING'},
+                    'evidence': {'type': 'STRING'},
+                },
+                'required': ['nome'],
+            },
+        },
+        'tags_sugeridas': {'type': 'ARRAY', 'items': {'type': 'STRING'}},
+        'image_alt_texts': {
+            'type': 'ARRAY',
+            'items': {
+                'type': 'OBJECT',
+                'properties': {'arquivo': {'type': 'STRING'}, 'alt': {'type': 'STRING'}},
+                'required': ['arquivo', 'alt'],
+            },
+        },
+        'yoast_meta': {
+            'type': 'OBJECT',
+            'properties': {
+                '_yoast_wpseo_title': {'type': 'STRING'},
+                '_yoast_wpseo_metadesc': {'type': 'STRING'},
+                '_yoast_wpseo_focuskw': {'type': 'STRING'},
+                '_yoast_news_keywords': {'type': 'STRING'},
+                '_yoast_wpseo_opengraph-title': {'type': 'STRING'},
+                '_yoast_wpseo_opengraph-description': {'type': 'STRING'},
+                '_yoast_wpseo_twitter-title': {'type': 'STRING'},
+                '_yoast_wpseo_twitter-description': {'type': 'STRING'},
+            },
+        },
+    },
+    # The Yoast fields and the slug are derivable, so a miss there costs nothing
+    'required': ['titulo_final', 'conteudo_final', 'meta_description', 'focus_keyphrase', 'tags_sugeridas'],
+}
+
+SECTION_SCHEMA: Dict[str, Any] = {
+    'type': 'OBJECT',
+    'properties': {'conteudo_final': {'type': 'STRING'}},
+    'required': ['conteudo_final'],
+}
+
+YOAST_KEYS = ('_yoast_wpseo_title', '_yoast_wpseo_metadesc', '_yoast_wpseo_focuskw', '_yoast_news_keywords')
+
+_BLOCK_END_RE = re.compile(r'</(?:p|h[2-6]|ul|ol|figure|blockquote|table|div)>', re.I)
+_FENCE_RE = re.compile(r'```(?:json)?\s*(.*?)(?:```|$)', re.S | re.I)
+# Repair stops trying cut points after this many (each is a json.loads of the text)
+MAX_REPAIR_ATTEMPTS = 64
+
+
+def _json_text(text: str) -> str:
+    """The JSON part of an answer: inside a code fence if there is one, from the first '{' on."""
+    text = (text or '').strip()
+    fenced = _FENCE_RE.search(text)
+    if fenced:
+        text = fenced.group(1).strip()
+    start = text.find('{')
+    return text[start:] if start > 0 else text
+
+
+def repair_json(text: str) -> Optional[Any]:
+    """
+    Parses JSON that may have trailing commas or be cut off: the open string and
+    brackets are closed, or the text is cut back to the last complete element.
+    None when nothing parses.
+    """
+    out: List[str] = []
+    stack: List[str] = []
+    # (length of `out`, closers) where cutting leaves only complete elements
+    cuts: List[Tuple[int, str]] = []
+    in_string = escape = False
+    for ch in text:
+        if in_string:
+            out.append(ch)
+            if escape:
+                escape = False
+            elif ch == '\\':
+                escape = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in '{[':
+            stack.append('}' if ch == '{' else ']')
+            out.append(ch)
+            cuts.append((len(out), ''.join(reversed(stack))))
+            continue
+        elif ch in '}]':
+            # Trailing comma before the closer
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ',':
+                out.pop()
+            if stack:
+                stack.pop()
+        elif ch == ',':
+            cuts.append((len(out), ''.join(reversed(stack))))
+        out.append(ch)
+        if not stack and ch in '}]':
+            break
+
+    candidates = []
+    head = ''.join(out)
+    if in_string:
+        candidates.append(head[:-1] + '"' if escape else head + '"')
+    candidates.append(head)
+    attempts = [candidate.rstrip().rstrip(',') + ''.join(reversed(stack)) for candidate in candidates]
+    attempts += [''.join(out[:length]).rstrip().rstrip(',') + closers
+                 for length, closers in reversed(cuts[-MAX_REPAIR_ATTEMPTS:])]
+    for attempt in attempts:
+        try:
+            return json.loads(attempt, strict=False)
+        except json.JSONDecodeError:
+            continue
+    return None
+
+
+def loads_lenient(text: str) -> Tuple[Optional[Any], bool]:
+    """(parsed JSON or None, whether it needed repairing) of a model answer."""
+    raw = _json_text(text)
+    try:
+        return json.loads(raw, strict=False), False
+    except json.JSONDecodeError:
+        pass
+    return repair_json(raw), True
+
+
+def trim_partial_html(html: str) -> str:
+    """Cuts a body that was cut off mid-block back to the end of its last complete block."""
+    ends = list(_BLOCK_END_RE.finditer(html))
+    return html[:ends[-1].end()] if ends else html
+
+
+def _text(value: Any) -> str:
+    return value.strip() if isinstance(value, str) else ''
+
+
+def _summary(html: str, limit: int = 155) -> str:
+    """The body's first paragraph, cut at a word boundary to `limit` characters."""
+    soup = BeautifulSoup(html, 'lxml')
+    paragraph = soup.find('p') or soup
+    text = ' '.join(paragraph.get_text(' ', strip=True).split())
+    if len(text) <= limit:
+        return text
+    return text[:limit - 1].rsplit(' ', 1)[0].rstrip(',;:') + '…'
+
+
+def complete_article(data: Dict[str, Any], require_content: bool = True,
+                     repaired: bool = False) -> Tuple[Optional[str], List[str]]:
+    """
+    Fills the fields of an article answer that can be derived from the others, in
+    place (after a repair, the body is also trimmed to its last whole block).
+    Returns (reason it is unusable or None, names of the filled fields).
+    """
+    filled: List[str] = []
+
+    def fill(key: str, value: str, target: Dict[str, Any] = data) -> None:
+        if value and not _text(target.get(key)):
+            target[key] = value
+            filled.append(key)
+
+    title = _text(data.get('titulo_final'))
+    if not title:
+        return "missing 'titulo_final'", filled
+    if not isinstance(data.get('conteudo_final'), str):
+        return "missing 'conteudo_final'", filled
+    if repaired:
+        data['conteudo_final'] = trim_partial_html(data['conteudo_final'])
+    if require_content and not data['conteudo_final'].strip():
+        return "missing 'conteudo_final'", filled
+
+    yoast = data.get('yoast_meta')
+    if not isinstance(yoast, dict):
+        yoast = data['yoast_meta'] = {}
+    tags = [t for t in data.get('tags_sugeridas') or [] if isinstance(t, str) and t.strip()]
+    if not isinstance(data.get('tags_sugeridas'), list):
+        data['tags_sugeridas'] = tags
+        filled.append('tags_sugeridas')
+
+    fill('meta_description', _text(yoast.get('_yoast_wpseo_metadesc')))
+    if not _text(data.get('meta_description')) and data['conteudo_final'].strip():
+        fill('meta_description', _summary(data['conteudo_final']))
+    fill('focus_keyphrase', _text(yoast.get('_yoast_wpseo_focuskw')) or (tags[0] if tags else ''))
+    fill('slug', slugify(title, max_length=80, word_boundary=True))
+    fill('_yoast_wpseo_title', title[:65], yoast)
+    fill('_yoast_wpseo_metadesc', _text(data.get('meta_description'))[:155], yoast)
+    fill('_yoast_wpseo_focuskw', _text(data.get('focus_keyphrase')), yoast)
+    fill('_yoast_news_keywords', ', '.join(tags) or _text(data.get('focus_keyphrase')), yoast)
+    for key in ('meta_description', 'focus_keyphrase') + YOAST_KEYS:
+        target = yoast if key.startswith('_yoast') else data
+        target.setdefault(key, '')
+
+    alt_texts = data.get('image_alt_texts')
+    if isinstance(alt_texts, list):
+        data['image_alt_texts'] = {
+            item['arquivo']: item['alt'] for item in alt_texts
+            if isinstance(item, dict) and item.get('arquivo') and item.get('alt')
+        }
+    elif not isinstance(alt_texts, dict):
+        data['image_alt_texts'] = {}
+    return None, filled
@@ -0,0 +1,482 @@
+"""
+Content-addressed archive of fetched article pages.
+
+Every page the pipeline downloads is stored once under its SHA-256 hash and
+compressed per domain. zstd (the `zstandard` package) is used when installed,
+with a dictionary trained on that domain's pages; otherwise zlib with a preset
+dictionary cut from a recent page of the domain. Our pages come from a handful
+of sites whose markup is mostly shared boilerplate, so a per-domain dictionary
+is what makes the archive small.
+
+A small SQLite index next to the objects maps article IDs and URLs to hashes,
+so the pipeline can reuse a recent copy instead of downloading the page again
+(retries, re-queued articles) and `replay` can rerun extraction offline. The
+directory is self-contained: copy it elsewhere and `iter_corpus` serves it as
+a corpus for benchmarks and regression runs. Least recently used objects are
+evicted once the archive grows past `max_bytes`.
+
+Usage:
+    python -m app.archive stats
+    python -m app.archive train
+    python -m app.archive replay <article_id|url>
+    python -m app.archive regress [--domain ge.globo.com] [--limit 200]
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+import zlib
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from .config import ARCHIVE_CONFIG
+from .urlnorm import canonical_url
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# The zlib fallback is logged once per process, not once per archive opened
+_zlib_fallback_logged = False
+
+CODEC_ZSTD = 'zstd'
+CODEC_ZLIB = 'zlib'
+# zlib only looks back 32KB, so a longer preset dictionary is wasted
+ZLIB_DICT_BYTES = 32 * 1024
+
+_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS objects (
+        sha256 TEXT PRIMARY KEY,
+        domain TEXT NOT NULL,
+        codec TEXT NOT NULL,
+        dict_id INTEGER,
+        raw_size INTEGER NOT NULL,
+        stored_size INTEGER NOT NULL,
+        created_at REAL NOT NULL,
+        last_access REAL NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS refs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        sha256 TEXT NOT NULL REFERENCES objects(sha256) ON DELETE CASCADE,
+        article_id INTEGER,
+        url TEXT NOT NULL,
+        url_key TEXT,
+        kind TEXT NOT NULL DEFAULT 'page',
+        content_type TEXT,
+        fetched_at REAL NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS dicts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        domain TEXT NOT NULL,
+        codec TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        samples INTEGER NOT NULL,
+        created_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_refs_article ON refs (article_id, kind);
+    CREATE INDEX IF NOT EXISTS idx_objects_access ON objects (last_access);
+    CREATE INDEX IF NOT EXISTS idx_objects_domain ON objects (domain, created_at);
+'''
+
+
+def _domain(url: str) -> str:
+    return (urlparse(url).hostname or '').lower().replace('www.', '', 1)
+
+
+class ArchivedPage:
+    """A page read back from the archive, shaped like `fetching.FetchedPage`."""
+
+    def __init__(self, url: str, content: bytes, content_type: Optional[str], fetched_at: float,
+                 sha256: str, kind: str = 'page', article_id: Optional[int] = None):
+        from .fetching import declared_encoding
+        self.url = url
+        self.content = content
+        self.content_type = content_type or ''
+        self.encoding = declared_encoding(content_type)
+        self.fetched_at = fetched_at
+        self.sha256 = sha256
+        self.kind = kind
+        self.article_id = article_id
+        self.truncated = None
+
+    @property
+    def size(self) -> int:
+        return len(self.content)
+
+
+class HtmlArchive:
+    """The on-disk archive: objects/<aa>/<sha256>, dicts/<id>.dict and index.db."""
+
+    def __init__(self, root: Optional[str] = None, config: Optional[Dict[str, Any]] = None,
+                 check_same_thread: bool = True):
+        self.config = dict(ARCHIVE_CONFIG)
+        self.config.update(config or {})
+        self.root = Path(root or self.config['path'])
+        (self.root / 'objects').mkdir(parents=True, exist_ok=True)
+        (self.root / 'dicts').mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.root / 'index.db'), timeout=10, check_same_thread=check_same_thread)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(_SCHEMA)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(refs)")}
+        if 'url_key' not in columns:
+            self.conn.execute("ALTER TABLE refs ADD COLUMN url_key TEXT")
+            self.conn.executemany("UPDATE refs SET url_key = ? WHERE id = ?",
+                                  [(canonical_url(url), ref_id) for ref_id, url in
+                                   self.conn.execute("SELECT id, url FROM refs").fetchall()])
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_refs_url_key ON refs (url_key, kind)")
+        self.conn.commit()
+        self._dict_cache: Dict[int, bytes] = {}
+        global _zlib_fallback_logged
+        if zstandard is None and not _zlib_fallback_logged:
+            _zlib_fallback_logged = True
+            logger.warning("zstandard is not installed; the page archive falls back to zlib "
+                           "(larger objects, no trained dictionaries). Install it with `pip install zstandard`.")
+
+    def close(self) -> None:
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+    # --- codecs -------------------------------------------------------------
+
+    @property
+    def codec(self) -> str:
+        return CODEC_ZSTD if zstandard is not None else CODEC_ZLIB
+
+    def _dict_path(self, dict_id: int) -> Path:
+        return self.root / 'dicts' / f"{dict_id}.dict"
+
+    def _load_dict(self, dict_id: Optional[int]) -> Optional[bytes]:
+        if dict_id is None:
+            return None
+        if dict_id not in self._dict_cache:
+            self._dict_cache[dict_id] = self._dict_path(dict_id).read_bytes()
+        return self._dict_cache[dict_id]
+
+    def _current_dict(self, domain: str) -> Optional[sqlite3.Row]:
+        return self.conn.execute(
+            "SELECT id, codec FROM dicts WHERE domain = ? AND codec = ? ORDER BY id DESC LIMIT 1",
+            (domain, self.codec)
+        ).fetchone()
+
+    def _compress(self, data: bytes, codec: str, dict_data: Optional[bytes]) -> bytes:
+        if codec == CODEC_ZSTD:
+            zdict = zstandard.ZstdCompressionDict(dict_data) if dict_data else None
+            return zstandard.ZstdCompressor(level=self.config['zstd_level'], dict_data=zdict).compress(data)
+        compressor = zlib.compressobj(self.config['zlib_level'], zdict=dict_data) if dict_data \
+            else zlib.compressobj(self.config['zlib_level'])
+        return compressor.compress(data) + compressor.flush()
+
+    @staticmethod
+    def _decompress(blob: bytes, codec: str, dict_data: Optional[bytes]) -> bytes:
+        if codec == CODEC_ZSTD:
+            if zstandard is None:
+                raise RuntimeError("zstandard is not installed; cannot read zstd archive objects")
+            zdict = zstandard.ZstdCompressionDict(dict_data) if dict_data else None
+            return zstandard.ZstdDecompressor(dict_data=zdict).decompress(blob)
+        decompressor = zlib.decompressobj(zdict=dict_data) if dict_data else zlib.decompressobj()
+        return decompressor.decompress(blob) + decompressor.flush()
+
+    # --- writes -------------------------------------------------------------
+
+    def _object_path(self, sha256: str) -> Path:
+        return self.root / 'objects' / sha256[:2] / sha256
+
+    def put(self, url: str, content: bytes, content_type: Optional[str] = None,
+            article_id: Optional[int] = None, kind: str = 'page') -> Optional[str]:
+        """
+        Stores a fetched page (once per distinct body) and indexes it by article and URL.
+
+        Returns:
+            The SHA-256 of the body, or None when it could not be stored.
+        """
+        if not content:
+            return None
+        sha256 = hashlib.sha256(content).hexdigest()
+        now = time.time()
+        try:
+            if not self.conn.execute("SELECT 1 FROM objects WHERE sha256 = ?", (sha256,)).fetchone():
+                domain = _domain(url)
+                current = self._current_dict(domain)
+                dict_id = current['id'] if current else None
+                blob = self._compress(content, self.codec, self._load_dict(dict_id))
+                path = self._object_path(sha256)
+                path.parent.mkdir(exist_ok=True)
+                tmp = path.with_suffix('.tmp')
+                tmp.write_bytes(blob)
+                os.replace(tmp, path)
+                self.conn.execute(
+                    "INSERT INTO objects (sha256, domain, codec, dict_id, raw_size, stored_size, created_at, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (sha256, domain, self.codec, dict_id, len(content), len(blob), now, now)
+                )
+            self.conn.execute(
+                "INSERT INTO refs (sha256, article_id, url, url_key, kind, content_type, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (sha256, article_id, url, canonical_url(url), kind, content_type, now)
+            )
+            self.conn.commit()
+            return sha256
+        except (OSError, sqlite3.Error, zlib.error) as e:
+            logger.warning(f"Could not archive {url}: {e}")
+            self.conn.rollback()
+            return None
+
+    # --- reads --------------------------------------------------------------
+
+    def _read(self, sha256: str, touch: bool = True) -> Optional[bytes]:
+        row = self.conn.execute("SELECT codec, dict_id FROM objects WHERE sha256 = ?", (sha256,)).fetchone()
+        if not row:
+            return None
+        try:
+            data = self._decompress(self._object_path(sha256).read_bytes(), row['codec'], self._load_dict(row['dict_id']))
+        except (OSError, RuntimeError, zlib.error) as e:
+            logger.warning(f"Archived object {sha256[:12]} is unreadable: {e}")
+            return None
+        if touch:
+            self.conn.execute("UPDATE objects SET last_access = ? WHERE sha256 = ?", (time.time(), sha256))
+            self.conn.commit()
+        return data
+
+    def get(self, article_id: Optional[int] = None, url: Optional[str] = None, kind: str = 'page',
+            max_age_hours: Optional[float] = None) -> Optional[ArchivedPage]:
+        """The most recent archived copy for an article or for any variant of its URL."""
+        clauses, params = [], []
+        if article_id is not None:
+            clauses.append("article_id = ?")
+            params.append(article_id)
+        if url:
+            clauses.append("url_key = ?")
+            params.append(canonical_url(url))
+        if not clauses:
+            return None
+        sql = f"SELECT * FROM refs WHERE ({' OR '.join(clauses)}) AND kind = ?"
+        params.append(kind)
+        if max_age_hours is not None:
+            sql += " AND fetched_at >= ?"
+            params.append(time.time() - max_age_hours * 3600.0)
+        row = self.conn.execute(sql + " ORDER BY fetched_at DESC LIMIT 1", params).fetchone()
+        if not row:
+            return None
+        content = self._read(row['sha256'])
+        if content is None:
+            return None
+        return ArchivedPage(row['url'], content, row['content_type'], row['fetched_at'],
+                            row['sha256'], row['kind'], row['article_id'])
+
+    def iter_corpus(self, domain: Optional[str] = None, kind: Optional[str] = 'page',
+                    limit: Optional[int] = None) -> Iterator[ArchivedPage]:
+        """Yields archived pages (latest reference per body), newest first, for benchmarks and regressions."""
+        sql = ("SELECT r.* FROM refs r JOIN objects o ON o.sha256 = r.sha256 "
+               "WHERE r.id = (SELECT MAX(id) FROM refs WHERE sha256 = r.sha256)")
+        params: List[Any] = []
+        if domain:
+            sql += " AND o.domain = ?"
+            params.append(domain)
+        if kind:
+            sql += " AND r.kind = ?"
+            params.append(kind)
+        sql += " ORDER BY r.fetched_at DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        for row in self.conn.execute(sql, params).fetchall():
+            content = self._read(row['sha256'], touch=False)
+            if content is not None:
+                yield ArchivedPage(row['url'], content, row['content_type'], row['fetched_at'],
+                                   row['sha256'], row['kind'], row['article_id'])
+
+    # --- maintenance ----------------------------------------------------------
+
+    def train_dictionaries(self, force: bool = False) -> Dict[str, int]:
+        """
+        Trains a dictionary for every domain with enough new pages since its last one.
+        Objects keep the dictionary they were written with; only new writes use the new one.
+
+        Returns:
+            {domain: dict_id} for the dictionaries created.
+        """
+        created: Dict[str, int] = {}
+        min_samples = self.config['train_min_samples']
+        for row in self.conn.execute("SELECT domain, COUNT(*) AS n FROM objects GROUP BY domain").fetchall():
+            domain = row['domain']
+            current = self._current_dict(domain)
+            since = self.conn.execute(
+                "SELECT COUNT(*) FROM objects WHERE domain = ? AND (dict_id IS NULL OR dict_id != ?)",
+                (domain, current['id'] if current else -1)
+            ).fetchone()[0]
+            needed = min_samples if current is None else self.config['retrain_every']
+            if since < needed and not (force and row['n'] >= min_samples):
+                continue
+            samples = [
+                data for data in (
+                    self._read(r['sha256'], touch=False) for r in self.conn.execute(
+                        "SELECT sha256 FROM objects WHERE domain = ? ORDER BY created_at DESC LIMIT ?",
+                        (domain, self.config['train_max_samples'])
+                    ).fetchall()
+                ) if data
+            ]
+            if len(samples) < min_samples:
+                continue
+            dict_data = self._train(samples)
+            if not dict_data:
+                continue
+            cursor = self.conn.execute(
+                "INSERT INTO dicts (domain, codec, size, samples, created_at) VALUES (?, ?, ?, ?, ?)",
+                (domain, self.codec, len(dict_data), len(samples), time.time())
+            )
+            self._dict_path(cursor.lastrowid).write_bytes(dict_data)
+            self.conn.commit()
+            created[domain] = cursor.lastrowid
+            logger.info(f"Trained a {len(dict_data)} byte {self.codec} dictionary for {domain} from {len(samples)} pages.")
+        return created
+
+    def _train(self, samples: List[bytes]) -> Optional[bytes]:
+        if self.codec == CODEC_ZSTD:
+            try:
+                return zstandard.train_dictionary(self.config['dict_bytes'], samples).as_bytes()
+            except zstandard.ZstdError as e:
+                logger.warning(f"zstd dictionary training failed: {e}")
+                return None
+        # zlib: the boilerplate shared by the pages of a site is mostly at the top and the bottom,
+        # and zlib prefers matches near the end of the dictionary
+        common = Counter()
+        for sample in samples:
+            common.update(set(sample[:ZLIB_DICT_BYTES].split(b'>')))
+        lines = [line + b'>' for line, count in common.most_common() if count > len(samples) // 2 and line]
+        dict_data = b''.join(reversed(lines))[-ZLIB_DICT_BYTES:]
+        return dict_data or None
+
+    def evict(self) -> int:
+        """Deletes least recently used objects until the archive is back under `max_bytes`."""
+        total = self.conn.execute("SELECT COALESCE(SUM(stored_size), 0) FROM objects").fetchone()[0]
+        limit = self.config['max_bytes']
+        if total <= limit:
+            return 0
+        target = limit * 0.9
+        removed = 0
+        for row in self.conn.execute("SELECT sha256, stored_size FROM objects ORDER BY last_access").fetchall():
+            if total <= target:
+                break
+            try:
+                self._object_path(row['sha256']).unlink()
+            except FileNotFoundError:
+                pass
+            self.conn.execute("DELETE FROM refs WHERE sha256 = ?", (row['sha256'],))
+            self.conn.execute("DELETE FROM objects WHERE sha256 = ?", (row['sha256'],))
+            total -= row['stored_size']
+            removed += 1
+        # Dictionaries no object uses any more, except the current one of each domain
+        for row in self.conn.execute(
+            "SELECT id FROM dicts d WHERE NOT EXISTS (SELECT 1 FROM objects o WHERE o.dict_id = d.id) "
+            "AND id != (SELECT MAX(id) FROM dicts WHERE domain = d.domain AND codec = d.codec)"
+        ).fetchall():
+            self.conn.execute("DELETE FROM dicts WHERE id = ?", (row['id'],))
+            self._dict_cache.pop(row['id'], None)
+            try:
+                self._dict_path(row['id']).unlink()
+            except FileNotFoundError:
+                pass
+        self.conn.commit()
+        logger.info(f"Evicted {removed} archived pages; archive is now {total} bytes.")
+        return removed
+
+    def maintain(self) -> None:
+        """Periodic upkeep: dictionary training and size eviction."""
+        try:
+            self.train_dictionaries()
+            self.evict()
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Archive maintenance failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        rows = self.conn.execute(
+            "SELECT domain, COUNT(*) AS pages, SUM(raw_size) AS raw, SUM(stored_size) AS stored "
+            "FROM objects GROUP BY domain ORDER BY stored DESC"
+        ).fetchall()
+        return {
+            'codec': self.codec,
+            'domains': {
+                r['domain']: {'pages': r['pages'], 'raw_bytes': r['raw'], 'stored_bytes': r['stored'],
+                              'ratio': round(r['raw'] / r['stored'], 2) if r['stored'] else None}
+                for r in rows
+            },
+            'stored_bytes': sum(r['stored'] or 0 for r in rows),
+            'max_bytes': self.config['max_bytes'],
+        }
+
+
+def replay(archive: HtmlArchive, key: str) -> Tuple[Optional[ArchivedPage], Optional[Dict[str, Any]]]:
+    """Reruns extraction (cleaners included, as in the pipeline) on the archived copy of an article ID or URL."""
+    from .extract_pool import extract_page
+    from .extractor import ContentExtractor
+
+    article_id = int(key) if key.isdigit() else None
+    page = archive.get(article_id=article_id, url=None if article_id is not None else key)
+    if page is None:
+        page = archive.get(article_id=article_id, url=None if article_id is not None else key, kind='lite')
+    if page is None:
+        return None, None
+    result, _ = extract_page(ContentExtractor(), page.content, page.url, page.encoding, kind=page.kind)
+    return page, result
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Raw HTML archive tools")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('stats')
+    sub.add_parser('train')
+    p_replay = sub.add_parser('replay')
+    p_replay.add_argument('key', help="article ID or URL")
+    p_regress = sub.add_parser('regress')
+    p_regress.add_argument('--domain')
+    p_regress.add_argument('--limit', type=int, default=200)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    archive = HtmlArchive()
+    try:
+        if args.command == 'stats':
+            print(json.dumps(archive.stats(), indent=2))
+        elif args.command == 'train':
+            print(json.dumps(archive.train_dictionaries(force=True), indent=2))
+        elif args.command == 'replay':
+            page, result = replay(archive, args.key)
+            if page is None:
+                print(f"Nothing archived for {args.key}")
+                return 1
+            print(json.dumps(result, indent=2, ensure_ascii=False, default=str))
+        elif args.command == 'regress':
+            from .extract_pool import ExtractionPool
+            pages = list(archive.iter_corpus(domain=args.domain, limit=args.limit))
+            pool = ExtractionPool()
+            failures = 0
+            try:
+                # Extracted across all worker processes, results in corpus order
+                results = pool.map((page.content, page.url, page.encoding) for page in pages)
+                for page, (result, decision) in zip(pages, results):
+                    if not result or not result.get('content'):
+                        failures += 1
+                        print(f"FAIL {page.url} ({decision})")
+            finally:
+                pool.close()
+            print(f"{len(pages) - failures}/{len(pages)} archived pages extracted")
+            return 1 if failures else 0
+    finally:
+        archive.close()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
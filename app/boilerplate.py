@@ -0,0 +1,180 @@
+"""
+Per-domain boilerplate fingerprints.
+
+Pages of one outlet repeat the same navigation, newsletter boxes, "siga-nos"
+lines and footers, and the cleaners rediscover them on every page. Each
+block of a page (BLOCK_TAGS) gets a fingerprint: a Merkle-style hash of its
+tag, classes and whitespace/digit-normalised text, built bottom-up from its
+children's hashes, so the whole page is hashed in one pass. Per domain,
+`BoilerplateStore` counts on how many pages each fingerprint was seen, with
+exponential decay (`half_life_days`). Fingerprints whose decayed count
+reaches `min_pages` are boilerplate: the extractor drops matching blocks
+before any other cleaning, one set lookup per block. An article's own text is
+unique, so it never builds up a count.
+
+The store is bounded: fingerprints whose decayed count falls below
+`min_score`, or not seen for `ttl_days`, are forgotten, and each domain
+keeps at most `max_per_domain`, the lowest counts going first. It lives in
+the pipeline process and is kept in the database; extraction workers get
+the known fingerprints of one page's domain (`plan()`) and report the
+page's own (app/extract_pool.py).
+"""
+
+import hashlib
+import logging
+import re
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+from bs4 import BeautifulSoup, Comment, NavigableString, Tag
+
+from .config import BOILERPLATE_CONFIG
+from .store import Database
+
+logger = logging.getLogger(__name__)
+
+# Blocks that are fingerprinted (and removed when known)
+BLOCK_TAGS = frozenset(('div', 'section', 'aside', 'nav', 'header', 'footer', 'ul', 'ol', 'form', 'table', 'p'))
+# Contents vary between loads (tracking ids, ad slots), so they are left out of the hashes
+SKIPPED_TAGS = frozenset(('script', 'style', 'noscript', 'template', 'iframe'))
+
+_DIGITS_RE = re.compile(r'\d+')
+
+
+def _normalise(text: str) -> str:
+    # Dates, counters and years in footers change from page to page
+    return _DIGITS_RE.sub('0', ' '.join(text.split()).lower())
+
+
+def fingerprint_blocks(soup: BeautifulSoup, min_chars: int = 30,
+                       max_chars: int = 3000) -> List[Tuple[Tag, str]]:
+    """(block, fingerprint) for every block of the page body with min_chars..max_chars of text, in document order."""
+    root = soup.body or soup
+    tags = root.find_all(True)
+    hashes: Dict[int, bytes] = {}
+    lengths: Dict[int, int] = {}
+    # Reverse document order visits children before their parents
+    for el in reversed(tags):
+        if el.name in SKIPPED_TAGS:
+            continue
+        digest = hashlib.blake2b(digest_size=8)
+        digest.update(el.name.encode())
+        digest.update(_normalise(' '.join(el.get('class', []))).encode())
+        length = 0
+        for child in el.children:
+            if isinstance(child, Tag):
+                child_hash = hashes.get(id(child))
+                if child_hash is not None:
+                    digest.update(child_hash)
+                    length += lengths[id(child)]
+            elif isinstance(child, NavigableString) and not isinstance(child, Comment):
+                text = _normalise(child)
+                if text:
+                    digest.update(b'\0' + text.encode('utf-8'))
+                    length += len(text)
+        hashes[id(el)] = digest.digest()
+        lengths[id(el)] = length
+    return [
+        (el, hashes[id(el)].hex()) for el in tags
+        if el.name in BLOCK_TAGS and min_chars <= lengths.get(id(el), 0) <= max_chars
+    ]
+
+
+def remove_boilerplate(soup: BeautifulSoup, plan: Dict[str, Any]) -> int:
+    """
+    Drops the page's blocks whose fingerprint is in plan['known'] and writes the
+    page's fingerprints to plan['seen'] (and the count to plan['removed']).
+    """
+    blocks = fingerprint_blocks(soup, plan.get('min_chars', 30), plan.get('max_chars', 3000))
+    known: Set[str] = set(plan.get('known') or ())
+    removed = 0
+    for el, fingerprint in blocks:
+        if fingerprint in known and not el.decomposed:
+            el.decompose()
+            removed += 1
+    seen = list(dict.fromkeys(fingerprint for _, fingerprint in blocks))
+    cap = plan.get('max_report', 400)
+    if len(seen) > cap:
+        # Site chrome sits at both ends of the page; the middle is mostly the article
+        seen = seen[:cap // 2] + seen[-(cap - cap // 2):]
+    plan['seen'] = seen
+    plan['removed'] = removed
+    return removed
+
+
+def _domain(url: str) -> str:
+    return (urlsplit(url).hostname or '').lower().replace('www.', '', 1)
+
+
+class BoilerplateStore:
+    """Decaying per-domain fingerprint counts, kept in the application database."""
+
+    def __init__(self, db: Database, config: Optional[Dict[str, Any]] = None):
+        self.db = db
+        self.config = dict(BOILERPLATE_CONFIG)
+        self.config.update(config or {})
+        # domain -> fingerprint -> [count at last_seen, last_seen]
+        self._domains: Dict[str, Dict[str, List[float]]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.config['enabled'])
+
+    def _entries(self, domain: str) -> Dict[str, List[float]]:
+        if domain not in self._domains:
+            self._domains[domain] = self.db.get_boilerplate_fingerprints(domain)
+        return self._domains[domain]
+
+    def _score(self, entry: List[float], now: float) -> float:
+        count, last_seen = entry
+        return count * 0.5 ** (max(now - last_seen, 0.0) / (self.config['half_life_days'] * 86400.0))
+
+    def known(self, url: str, now: Optional[float] = None) -> List[str]:
+        """Fingerprints of the URL's domain whose decayed page count reaches `min_pages`."""
+        now = now or time.time()
+        return [fp for fp, entry in self._entries(_domain(url)).items()
+                if self._score(entry, now) >= self.config['min_pages']]
+
+    def plan(self, url: str) -> Optional[Dict[str, Any]]:
+        """The known fingerprints and fingerprinting limits for one page; None when disabled."""
+        if not self.enabled:
+            return None
+        return {
+            'known': self.known(url),
+            'min_chars': self.config['min_chars'],
+            'max_chars': self.config['max_chars'],
+            'max_report': self.config['max_report'],
+        }
+
+    def observe(self, url: str, report: Optional[Dict[str, Any]], now: Optional[float] = None) -> None:
+        """Counts the fingerprints a page reported (`plan()` filled in by the extractor)."""
+        if not self.enabled or not report or not report.get('seen'):
+            return
+        now = now or time.time()
+        domain = _domain(url)
+        entries = self._entries(domain)
+        seen = set(report['seen'])
+        for fp in seen:
+            entry = entries.get(fp)
+            entries[fp] = [(self._score(entry, now) if entry else 0.0) + 1.0, now]
+
+        scores = {fp: self._score(entry, now) for fp, entry in entries.items()}
+        dropped = [fp for fp, score in scores.items() if score < self.config['min_score']]
+        overflow = len(entries) - len(dropped) - self.config['max_per_domain']
+        if overflow > 0:
+            kept = sorted((fp for fp in scores if scores[fp] >= self.config['min_score']), key=scores.get)
+            dropped += kept[:overflow]
+        for fp in dropped:
+            del entries[fp]
+        if report.get('removed'):
+            logger.info(f"Removed {report['removed']} known boilerplate block(s) from {url}.")
+        self.db.save_boilerplate_fingerprints(domain, [(fp, *entries[fp]) for fp in seen if fp in entries], dropped)
+
+    def prune(self, now: Optional[float] = None) -> int:
+        """Forgets fingerprints not seen for `ttl_days`, including those of domains no longer crawled."""
+        oldest = (now or time.time()) - self.config['ttl_days'] * 86400.0
+        for entries in self._domains.values():
+            for fp in [fp for fp, entry in entries.items() if entry[1] < oldest]:
+                del entries[fp]
+        return self.db.prune_boilerplate_fingerprints(oldest)
@@ -0,0 +1,92 @@
+"""
+Section splitting for chunked rewrites of long articles.
+
+Long match reports and analysis pieces used to go to Gemini in one prompt
+whose answer (the whole rewritten body plus the SEO fields) hit the output
+token limit: the JSON came back cut off, `json.loads` failed and the article
+was retried from scratch on the next key. Above `threshold_tokens`,
+`AIProcessor.rewrite_content` now rewrites the body in sections: the
+article's top-level blocks are split at <h2>/<h3> or paragraph boundaries
+into sections of about `section_tokens`, each section is rewritten by its
+own request (concurrently, on different keys), the title/slug/Yoast/tag
+fields come from one more request that leaves the body empty, and the
+sections are put back together in their original order (`stitch`).
+"""
+
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+from bs4 import BeautifulSoup, Comment, NavigableString, Tag
+
+from .config import CHUNKING_CONFIG
+
+HEADINGS = frozenset(('h2', 'h3'))
+
+
+def estimate_tokens(html: str, chars_per_token: Optional[float] = None) -> int:
+    """Rough token count of an HTML fragment (tags included: the rewrite echoes them)."""
+    return math.ceil(len(html or '') / (chars_per_token or CHUNKING_CONFIG['chars_per_token']))
+
+
+def _blocks(html: str) -> List[Tuple[str, str]]:
+    """(tag name, HTML) of the fragment's top-level blocks, unwrapping single-container wrappers."""
+    soup = BeautifulSoup(html, 'lxml')
+    root = soup.body or soup
+    while True:
+        children = [c for c in root.children if isinstance(c, Tag) or str(c).strip()]
+        if len(children) == 1 and isinstance(children[0], Tag) and children[0].name in ('div', 'article', 'section', 'main'):
+            root = children[0]
+            continue
+        break
+    blocks = []
+    for child in root.children:
+        if isinstance(child, Comment):
+            continue
+        if isinstance(child, NavigableString):
+            text = str(child).strip()
+            if text:
+                blocks.append(('p', f'<p>{text}</p>'))
+        else:
+            blocks.append((child.name, str(child)))
+    return blocks
+
+
+def split_sections(html: str, section_tokens: Optional[int] = None, max_sections: Optional[int] = None,
+                   chars_per_token: Optional[float] = None) -> List[str]:
+    """
+    Splits an article's HTML into sections of about `section_tokens`, at block
+    boundaries, preferring to start a section at a heading. A block bigger than
+    a section stays whole. At most `max_sections` (sections grow to fit).
+    """
+    section_tokens = section_tokens or CHUNKING_CONFIG['section_tokens']
+    max_sections = max_sections or CHUNKING_CONFIG['max_sections']
+    chars_per_token = chars_per_token or CHUNKING_CONFIG['chars_per_token']
+
+    blocks = _blocks(html)
+    total = sum(estimate_tokens(block, chars_per_token) for _, block in blocks)
+    target = max(section_tokens, math.ceil(total / max_sections))
+
+    sections: List[List[str]] = [[]]
+    size = 0
+    for name, block in blocks:
+        tokens = estimate_tokens(block, chars_per_token)
+        # A heading past half a section starts the next one; anything else only when the section is full
+        if sections[-1] and (size + tokens > target or (name in HEADINGS and size >= target / 2)):
+            sections.append([])
+            size = 0
+        sections[-1].append(block)
+        size += tokens
+
+    # Blocks bigger than `target` can still leave too many sections: merge the smallest neighbours
+    while len(sections) > max_sections:
+        sizes = [sum(estimate_tokens(b, chars_per_token) for b in s) for s in sections]
+        i = min(range(len(sections) - 1), key=lambda j: sizes[j] + sizes[j + 1])
+        sections[i:i + 2] = [sections[i] + sections[i + 1]]
+    return [''.join(s) for s in sections if s]
+
+
+def stitch(metadata: Dict[str, Any], sections: List[str]) -> Dict[str, Any]:
+    """The metadata request's fields with the rewritten sections, in order, as `conteudo_final`."""
+    result = dict(metadata)
+    result['conteudo_final'] = '\n'.join(s.strip() for s in sections if s and s.strip())
+    return result
@@ -0,0 +1,239 @@
+"""
+Single-pass junk removal.
+
+A `CleaningPlan` merges every removal rule of a cleaning step (tag names,
+exact and substring class/id patterns, attribute markers, related-content
+links, text-triggered headings, marker strings and short label blocks) into
+one matcher, compiled once. `apply()` walks the tree a single time, skipping
+the subtree of every node it has already decided to drop, collects the
+nodes to remove and only then detaches them.
+
+The old multi-pass cleaners ran one `soup.select()` per selector and called
+`get_text()` on every candidate container, which re-read each subtree once
+per ancestor. Here text is summarised bottom-up during the same walk: each
+element keeps at most `short_text_limit + 1` characters of its normalised
+text, which is all the exact-text and label rules need.
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from bs4 import BeautifulSoup, CData, NavigableString, Tag
+
+HEADING_TAGS = frozenset(('h1', 'h2', 'h3', 'h4', 'h5', 'h6'))
+
+# Walk states
+_WALK, _EXIT, _SCAN = 0, 1, 2
+
+
+def _contains_re(parts: Iterable[str], flags: int = 0) -> Optional['re.Pattern[str]']:
+    parts = list(parts)
+    return re.compile('|'.join(re.escape(p) for p in parts), flags) if parts else None
+
+
+class CleaningPlan:
+    """
+    Removal rules of one cleaning step, applied in a single walk.
+
+    Args:
+        tags: Tag names removed outright.
+        classes / ids: Exact class tokens / ids (`.share`, `#comments`).
+        class_contains / id_contains: Substrings of the class attribute / id
+            (`[class*="related"]`), case-sensitive as in CSS.
+        tag_classes: (tag, class) pairs (`div.widget`).
+        attrs: Attributes whose presence marks a block (`[data-ad]`).
+        aria_labels: (tag, substring) pairs for `aria-label` (`section[aria-label*="Leia"]`).
+        link_class_markers: Case-insensitive class substrings that mark an <a> as a related link.
+        link_ctas: `data-gtm-cta` values that mark an <a> as a related link.
+        heading_re: Headings whose text matches are related-content sections;
+            their container goes when it holds at most two headings, otherwise
+            the heading and the list/block right after it.
+        text_markers: Lower-case substrings of a text node that remove its parent.
+        exact_texts: Text nodes equal to one of these remove their parent; a
+            `short_text_tags` element whose whole text (minus a trailing colon)
+            is one of these, or one of `labels`, is removed.
+        labels: Field labels of technical info boxes; a `label_containers`
+            element whose text starts with `min_labels` of them is removed.
+    """
+
+    def __init__(self, tags: Iterable[str] = (), classes: Iterable[str] = (), ids: Iterable[str] = (),
+                 class_contains: Iterable[str] = (), id_contains: Iterable[str] = (),
+                 tag_classes: Iterable[Tuple[str, str]] = (), attrs: Iterable[str] = (),
+                 aria_labels: Iterable[Tuple[str, str]] = (), link_class_markers: Iterable[str] = (),
+                 link_ctas: Iterable[str] = (), heading_re: Optional['re.Pattern[str]'] = None,
+                 text_markers: Iterable[str] = (), exact_texts: Iterable[str] = (),
+                 short_text_tags: Iterable[str] = (), labels: Iterable[str] = (),
+                 label_containers: Iterable[str] = (), min_labels: int = 2):
+        self.tags = frozenset(tags)
+        self.classes = frozenset(classes)
+        self.ids = frozenset(ids)
+        self.class_contains = _contains_re(class_contains)
+        self.id_contains = _contains_re(id_contains)
+        self.tag_classes: Dict[str, frozenset] = {}
+        for tag, cls in tag_classes:
+            self.tag_classes[tag] = self.tag_classes.get(tag, frozenset()) | {cls}
+        self.attrs = tuple(attrs)
+        self.aria_labels: Dict[str, 're.Pattern[str]'] = {}
+        for tag in {t for t, _ in aria_labels}:
+            self.aria_labels[tag] = _contains_re(s for t, s in aria_labels if t == tag)
+        self.link_class_markers = _contains_re(link_class_markers, re.I)
+        self.link_ctas = frozenset(link_ctas)
+        self.heading_re = heading_re
+        self.text_markers = tuple(m.lower() for m in text_markers)
+        self.exact_texts = frozenset(exact_texts)
+        self.short_texts = self.exact_texts | frozenset(labels)
+        self.short_text_tags = frozenset(short_text_tags)
+        self.label_res = [re.compile(rf"^{re.escape(l)} ?(?::|$)", re.I) for l in labels]
+        self.label_containers = frozenset(label_containers)
+        self.min_labels = min_labels
+        # Longest text a short-text or label rule has to see; longer texts are kept truncated
+        self.short_text_limit = max((len(s) for s in (*self.exact_texts, *labels)), default=0) + 2
+        self._summarise = bool(self.short_text_tags and self.short_texts) or bool(self.label_containers and labels)
+
+    def _matches(self, el: Tag) -> bool:
+        name = el.name
+        if name in self.tags:
+            return True
+        attrs = el.attrs
+        if attrs:
+            classes = attrs.get('class')
+            if classes:
+                class_str = ' '.join(classes) if isinstance(classes, list) else classes
+                if self.classes and not self.classes.isdisjoint(class_str.split()):
+                    return True
+                if self.class_contains is not None and self.class_contains.search(class_str):
+                    return True
+                wanted = self.tag_classes.get(name)
+                if wanted and not wanted.isdisjoint(class_str.split()):
+                    return True
+                if name == 'a' and self.link_class_markers is not None and self.link_class_markers.search(class_str):
+                    return True
+            el_id = attrs.get('id')
+            if el_id:
+                if el_id in self.ids or (self.id_contains is not None and self.id_contains.search(el_id)):
+                    return True
+            for attr in self.attrs:
+                if attr in attrs:
+                    return True
+            aria = self.aria_labels.get(name)
+            if aria is not None and aria.search(attrs.get('aria-label') or ''):
+                return True
+            if name == 'a' and attrs.get('data-gtm-cta') in self.link_ctas:
+                return True
+        return False
+
+    @staticmethod
+    def _remove_related_section(heading: Tag) -> int:
+        if heading.decomposed:
+            return 0
+        container = heading.find_parent(('section', 'aside', 'div'))
+        if container is not None and len(container.find_all(HEADING_TAGS)) <= 2:
+            container.decompose()
+            return 1
+        sibling = heading.find_next_sibling()
+        removed = 1
+        if sibling is not None and sibling.name in ('div', 'ul', 'section', 'ol'):
+            sibling.decompose()
+            removed += 1
+        heading.decompose()
+        return removed
+
+    def _walk(self, root: Tag, extra=None) -> Tuple[List[Tag], List[Tag]]:
+        """
+        One pass over the descendants of `root`, without touching the tree.
+
+        Returns:
+            (nodes to remove, related-content headings), both in document order.
+
+        Args:
+            root: Document or element to clean.
+            extra: Optional compiled soupsieve matcher (a site's related-block
+                selectors) checked in the same walk.
+        """
+        drop: List[Tag] = []
+        headings: List[Tag] = []
+        dropped = set()
+        summaries: Dict[int, str] = {}
+        limit = self.short_text_limit
+        summarise = self._summarise
+        # (node, state): EXIT entries come back after all of a tag's children; SCAN marks the
+        # inside of a dropped subtree, still read for related headings whose section may reach
+        # outside it. Like select()/find_all(), only descendants of root are candidates.
+        stack: List[Tuple[object, int]] = [(child, _WALK) for child in reversed(root.contents)]
+
+        def mark(node: Tag) -> None:
+            if id(node) not in dropped:
+                dropped.add(id(node))
+                drop.append(node)
+
+        def related_heading(node: Tag) -> bool:
+            if node.name not in HEADING_TAGS:
+                return False
+            heading_text = node.get_text(" ", strip=True)
+            return bool(heading_text and self.heading_re.search(heading_text))
+
+        while stack:
+            node, state = stack.pop()
+            if state == _SCAN:
+                if isinstance(node, Tag):
+                    if related_heading(node):
+                        headings.append(node)
+                    else:
+                        stack.extend((child, _SCAN) for child in reversed(node.contents))
+                continue
+            if state == _EXIT:
+                if id(node) in dropped:
+                    continue
+                pieces = [summaries.pop(id(c), '') if isinstance(c, Tag) else
+                          (c if type(c) in (NavigableString, CData) else '') for c in node.contents]
+                text = ' '.join(' '.join(pieces).split())[:limit + 1]
+                if node.name in self.short_text_tags and len(text) <= limit \
+                        and text.rstrip(':').strip() in self.short_texts:
+                    mark(node)
+                    continue
+                if node.name in self.label_containers and text and \
+                        sum(1 for rx in self.label_res if rx.match(text)) >= self.min_labels:
+                    mark(node)
+                    continue
+                summaries[id(node)] = text
+                continue
+
+            if isinstance(node, Tag):
+                if id(node) in dropped:
+                    continue
+                # Related headings first: a heading that is also junk still takes its section along
+                if self.heading_re is not None and related_heading(node):
+                    headings.append(node)
+                    continue
+                if self._matches(node) or (extra is not None and extra.match(node)):
+                    mark(node)
+                    if self.heading_re is not None:
+                        stack.extend((child, _SCAN) for child in reversed(node.contents))
+                    continue
+                if summarise:
+                    stack.append((node, _EXIT))
+                stack.extend((child, _WALK) for child in reversed(node.contents))
+            elif type(node) in (NavigableString, CData):
+                if self.text_markers or self.exact_texts:
+                    parent = node.parent
+                    if parent is None or isinstance(parent, BeautifulSoup):
+                        continue
+                    s = node.strip()
+                    if s and (s in self.exact_texts or any(m in s.lower() for m in self.text_markers)):
+                        mark(parent)
+        return drop, headings
+
+    def apply(self, root: Tag, extra=None) -> int:
+        """Removes every node the plan matches under `root`; returns how many subtrees were removed."""
+        drop, headings = self._walk(root, extra)
+        removed = 0
+        # Related sections go last-first, so an emptied container counts fewer headings for earlier ones
+        for heading in reversed(headings):
+            removed += self._remove_related_section(heading)
+        for node in drop:
+            if node.decomposed or node.parent is None:
+                continue
+            node.decompose()
+            removed += 1
+        return removed
+
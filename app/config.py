@@ -22,37 +22,44 @@ RSS_FEEDS: Dict[str, Dict[str, Any]] = {
         'urls': ['https://aprenderpoker.site/feeds/lance/futebol/rss'],
         'category': 'futebol',
         'source_name': 'LANCE!',
+        'language': 'pt',
         'deny_regex': r'(?i)Onde Assistir',
     },
     'globo_futebol': {
         'urls': ['https://aprenderpoker.site/feeds/ge/futebol/rss'],
         'category': 'futebol',
         'source_name': 'Globo Esporte',
+        'language': 'pt',
     },
     'marca': {
         'urls': ['https://aprenderpoker.site/feeds/marca/futbol/rss'],
         'category': 'futebol-internacional',
         'source_name': 'Marca',
+        'language': 'es',
     },
     'as_es': {
         'urls': ['https://aprenderpoker.site/feeds/as_es/primera/rss'],
         'category': 'futebol-internacional',
         'source_name': 'AS España',
+        'language': 'es',
     },
     'cbs_nfl': {
         'urls': ['https://www.cbssports.com/rss/headlines/nfl/'],
         'category': 'outros-esportes',
         'source_name': 'CBS Sports',
+        'language': 'en',
     },
     'cbs_nba': {
         'urls': ['https://www.cbssports.com/rss/headlines/nba/'],
         'category': 'outros-esportes',
         'source_name': 'CBS Sports',
+        'language': 'en',
     },
     'the_guardian_official': {
         'urls': ['https://www.theguardian.com/football/rss'],
         'category': 'futebol-internacional',
         'source_name': 'The Guardian',
+        'language': 'en',
     },
 }
 
@@ -63,6 +70,39 @@ USER_AGENT = (
     'Chrome/91.0.4472.124 Safari/537.36'
 )
 
+# --- Transporte HTTP compartilhado (app/transport.py) ---
+TRANSPORT_CONFIG = {
+    # Conexões keep-alive mantidas por host e quantos hosts têm pool em cache
+    'pool_maxsize': int(os.getenv('HTTP_POOL_MAXSIZE', 8)),
+    'pool_connections': int(os.getenv('HTTP_POOL_CONNECTIONS', 32)),
+    # Máximo de requisições simultâneas a um mesmo host
+    'max_per_host': int(os.getenv('HTTP_MAX_PER_HOST', 4)),
+    # Política por classe de host: timeouts (s), tentativas extras e backoff exponencial
+    # (só métodos idempotentes são repetidos; 429/5xx respeitam o Retry-After)
+    'classes': {
+        'pages': {'connect_timeout': 5, 'read_timeout': 20, 'retries': 2, 'backoff_factor': 0.5},
+        'feeds': {'connect_timeout': 5, 'read_timeout': 20, 'retries': 2, 'backoff_factor': 1.0},
+        'media': {'connect_timeout': 5, 'read_timeout': 25, 'retries': 2, 'backoff_factor': 1.0},
+        'wordpress': {'connect_timeout': 10, 'read_timeout': 60, 'retries': 3, 'backoff_factor': 1.0},
+    },
+}
+
+# Download de páginas e feeds em streaming, com limites de tamanho e de tempo por documento
+FETCH_CONFIG = {
+    'timeout_seconds': float(os.getenv('FETCH_TIMEOUT_SECONDS', 20)),
+    'max_page_bytes': int(os.getenv('FETCH_MAX_PAGE_BYTES', 3 * 1024 * 1024)),
+    'max_feed_bytes': int(os.getenv('FETCH_MAX_FEED_BYTES', 10 * 1024 * 1024)),
+    # Tempo máximo lendo o corpo de uma resposta (páginas lentas não seguram o ciclo)
+    'max_seconds': float(os.getenv('FETCH_MAX_SECONDS', 30)),
+    'chunk_bytes': 64 * 1024,
+    # Para de baixar a página quando o <head> e o <article> principal já fecharam
+    'stop_at_article_end': os.getenv('FETCH_STOP_AT_ARTICLE_END', 'true').lower() in ('1', 'true', 'yes'),
+    # <article> menores que isso (cards, chamadas) não contam como o artigo principal
+    'min_article_bytes': 2048,
+    # Domínios cujo conteúdo útil continua depois do </article> (sempre baixados por inteiro)
+    'full_body_domains': [],
+}
+
 # --- Configuração da IA ---
 def _load_ai_keys() -> List[str]:
     """
@@ -95,6 +135,19 @@ AI_GENERATION_CONFIG = {
     'max_output_tokens': 4096,
 }
 
+# Reescrita em trechos (app/chunking.py): corpos acima de threshold_tokens são divididos em seções
+# reescritas em paralelo, cada uma em uma chave, e os metadados (título, slug, Yoast, tags) saem de uma chamada à parte
+CHUNKING_CONFIG = {
+    'enabled': os.getenv('CHUNKED_REWRITE', 'true').lower() in ('1', 'true', 'yes'),
+    'threshold_tokens': int(os.getenv('CHUNKED_REWRITE_THRESHOLD', 2500)),
+    'section_tokens': 1500,
+    'max_sections': 6,
+    # Chamadas simultâneas (no máximo uma por chave)
+    'max_workers': 4,
+    # Estimativa de tokens: ~4 caracteres de HTML por token
+    'chars_per_token': 4.0,
+}
+
 # --- WordPress ---
 WORDPRESS_CONFIG = {
     'url': os.getenv('WORDPRESS_URL'),
@@ -130,9 +183,204 @@ CATEGORY_ALIASES: Dict[str, str] = {
 SCHEDULE_CONFIG = {
     'check_interval_minutes': int(os.getenv('CHECK_INTERVAL_MINUTES', 15)),
     'max_articles_per_feed': int(os.getenv('MAX_ARTICLES_PER_FEED', 3)),
+    # Itens NEW que passaram do limite de uma rodada ainda são processados nas seguintes por até N horas
+    'backlog_max_age_hours': float(os.getenv('BACKLOG_MAX_AGE_HOURS', 6)),
     'per_article_delay_seconds': int(os.getenv('PER_ARTICLE_DELAY_SECONDS', 8)),
     'per_feed_delay_seconds': int(os.getenv('PER_FEED_DELAY_SECONDS', 15)),
     'cleanup_after_hours': int(os.getenv('CLEANUP_AFTER_HOURS', 72)),
+    # Lease do ciclo (renovado pelo heartbeat); expira se o processo morrer
+    'cycle_lease_ttl_seconds': int(os.getenv('CYCLE_LEASE_TTL_SECONDS', 600)),
+}
+
+# --- Polling adaptativo por feed (um job por feed no agendador) ---
+# Cada feed pode sobrescrever os limites com RSS_FEEDS[...]['poll'] = {'min_minutes': .., 'max_minutes': ..}
+POLLING_CONFIG = {
+    'min_interval_minutes': float(os.getenv('POLL_MIN_INTERVAL_MINUTES', 3)),
+    'max_interval_minutes': float(os.getenv('POLL_MAX_INTERVAL_MINUTES', 90)),
+    # Intervalo inicial de um feed sem histórico
+    'initial_interval_minutes': float(os.getenv('POLL_INITIAL_INTERVAL_MINUTES', SCHEDULE_CONFIG['check_interval_minutes'])),
+    # Quantos itens novos se espera encontrar por poll (define o intervalo a partir da taxa observada)
+    'target_items_per_poll': float(os.getenv('POLL_TARGET_ITEMS_PER_POLL', 1)),
+    # Peso da observação mais recente na média móvel exponencial da taxa de publicação
+    'ewma_alpha': float(os.getenv('POLL_EWMA_ALPHA', 0.3)),
+    # Fator de recuo (polls vazios/304) e de aceleração (itens novos)
+    'backoff_factor': float(os.getenv('POLL_BACKOFF_FACTOR', 1.5)),
+    # Jitter como fração do intervalo (evita que os feeds sincronizem)
+    'jitter_fraction': float(os.getenv('POLL_JITTER_FRACTION', 0.1)),
+}
+
+# --- Caminho rápido: usar o conteúdo completo do RSS (content:encoded) sem baixar a página ---
+# Cada feed pode desligar (RSS_FEEDS[...]['feed_content'] = False) ou ajustar os limites com um dict
+FEED_CONTENT_CONFIG = {
+    'enabled': os.getenv('FEED_CONTENT_FAST_PATH', 'true').lower() in ('1', 'true', 'yes'),
+    'min_chars': int(os.getenv('FEED_CONTENT_MIN_CHARS', 1500)),
+    'min_paragraphs': int(os.getenv('FEED_CONTENT_MIN_PARAGRAPHS', 4)),
+    'require_image': os.getenv('FEED_CONTENT_REQUIRE_IMAGE', 'true').lower() in ('1', 'true', 'yes'),
+}
+
+# --- Versões leves (AMP/lite) de páginas pesadas ---
+# Por padrão só os domínios abaixo; cada feed pode forçar (RSS_FEEDS[...]['prefer_lite'] = True) ou desligar (= False)
+LITE_PAGE_CONFIG = {
+    'enabled': os.getenv('LITE_PAGES', 'true').lower() in ('1', 'true', 'yes'),
+    'domains': ['ge.globo.com', 'lance.com.br', 'marca.com'],
+    # Padrões conhecidos de URL leve ('{path}' = caminho da URL original). Os demais são descobertos
+    # pelo <link rel="amphtml"> no <head> da página e aprendidos por domínio
+    'url_templates': {
+        'ge.globo.com': 'https://ge.globo.com/google/amp{path}',
+    },
+    # Quanto do início da página baixar, no máximo, para achar o <link rel="amphtml">
+    'head_max_bytes': int(os.getenv('LITE_HEAD_MAX_BYTES', 256 * 1024)),
+    # Domínio sem versão leve (ou que falhou 'max_failures' vezes seguidas) não é tentado de novo por este tempo
+    'retry_after_hours': float(os.getenv('LITE_RETRY_AFTER_HOURS', 6)),
+    'max_failures': int(os.getenv('LITE_MAX_FAILURES', 3)),
+    # Verificação de qualidade do texto extraído da versão leve (abaixo disso, usa a página completa)
+    'min_chars': int(os.getenv('LITE_MIN_CHARS', 1200)),
+    'min_paragraphs': int(os.getenv('LITE_MIN_PARAGRAPHS', 3)),
+}
+
+# --- Arquivo do HTML bruto baixado (app/archive.py) ---
+# Cada página fica guardada uma vez (chave SHA-256), comprimida com dicionário treinado por domínio
+# (zstd se o pacote 'zstandard' estiver instalado, senão zlib). Serve para reprocessar sem baixar
+# de novo e como corpus de benchmarks/regressões (python -m app.archive regress)
+ARCHIVE_CONFIG = {
+    'enabled': os.getenv('HTML_ARCHIVE', 'true').lower() in ('1', 'true', 'yes'),
+    'path': os.getenv('HTML_ARCHIVE_PATH', os.path.join('data', 'archive')),
+    # Acima disso, as páginas acessadas há mais tempo são apagadas (até 90% do limite)
+    'max_bytes': int(os.getenv('HTML_ARCHIVE_MAX_BYTES', 500 * 1024 * 1024)),
+    'zstd_level': 9,
+    'zlib_level': 9,
+    'dict_bytes': 112 * 1024,
+    # Páginas de um domínio necessárias para treinar o primeiro dicionário, quantas usar no treino
+    # e quantas páginas novas disparam um novo treino
+    'train_min_samples': 25,
+    'train_max_samples': 200,
+    'retrain_every': 500,
+    # Cópia arquivada mais nova que isso é reaproveitada no lugar de um novo download
+    'reuse_max_age_hours': float(os.getenv('HTML_ARCHIVE_REUSE_HOURS', 72)),
+}
+
+# --- Artefatos de depuração da IA (app/debug_recorder.py) ---
+# Gravados em segundo plano em segmentos .jsonl.gz rotativos, indexados por artigo
+DEBUG_RECORDER_CONFIG = {
+    'enabled': os.getenv('DEBUG_RECORDER', 'true').lower() in ('1', 'true', 'yes'),
+    'path': os.getenv('DEBUG_RECORDER_PATH', 'debug'),
+    # Fração das respostas bem-sucedidas guardadas (sem o prompt); falhas são sempre guardadas, com o prompt
+    'sample_rate': float(os.getenv('DEBUG_SAMPLE_RATE', 0.05)),
+    'segment_bytes': 4 * 1024 * 1024,
+    # Acima de qualquer um dos limites, os segmentos mais antigos são apagados
+    'max_segments': 16,
+    'max_bytes': int(os.getenv('DEBUG_RECORDER_MAX_BYTES', 48 * 1024 * 1024)),
+    # Artefatos além disso na fila são descartados: a gravação nunca segura o pipeline
+    'queue_size': 512,
+    'compress_level': 6,
+}
+
+# --- Cache de resultados de extração (app/extraction_cache.py) ---
+# Mesma URL (normalizada) com o mesmo HTML e a mesma versão do extrator não é extraída de novo
+EXTRACTION_CACHE_CONFIG = {
+    'enabled': os.getenv('EXTRACTION_CACHE', 'true').lower() in ('1', 'true', 'yes'),
+    'ttl_hours': float(os.getenv('EXTRACTION_CACHE_TTL_HOURS', 72)),
+    # Acima disso, os resultados usados há mais tempo são descartados
+    'max_entries': int(os.getenv('EXTRACTION_CACHE_MAX_ENTRIES', 5000)),
+}
+
+# --- Detecção de matérias duplicadas entre fontes (app/dedupe.py) ---
+# Antes do Gemini, o texto extraído é comparado (SimHash de 64 bits) com as matérias publicadas na janela
+DEDUPE_CONFIG = {
+    'enabled': os.getenv('DEDUPE', 'true').lower() in ('1', 'true', 'yes'),
+    'window_hours': float(os.getenv('DEDUPE_WINDOW_HOURS', 36)),
+    # Bits diferentes (de 64) até os quais duas matérias são a mesma história; a distância até a
+    # mais próxima vai para o log, para ajuste
+    'max_distance': int(os.getenv('DEDUPE_MAX_DISTANCE', 10)),
+    # 'skip' descarta a duplicata; 'merge' também acrescenta a nova fonte ao post já publicado
+    'action': os.getenv('DEDUPE_ACTION', 'skip'),
+    'title_weight': 3,
+    # Textos com menos palavras que isso não são comparados
+    'min_tokens': 80,
+}
+
+# --- Processos de extração (app/extract_pool.py) ---
+# Parsing/limpeza/trafilatura rodam em processos separados; 0 = no próprio processo do pipeline
+EXTRACT_POOL_CONFIG = {
+    'workers': int(os.getenv('EXTRACT_WORKERS', min(4, os.cpu_count() or 1))),
+    # Tarefa que passar disso tem os processos reiniciados e o artigo falha com 'timeout'
+    'task_timeout_seconds': float(os.getenv('EXTRACT_TASK_TIMEOUT', 60)),
+    # Cada processo é reciclado após N extrações (limita o crescimento de memória)
+    'max_tasks_per_child': int(os.getenv('EXTRACT_MAX_TASKS_PER_CHILD', 50)),
+    'start_method': os.getenv('EXTRACT_START_METHOD', 'forkserver'),
+}
+
+# --- Regras por site (app/site_rules.py) ---
+# Arquivo JSON opcional com perfis extras de sites (seletores/ganchos); substitui perfis embutidos de mesmo nome
+SITE_RULES_CONFIG = {
+    'path': os.getenv('SITE_RULES_PATH', os.path.join('data', 'site_rules.json')),
+}
+
+# --- Seletores de conteúdo aprendidos por domínio (app/selector_learning.py) ---
+# Sites sem perfil próprio: o contêiner de onde o trafilatura tira o texto é aprendido e, com confiança
+# suficiente, usado direto (sem trafilatura), com validação periódica e rebaixamento se o layout mudar
+SELECTOR_LEARNING_CONFIG = {
+    'enabled': os.getenv('SELECTOR_LEARNING', 'true').lower() in ('1', 'true', 'yes'),
+    # Últimas páginas consideradas por domínio
+    'window': int(os.getenv('SELECTOR_LEARNING_WINDOW', 10)),
+    # Promoção: o mesmo seletor em pelo menos N páginas e nesta fração da janela
+    'min_observations': int(os.getenv('SELECTOR_LEARNING_MIN_OBSERVATIONS', 5)),
+    'confidence': float(os.getenv('SELECTOR_LEARNING_CONFIDENCE', 0.8)),
+    # A cada N páginas pelo seletor, uma roda também o trafilatura para comparar
+    'validate_every': int(os.getenv('SELECTOR_LEARNING_VALIDATE_EVERY', 20)),
+    # Similaridade de texto (0-1) abaixo da qual o seletor é rebaixado
+    'min_similarity': float(os.getenv('SELECTOR_LEARNING_MIN_SIMILARITY', 0.8)),
+    # Contêiner com menos texto que isso não conta como acerto
+    'min_chars': 300,
+}
+
+# --- Impressões digitais de blocos repetidos por domínio (app/boilerplate.py) ---
+# Blocos (menus, caixas de newsletter, rodapés) vistos em várias páginas do mesmo site são removidos
+# antes da limpeza heurística; as contagens decaem com o tempo
+BOILERPLATE_CONFIG = {
+    'enabled': os.getenv('BOILERPLATE_FINGERPRINTS', 'true').lower() in ('1', 'true', 'yes'),
+    # Contagem (com decaimento) de páginas em que o bloco precisa aparecer para ser removido;
+    # fracionária porque cada aparição já perdeu um pouco do peso quando a próxima página chega
+    'min_pages': float(os.getenv('BOILERPLATE_MIN_PAGES', 3.5)),
+    'half_life_days': float(os.getenv('BOILERPLATE_HALF_LIFE_DAYS', 7)),
+    # Contagem abaixo da qual a impressão é esquecida; sem ser vista por ttl_days também
+    'min_score': 0.05,
+    'ttl_days': float(os.getenv('BOILERPLATE_TTL_DAYS', 30)),
+    'max_per_domain': int(os.getenv('BOILERPLATE_MAX_PER_DOMAIN', 5000)),
+    # Impressões enviadas por página; blocos com texto fora desta faixa (caracteres) são ignorados
+    'max_report': 400,
+    'min_chars': 30,
+    'max_chars': 3000,
+}
+
+# --- Filtro antes da IA (app/gating.py) ---
+# Regras baratas descartam artigos fracos antes de gastar uma chamada ao Gemini. Cada feed pode
+# desligar (RSS_FEEDS[...]['gate'] = False) ou ajustar com um dict; 'title_deny' do feed soma à lista global
+GATE_CONFIG = {
+    'enabled': os.getenv('GATE', 'true').lower() in ('1', 'true', 'yes'),
+    # 'shadow' só registra (padrão, para calibrar os limites sem perder artigos); 'enforce' descarta.
+    # Passe um feed para enforce (RSS_FEEDS[...]['gate'] = {'mode': 'enforce'}) quando /api/gate/rejections
+    # mostrar poucos falsos positivos
+    'mode': os.getenv('GATE_MODE', 'shadow'),
+    'min_words': int(os.getenv('GATE_MIN_WORDS', 120)),
+    # Parágrafos com pelo menos 8 palavras
+    'min_paragraphs': int(os.getenv('GATE_MIN_PARAGRAPHS', 2)),
+    'title_deny': [
+        r'\bonde assistir\b', r'\bd[oó]nde ver\b', r'\bhow to watch\b',
+        r'\bao vivo\b', r'\ben (directo|vivo)\b', r'\bminuto a minuto\b', r'[-–—:]\s*live$', r'^live[:\s]',
+    ],
+    # Marcadores de paywall só contam em textos curtos (o teaser); matérias completas às vezes os têm no rodapé
+    'paywall_markers': [
+        'exclusivo para assinantes', 'assine para continuar', 'assine para ler', 'já é assinante',
+        'suscríbete para seguir leyendo', 'contenido exclusivo para suscriptores', 'ya eres suscriptor',
+        'subscribe to continue reading', 'this article is for subscribers', 'subscribers only',
+    ],
+    'paywall_max_words': 400,
+    # O idioma detectado precisa ter N vezes mais palavras-chave que o idioma do feed (RSS_FEEDS[...]['language'])
+    'language_margin': 2.0,
+    # Distância SimHash até uma matéria publicada abaixo da qual o artigo é descartado (None = desligado;
+    # duplicatas confirmadas já saem em app/dedupe.py)
+    'max_duplicate_distance': None,
 }
 
 PIPELINE_CONFIG = {
@@ -144,3 +392,25 @@ PIPELINE_CONFIG = {
         'https://exemplo.com/logo.png'  # TODO: atualizar para a URL real do logo
     ),
 }
+
+# --- Métricas / painel de performance ---
+METRICS_CONFIG = {
+    'retention_days': int(os.getenv('METRICS_RETENTION_DAYS', 30)),
+    'dashboard_window_hours': int(os.getenv('METRICS_WINDOW_HOURS', 24)),
+}
+
+# --- Dashboard ---
+DASHBOARD_CONFIG = {
+    'stats_cache_ttl_seconds': float(os.getenv('DASHBOARD_STATS_TTL_SECONDS', 5)),
+    # Live stream (SSE): intervalo de polling dos eventos/log e keep-alive
+    'stream_poll_seconds': float(os.getenv('DASHBOARD_STREAM_POLL_SECONDS', 1)),
+    'stream_keepalive_seconds': float(os.getenv('DASHBOARD_STREAM_KEEPALIVE_SECONDS', 15)),
+    # Quantos bytes do fim do log são lidos na primeira leitura
+    'log_backfill_bytes': int(os.getenv('DASHBOARD_LOG_BACKFILL_BYTES', 64 * 1024)),
+    # Quantos eventos do pipeline manter no banco
+    'events_retention': int(os.getenv('PIPELINE_EVENTS_RETENTION', 5000)),
+    # Heartbeat do agendador: intervalo de escrita, quando considerar 'travado'
+    'heartbeat_interval_seconds': float(os.getenv('HEARTBEAT_INTERVAL_SECONDS', 5)),
+    'heartbeat_stale_seconds': float(os.getenv('HEARTBEAT_STALE_SECONDS', 30)),
+    'stage_timeout_seconds': float(os.getenv('STAGE_TIMEOUT_SECONDS', 900)),
+}
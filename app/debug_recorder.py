@@ -0,0 +1,255 @@
+"""
+Bounded, asynchronous recorder of AI debug artifacts.
+
+`AIProcessor._parse_response` used to `mkdir` and write a new
+`debug/ai_response_<second>.json` on every answer: synchronous I/O on the
+rewrite path, a directory growing without bound, and concurrent answers in
+the same second overwriting each other. Now `record()` only decides whether
+to keep an artifact and queues it; a background thread writes batches to
+gzip-compressed JSON-lines segments (`seg-000001.jsonl.gz`, one gzip member
+per batch) and indexes them by article ID in `index.db`.
+
+- Successful answers are kept at `sample_rate`, without the prompt.
+- Failures (unparseable or unusable answers, API errors) are always kept,
+  with the prompt and the error: full capture only where it is needed.
+- The queue is bounded: when the writer falls behind, artifacts are dropped
+  and counted, and the pipeline never waits on the disk.
+- Segments roll over at `segment_bytes`; the oldest are deleted past
+  `max_segments` or `max_bytes`, so the directory is a ring buffer.
+
+Usage:
+    python -m app.debug_recorder stats
+    python -m app.debug_recorder show <article_id>
+"""
+
+import argparse
+import atexit
+import gzip
+import json
+import logging
+import queue
+import random
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .config import DEBUG_RECORDER_CONFIG
+
+logger = logging.getLogger(__name__)
+
+_SEGMENT_RE = re.compile(r'^seg-(\d+)\.jsonl\.gz$')
+_STOP = object()
+
+_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS entries (
+        segment INTEGER NOT NULL,
+        article_id INTEGER,
+        kind TEXT NOT NULL,
+        failed INTEGER NOT NULL,
+        created_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_entries_article ON entries (article_id);
+    CREATE INDEX IF NOT EXISTS idx_entries_segment ON entries (segment);
+'''
+
+
+class DebugRecorder:
+    """Samples AI artifacts and writes them from a background thread into a bounded set of segments."""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = dict(DEBUG_RECORDER_CONFIG)
+        self.config.update(config or {})
+        self.root = Path(self.config['path'])
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=self.config['queue_size'])
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.config['enabled'])
+
+    def record(self, kind: str, article_id: Optional[int] = None, response: Optional[str] = None,
+               failed: bool = False, prompt: Optional[str] = None, error: Optional[str] = None,
+               **extra: Any) -> bool:
+        """
+        Queues an artifact; True if it will be written. Never blocks: sampled-out
+        successes and artifacts that find the queue full are skipped.
+        """
+        if not self.enabled or self._closed:
+            return False
+        if not failed and random.random() >= self.config['sample_rate']:
+            return False
+        entry = dict(extra, ts=time.time(), kind=kind, article_id=article_id, failed=failed, response=response)
+        if failed:
+            entry.update(prompt=prompt, error=error)
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped % 100 == 1:
+                logger.warning(f"Debug recorder queue full; {self.dropped} artifact(s) dropped so far.")
+            return False
+        self._start()
+        return True
+
+    def _start(self) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='debug-recorder', daemon=True)
+                    self._thread.start()
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Waits until everything queued so far is on disk; False on timeout."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Writes what is queued and stops the writer."""
+        self._closed = True
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+            self._thread = None
+
+    # --- Writer thread ---
+
+    def _run(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        index = sqlite3.connect(str(self.root / 'index.db'))
+        index.executescript(_SCHEMA)
+        segment = max(self._segments(), default=0) + 1
+        try:
+            while True:
+                batch = [self._queue.get()]
+                while len(batch) < 256:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                entries = [e for e in batch if e is not _STOP]
+                try:
+                    if entries:
+                        segment = self._write(index, segment, entries)
+                except Exception as e:
+                    logger.error(f"Failed to write {len(entries)} debug artifact(s): {e}")
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+                if len(entries) < len(batch):
+                    return
+        finally:
+            index.close()
+
+    def _segment_path(self, segment: int) -> Path:
+        return self.root / f'seg-{segment:06d}.jsonl.gz'
+
+    def _segments(self) -> List[int]:
+        if not self.root.is_dir():
+            return []
+        return sorted(int(m.group(1)) for m in map(_SEGMENT_RE.match, (p.name for p in self.root.iterdir())) if m)
+
+    def _write(self, index: sqlite3.Connection, segment: int, entries: List[Dict[str, Any]]) -> int:
+        """Appends a batch as one gzip member; returns the segment the next batch goes to."""
+        path = self._segment_path(segment)
+        data = ''.join(json.dumps(e, ensure_ascii=False, default=str) + '\n' for e in entries).encode('utf-8')
+        with open(path, 'ab') as f:
+            f.write(gzip.compress(data, compresslevel=self.config['compress_level']))
+        with index:
+            index.executemany(
+                "INSERT INTO entries (segment, article_id, kind, failed, created_at) VALUES (?, ?, ?, ?, ?)",
+                [(segment, e['article_id'], e['kind'], int(e['failed']), e['ts']) for e in entries]
+            )
+        if path.stat().st_size >= self.config['segment_bytes']:
+            segment += 1
+        self._enforce_retention(index, keep=segment)
+        return segment
+
+    def _enforce_retention(self, index: sqlite3.Connection, keep: int) -> None:
+        segments = self._segments()
+        sizes = {s: self._segment_path(s).stat().st_size for s in segments}
+        total = sum(sizes.values())
+        for s in segments:
+            if s >= keep or (len(sizes) <= self.config['max_segments'] and total <= self.config['max_bytes']):
+                break
+            self._segment_path(s).unlink(missing_ok=True)
+            total -= sizes.pop(s)
+            with index:
+                index.execute("DELETE FROM entries WHERE segment = ?", (s,))
+
+    # --- Reading ---
+
+    def find(self, article_id: int) -> List[Dict[str, Any]]:
+        """The artifacts still kept for an article, oldest first."""
+        path = self.root / 'index.db'
+        if not path.exists():
+            return []
+        conn = sqlite3.connect(str(path))
+        try:
+            segments = [row[0] for row in conn.execute(
+                "SELECT DISTINCT segment FROM entries WHERE article_id = ? ORDER BY segment", (article_id,))]
+        finally:
+            conn.close()
+        found = []
+        for segment in segments:
+            try:
+                with gzip.open(self._segment_path(segment), 'rt', encoding='utf-8') as f:
+                    found.extend(e for e in map(json.loads, f) if e.get('article_id') == article_id)
+            except (OSError, EOFError, json.JSONDecodeError) as e:
+                logger.warning(f"Could not read debug segment {segment}: {e}")
+        return found
+
+    def stats(self) -> Dict[str, Any]:
+        segments = self._segments()
+        return {
+            'segments': len(segments),
+            'bytes': sum(self._segment_path(s).stat().st_size for s in segments),
+            'queued': self._queue.qsize(),
+            'dropped': self.dropped,
+        }
+
+
+_shared: Optional[DebugRecorder] = None
+
+
+def shared_recorder() -> DebugRecorder:
+    """The process-wide recorder (one writer thread per process)."""
+    global _shared
+    if _shared is None:
+        _shared = DebugRecorder()
+        atexit.register(_shared.close)
+    return _shared
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="AI debug artifacts")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('stats', help="Segments and bytes kept")
+    show = sub.add_parser('show', help="Artifacts kept for an article")
+    show.add_argument('article_id', type=int)
+    args = parser.parse_args(argv)
+
+    recorder = DebugRecorder()
+    if args.command == 'stats':
+        print(json.dumps(recorder.stats(), indent=2))
+    else:
+        artifacts = recorder.find(args.article_id)
+        if not artifacts:
+            print(f"No debug artifacts kept for article {args.article_id}.")
+            return 1
+        for artifact in artifacts:
+            print(json.dumps(artifact, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
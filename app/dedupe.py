@@ -0,0 +1,149 @@
+"""
+Cross-source near-duplicate story detection.
+
+Lance, Globo Esporte, Marca, AS and The Guardian often cover the same match or
+transfer within minutes of each other. Before an extracted article is sent to
+Gemini it is fingerprinted with a 64-bit SimHash of its cleaned text (word
+3-shingles) plus its title tokens (weighted higher, since outlets rewrite the
+body more than the headline), and compared with the stories published in the
+last `window_hours`. Within `max_distance` differing bits it is a duplicate:
+
+- 'skip':  the article is marked DUPLICATE and dropped;
+- 'merge': additionally, the published post gets a "Também noticiado por"
+  line crediting the new source (one WordPress update instead of a rewrite
+  and a new post).
+
+Every comparison logs the nearest story and its distance, for tuning
+`max_distance`. SimHash compares wording, so the same story in two languages
+is not detected.
+"""
+
+import hashlib
+import html
+import logging
+import re
+import time
+import unicodedata
+from typing import Any, Dict, List, Optional
+
+from bs4 import BeautifulSoup
+
+from .config import DEDUPE_CONFIG
+from .store import Database
+
+logger = logging.getLogger(__name__)
+
+SKIP = 'skip'
+MERGE = 'merge'
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+_BITS = 64
+_MASK = (1 << _BITS) - 1
+
+
+def _tokens(text: str) -> List[str]:
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return [t for t in _WORD_RE.findall(text) if len(t) > 2 or t.isdigit()]
+
+
+def _hash(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def simhash(text: str, title: str = '', title_weight: int = 3, shingle: int = 3) -> Optional[int]:
+    """64-bit SimHash of word shingles of `text` plus the tokens of `title`; None if there is no text."""
+    words = _tokens(text)
+    weights: Dict[str, int] = {}
+    for i in range(max(len(words) - shingle + 1, 0)):
+        feature = ' '.join(words[i:i + shingle])
+        weights[feature] = weights.get(feature, 0) + 1
+    for token in _tokens(title):
+        weights[f"t:{token}"] = weights.get(f"t:{token}", 0) + title_weight
+    if not weights:
+        return None
+    totals = [0] * _BITS
+    for feature, weight in weights.items():
+        h = _hash(feature)
+        for bit in range(_BITS):
+            totals[bit] += weight if h >> bit & 1 else -weight
+    return sum(1 << bit for bit in range(_BITS) if totals[bit] > 0)
+
+
+def hamming(a: int, b: int) -> int:
+    return bin((a ^ b) & _MASK).count('1')
+
+
+def _to_signed(value: int) -> int:
+    """SQLite integers are signed 64-bit."""
+    return value - (1 << _BITS) if value >= 1 << (_BITS - 1) else value
+
+
+def _to_unsigned(value: int) -> int:
+    return value & _MASK
+
+
+class StoryIndex:
+    """SimHash fingerprints of recently published stories, kept in the application database."""
+
+    def __init__(self, db: Database, config: Optional[Dict[str, Any]] = None):
+        self.db = db
+        self.config = dict(DEDUPE_CONFIG)
+        self.config.update(config or {})
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.config['enabled'])
+
+    def fingerprint(self, extracted: Dict[str, Any]) -> Optional[int]:
+        """SimHash of an extraction result, or None when its text is too short to compare."""
+        text = BeautifulSoup(extracted.get('content') or '', 'lxml').get_text(' ', strip=True)
+        if len(_tokens(text)) < self.config['min_tokens']:
+            return None
+        return simhash(text, extracted.get('title') or '', self.config['title_weight'])
+
+    def nearest(self, fingerprint: int, article_id: int, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        The closest story published within the window, with its `distance` and
+        whether it is a `duplicate` (within `max_distance`), or None. Logged either way.
+        """
+        now = now or time.time()
+        candidates = self.db.get_story_fingerprints(now - self.config['window_hours'] * 3600.0)
+        nearest, nearest_distance = None, _BITS + 1
+        for story in candidates:
+            if story['article_id'] == article_id:
+                continue
+            distance = hamming(fingerprint, _to_unsigned(story['simhash']))
+            if distance < nearest_distance:
+                nearest, nearest_distance = story, distance
+        if nearest is None:
+            logger.info(f"Dedupe: article {article_id} has no published story in the window to compare with.")
+            return None
+        is_duplicate = nearest_distance <= self.config['max_distance']
+        logger.info(
+            f"Dedupe: article {article_id} nearest story is article {nearest['article_id']} "
+            f"({nearest['source_id']}, '{nearest['title']}') at distance {nearest_distance}/"
+            f"{self.config['max_distance']} -> {'duplicate' if is_duplicate else 'unique'}."
+        )
+        return dict(nearest, distance=nearest_distance, duplicate=is_duplicate)
+
+    def find_duplicate(self, fingerprint: int, article_id: int,
+                       now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """The closest story published within the window, if it is within `max_distance`."""
+        nearest = self.nearest(fingerprint, article_id, now)
+        return nearest if nearest and nearest['duplicate'] else None
+
+    def add(self, article_id: int, source_id: str, url: str, title: str,
+            fingerprint: int, wp_post_id: Optional[int] = None) -> None:
+        self.db.save_story_fingerprint(article_id, source_id, url, title, _to_signed(fingerprint), wp_post_id)
+
+    def prune(self, now: Optional[float] = None) -> int:
+        now = now or time.time()
+        return self.db.prune_story_fingerprints(now - self.config['window_hours'] * 3600.0)
+
+
+def merge_note(source_name: str, url: str) -> str:
+    """HTML credited to an extra source of an already published story."""
+    return (f'<p class="also-reported">Também noticiado por: '
+            f'<a href="{html.escape(url)}" target="_blank" rel="noopener nofollow">'
+            f'{html.escape(source_name or url)}</a></p>')
@@ -0,0 +1,145 @@
+"""
+Page metadata, read once per document.
+
+`DocumentMetadata.from_soup()` makes one pass over the <title>, <meta> and
+JSON-LD <script> tags of a page and keeps everything the extractors ask
+for: meta tags indexed by `property` (Open Graph, article:*), `name`
+(description, Twitter card) and `itemprop`, and every JSON-LD block, parsed
+once, flattened through `@graph` and indexed by `@type`.
+
+Previously the featured-image picker parsed the first JSON-LD script,
+`_extract_json_ld` parsed them all again and each extraction path ran its
+own og:title / description / og:image lookups on the tree. Build the object
+once per page and pass it down.
+"""
+
+import json
+import logging
+import re
+from typing import Any, Dict, List, Optional
+
+from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+ARTICLE_TYPES = ('NewsArticle', 'Article', 'BlogPosting')
+
+# Trailing commas are the most common JSON-LD syntax error in the wild
+_TRAILING_COMMA_RE = re.compile(r',\s*([\}\]])')
+
+
+def parse_json_ld(text: Optional[str]) -> Any:
+    """One JSON-LD block, with trailing commas forgiven; None when it cannot be parsed."""
+    if not text:
+        return None
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+    try:
+        return json.loads(_TRAILING_COMMA_RE.sub(r'\1', text))
+    except json.JSONDecodeError:
+        logger.warning("Falha ao parsear script JSON-LD.", exc_info=False)
+        return None
+
+
+def _types(item: Dict[str, Any]) -> List[str]:
+    value = item.get('@type')
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, list):
+        return [t for t in value if isinstance(t, str)]
+    return []
+
+
+class DocumentMetadata:
+    """Meta tags and JSON-LD of one page."""
+
+    def __init__(self):
+        self.title: Optional[str] = None
+        self.has_title = False
+        self.properties: Dict[str, List[Optional[str]]] = {}
+        self.names: Dict[str, List[Optional[str]]] = {}
+        self.itemprops: Dict[str, List[Optional[str]]] = {}
+        # One parsed value per ld+json script, in document order (None if malformed)
+        self.json_ld: List[Any] = []
+        # Top-level JSON-LD objects, as _extract_json_ld returned them
+        self.json_ld_objects: List[Dict[str, Any]] = []
+        # Every JSON-LD item (top-level objects and their @graph members), and the same indexed by @type
+        self.items: List[Dict[str, Any]] = []
+        self.by_type: Dict[str, List[Dict[str, Any]]] = {}
+
+    @classmethod
+    def from_soup(cls, soup: BeautifulSoup) -> 'DocumentMetadata':
+        doc = cls()
+        for el in soup.find_all(('title', 'meta', 'script')):
+            if el.name == 'meta':
+                content = el.get('content')
+                for attr, index in (('property', doc.properties), ('name', doc.names), ('itemprop', doc.itemprops)):
+                    key = el.get(attr)
+                    if isinstance(key, str) and key:
+                        index.setdefault(key, []).append(content)
+            elif el.name == 'script':
+                if el.get('type') == 'application/ld+json':
+                    doc._add_json_ld(parse_json_ld(el.string))
+            elif not doc.has_title:
+                doc.has_title = True
+                doc.title = el.string
+        return doc
+
+    def _add_json_ld(self, data: Any) -> None:
+        self.json_ld.append(data)
+        if isinstance(data, dict):
+            objects = [data]
+        elif isinstance(data, list):
+            objects = [d for d in data if isinstance(d, dict)]
+        else:
+            objects = []
+        for obj in objects:
+            self.json_ld_objects.append(obj)
+            graph = obj.get('@graph', [obj])
+            for item in graph if isinstance(graph, list) else [graph]:
+                if isinstance(item, dict):
+                    self.items.append(item)
+                    for t in _types(item):
+                        self.by_type.setdefault(t, []).append(item)
+
+    # --- queries ---------------------------------------------------------------
+
+    def prop(self, key: str) -> Optional[str]:
+        """`content` of the first <meta property=key> (og:title, og:image, article:published_time...)."""
+        values = self.properties.get(key)
+        return values[0] if values else None
+
+    def name(self, key: str) -> Optional[str]:
+        """`content` of the first <meta name=key> (description, twitter:card, twitter:image...)."""
+        values = self.names.get(key)
+        return values[0] if values else None
+
+    def og(self, key: str) -> Optional[str]:
+        return self.prop(f'og:{key}')
+
+    def twitter(self, key: str) -> Optional[str]:
+        # Twitter cards are meant to use name=, but property= is common too
+        return self.name(f'twitter:{key}') or self.prop(f'twitter:{key}')
+
+    def of_type(self, *types: str) -> List[Dict[str, Any]]:
+        """JSON-LD items of any of `types`, in document order."""
+        wanted = set(types)
+        return [item for item in self.items if wanted.intersection(_types(item))]
+
+    def article(self) -> Optional[Dict[str, Any]]:
+        """The first NewsArticle, Article or BlogPosting of the page's JSON-LD."""
+        found = self.of_type(*ARTICLE_TYPES)
+        return found[0] if found else None
+
+    def first_json_ld(self) -> Any:
+        return self.json_ld[0] if self.json_ld else None
+
+    def title_text(self, default: str = 'No Title Found') -> str:
+        """og:title, else the <title> text, else `default`."""
+        return self.og('title') or self.title or default
+
+    def description(self) -> str:
+        """meta description, else og:description."""
+        return self.name('description') or self.og('description') or ''
@@ -0,0 +1,95 @@
+"""
+Pipeline events and the Server-Sent Events stream the dashboard listens to.
+
+The pipeline appends rows to `pipeline_events` (see `Database.record_event`);
+the dashboard follows them by primary key together with new log lines, so each
+poll is a single indexed range query plus a `stat()` of the log file.
+"""
+
+import json
+import logging
+import time
+from typing import Any, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+ARTICLE_CLAIMED = 'article_claimed'
+STAGE_FINISHED = 'stage_finished'
+POST_PUBLISHED = 'post_published'
+ARTICLE_FAILED = 'article_failed'
+ARTICLE_REJECTED = 'article_rejected'
+
+
+def format_sse(event: str, data: Any, event_id: Optional[int] = None) -> str:
+    """Serialises one message in the text/event-stream format."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def event_stream(stats_service, tailer, last_event_id: Optional[int] = None,
+                 poll_seconds: float = 1.0, keepalive_seconds: float = 15.0,
+                 max_seconds: Optional[float] = None) -> Iterator[str]:
+    """
+    Yields pipeline events ('pipeline') and new log lines ('log') as they appear.
+
+    Args:
+        stats_service: A `StatsService` used for the read-only event queries.
+        tailer: A `LogTailer` shared by the dashboard.
+        last_event_id: Resume after this event id (the browser's Last-Event-ID);
+            when omitted only events newer than the connection are sent.
+        max_seconds: Ends the stream after this long (the browser reconnects).
+    """
+    if last_event_id is None:
+        try:
+            last_event_id = stats_service.get_last_event_id()
+        except Exception as e:
+            logger.error(f"Could not read last pipeline event id: {e}")
+            last_event_id = 0
+    tailer.refresh()
+    log_seq = tailer.last_seq
+
+    started = last_sent = time.monotonic()
+    yield "retry: 5000\n\n"
+    while max_seconds is None or time.monotonic() - started < max_seconds:
+        sent = False
+        try:
+            for row in stats_service.get_events_after(last_event_id):
+                last_event_id = row['id']
+                yield format_sse('pipeline', row, event_id=row['id'])
+                sent = True
+        except Exception as e:
+            logger.error(f"Error reading pipeline events: {e}")
+
+        log_seq, entries = tailer.since(log_seq)
+        for entry in entries:
+            yield format_sse('log', entry)
+            sent = True
+
+        now = time.monotonic()
+        if sent:
+            last_sent = now
+        elif now - last_sent >= keepalive_seconds:
+            yield ": keepalive\n\n"
+            last_sent = now
+        time.sleep(poll_seconds)
+
+
+def event_row_to_dict(row) -> Dict[str, Any]:
+    """Converts a `pipeline_events` row into the JSON payload sent to the browser."""
+    event_id, event_type, source_id, article_id, payload, created_at = row
+    try:
+        data = json.loads(payload) if payload else {}
+    except ValueError:
+        data = {}
+    return {
+        'id': event_id,
+        'type': event_type,
+        'source_id': source_id,
+        'article_id': article_id,
+        'created_at': created_at,
+        'data': data,
+    }
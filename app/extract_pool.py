@@ -0,0 +1,218 @@
+"""
+Process pool for page extraction.
+
+Parsing with lxml/BeautifulSoup, the site cleaners and trafilatura are pure
+CPU work; run in the pipeline process they hold the GIL against the
+heartbeat, metrics and scheduler threads, and one pathological page can
+stall a feed job. Extraction is shipped to worker processes instead:
+
+- workers start from a fork server that has already imported trafilatura,
+  lxml, bs4 and the extractor, so each worker forks with them loaded and
+  builds its `ContentExtractor` once;
+- a task is the raw page bytes plus URL and declared charset, and the
+  result comes back as packed (zlib-compressed compact JSON) bytes;
+- each task has a timeout; a task that runs past it gets its workers
+  killed and the pool restarted;
+- workers are recycled after `max_tasks_per_child` tasks to cap memory
+  creep from lxml/trafilatura caches;
+- a full-page task may carry per-domain plans (REPORT_OPTIONS: the learned
+  selector of app/selector_learning.py, the boilerplate fingerprints of
+  app/boilerplate.py); the worker fills them in, they come back in the
+  packed result and are copied into the caller's dicts.
+
+`map()` runs a batch across all workers (replays and regression runs over
+the page archive); the pipeline calls `extract()` per article. With
+`workers = 0` extraction runs inline, in the calling process.
+"""
+
+import atexit
+import logging
+import multiprocessing
+import signal
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from . import site_rules
+from .config import EXTRACT_POOL_CONFIG
+from .extraction_cache import pack, unpack
+from .extractor import ContentExtractor, make_soup
+
+logger = logging.getLogger(__name__)
+
+KIND_PAGE = 'page'
+KIND_LITE = 'lite'
+
+# Modules the fork server imports once, so every worker starts with them loaded
+PRELOAD_MODULES = ['lxml.html', 'bs4', 'trafilatura', 'app.extractor', 'app.extract_pool']
+
+# Task options the worker fills in with its report on the page
+REPORT_OPTIONS = ('learning', 'fingerprints')
+
+_worker_extractor: Optional[ContentExtractor] = None
+
+
+def extract_page(extractor: ContentExtractor, content: bytes, url: str, encoding: Optional[str] = None,
+                 kind: str = KIND_PAGE, **options: Any) -> Tuple[Optional[Dict[str, Any]], str]:
+    """
+    Extracts one downloaded page: a full page through its site cleaner and
+    `ContentExtractor.extract`, a lite page through `extract_lite(**options)`.
+
+    Returns:
+        (result, decision), as `extract_lite` does; for full pages the decision
+        is 'used' or 'no_content'. A full page's plans (REPORT_OPTIONS) are filled in place.
+    """
+    if kind == KIND_LITE:
+        return extractor.extract_lite(content, url, encoding=encoding, **options)
+    # Parse the raw bytes once; the same tree goes through the cleaners and the extractor
+    soup = make_soup(content, encoding)
+    profile = site_rules.resolve(url)
+    if profile and profile.cleaner:
+        soup = profile.cleaner(soup)
+        logger.info(f"Applied cleaner for {profile.name}")
+    result = extractor.extract(content, url=url, soup=soup, learning=options.get('learning'),
+                               fingerprints=options.get('fingerprints'))
+    return result, 'used' if result and result.get('content') else 'no_content'
+
+
+def _init_worker() -> None:
+    global _worker_extractor
+    # Ctrl+C is handled by the parent, which shuts the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _worker_extractor = ContentExtractor()
+
+
+def _run_task(content: bytes, url: str, encoding: Optional[str], kind: str, options: Dict[str, Any]) -> bytes:
+    result, decision = extract_page(_worker_extractor, content, url, encoding, kind, **options)
+    return pack({'result': result, 'decision': decision, 'reports': _reports(options)})
+
+
+def _reports(options: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    return {name: options[name] for name in REPORT_OPTIONS if options.get(name) is not None}
+
+
+def _start_method(preferred: str) -> str:
+    available = multiprocessing.get_all_start_methods()
+    return preferred if preferred in available else ('forkserver' if 'forkserver' in available else 'spawn')
+
+
+class ExtractionPool:
+    """Extraction worker processes, started on first use and restarted after a timeout or crash."""
+
+    def __init__(self, workers: Optional[int] = None, task_timeout: Optional[float] = None,
+                 max_tasks_per_child: Optional[int] = None, start_method: Optional[str] = None):
+        config = EXTRACT_POOL_CONFIG
+        self.workers = config['workers'] if workers is None else workers
+        self.task_timeout = task_timeout or config['task_timeout_seconds']
+        self.max_tasks_per_child = max_tasks_per_child or config['max_tasks_per_child']
+        self.start_method = _start_method(start_method or config['start_method'])
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._inline: Optional[ContentExtractor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                context = multiprocessing.get_context(self.start_method)
+                if self.start_method == 'forkserver':
+                    context.set_forkserver_preload(PRELOAD_MODULES)
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=context, initializer=_init_worker,
+                    max_tasks_per_child=self.max_tasks_per_child,
+                )
+                logger.info(f"Started {self.workers} extraction workers ({self.start_method}).")
+            return self._executor
+
+    def _restart(self, reason: str) -> None:
+        """Kills the workers (a stuck task cannot be cancelled otherwise); the next task starts new ones."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is None:
+            return
+        logger.warning(f"Restarting extraction workers: {reason}.")
+        for process in list((getattr(executor, '_processes', None) or {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, content: bytes, url: str, encoding: Optional[str] = None,
+               kind: str = KIND_PAGE, **options: Any) -> Future:
+        """Queues an extraction; pass the future to `result()`."""
+        if self.workers <= 0:
+            future: Future = Future()
+            if self._inline is None:
+                self._inline = ContentExtractor()
+            try:
+                result, decision = extract_page(self._inline, content, url, encoding, kind, **options)
+                future.set_result(pack({'result': result, 'decision': decision}))
+            except Exception as e:
+                future.set_exception(e)
+        else:
+            future = self._get_executor().submit(_run_task, content, url, encoding, kind, options)
+        # Workers fill copies of the plans; `result()` copies their reports back
+        future.reports = _reports(options)
+        return future
+
+    def result(self, future: Future, url: str = '') -> Tuple[Optional[Dict[str, Any]], str]:
+        """(result, decision) of a submitted extraction; decision is 'timeout'/'worker_crashed'/'error' on failure."""
+        try:
+            packed = unpack(future.result(timeout=self.task_timeout))
+        except FutureTimeout:
+            logger.error(f"Extraction of {url} timed out after {self.task_timeout}s.")
+            self._restart(f"task timeout ({url})")
+            return None, 'timeout'
+        except BrokenProcessPool as e:
+            logger.error(f"Extraction worker died while extracting {url}: {e}")
+            self._restart("worker crashed")
+            return None, 'worker_crashed'
+        except Exception as e:
+            logger.error(f"Extraction of {url} failed: {e}", exc_info=True)
+            return None, 'error'
+        if not packed:
+            return None, 'error'
+        targets = getattr(future, 'reports', {})
+        for name, report in (packed.get('reports') or {}).items():
+            if name in targets:
+                targets[name].update(report)
+        return packed['result'], packed['decision']
+
+    def extract(self, content: bytes, url: str, encoding: Optional[str] = None,
+                kind: str = KIND_PAGE, **options: Any) -> Tuple[Optional[Dict[str, Any]], str]:
+        """Extracts one page in a worker and waits for it (at most `task_timeout`)."""
+        try:
+            future = self.submit(content, url, encoding, kind, **options)
+        except BrokenProcessPool:
+            self._restart("pool broken")
+            future = self.submit(content, url, encoding, kind, **options)
+        return self.result(future, url)
+
+    def map(self, pages: Iterable[Tuple[bytes, str, Optional[str]]],
+            kind: str = KIND_PAGE) -> Iterator[Tuple[Optional[Dict[str, Any]], str]]:
+        """Extracts (content, url, encoding) tuples across all workers, yielding results in input order."""
+        window = max(self.workers, 1) * 2
+        pending = []
+        for content, url, encoding in pages:
+            pending.append((self.submit(content, url, encoding, kind), url))
+            if len(pending) >= window:
+                future, pending_url = pending.pop(0)
+                yield self.result(future, pending_url)
+        for future, pending_url in pending:
+            yield self.result(future, pending_url)
+
+    def close(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+_shared: Optional[ExtractionPool] = None
+
+
+def shared_pool() -> ExtractionPool:
+    """The process-wide pool: workers outlive pipeline runs, so their preloaded modules are reused."""
+    global _shared
+    if _shared is None:
+        _shared = ExtractionPool()
+        atexit.register(_shared.close)
+    return _shared
@@ -0,0 +1,79 @@
+"""
+Persistent cache of extraction results.
+
+Extracting a page (cleaners, trafilatura, image and video collection) is the
+most expensive step before the AI call, and the same page comes back often: a
+retried or re-queued article, or the same story listed by two feeds. Results
+are cached in the database under the canonical URL, the SHA-256 of the HTML
+and `EXTRACTOR_VERSION`, so a changed page or a changed extractor is a miss
+and reprocessing an unchanged page is a single lookup.
+
+Results are stored as zlib-compressed compact JSON. Entries expire after
+`ttl_hours`; above `max_entries` the least recently used are dropped.
+"""
+
+import hashlib
+import json
+import logging
+import time
+import zlib
+from typing import Any, Dict, Optional
+
+from .config import EXTRACTION_CACHE_CONFIG
+from .extractor import EXTRACTOR_VERSION
+from .store import Database
+from .urlnorm import canonical_url
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(url: str, html: bytes, kind: str = 'page') -> str:
+    digest = hashlib.sha256()
+    for part in (str(EXTRACTOR_VERSION), kind, canonical_url(url)):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    digest.update(hashlib.sha256(html).digest())
+    return digest.hexdigest()
+
+
+def pack(result: Dict[str, Any]) -> bytes:
+    return zlib.compress(json.dumps(result, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8'), 6)
+
+
+def unpack(blob: bytes) -> Optional[Dict[str, Any]]:
+    try:
+        return json.loads(zlib.decompress(blob))
+    except (zlib.error, ValueError) as e:
+        logger.warning(f"Discarding unreadable extraction cache entry: {e}")
+        return None
+
+
+class ExtractionCache:
+    """Extraction results cached in the application database."""
+
+    def __init__(self, db: Database, config: Optional[Dict[str, Any]] = None):
+        self.db = db
+        self.config = dict(EXTRACTION_CACHE_CONFIG)
+        self.config.update(config or {})
+
+    def _min_created_at(self) -> float:
+        return time.time() - self.config['ttl_hours'] * 3600.0
+
+    def get(self, url: str, html: bytes, kind: str = 'page') -> Optional[Dict[str, Any]]:
+        """The cached result for this page body, with `source_url` set to `url`, or None."""
+        if not self.config['enabled'] or not html:
+            return None
+        blob = self.db.get_cached_extraction(cache_key(url, html, kind), self._min_created_at())
+        result = unpack(blob) if blob else None
+        if result is not None:
+            result['source_url'] = url
+        return result
+
+    def put(self, url: str, html: bytes, result: Optional[Dict[str, Any]], kind: str = 'page') -> None:
+        """Caches a successful extraction (results without content are not cached)."""
+        if not self.config['enabled'] or not html or not result or not result.get('content'):
+            return
+        self.db.save_cached_extraction(cache_key(url, html, kind), canonical_url(url), pack(result))
+
+    def prune(self) -> int:
+        return self.db.prune_extraction_cache(self._min_created_at(), self.config['max_entries'])
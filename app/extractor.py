@@ -4,14 +4,21 @@ from bs4 import BeautifulSoup
 import requests
 import html # New import for html.unescape
 from typing import Dict, Optional, Any, Set, List, Tuple, Union
-import json
 import re
 import os
-from urllib.parse import urljoin, urlparse, parse_qs
-
-from .config import USER_AGENT
+from urllib.parse import urljoin, urlparse
+
+from .config import USER_AGENT, FETCH_CONFIG
+from .fetching import FetchedPage, HTML_CONTENT_TYPES, fetch_bounded
+from . import boilerplate, selector_learning, site_rules, transport
+from .cleaning import CleaningPlan
+from .doc_metadata import DocumentMetadata
+from .media import PageMedia, _abs, collect_media, is_valid_article_image
 from trafilatura.metadata import extract_metadata as trafilatura_extract_metadata # New import
 
+# Bump whenever a change alters extraction output, so cached results (app/extraction_cache.py) are not reused
+EXTRACTOR_VERSION = 3
+
 logger = logging.getLogger(__name__)
 
 def _coerce_url(candidate: Any) -> Optional[str]:
@@ -65,65 +72,6 @@ def _dedupe_preserve(urls: List[str]) -> List[str]:
             out.append(u)
     return out
 
-BAD_IMAGE_KEYWORDS = {
-    'author', 'autor', 'avatar', 'byline', 'perfil', 'profile',
-    'placeholder', 'logo', 'logomarca', 'brand', 'marca',
-    'icon', 'favicon', 'sprite', 'comment', 'user', 'usuario', 'usuário'
-}
-
-BAD_IMAGE_DOMAINS = {
-    'gravatar.com', 'twimg.com', 'facebook.com', 'fbcdn.net',
-    'gstatic.com', 'googleusercontent.com',
-    # Adicionados conforme sugestão para bloquear trackers e placeholders
-    "schema.org", "scorecardresearch.com", "doubleclick.net",
-    "quantserve.com", "chartbeat.com", "google-analytics.com"
-}
-
-# aceita query ?width=1200&height=630 e sufixos -1200x630.jpg
-DIM_SUFFIX_RE = re.compile(r'-(\d{2,5})x(\d{2,5})(?=\.[a-z]{3,4})(?:\?.*)?$', re.IGNORECASE)
-
-def _guess_dimensions_from_url(url: str) -> Tuple[Optional[int], Optional[int]]:
-    try:
-        p = urlparse(url)
-        q = parse_qs(p.query or '')
-        w = q.get('width') or q.get('w')
-        h = q.get('height') or q.get('h')
-        if w and h:
-            return int(w[0]), int(h[0])
-        m = DIM_SUFFIX_RE.search(p.path)
-        if m:
-            return int(m.group(1)), int(m.group(2))
-    except Exception:
-        pass
-    return None, None
-
-def _is_bad_domain(url: str) -> bool:
-    try:
-        host = urlparse(url).hostname or ''
-        return any(host.endswith(d) for d in BAD_IMAGE_DOMAINS)
-    except Exception:
-        return False
-
-
-YOUTUBE_DOMAINS = (
-    "youtube.com", "www.youtube.com", "m.youtube.com",
-    "youtu.be", "www.youtu.be",
-)
-
-_YT_PATTERNS = (
-    r"(?:youtube\.com/(?:embed/|shorts/|v/)|youtu\.be/)([A-Za-z0-9_-]{11})",
-)
-
-PRIORITY_CDN_DOMAINS = (
-    "static1.srcdn.com",              # ScreenRant
-    "static1.colliderimages.com",     # Collider
-    "static1.cbrimages.com",          # CBR
-    "static1.moviewebimages.com",     # MovieWeb
-    "static0.gamerantimages.com", "static1.gamerantimages.com",
-    "static2.gamerantimages.com", "static3.gamerantimages.com",  # GameRant
-    "static1.thegamerimages.com",     # TheGamer
-)
-
 FORBIDDEN_TEXT_EXACT: Set[str] = {
     "Your comment has not been saved",
 }
@@ -133,12 +81,6 @@ FORBIDDEN_LABELS: Set[str] = {
     "Producer", "Producers", "Cast"
 }
 
-JUNK_IMAGE_PATTERNS = (
-    "placeholder", "sprite", "icon", "emoji", ".svg",
-    # From user suggestion to filter out non-content images
-    "cta", "read-more", "share", "logo", "banner"
-)
-
 # Blocos a ignorar (relacionados/sidebars/galerias etc.)
 _BAD_SECTION_RX = re.compile(
     r"(related|trending|more|sidebar|aside|recommend|recommended|"
@@ -151,93 +93,6 @@ _BAD_SECTION_RX = re.compile(
 )
 
 
-def _parse_srcset(srcset: str):
-    """Retorna a URL com maior largura declarada em um srcset."""
-    best = None
-    best_w = -1
-    for part in (srcset or "").split(","): 
-        part = part.strip()
-        if not part:
-            continue
-        tokens = part.split()
-        url = tokens[0]
-        w = 0
-        if len(tokens) > 1 and tokens[1].endswith("w"):
-            try:
-                w = int(tokens[1][:-1])
-            except Exception:
-                w = 0
-        if w >= best_w:
-            best_w = w
-            best = url
-    return best
-
-
-def _has_bad_keyword(url: str) -> bool:
-    u = url.lower()
-    return any(k in u for k in BAD_IMAGE_KEYWORDS)
-
-def _is_junk_filename(url: str) -> bool:
-    """Checks if the image filename suggests it's a non-content image."""
-    try:
-        name = urlparse(url).path.rsplit("/", 1)[-1].lower()
-        return any(snippet in name for snippet in JUNK_IMAGE_PATTERNS)
-    except Exception:
-        return False # Fail safe
-
-def _passes_min_size(url: str, min_w: int = 600, min_h: int = 315) -> bool:
-    w, h = _guess_dimensions_from_url(url)
-    if w is None or h is None:
-        # Sem dimensão explícita: aceita provisoriamente (muitos sites não expõem)
-        return True
-    if w < min_w or h < min_h:
-        return False
-    # evita quase-quadradas/estranhas como avatar 150x150
-    ar = w / h if h else 0
-    return 0.6 <= ar <= 2.2
-
-def is_valid_article_image(url: str) -> bool:
-    if not url or url.startswith('data:') :
-        return False
-    if _is_bad_domain(url):
-        return False
-    if _has_bad_keyword(url):
-        return False
-    if _is_junk_filename(url):
-        return False
-    if not _passes_min_size(url):
-        return False
-    return True
-
-def pick_featured_image(candidates: list[str]) -> Optional[str]:
-    """Retorna a primeira imagem que passa no filtro."""
-    for u in candidates:
-        if is_valid_article_image(u):
-            return u
-    return None
-
-
-def _abs(u: str, base: str) -> Optional[str]:
-    if not u:
-        return None
-    u = u.strip()
-    if not u or u.startswith("data:"):
-        return None
-    return urljoin(base, u)
-
-def _extract_from_style(style_attr: str) -> Optional[str]:
-    if not style_attr:
-        return None
-    m = re.search(r"url\((.*?)\)", style_attr)
-    if not m:
-        return None
-    url = m.group(1).strip()
-    if url.startswith("'") and url.endswith("'"):
-        return url[1:-1]
-    if url.startswith('"') and url.endswith('"'):
-        return url[1:-1]
-    return url
-
 def _find_article_body(soup: BeautifulSoup) -> BeautifulSoup:
     """
     Tenta localizar o nó raiz do corpo do artigo.
@@ -257,7 +112,7 @@ def _find_article_body(soup: BeautifulSoup) -> BeautifulSoup:
     candidates = soup.select(
         "article .entry-content, article .content, article [itemprop='articleBody'], "
         ".post-content, .single-content, .post-body, "
-        "[itemprop='articleBody'], .article-body, .article-content, " # Original selectors
+        "[itemprop='articleBody'], .article-body, .article-content" # Original selectors
     )
     if not candidates:
         candidates = soup.find_all(True)
@@ -281,88 +136,20 @@ def collect_images_from_article(soup: BeautifulSoup, base_url: str) -> list[str]
     Fontes consideradas:
       - <img> (src, data-*, srcset)
       - <picture><source srcset="..."/>
+      - <noscript> com <img> (fallback de lazy-load)
       - nós com atributos data-*
       - estilos inline: background-image
       - <figure> contendo <img>
-    Aplica filtros de junk/thumb e prioriza CDNs conhecidas.
+    Aplica filtros de junk/thumb e prioriza CDNs conhecidas (see app/media.py).
     """
-    root = _find_article_body(soup)
-    urls: list[str] = []
-
-    def _push(candidate: Optional[str]) -> None:
-        if not candidate:
-            return
-        abs_u = _abs(candidate, base_url)
-        if not abs_u:
-            return
-        if not is_valid_article_image(abs_u):
-            return
-        urls.append(abs_u.rstrip("/"))
-
-    # 1) <img> tags
-    for img in root.select("img:not([aria-hidden='true'])"):
-        cand = None
-        for attr in ("src", "data-src", "data-original", "data-lazy-src", "data-image", "data-img-url"):
-            if img.get(attr):
-                cand = img.get(attr)
-                break
-        if not cand and img.get("srcset"):
-            cand = _parse_srcset(img.get("srcset"))
-        _push(cand)
-
-    # 2) <picture><source>
-    for source in root.select("picture source[srcset]"):
-        _push(_parse_srcset(source.get("srcset", "")))
-
-    # 2.5) <noscript> com <img> (fallback de lazy-load)
-    for ns in root.find_all("noscript"):
-        try:
-            inner = BeautifulSoup(ns.string or "", "html.parser")
-        except Exception:
-            continue
-        for img in inner.find_all("img"):
-            _push(img.get("src") or img.get("data-src") or img.get("data-original"))
-
-    # 3) nós com data-* comuns
-    for node in root.select('[data-img-url], [data-image], [data-src], [data-original]') :
-        cand = node.get("data-img-url") or node.get("data-image") or node.get("data-src") or node.get("data-original")
-        _push(cand)
-
-    # 4) estilos inline background-image
-    for node in root.select('[style*="background-image"]') :
-        _push(_extract_from_style(node.get("style", "")))
-
-    # 5) <figure> contendo <img> (ou srcset)
-    for fig in root.find_all("figure"):
-        img = fig.find("img")
-        if img:
-            if img.get("src"):
-                _push(img.get("src"))
-            elif img.get("srcset"):
-                _push(_parse_srcset(img.get("srcset", "")))
-
-    # de-dup preservando preferência das CDNs
-    dedup: dict[str, int] = {}
-    for u in urls:
-        host = urlparse(u).netloc
-        pref = 0 if host in PRIORITY_CDN_DOMAINS else 1
-        dedup[u] = min(dedup.get(u, pref), pref)
-    ordered = sorted(dedup.items(), key=lambda kv: (kv[1], kv[0]))
-    return [u for u, _ in ordered]
+    return collect_media(soup, base_url, root=_find_article_body(soup)).body_images()
 
 # --- New helper functions from user prompt ---
-def _get(url, timeout=25, tries=2):
-    last_err = None
-    for _ in range(tries):
-        try:
-            r = requests.get(url, headers={"User-Agent": USER_AGENT}, timeout=timeout, allow_redirects=True)
-            if 200 <= r.status_code < 300 and "text/html" in r.headers.get("Content-Type",""):
-                return r
-        except Exception as e:
-            last_err = e
-        time.sleep(0.6)
-    if last_err:
-        raise last_err
+def _get(url, timeout=25):
+    # Retries and backoff come from the 'pages' transport policy
+    r = transport.session(transport.PAGES, headers={"User-Agent": USER_AGENT}).get(url, timeout=timeout, allow_redirects=True)
+    if 200 <= r.status_code < 300 and "text/html" in r.headers.get("Content-Type",""):
+        return r
     raise RuntimeError(f"HTTP error fetching {url}")
 
 def _clean_text(s):
@@ -428,39 +215,50 @@ def _choose_best(a, b):
         out[k] = a.get(k) or b.get(k)
     return out
 
-def _extract_site_specific(soup: BeautifulSoup, url: str, selectors: Dict[str, Union[str, List[str]]]) -> Optional[Dict[str, Any]]:
+def _extract_site_specific(soup: BeautifulSoup, url: str, profile: 'site_rules.SiteProfile',
+                           extractor: Optional['ContentExtractor'] = None,
+                           metadata: Optional[DocumentMetadata] = None) -> Optional[Dict[str, Any]]:
     """
-    Helper for site-specific extraction using a dictionary of CSS selectors.
+    Helper for site-specific extraction using the compiled selectors of a site profile.
     Falls back gracefully by returning None if key elements are not found.
     """
     try:
         # Find title
-        title_tag = soup.select_one(str(selectors['title']))
+        title_tag = profile.title.select_one(soup) if profile.title else None
         title = title_tag.get_text(strip=True) if title_tag else None
 
         # Find content body
-        content_tag = soup.select_one(str(selectors['content']))
+        content_tag = profile.content.select_one(soup)
 
         if not title or not content_tag:
             logger.warning(f"Specific extractor failed to find title/content for {url}. Will fall back to generic.")
             return None
 
         # Basic cleanup inside content
-        for junk_selector in selectors.get('junk', []):
-            for junk_tag in content_tag.select(str(junk_selector)):
+        if profile.junk is not None:
+            for junk_tag in profile.junk.select(content_tag):
                 junk_tag.decompose()
+        profile.remove_related(content_tag)
         
         content_html = str(content_tag)
 
         # Use existing helpers for media and metadata
         # Note: These helpers operate on the *original* soup object to find meta tags, etc.
-        extractor = ContentExtractor() # Temporary instance to access helpers
-        featured_image_url = extractor._pick_featured_image(soup, url)
-        images = collect_images_from_article(soup, url) # This also uses its own logic to find the body
-        videos = extractor._extract_youtube_videos(soup)
+        extractor = extractor or ContentExtractor() # Instance to access helpers
+        metadata = metadata or DocumentMetadata.from_soup(soup)
+        media = collect_media(soup, url, root=None if profile.images is not None else _find_article_body(soup),
+                              metadata=metadata)
+        featured_image_url = extractor._pick_featured_image(soup, url, media)
+        if profile.images is not None:
+            images = _dedupe_preserve([
+                u for img in profile.images.select(content_tag)
+                if (u := _abs(img.get('src') or img.get('data-src') or '', url))
+            ])
+        else:
+            images = media.body_images()
+        videos = media.videos()
         
-        excerpt_tag = soup.select_one('meta[name="description"], meta[property="og:description"]')
-        excerpt = excerpt_tag['content'].strip() if excerpt_tag and excerpt_tag.get('content') else ''
+        excerpt = metadata.description().strip()
 
         # Ensure the featured image isn't duplicated in the body images list
         other_images = [img for img in images if img != featured_image_url]
@@ -483,194 +281,304 @@ def _extract_site_specific(soup: BeautifulSoup, url: str, selectors: Dict[str, U
         logger.error(f"Error in site-specific extractor for {url}: {e}. Falling back to generic.", exc_info=False)
         return None
 
-def _extract_json_ld(soup: BeautifulSoup) -> List[Dict[str, Any]]:
-    """
-    Encontra e parseia todos os scripts do tipo ld+json da página.
-    """
-    json_ld_data = []
-    scripts = soup.find_all('script', type='application/ld+json')
-    for script in scripts:
-        if script.string:
-            try:
-                # Corrigir JSONs malformados com vírgulas extras
-                clean_str = re.sub(r',\s*([\}\]])', r'\1', script.string)
-                data = json.loads(clean_str)
-                if isinstance(data, dict):
-                    json_ld_data.append(data)
-                elif isinstance(data, list):
-                    json_ld_data.extend([d for d in data if isinstance(d, dict)])
-            except json.JSONDecodeError:
-                logger.warning("Falha ao parsear script JSON-LD.", exc_info=False)
-    return json_ld_data
-
-def _find_news_article_in_json_ld(json_ld_data: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+# --- New constants for related content removal ---
+LEIA_HEADING_RE = re.compile(r"(leia também|veja também|relacionad[oa]s|recomendad[oa]s|tópicos relacionados)", re.I)
+
+# Widgets, ads and related-content blocks removed before extraction (one walk, see app/cleaning.py)
+PRE_CLEAN_PLAN = CleaningPlan(
+    tags=('header', 'footer', 'nav', 'aside'),
+    classes=(
+        # CTAs, ads and social sharing
+        'cta-middle', 'infomoney-read-more', 'read-more', 'post__related', 'sharing', 'share', 'social',
+        'banner', 'ads', 'advertisement', 'sponsored', 'paid-content', 'partner', 'outbrain', 'taboola',
+        'review', 'score', 'meter', 'comments', 'subscribe',
+        # Author boxes
+        'author', 'author-box', 'post-author', 'byline', 'entry-author', 'avatar', 'author__image', 'author-profile',
+    ),
+    ids=('comments',),
+    class_contains=(
+        'srdb', 'rating', 'related', 'relaciona', 'recommend', 'veja-tambem', 'leia-tambem', 'trending',
+        'sidebar', 'screen-hub', 'screenhub', 'popular', 'newsletter', 'ad-', 'advert',
+    ),
+    id_contains=('related', 'relacionad', 'leia', 'trending', 'sidebar', 'popular', 'newsletter', 'ad-', 'advert'),
+    tag_classes=(('div', 'widget'),),
+    attrs=('data-ad', 'data-ad-slot'),
+    aria_labels=(('section', 'Leia'), ('section', 'Relacionad')),
+    link_class_markers=('relacion', 'related', 'leia', 'veja'),
+    link_ctas=('related', 'see_more'),
+    heading_re=LEIA_HEADING_RE,
+    text_markers=('powered by srdb',),
+)
+
+# Technical info boxes and stray messages left in the extracted body
+FORBIDDEN_BLOCKS_PLAN = CleaningPlan(
+    exact_texts=FORBIDDEN_TEXT_EXACT,
+    short_text_tags=('p', 'li', 'span', 'h3', 'h4'),
+    labels=FORBIDDEN_LABELS,
+    label_containers=('div', 'section', 'aside', 'ul', 'ol'),
+)
+
+# --- RSS-first fast path ---------------------------------------------------
+
+def _feed_entry_html(raw: Dict[str, Any]) -> str:
+    """Longest full-content block of a feedparser entry (content:encoded), falling back to an HTML summary."""
+    blocks = [c.get('value') or '' for c in (raw.get('content') or []) if isinstance(c, dict)]
+    best = max(blocks, key=len, default='')
+    if not best:
+        summary = raw.get('summary') or raw.get('description') or ''
+        if '<p' in summary:
+            best = summary
+    return best
+
+
+def _feed_entry_image_urls(raw: Dict[str, Any], content_soup: BeautifulSoup, base_url: str) -> List[str]:
+    """Images carried by the entry: media:content, media:thumbnail, image enclosures, then <img> in the body."""
+    candidates: List[str] = []
+    for media in raw.get('media_content') or []:
+        medium = (media.get('medium') or '').lower()
+        mtype = (media.get('type') or '').lower()
+        if medium == 'image' or mtype.startswith('image/') or (not medium and not mtype):
+            candidates.append(media.get('url'))
+    for link in (raw.get('enclosures') or []) + (raw.get('links') or []):
+        if link.get('rel', 'enclosure') == 'enclosure' and (link.get('type') or '').lower().startswith('image/'):
+            candidates.append(link.get('href') or link.get('url'))
+    for thumb in raw.get('media_thumbnail') or []:
+        candidates.append(thumb.get('url'))
+    for img in content_soup.find_all('img'):
+        candidates.append(img.get('src') or img.get('data-src'))
+    urls = [_abs(u, base_url) for u in candidates if isinstance(u, str)]
+    return _dedupe_preserve([u for u in urls if u and is_valid_article_image(u)])
+
+
+def assess_feed_content(content_soup: BeautifulSoup, image_urls: List[str], min_chars: int,
+                        min_paragraphs: int, require_image: bool) -> Optional[str]:
     """
-    Busca nos dados JSON-LD parseados por um objeto NewsArticle, Article ou BlogPosting.
+    Completeness check for a feed payload or a lite (AMP) page body.
+
+    Returns:
+        None when the payload is complete enough to skip the full page,
+        otherwise the reason it is not ('too_short', 'few_paragraphs', 'no_image').
     """
-    for data in json_ld_data:
-        graph = data.get('@graph', [data])
-        for item in graph:
-            if isinstance(item, dict) and item.get('@type') in ('NewsArticle', 'Article', 'BlogPosting'):
-                return item
+    text = content_soup.get_text(" ", strip=True)
+    if len(text) < min_chars:
+        return 'too_short'
+    paragraphs = [p for p in content_soup.find_all('p') if len(p.get_text(strip=True)) >= 40]
+    if len(paragraphs) < min_paragraphs:
+        return 'few_paragraphs'
+    if require_image and not image_urls:
+        return 'no_image'
     return None
 
-# --- New constants for related content removal ---
-LEIA_HEADING_RE = re.compile(r"(leia também|veja também|relacionad[oa]s|recomendad[oa]s|tópicos relacionados)", re.I)
 
-# Site-specific rules for related content
-SITE_SPECIFIC_RELATED_SELECTORS = {
-    "infomoney.com.br": [
-        ".single__related", ".article__related", ".post-related", ".related-posts",
-        ".rm-related", ".block-related", ".single__sidebar", ".article__sidebar",
-        "section.single__see-also", ".wp-block-infomoney-blocks-infomoney-read-more",
-    ],
-    "estadao.com.br": [
-        ".links-relacionados", ".mat-relacionadas", ".es-relacionadas",
-        ".stories-related", ".see-also", ".link-relacionado", ".box-relacionadas",
-    ],
-}
+def make_soup(markup: Union[str, bytes], encoding: Optional[str] = None) -> BeautifulSoup:
+    """Parses a page with lxml; bytes are decoded by the parser (declared charset or <meta> sniffing)."""
+    if isinstance(markup, bytes):
+        return BeautifulSoup(markup, 'lxml', from_encoding=encoding)
+    return BeautifulSoup(markup, 'lxml')
+
+
+# --- Lightweight cleaner profile for AMP/lite pages ------------------------
+
+# AMP chrome and non-content components; the real content never lives in these
+LITE_DROP_TAGS = (
+    'script', 'style', 'noscript', 'template', 'svg', 'form',
+    'header', 'footer', 'nav', 'aside',
+    'amp-ad', 'amp-embed', 'amp-sticky-ad', 'amp-analytics', 'amp-pixel', 'amp-sidebar',
+    'amp-social-share', 'amp-consent', 'amp-user-notification', 'amp-geo', 'amp-list',
+    'amp-carousel', 'amp-accordion', 'amp-access', 'amp-next-page', 'amp-install-serviceworker',
+)
+# Blocks kept in the article body, in document order
+LITE_CONTENT_TAGS = ('p', 'h2', 'h3', 'ul', 'ol', 'blockquote', 'table')
+
+
+def _content_blocks(root, keep_tweets: bool = True) -> List[str]:
+    """The outermost text blocks under `root` (LITE_CONTENT_TAGS), as HTML, minus "Leia também" headings."""
+    blocks = []
+    for el in root.find_all(LITE_CONTENT_TAGS):
+        if el.find_parent(LITE_CONTENT_TAGS) is not None or not el.get_text(strip=True):
+            continue
+        if el.name == 'blockquote':
+            is_tweet = 'twitter-tweet' in el.get('class', [])
+            if (is_tweet and not keep_tweets) or (not is_tweet and not el.find('p')):
+                continue
+        if el.name in ('h2', 'h3') and LEIA_HEADING_RE.search(el.get_text(" ", strip=True)):
+            continue
+        blocks.append(str(el))
+    return blocks
 
 
 class ContentExtractor:
     """Extrai e limpa conteúdo para o pipeline."""
     def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({'User-Agent': USER_AGENT})
+        self.session = transport.session(transport.PAGES, headers={'User-Agent': USER_AGENT})
 
-    def _fetch_html(self, url: str) -> Optional[str]:
+    def extract_from_feed(self, item: Dict[str, Any], url: str, min_chars: int = 1500,
+                          min_paragraphs: int = 4, require_image: bool = True) -> Tuple[Optional[Dict[str, Any]], str]:
+        """
+        Builds the extraction result straight from the feed entry when it syndicates
+        the full article, so the page download and full-page parse can be skipped.
+
+        Args:
+            item: A normalized feed item (see `feeds.normalize_item`), with the
+                feedparser entry in '_raw'.
+
+        Returns:
+            (result, decision): result has the same shape as `extract()` or is None;
+            decision is 'used', 'no_content' or the failed completeness check.
+        """
+        raw = item.get('_raw') or {}
+        content_html = _feed_entry_html(raw)
+        if not content_html:
+            return None, 'no_content'
+
+        soup = BeautifulSoup(content_html, 'lxml')
+        image_urls = _feed_entry_image_urls(raw, soup, url)
+        reason = assess_feed_content(soup, image_urls, min_chars, min_paragraphs, require_image)
+        if reason:
+            return None, reason
+
+        videos = self._extract_youtube_videos(soup)
+        for img in soup.find_all('img'):
+            # Images are passed separately, as in the page extractors
+            (img.find_parent('figure') or img).decompose()
+        self._remove_forbidden_blocks(soup)
+        final_content_html = soup.body.decode_contents() if soup.body else str(soup)
+
+        featured_image_url = image_urls[0] if image_urls else None
+        body_images_html_list = [
+            f'<figure><img src="{u}" alt=""><figcaption></figcaption></figure>' for u in image_urls[1:]
+        ]
+        summary = raw.get('summary') or ''
+        excerpt = BeautifulSoup(summary, 'lxml').get_text(" ", strip=True) if summary else ''
+        return {
+            "title": (item.get('title') or 'No Title Found').strip(),
+            "content": final_content_html,
+            "excerpt": excerpt[:300],
+            "featured_image_url": featured_image_url,
+            "images": body_images_html_list,
+            "videos": videos,
+            "source_url": url,
+            "schema_original": None,
+        }, 'used'
+
+    def extract_lite(self, html: Union[str, bytes], url: str, min_chars: int = 1200,
+                     min_paragraphs: int = 3, encoding: Optional[str] = None) -> Tuple[Optional[Dict[str, Any]], str]:
+        """
+        Extracts an AMP/lite page with a lightweight cleaner profile: drop the AMP
+        chrome by tag name, then keep only the text blocks of the article body.
+        The heavy `_pre_clean_html` and trafilatura passes are not needed.
+
+        Args:
+            html: The lite page, as text or as fetched bytes (see `fetch_page`).
+            url: The original (canonical) article URL, used as source_url.
+            encoding: Charset declared for `html` bytes, if any.
+
+        Returns:
+            (result, decision): result has the same shape as `extract()` or is None;
+            decision is 'used', 'no_content' or the failed quality check.
+        """
+        soup = make_soup(html, encoding)
+        metadata = DocumentMetadata.from_soup(soup)
+        news_article_schema = metadata.article()
+        featured_image_url = self._pick_featured_image(soup, url, collect_media(soup, url, metadata=metadata))
+        title = metadata.title_text()
+        excerpt = metadata.description()
+        if news_article_schema:
+            title = news_article_schema.get('headline') or title
+            excerpt = excerpt or news_article_schema.get('description') or ''
+            featured_image_url = featured_image_url or _coerce_url(news_article_schema.get('image'))
+
+        # AMP components that carry content become their plain HTML equivalents
+        videos = []
+        for amp_yt in soup.find_all('amp-youtube'):
+            vid = amp_yt.get('data-videoid')
+            if vid:
+                videos.append({"id": vid, "embed_url": f"https://www.youtube.com/embed/{vid}",
+                               "watch_url": f"https://www.youtube.com/watch?v={vid}"})
+            amp_yt.decompose()
+        for amp_img in soup.find_all('amp-img'):
+            amp_img.name = 'img'
+        for tag in soup.find_all(LITE_DROP_TAGS):
+            if tag.parent is not None:
+                tag.decompose()
+
+        root = _find_article_body(soup)
+        # Site related-blocks and forbidden blocks go in the same walk
+        profile = site_rules.resolve(url)
+        FORBIDDEN_BLOCKS_PLAN.apply(root, extra=profile.related if profile else None)
+
+        blocks = _content_blocks(root)
+        if not blocks:
+            return None, 'no_content'
+
+        content_soup = BeautifulSoup("".join(blocks), 'lxml')
+        for img in content_soup.find_all('img'):
+            img.decompose()
+        body_images = []
+        for img in root.find_all('img'):
+            src = _abs(img.get('src') or img.get('data-src') or '', url)
+            if src and is_valid_article_image(src):
+                body_images.append(src)
+        body_images = [u for u in _dedupe_preserve(body_images) if u != featured_image_url]
+        reason = assess_feed_content(content_soup, body_images, min_chars, min_paragraphs, require_image=False)
+        if reason:
+            return None, reason
+
+        seen_video_ids = {v['id'] for v in videos}
+        videos += [v for v in self._extract_youtube_videos(root) if v['id'] not in seen_video_ids]
+        final_content_html = content_soup.body.decode_contents() if content_soup.body else str(content_soup)
+        return {
+            "title": title.strip(),
+            "content": final_content_html,
+            "excerpt": (excerpt or "").strip(),
+            "featured_image_url": featured_image_url,
+            "images": [f'<figure><img src="{u}" alt=""><figcaption></figcaption></figure>' for u in body_images],
+            "videos": videos,
+            "source_url": url,
+            "schema_original": news_article_schema,
+        }, 'used'
+
+    def fetch_page(self, url: str) -> Optional[FetchedPage]:
+        """
+        Streams an article page with the FETCH_CONFIG size/time caps, stopping once the
+        main <article> has closed. The body stays as bytes; parse it with `make_soup`.
+        """
+        host = urlparse(url).netloc.lower().replace('www.', '')
+        stop_early = FETCH_CONFIG.get('stop_at_article_end', True) and \
+            not any(host == d or host.endswith('.' + d) for d in FETCH_CONFIG.get('full_body_domains', []))
         try:
-            resp = self.session.get(url, timeout=20.0, allow_redirects=True)
-            resp.raise_for_status()
-            return resp.text
+            return fetch_bounded(self.session, url, allowed_types=HTML_CONTENT_TYPES,
+                                 stop_at_article_end=stop_early)
         except requests.RequestException as e:
             logger.error(f"Failed to fetch HTML from {url}: {e}")
             return None
 
+    def _fetch_html(self, url: str) -> Optional[str]:
+        page = self.fetch_page(url)
+        return page.text() if page else None
+
     def _pre_clean_html(self, soup: BeautifulSoup, url: str):
         """Remove widgets/ads/blocos óbvios ANTES da extração."""
-        # --- New robust related content removal logic from user patch ---
-        try:
-            # 1. Remove sections by heading text (e.g., "Leia também")
-            # Iterate backwards to avoid issues with modifying the list while iterating
-            for h in reversed(soup.find_all(re.compile("^h[1-6]$"))):
-                heading_text = h.get_text(" ", strip=True)
-                if heading_text and LEIA_HEADING_RE.search(heading_text):
-                    parent_container = h.find_parent(('section', 'aside', 'div'))
-                    if parent_container and len(parent_container.find_all(re.compile("^h[1-6]$"))) <= 2:
-                        logger.debug(f"Decomposing parent container '{parent_container.name}' of related heading: {heading_text}")
-                        parent_container.decompose()
-                    else:
-                        logger.debug(f"Decomposing related heading and its sibling: {heading_text}")
-                        next_sibling = h.find_next_sibling()
-                        if next_sibling and next_sibling.name in ("div", "ul", "section", "ol"):
-                            next_sibling.decompose()
-                        h.decompose()
-            
-            # 2. Remove by site-specific selectors
-            source_host = (urlparse(url).hostname or "").replace("www.", "")
-            if source_host in SITE_SPECIFIC_RELATED_SELECTORS:
-                for sel in SITE_SPECIFIC_RELATED_SELECTORS[source_host]:
-                    for el in soup.select(sel):
-                        el.decompose()
-            
-            # 3. Remove links that are likely related content wrappers
-            for a in soup.select("a"):
-                cls = " ".join(a.get("class", [])).lower()
-                if any(k in cls for k in ["relacion", "related", "leia", "veja"]) or a.get("data-gtm-cta") in ("related", "see_more"):
-                    a.decompose()
-
-        except Exception as e:
-            logger.warning(f"Error during advanced related content removal for {url}: {e}", exc_info=False)
-        # --- End of new logic ---
-
-        # Merged list from original and user suggestions for more robust cleaning
-        selectors_to_remove = {
-            # User-suggested selectors for CTAs, ads, and social sharing
-            ".cta-middle", ".infomoney-read-more", ".read-more", ".post__related",
-            ".sharing", ".share", ".social", ".banner", ".ads", ".advertisement",
-            "[data-ad]", "[data-ad-slot]",
-            ".sponsored", ".paid-content", ".partner", ".outbrain", ".taboola",
-            
-            # Original selectors
-            '[class*="srdb"]', '[class*="rating"]', '.review', '.score', '.meter',
-            'header', 'footer', 'nav', 'aside',
-            '[class*="related"]', '[id*="related"]',
-            # From user's patch (GENERIC_REL_SELECTORS)
-            "[class*='relacionad']", "[class*='relaciona']", "[class*='recommend']",
-            "[class*='veja-tambem']", "[class*='leia-tambem']", "[id*='relacionad']",
-            "[id*='leia']", "section[aria-label*='Leia']", "section[aria-label*='Relacionad']",
-            '[class*="trending"]', '[id*="trending"]', 'div.widget',
-            '[class*="sidebar"]',  '[id*="sidebar"]',
-            '[class*="recommend"]','[class*="recommended"]',
-            '[class*="screen-hub"]','[class*="screenhub"]',
-            '[class*="most-popular"]','[id*="most-popular"]',
-            '[class*="popular"]','[id*="popular"]',
-            '[class*="newsletter"]','[id*="newsletter"]',
-            '[class*="ad-"]','[id*="ad-"]','[class*="advert"]','[id*="advert"]',
-            '.comments', '#comments',
-            '.author', '.author-box', '.post-author', '.byline', '.entry-author',
-            '.avatar', '.author__image', '.author-profile',
-            '.subscribe',
-        }
-        for sel in selectors_to_remove:
-            for el in soup.select(sel):
-                try:
-                    el.decompose()
-                except Exception:
-                    pass
-
-        # remover texto "powered by srdb"
-        for text_node in soup.find_all(string=lambda t: isinstance(t, str) and "powered by srdb" in t.lower()):
-            p = text_node.find_parent()
-            if p:
-                try:
-                    p.decompose()
-                except Exception:
-                    pass
-
-        logger.info("Pre-cleaned HTML, removing unwanted widgets and blocks.")
+        profile = site_rules.resolve(url)
+        removed = PRE_CLEAN_PLAN.apply(soup, extra=profile.related if profile else None)
+        logger.info(f"Pre-cleaned HTML, removing {removed} unwanted widgets and blocks.")
 
     def _remove_forbidden_blocks(self, soup: BeautifulSoup) -> None:
         """Remove infobox técnica e mensagens indesejadas do html extraído."""
-        for t in soup.find_all(string=True):
-            s = (t or "").strip()
-            if s and s in FORBIDDEN_TEXT_EXACT:
-                try:
-                    t.parent.decompose()
-                except Exception:
-                    pass
-
-        candidates = []
-        for tag in soup.find_all(["div", "section", "aside", "ul", "ol"]):
-            text = " ".join(tag.get_text(separator="\n").split())
-            lbl_count = sum(1 for lbl in FORBIDDEN_LABELS
-                            if re.search(rf"(^|\n)\s*{re.escape(lbl)}\s*(\n|$|:)", text, flags=re.I))
-            if lbl_count >= 2:
-                candidates.append(tag)
-        for c in candidates:
-            try:
-                c.decompose()
-            except Exception:
-                pass
+        FORBIDDEN_BLOCKS_PLAN.apply(soup)
 
-        for tag in soup.find_all(["p", "li", "span", "h3", "h4"]):
-            if not tag.parent:
-                continue
-            s = (tag.get_text() or "").strip().rstrip(':').strip()
-            if s in FORBIDDEN_TEXT_EXACT or s in FORBIDDEN_LABELS:
-                try:
-                    tag.decompose()
-                except Exception:
-                    pass
-
-    def _convert_data_img_to_figure(self, soup: BeautifulSoup):
+    def _convert_data_img_to_figure(self, soup: BeautifulSoup, media: Optional[PageMedia] = None):
         """
         Converte divs com 'data-img-url' em <figure><img>.
         Faz APENAS dentro do corpo do artigo para não pegar sidebar.
+        Pass `media` when the page was already scanned by `collect_media`.
         """
-        root = _find_article_body(soup)
+        if media is None:
+            media = collect_media(soup, root=_find_article_body(soup))
         converted = 0
-        for div in root.select('div[data-img-url]') :
+        for div in media.data_img_divs:
+            if div.parent is None:
+                continue
             img_url = div['data-img-url']
             fig = soup.new_tag('figure')
             img = soup.new_tag('img', src=img_url)
@@ -690,171 +598,70 @@ class ContentExtractor:
         if converted:
             logger.info(f"Converted {converted} 'data-img-url' divs to <figure> tags.")
 
-    def _pick_featured_image(self, soup: BeautifulSoup, base_url: str) -> Optional[str]:
+    def _pick_featured_image(self, soup: BeautifulSoup, base_url: str,
+                             media: Optional[PageMedia] = None) -> Optional[str]:
         """
-        Encontra a melhor imagem destacada de um artigo seguindo uma ordem de prioridade.
-        1. Metatag Open Graph (og:image) - Mais confiável.
-        2. Dados Estruturados JSON-LD - Muito confiável.
-        3. Maior imagem dentro da tag <article> - Bom fallback.
+        Encontra a melhor imagem destacada de um artigo seguindo uma ordem de prioridade
+        (og:image, JSON-LD, maior imagem do <article>; see `PageMedia.featured_image`).
         """
+        if media is None:
+            media = collect_media(soup, base_url)
+        return media.featured_image()
 
-        # --- Prioridade 1: Metatag Open Graph (og:image) ---
-        # Quase todos os sites usam isso para compartilhar em redes sociais.
-        og_image = soup.find('meta', property='og:image')
-        if og_image and og_image.get('content'):
-            logger.info("✅ Imagem encontrada com sucesso via Open Graph (og:image).")
-            return urljoin(base_url, og_image['content'])
-
-        # --- Prioridade 2: Dados Estruturados (JSON-LD) ---
-        # Muitos sites usam isso para SEO e para o Google.
-        json_ld_script = soup.find('script', type='application/ld+json')
-        if json_ld_script and json_ld_script.string:
-            try:
-                data = json.loads(json_ld_script.string)
-                
-                # O JSON-LD pode ser uma lista (com @graph) ou um objeto.
-                if isinstance(data, list):
-                    data = data[0]
-                
-                image_data = data.get('image')
-                if image_data:
-                    # A imagem pode ser uma lista, um objeto ou uma string.
-                    image_url = None
-                    if isinstance(image_data, list):
-                        image_data = image_data[0]
-                    
-                    if isinstance(image_data, dict) and image_data.get('url'):
-                        image_url = image_data['url']
-                    elif isinstance(image_data, str):
-                        image_url = image_data
-                    
-                    if image_url:
-                        logger.info("✅ Imagem encontrada com sucesso via JSON-LD.")
-                        return urljoin(base_url, image_url)
-
-            except (json.JSONDecodeError, KeyError, TypeError, IndexError):
-                # Ignora erros se o JSON-LD estiver mal formatado ou não tiver a imagem.
-                pass
-
-        # --- Prioridade 3: Maior imagem dentro da tag <article> (Fallback) ---
-        # Se os métodos acima falharem, procura a maior imagem dentro do corpo do artigo.
-        article_tag = soup.find('article')
-        if article_tag:
-            max_area = 0
-            best_image_url = None
-            for img in article_tag.find_all('img'):
-                src = img.get('src') or img.get('data-src')
-                if not src:
-                    continue
-
-                width_str = img.get('width', '0')
-                height_str = img.get('height', '0')
-                # Garante que width e height são numéricos antes de converter
-                if width_str.isdigit() and height_str.isdigit():
-                    width = int(width_str)
-                    height = int(height_str)
-                    area = width * height
-                    if area > max_area:
-                        max_area = area
-                        best_image_url = src
-            
-            if best_image_url:
-                logger.warning("⚠️ Imagem encontrada via método de fallback (maior imagem no artigo).")
-                return urljoin(base_url, best_image_url)
-
-        logger.warning(f"❌ Nenhuma imagem destacada confiável foi encontrada para {base_url}.")
-        return None
+    def _extract_youtube_videos(self, soup: BeautifulSoup) -> list[dict]:
+        return collect_media(soup).videos()
 
-    def _extract_youtube_id(self, url: str, soup: Optional[BeautifulSoup] = None) -> Optional[str]:
-        """
-        Extracts a YouTube video ID from a URL using various patterns.
-        Optionally uses the soup object to find a fallback ID in meta tags.
-        """
-        if not url:
+    def _container_content(self, soup: BeautifulSoup, selector: str, min_chars: int = 0) -> Optional[str]:
+        """Body HTML from a learned container (app/selector_learning.py); None if it is missing or too short."""
+        container = selector_learning.select_container(soup, selector)
+        if container is None or len(container.get_text(strip=True)) < min_chars:
             return None
+        # Twitter embeds are appended separately, as on the trafilatura path
+        blocks = _content_blocks(container, keep_tweets=False)
+        return "".join(blocks) if blocks else None
 
-        # 1) Common patterns (embed/shorts/youtu.be)
-        for pattern in _YT_PATTERNS:
-            m = re.search(pattern, url)
-            if m:
-                return m.group(1)
-
-        # 2) watch?v=ID
-        try:
-            pu = urlparse(url)
-            if "youtube.com" in pu.netloc and pu.path == "/watch":
-                q = parse_qs(pu.query)
-                if "v" in q and len(q["v"][0]) == 11:
-                    return q["v"][0]
-        except Exception:
-            pass
-
-        # 3) Optional fallback using og:image (only if soup is provided)
-        if soup is not None:
-            try:
-                og = soup.find("meta", property="og:image")
-                if og and og.get("content"):
-                    # og:image often ends with .../<ID>/hqdefault.jpg
-                    mm = re.search(r"/([A-Za-z0-9_-]{11})/hqdefault", og["content"])
-                    if mm:
-                        return mm.group(1)
-            except Exception:
-                pass
-
-        return None
-
-    def _extract_youtube_videos(self, soup: BeautifulSoup) -> list[dict]:
-        ids = []
-        for iframe in soup.find_all("iframe"):
-            vid = self._extract_youtube_id(iframe.get("src", ""), soup=soup)
-            if vid:
-                ids.append(vid)
-        for div in soup.select('.w-youtube[id], .youtube[id], [data-youtube-id]') :
-            vid = div.get("id") or div.get("data-youtube-id")
-            if vid:
-                ids.append(vid)
-        seen, ordered = set(), []
-        for v in ids:
-            if v and v not in seen:
-                seen.add(v)
-                ordered.append(v)
-        if ordered:
-            logger.info(f"Found {len(ordered)} unique YouTube videos.")
-        return [{"id": v, "embed_url": f"https://www.youtube.com/embed/{v}",
-                 "watch_url": f"https://www.youtube.com/watch?v={v}"} for v in ordered]
-
-    def _extract_with_trafilatura(self, html: str, url: str) -> Optional[Dict[str, Any]]:
+    def _extract_with_trafilatura(self, html: Union[str, bytes], url: str, soup: Optional[BeautifulSoup] = None,
+                                  metadata: Optional[DocumentMetadata] = None,
+                                  learning: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
         """
         Generic extraction method using Trafilatura as the core engine.
         This was the original `extract` method.
+
+        `learning` is the page's plan from `SelectorLearner.plan()`: with a promoted
+        selector the body comes straight from that container and trafilatura is
+        skipped (unless the plan asks to validate). The outcome is written back
+        into the dict ('fast_path', 'missed', 'observed', 'similarity').
         """
         logger.debug(f"Using generic (trafilatura) extractor for {url}")
         try:
-            soup = BeautifulSoup(html, 'lxml')
-
-            # Preserve twitter embeds
-            twitter_embeds = soup.find_all('blockquote', class_='twitter-tweet')
+            if soup is None:
+                soup = make_soup(html)
+            if metadata is None:
+                metadata = DocumentMetadata.from_soup(soup)
 
             # 1) Tenta extrair metadados de JSON-LD primeiro, pois é a fonte mais confiável
-            all_json_ld = _extract_json_ld(soup)
-            news_article_schema = _find_news_article_in_json_ld(all_json_ld)
+            news_article_schema = metadata.article()
 
             # 2) limpeza prévia pesada
             self._pre_clean_html(soup, url)
 
-            # 3) normaliza data-img-url -> <figure>
-            self._convert_data_img_to_figure(soup)
+            # 3) uma única varredura coleta imagens, vídeos e embeds do twitter (app/media.py)
+            media = collect_media(soup, url, root=_find_article_body(soup), metadata=metadata)
+            twitter_embeds = media.twitter_embeds
 
-            # 4) Extrai imagem destacada com a nova lógica de priorização
-            featured_image_url = self._pick_featured_image(soup, url)
+            # 4) normaliza data-img-url -> <figure>
+            self._convert_data_img_to_figure(soup, media)
 
-            # 5) Extrai imagens do corpo do artigo
-            body_images = collect_images_from_article(soup, base_url=url)
+            # 5) Extrai imagem destacada com a nova lógica de priorização
+            featured_image_url = self._pick_featured_image(soup, url, media)
 
-            # 6) vídeos
-            videos = self._extract_youtube_videos(soup)
+            # 6) Extrai imagens do corpo do artigo
+            body_images = media.body_images()
 
-            # 7) metadados: Prioriza JSON-LD, com fallback para tags meta
+            # 7) vídeos
+            videos = media.videos()
+
+            # 8) metadados: Prioriza JSON-LD, com fallback para tags meta
             title = 'No Title Found'
             excerpt = ''
             if news_article_schema:
@@ -864,35 +671,51 @@ class ContentExtractor:
                 if not featured_image_url:
                      featured_image_url = _coerce_url(news_article_schema.get('image'))
             else: # Fallback
-                title = (og_title.get('content') if (og_title := soup.find('meta', property='og:title')) else None) or (soup.title.string if soup.title else title)
-                excerpt = (meta_desc.get('content') if (meta_desc := soup.find('meta', attrs={'name': 'description'})) else None) or \
-                          (og_desc.get('content') if (og_desc := soup.find('meta', property='og:description')) else '')
-
-            # 8) extrair corpo com trafilatura
-            cleaned_html_str = str(soup)
-            content_html = trafilatura.extract(
-                cleaned_html_str,
-                include_images=False, # Images are handled separately
-                include_links=True,
-                include_comments=False,
-                include_tables=False,
-                output_format='html'
-            )
-            if not content_html:
-                logger.warning(f"Trafilatura returned empty content for {url}")
-                return None
+                title = metadata.title_text(title)
+                excerpt = metadata.description()
+
+            # 9) extrair corpo: pelo contêiner aprendido para o domínio, senão com trafilatura
+            content_html = None
+            selector = learning.get('selector') if learning else None
+            if selector and not learning.get('validate'):
+                content_html = self._container_content(soup, selector, learning.get('min_chars', 0))
+                learning['fast_path' if content_html else 'missed'] = True
+            fast_path = content_html is not None
+            if not fast_path:
+                cleaned_html_str = str(soup)
+                content_html = trafilatura.extract(
+                    cleaned_html_str,
+                    include_images=False, # Images are handled separately
+                    include_links=True,
+                    include_comments=False,
+                    include_tables=False,
+                    output_format='html'
+                )
+                if not content_html:
+                    logger.warning(f"Trafilatura returned empty content for {url}")
+                    return None
+                if learning is not None:
+                    learning['observed'] = selector_learning.learn_selector(soup, content_html)
+                    if selector and learning.get('validate'):
+                        container_html = self._container_content(soup, selector)
+                        learning['similarity'] = (
+                            selector_learning.similarity(container_html, content_html) if container_html else 0.0
+                        )
 
             # Append twitter embeds back
             if twitter_embeds:
                 for embed in twitter_embeds:
                     content_html += str(embed)
 
-            # 9) pós-processar corpo
+            # 10) pós-processar corpo
             article_soup = BeautifulSoup(content_html, 'lxml')
+            if fast_path:
+                for img in article_soup.find_all('img'):
+                    img.decompose()
             self._remove_forbidden_blocks(article_soup)
 
-            # 10) Seleciona imagens do corpo (excluindo a destacada)
-            # A `collect_images_from_article` já aplica `is_valid_article_image`
+            # 11) Seleciona imagens do corpo (excluindo a destacada)
+            # `body_images()` já aplica `is_valid_article_image`
             other_valid_images = [
                 u for u in body_images if u != featured_image_url
             ]
@@ -1039,27 +862,46 @@ class ContentExtractor:
         logger.info("INFO (GE): Limpeza concluída. Retornando HTML final.")
         return main_container
 
-    def extract(self, html: str, url: str) -> Optional[Dict[str, Any]]:
+    def extract(self, html: Union[str, bytes], url: str, soup: Optional[BeautifulSoup] = None,
+                learning: Optional[Dict[str, Any]] = None,
+                fingerprints: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
         """
         Main extraction flow. Uses a modular, site-specific cleaning method.
         If no specific rule is found, it falls back to a generic extractor.
+
+        Pass `soup` when the page is already parsed, to avoid parsing it again,
+        `learning` (see `_extract_with_trafilatura`) to use or learn the domain's
+        content selector and `fingerprints` (`BoilerplateStore.plan()`) to drop the
+        domain's known boilerplate blocks first and fingerprint the page.
         """
-        soup = BeautifulSoup(html, 'lxml')
+        if soup is None:
+            soup = make_soup(html)
         domain = urlparse(url).netloc.lower().replace('www.', '')
-
-        # --- Step 1: Get metadata from the full page ---
-        featured_image_url = self._pick_featured_image(soup, url)
-        title = (og_title.get('content') if (og_title := soup.find('meta', property='og:title')) else None) or (soup.title.string if soup.title else 'No Title Found')
-        excerpt = (meta_desc.get('content') if (meta_desc := soup.find('meta', attrs={'name': 'description'})) else None) or \
-                  (og_desc.get('content') if (og_desc := soup.find('meta', property='og:description')) else '')
-        videos_full_page = self._extract_youtube_videos(soup)
-
-        # --- Step 2: Route to the correct site-specific cleaner ---
+        profile = site_rules.resolve(url)
+
+        # --- Step 1: Get metadata from the full page (read once, app/doc_metadata.py) ---
+        metadata = DocumentMetadata.from_soup(soup)
+        if fingerprints is not None:
+            # Blocks seen on many pages of the site go before any other cleaning (app/boilerplate.py)
+            boilerplate.remove_boilerplate(soup, fingerprints)
+        media = collect_media(soup, url, metadata=metadata)
+        featured_image_url = self._pick_featured_image(soup, url, media)
+        title = metadata.title_text()
+        excerpt = metadata.description()
+        videos_full_page = media.videos()
+
+        # --- Step 2: Route to the site's extractor hook or selectors (app/site_rules.py) ---
         cleaned_container = None
-        if 'lance.com.br' in domain:
-            cleaned_container = self._clean_html_for_lance_definitivo(soup)
-        elif 'ge.globo.com' in domain:
-            cleaned_container = self._clean_html_for_ge(soup)
+        if profile and profile.extractor:
+            hook = getattr(self, profile.extractor, None)
+            if hook is None:
+                logger.error(f"Site profile '{profile.name}' names an unknown extractor hook '{profile.extractor}'.")
+            else:
+                cleaned_container = hook(soup)
+        elif profile and profile.selector_extraction:
+            result = _extract_site_specific(soup, url, profile, extractor=self, metadata=metadata)
+            if result:
+                return result
         
         # --- Step 3: Process content if a cleaned container was returned ---
         if cleaned_container:
@@ -1091,4 +933,4 @@ class ContentExtractor:
         else:
             # --- Step 4: Fallback for unhandled sites ---
             logger.warning(f"No specific extractor rule found for {domain}. Falling back to generic (trafilatura) extractor.")
-            return self._extract_with_trafilatura(html, url)
+            return self._extract_with_trafilatura(html, url, soup=soup, metadata=metadata, learning=learning)
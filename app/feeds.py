@@ -4,11 +4,16 @@ import requests
 import re
 import xml.etree.ElementTree as ET
 from typing import List, Dict, Any, Optional
-import gzip
 import time
 import hashlib
+import zlib
 from datetime import datetime, timezone
 
+from . import transport
+from .config import FETCH_CONFIG
+from .fetching import FEED_CONTENT_TYPES, fetch_bounded
+from .urlnorm import canonical_url
+
 logger = logging.getLogger(__name__)
 
 NS = {"ns":"http://www.sitemaps.org/schemas/sitemap/0.9",
@@ -102,7 +107,7 @@ def normalize_item(raw: dict) -> dict:
     if guid:
         ext_id = str(guid).strip()
     elif link:
-        ext_id = _stable_id_from(link)
+        ext_id = _stable_id_from(canonical_url(link))
     else:
         ext_id = _stable_id_from(f"{title}|{published_iso or ''}")
 
@@ -118,22 +123,46 @@ def normalize_item(raw: dict) -> dict:
 
 class FeedReader:
     def __init__(self, user_agent: str):
-        self.session = requests.Session()
-        self.session.headers.update({'User-Agent': user_agent})
+        self.session = transport.session(transport.FEEDS, headers={'User-Agent': user_agent})
+        # True when every URL of the last read_feeds() call answered 304 Not Modified
+        self.last_not_modified = False
 
-    def _fetch_content(self, url: str) -> Optional[bytes]:
+    def _fetch_content(self, url: str, validators: Optional[Dict[str, Any]] = None) -> Optional[bytes]:
+        """
+        Fetches a feed/sitemap. When `validators` (this URL's {'etag', 'last_modified'}) is
+        given, the request is conditional: a 304 sets validators['not_modified'] and returns
+        None, a 200 stores the new validators.
+        """
+        headers = {}
+        if validators is not None:
+            validators['not_modified'] = False
+            if validators.get('etag'):
+                headers['If-None-Match'] = validators['etag']
+            if validators.get('last_modified'):
+                headers['If-Modified-Since'] = validators['last_modified']
+        max_bytes = FETCH_CONFIG['max_feed_bytes']
         try:
-            response = self.session.get(url, timeout=20)
-            response.raise_for_status()
-            
+            response = fetch_bounded(self.session, url, headers=headers or None, max_bytes=max_bytes,
+                                     allowed_types=FEED_CONTENT_TYPES)
+            if response.status_code == 304:
+                if validators is not None:
+                    logger.info(f"Feed {url} not modified since last poll (304).")
+                    validators['not_modified'] = True
+                return None
+            if validators is not None:
+                validators['etag'] = response.headers.get('ETag')
+                validators['last_modified'] = response.headers.get('Last-Modified')
+            if response.truncated:
+                logger.warning(f"Feed {url} is larger than {max_bytes} bytes; parsing the first {response.size}.")
+
             content = response.content
-            ctype = response.headers.get("Content-Type", "").lower()
-            
-            # Decompress if it's a gzipped file
+            ctype = response.content_type.lower()
+
+            # Decompress if it's a gzipped file (bounded like the download itself)
             if "gzip" in ctype or url.endswith(".gz"):
                 try:
-                    content = gzip.decompress(content)
-                except (gzip.BadGzipFile, OSError) as e:
+                    content = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(content, max_bytes)
+                except (zlib.error, OSError) as e:
                     logger.warning(
                         f"Content from {url} seems to be gzipped but failed to decompress. "
                         f"Proceeding with original content. Error: {e}"
@@ -229,15 +258,27 @@ class FeedReader:
         logger.info(f"Parsed {len(items)} items from sitemap.")
         return items[:limit]
 
-    def read_feeds(self, feed_config: Dict[str, Any], source_id: str) -> List[Dict[str, Any]]:
+    def read_feeds(self, feed_config: Dict[str, Any], source_id: str,
+                   validators: Optional[Dict[str, Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+        """
+        Reads every URL of a feed and returns normalized, URL-deduplicated items.
+
+        Args:
+            validators: Optional {url: {'etag', 'last_modified'}} map for conditional
+                requests, updated in place. URLs answering 304 contribute no items.
+        """
         raw_items = []
+        not_modified = 0
         feed_type = feed_config.get('type', 'rss')
         deny_regex = feed_config.get('deny_regex')
         deny = re.compile(deny_regex) if deny_regex else None
 
         for url in feed_config.get('urls', []):
             logger.info(f"Reading {feed_type} feed from {url} for source '{source_id}'")
-            content = self._fetch_content(url)
+            url_validators = validators.setdefault(url, {}) if validators is not None else None
+            content = self._fetch_content(url, url_validators)
+            if url_validators and url_validators.get('not_modified'):
+                not_modified += 1
             if not content:
                 continue
 
@@ -258,6 +299,7 @@ class FeedReader:
                 
                 raw_items.extend(entries)
         
+        self.last_not_modified = bool(not_modified) and not_modified == len(feed_config.get('urls', []))
         all_items = [normalize_item(item) for item in raw_items]
 
         if logger.isEnabledFor(logging.DEBUG):
@@ -269,9 +311,9 @@ class FeedReader:
         seen_urls = set()
         unique_items = []
         for item in all_items:
-            item_url = item.get('url')
-            if item_url and item_url not in seen_urls:
+            item_key = canonical_url(item.get('url') or '')
+            if item_key and item_key not in seen_urls:
                 unique_items.append(item)
-                seen_urls.add(item_url)
+                seen_urls.add(item_key)
         logger.info(f"Found {len(unique_items)} total unique items for {source_id}.")
         return unique_items
\ No newline at end of file
@@ -0,0 +1,181 @@
+"""
+Bounded streaming HTTP fetches.
+
+Pages and feeds are read in chunks instead of through `response.content` /
+`response.text`, so peak memory per document is capped by `max_bytes` and a
+slow or huge page cannot hold a cycle for longer than `max_seconds`. The raw
+bytes are returned together with the charset declared in the Content-Type
+header, so they can be handed straight to lxml: no `requests` charset
+detection, and no intermediate str copy of the document.
+
+For article pages the read can also stop as soon as the <head> and the
+top-level <article> have closed. Everything the extractors use (metadata and
+the first article container) has arrived by then, and the comment sections,
+related-article rails and footer scripts after it are never downloaded.
+"""
+
+import logging
+import re
+import time
+from typing import Any, Dict, Iterable, Optional
+
+import requests
+
+from . import transport
+from .config import FETCH_CONFIG
+
+logger = logging.getLogger(__name__)
+
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+FEED_CONTENT_TYPES = ('xml', 'rss', 'atom', 'text/', 'gzip', 'octet-stream')
+
+# Why a read stopped before the end of the body
+TRUNCATED_MAX_BYTES = 'max_bytes'
+TRUNCATED_DEADLINE = 'deadline'
+TRUNCATED_ARTICLE_END = 'article_end'
+
+_CHARSET_RE = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.IGNORECASE)
+_ARTICLE_TAG_RE = re.compile(rb'<(/?)article\b', re.IGNORECASE)
+_HEAD_END_RE = re.compile(rb'</head\s*>', re.IGNORECASE)
+# Longest tag prefix that can be split across two chunks ('</article' / '</head >')
+_CARRY_BYTES = 16
+
+
+class FetchRejected(requests.RequestException):
+    """The response was refused before reading its body (content type or declared size)."""
+
+
+def declared_encoding(content_type: Optional[str]) -> Optional[str]:
+    """Charset from a Content-Type header, or None to let the parser sniff the document."""
+    match = _CHARSET_RE.search(content_type or '')
+    return match.group(1) if match else None
+
+
+class FetchedPage:
+    """Body of a bounded fetch: raw bytes plus what the parser needs to decode them."""
+
+    def __init__(self, url: str, status_code: int, content: bytes, content_type: str = '',
+                 headers: Optional[Dict[str, Any]] = None, truncated: Optional[str] = None):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.content_type = content_type
+        self.encoding = declared_encoding(content_type)
+        self.headers = headers or {}
+        self.truncated = truncated
+
+    @property
+    def size(self) -> int:
+        return len(self.content)
+
+    def text(self) -> str:
+        """The body decoded with the declared charset (UTF-8 when none or unknown)."""
+        try:
+            return self.content.decode(self.encoding or 'utf-8', errors='replace')
+        except LookupError:
+            return self.content.decode('utf-8', errors='replace')
+
+
+class ArticleEndScanner:
+    """
+    Watches a streamed HTML body and reports when both the <head> and the first
+    substantial top-level <article> element have closed. Nested <article> tags are
+    tracked by depth; top-level articles shorter than `min_article_bytes` (cards,
+    teasers) do not count.
+    """
+
+    def __init__(self, min_article_bytes: int = 2048):
+        self.min_article_bytes = min_article_bytes
+        self.head_closed = False
+        self.depth = 0
+        self.article_start: Optional[int] = None
+        self._offset = 0   # absolute offset of self._carry
+        self._carry = b''
+
+    def feed(self, chunk: bytes) -> bool:
+        """Scans one more chunk; True once the read can stop."""
+        window = self._carry + chunk
+        if not self.head_closed and _HEAD_END_RE.search(window):
+            self.head_closed = True
+        done = False
+        last_end = 0
+        for match in _ARTICLE_TAG_RE.finditer(window):
+            last_end = match.end()
+            if not match.group(1):
+                if self.depth == 0:
+                    self.article_start = self._offset + match.start()
+                self.depth += 1
+            elif self.depth:
+                self.depth -= 1
+                if self.depth == 0 and self._offset + match.end() - self.article_start >= self.min_article_bytes:
+                    done = True
+        # Keep the unscanned tail so a tag split across chunks is still seen, never a matched one twice
+        keep_from = max(last_end, len(window) - _CARRY_BYTES)
+        self._offset += keep_from
+        self._carry = window[keep_from:]
+        return done and self.head_closed
+
+
+def fetch_bounded(session: requests.Session, url: str, timeout: Optional[float] = None,
+                  max_bytes: Optional[int] = None, max_seconds: Optional[float] = None,
+                  allowed_types: Optional[Iterable[str]] = None, stop_at_article_end: bool = False,
+                  headers: Optional[Dict[str, str]] = None) -> FetchedPage:
+    """
+    GETs `url` with a streamed, size- and time-capped body read.
+
+    A 304 Not Modified is returned as an empty page; other HTTP errors raise.
+    Size/time defaults come from FETCH_CONFIG.
+
+    Raises:
+        requests.RequestException: on network/HTTP errors, or FetchRejected when the
+            content type is not in `allowed_types` (substring match) or the declared
+            Content-Length is above `max_bytes`.
+    """
+    # A transport session brings its host-class timeout; plain sessions fall back to FETCH_CONFIG
+    timeout = timeout or getattr(session, 'default_timeout', None) or FETCH_CONFIG['timeout_seconds']
+    max_bytes = max_bytes or FETCH_CONFIG['max_page_bytes']
+    max_seconds = max_seconds or FETCH_CONFIG['max_seconds']
+    started = time.monotonic()
+
+    resp = session.get(url, timeout=timeout, headers=headers, stream=True, allow_redirects=True)
+    try:
+        content_type = resp.headers.get('Content-Type', '') or ''
+        if resp.status_code == 304:
+            return FetchedPage(resp.url or url, 304, b'', content_type, resp.headers)
+        resp.raise_for_status()
+
+        if allowed_types and content_type and not any(t in content_type.lower() for t in allowed_types):
+            raise FetchRejected(f"Unexpected content type '{content_type}' for {url}")
+        length = str(resp.headers.get('Content-Length') or '')
+        # Content-Length is the (possibly compressed) wire size, a lower bound of the body size
+        if length.isdigit() and int(length) > max_bytes:
+            raise FetchRejected(f"{url} declares {int(length)} bytes, above the {max_bytes} byte cap")
+
+        scanner = ArticleEndScanner(FETCH_CONFIG['min_article_bytes']) if stop_at_article_end else None
+        chunks, size, truncated = [], 0, None
+        for chunk in resp.iter_content(chunk_size=FETCH_CONFIG['chunk_bytes']):
+            if not chunk:
+                continue
+            if size + len(chunk) > max_bytes:
+                chunks.append(chunk[:max_bytes - size])
+                size = max_bytes
+                truncated = TRUNCATED_MAX_BYTES
+                break
+            chunks.append(chunk)
+            size += len(chunk)
+            if scanner and scanner.feed(chunk):
+                truncated = TRUNCATED_ARTICLE_END
+                break
+            if time.monotonic() - started > max_seconds:
+                truncated = TRUNCATED_DEADLINE
+                break
+    finally:
+        # Closing an unfinished stream drops the connection instead of draining the rest of the body
+        resp.close()
+
+    transport.record_bytes(url, size)
+    if truncated in (TRUNCATED_MAX_BYTES, TRUNCATED_DEADLINE):
+        logger.warning(f"Stopped reading {url} after {size} bytes ({truncated}).")
+    elif truncated:
+        logger.debug(f"Stopped reading {url} after {size} bytes, past the end of the article.")
+    return FetchedPage(resp.url or url, resp.status_code, b''.join(chunks), content_type, resp.headers, truncated)
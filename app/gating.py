@@ -0,0 +1,148 @@
+"""
+Pre-AI article gate.
+
+Some articles are not worth a Gemini call: paywalled teasers, live-blog
+shells, video-only pages, "Onde Assistir" listings, two-line briefs. They
+used to be dropped only after Gemini answered {"erro": ...} or came back
+without titulo_final/conteudo_final, a full prompt and response later.
+`check()` runs cheap rules on the extraction result, between dedupe and
+`rewrite_content`, in this order:
+
+- title_deny: the title matches a deny pattern (GATE_CONFIG's plus the feed's);
+- paywall: a subscription marker in a text shorter than `paywall_max_words`;
+- video_only / min_words: too little text (with a video embed: video_only);
+- min_paragraphs: the text is not in paragraphs (listings, live-blog shells);
+- language: the text's stopword profile is another language than the
+  feed's `language`;
+- duplicate: closer than `max_duplicate_distance` bits to a published story
+  (off by default: app/dedupe.py already drops confirmed duplicates, a feed
+  can set a looser bound here).
+
+Settings are GATE_CONFIG, overridden per feed with RSS_FEEDS[...]['gate'] (a
+dict, or False to turn the gate off for the feed). The default mode is
+'shadow': rejections are recorded but the article still goes to Gemini, so
+thresholds are tuned on real traffic before a feed is switched to
+{'mode': 'enforce'}. Every rejection is kept in `gate_rejections` with
+the signals it was judged on; a false reject is released from there (the
+dashboard's /api/gate/rejections) and its article is requeued past the gate.
+"""
+
+import logging
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from bs4 import BeautifulSoup
+
+from .config import GATE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+ENFORCE = 'enforce'
+SHADOW = 'shadow'
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+# Frequent words that tell the three feed languages apart (words shared by them are left out)
+STOPWORDS: Dict[str, frozenset] = {
+    'pt': frozenset('o os as um uma do da dos das no na nos nas em é ao pelo pela não com também foi seu sua '
+                    'ele ela isso mas já e ou até depois'.split()),
+    'es': frozenset('el los las una del al en y con es por su sus más fue pero también lo le ya muy este esta '
+                    'hasta después'.split()),
+    'en': frozenset('the and of to is was for with that on his her he she it at by from has have are but not '
+                    'this they after'.split()),
+}
+
+
+class GateVerdict(NamedTuple):
+    rule: Optional[str]       # the rule that rejected the article, None if it passed
+    detail: str
+    signals: Dict[str, Any]   # what the article was judged on, for auditing
+
+    @property
+    def rejected(self) -> bool:
+        return self.rule is not None
+
+
+@lru_cache(maxsize=256)
+def _compile(pattern: str) -> re.Pattern:
+    return re.compile(pattern, re.I)
+
+
+def detect_language(words: List[str], min_hits: int = 20) -> Tuple[Optional[str], Dict[str, int]]:
+    """The language whose stopwords dominate `words` (lowercased), or None below `min_hits` stopwords."""
+    hits = {lang: sum(1 for w in words if w in stop) for lang, stop in STOPWORDS.items()}
+    best = max(hits, key=hits.get)
+    return (best if hits[best] >= min_hits else None), hits
+
+
+def gate_settings(feed_config: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """GATE_CONFIG with the feed's overrides, or None when the gate is off for it."""
+    override = feed_config.get('gate', True)
+    if not GATE_CONFIG.get('enabled', True) or override is False:
+        return None
+    settings = dict(GATE_CONFIG)
+    if isinstance(override, dict):
+        settings.update(override)
+        # The feed's deny patterns add to the global ones
+        settings['title_deny'] = list(GATE_CONFIG['title_deny']) + list(override.get('title_deny', []))
+    settings['language'] = settings.get('language') or feed_config.get('language')
+    return settings
+
+
+def measure(extracted: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
+    """Word, paragraph, video and language counts of an extraction result, and its lowercased text."""
+    soup = BeautifulSoup(extracted.get('content') or '', 'lxml')
+    text = soup.get_text(' ', strip=True)
+    words = [w.lower() for w in _WORD_RE.findall(text)]
+    paragraphs = sum(1 for p in soup.find_all('p') if len(_WORD_RE.findall(p.get_text(' '))) >= 8)
+    language, hits = detect_language(words)
+    return {
+        'words': len(words),
+        'paragraphs': paragraphs,
+        'videos': len(extracted.get('videos') or []),
+        'language': language,
+        'language_hits': hits,
+    }, text.lower()
+
+
+def check(extracted: Dict[str, Any], settings: Dict[str, Any],
+          duplicate_distance: Optional[int] = None) -> GateVerdict:
+    """Runs the gate rules on an extraction result; the first failing rule rejects it."""
+    title = (extracted.get('title') or '').strip()
+    signals, text = measure(extracted)
+    signals['duplicate_distance'] = duplicate_distance
+
+    def reject(rule: str, detail: str) -> GateVerdict:
+        return GateVerdict(rule, detail, signals)
+
+    for pattern in settings.get('title_deny') or ():
+        if _compile(pattern).search(title):
+            return reject('title_deny', f"title matches {pattern!r}")
+
+    words = signals['words']
+    if words < settings['paywall_max_words']:
+        marker = next((m for m in settings.get('paywall_markers') or () if m in text), None)
+        if marker:
+            return reject('paywall', f"'{marker}' in a {words}-word text")
+
+    if words < settings['min_words']:
+        if signals['videos']:
+            return reject('video_only', f"{words} words around {signals['videos']} video(s)")
+        return reject('min_words', f"{words} words (minimum {settings['min_words']})")
+
+    if signals['paragraphs'] < settings['min_paragraphs']:
+        return reject('min_paragraphs', f"{signals['paragraphs']} paragraphs (minimum {settings['min_paragraphs']})")
+
+    expected = settings.get('language')
+    detected = signals['language']
+    if expected and detected and detected != expected:
+        hits = signals['language_hits']
+        if hits[detected] >= settings['language_margin'] * max(hits.get(expected, 0), 1):
+            return reject('language', f"text looks '{detected}', feed is '{expected}'")
+
+    max_distance = settings.get('max_duplicate_distance')
+    if max_distance is not None and duplicate_distance is not None and duplicate_distance <= max_distance:
+        return reject('duplicate', f"distance {duplicate_distance} to a published story (maximum {max_distance})")
+
+    return GateVerdict(None, '', signals)
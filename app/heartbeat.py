@@ -0,0 +1,235 @@
+"""
+Process heartbeat for the dashboard.
+
+The pipeline updates an in-memory snapshot of what it is doing (stage, article,
+cycle start, next run) and a background thread persists it to the single-row
+`process_heartbeat` table every few seconds. The dashboard reads that one row
+instead of scanning the OS process table, and treats a stale row, or a stage that
+has been running for too long, as "stuck".
+"""
+
+import logging
+import os
+import socket
+import sys
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .store import Database
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Stages the pipeline reports; 'idle' and 'sleep' are not subject to the stage timeout
+IDLE = 'idle'
+SLEEP = 'sleep'
+
+# Name of the lease that serialises pipeline cycles (see Database.acquire_lease)
+CYCLE_LEASE = 'pipeline_cycle'
+
+_lock = threading.Lock()
+_state: Dict[str, Any] = {}
+# Leases held by this process, renewed on every beat: {name: (owner, ttl_seconds)}
+_leases: Dict[str, Tuple[str, float]] = {}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).strftime(TIMESTAMP_FORMAT)
+
+
+def _fmt(dt: Optional[datetime]) -> Optional[str]:
+    if dt is None:
+        return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc)
+    return dt.strftime(TIMESTAMP_FORMAT)
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """Parses a heartbeat timestamp (stored as naive UTC) into an aware datetime."""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(str(value)[:19], TIMESTAMP_FORMAT).replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+
+
+def set_stage(stage: str, source_id: Optional[str] = None, article_id: Optional[int] = None,
+              article_url: Optional[str] = None) -> None:
+    """Reports the stage the pipeline is in (e.g. 'fetch', 'rewrite', 'sleep')."""
+    with _lock:
+        _state.update({
+            'stage': stage,
+            'stage_since': _now(),
+            'source_id': source_id,
+            'article_id': article_id,
+            'article_url': article_url,
+        })
+
+
+def cycle_started() -> None:
+    with _lock:
+        _state['cycle_started_at'] = _now()
+    set_stage('feeds')
+
+
+def cycle_finished() -> None:
+    with _lock:
+        _state['cycle_started_at'] = None
+    set_stage(IDLE)
+
+
+def set_next_run(next_run_at: Optional[datetime]) -> None:
+    with _lock:
+        _state['next_run_at'] = _fmt(next_run_at)
+
+
+def snapshot() -> Dict[str, Any]:
+    with _lock:
+        return dict(_state)
+
+
+def lease_owner() -> str:
+    """A lease owner id that is unique per process and per acquisition."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def hold_lease(name: str, owner: str, ttl_seconds: float) -> None:
+    """Asks the writer thread to keep renewing a lease this process acquired."""
+    with _lock:
+        _leases[name] = (owner, ttl_seconds)
+
+
+def drop_lease(name: str) -> None:
+    with _lock:
+        _leases.pop(name, None)
+
+
+class HeartbeatWriter:
+    """Daemon thread that persists the heartbeat snapshot every `interval` seconds."""
+
+    def __init__(self, db_path: str = 'data/app.db', interval: float = 5.0, mode: str = 'scheduler',
+                 on_command: Optional[Callable[[str], None]] = None):
+        """
+        Args:
+            on_command: Called with each control command queued by the dashboard
+                (e.g. 'run_now'). Only the long-running scheduler passes one.
+        """
+        self.db_path = db_path
+        self.interval = interval
+        self.on_command = on_command
+        self.pid = os.getpid()
+        self._identity = {
+            'pid': self.pid,
+            'hostname': socket.gethostname(),
+            'mode': mode,
+            'started_at': _now(),
+        }
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if not _state.get('stage'):
+            set_stage(IDLE)
+        self._thread = threading.Thread(target=self._run, name='heartbeat', daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        # SQLite connections are bound to the thread that created them
+        db = Database(self.db_path)
+        try:
+            while True:
+                self.beat(db)
+                self.renew_leases(db)
+                self.poll_commands(db)
+                if self._stop.wait(self.interval):
+                    break
+            db.clear_heartbeat(self.pid)
+        finally:
+            db.close()
+
+    def beat(self, db: Database) -> None:
+        row = snapshot()
+        row.update(self._identity)
+        row['updated_at'] = _now()
+        db.write_heartbeat(row)
+
+    def renew_leases(self, db: Database) -> None:
+        with _lock:
+            leases = list(_leases.items())
+        for name, (owner, ttl) in leases:
+            if not db.renew_lease(name, owner, ttl):
+                logger.warning(f"Lease '{name}' não pôde ser renovado (expirado ou tomado por outro processo).")
+
+    def poll_commands(self, db: Database) -> None:
+        if not self.on_command:
+            return
+        for command in db.consume_commands():
+            try:
+                self.on_command(command)
+            except Exception as e:
+                logger.error(f"Erro ao executar comando de controle '{command}': {e}", exc_info=True)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stops the thread and removes this process' heartbeat row."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+
+def pid_alive(pid: Optional[int]) -> Optional[bool]:
+    """Whether `pid` exists on this host; None when it cannot be determined."""
+    if not pid:
+        return False
+    if psutil:
+        return psutil.pid_exists(pid)
+    if sys.platform == 'win32':
+        # os.kill(pid, 0) would terminate the process on Windows
+        return None
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def evaluate(row: Optional[Dict[str, Any]], stale_after: float, stage_timeout: float,
+             now: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Turns a heartbeat row into a status for the dashboard.
+
+    Returns a dict with 'status' ('Running', 'Processing', 'Stuck' or 'Stopped'),
+    'reason' and the row itself.
+    """
+    if not row:
+        return {'status': 'Stopped', 'reason': 'Sem heartbeat', 'heartbeat': None}
+    now = now or datetime.now(timezone.utc)
+    same_host = row.get('hostname') == socket.gethostname()
+
+    updated_at = parse_timestamp(row.get('updated_at'))
+    age = (now - updated_at).total_seconds() if updated_at else None
+    if age is None or age > stale_after:
+        if same_host and pid_alive(row.get('pid')) is False:
+            return {'status': 'Stopped', 'reason': 'Processo encerrado sem limpar o heartbeat', 'heartbeat': row}
+        return {'status': 'Stuck', 'reason': f'Heartbeat sem atualização há {int(age or 0)}s', 'heartbeat': row}
+
+    stage = row.get('stage') or IDLE
+    if stage in (IDLE, SLEEP):
+        return {'status': 'Running', 'reason': stage, 'heartbeat': row}
+
+    stage_since = parse_timestamp(row.get('stage_since'))
+    in_stage = (now - stage_since).total_seconds() if stage_since else 0
+    if in_stage > stage_timeout:
+        return {'status': 'Stuck', 'reason': f"Etapa '{stage}' em execução há {int(in_stage)}s", 'heartbeat': row}
+    return {'status': 'Processing', 'reason': stage, 'heartbeat': row}
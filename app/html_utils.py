@@ -5,6 +5,8 @@ from typing import List, Dict, Optional
 from bs4 import BeautifulSoup
 from urllib.parse import urlparse, parse_qs
 
+from .urlnorm import canonical_url
+
 logger = logging.getLogger(__name__)
 
 # =========================
@@ -158,9 +160,7 @@ def hard_filter_forbidden_html(html: str) -> str:
 
 def _norm_key(u: str) -> str:
     """Normaliza URL para comparação/chave de dicionário."""
-    if not u:
-        return ""
-    return (u.strip().rstrip("/")).lower()
+    return canonical_url(u) if u else ""
 
 
 def _replace_in_srcset(srcset: str, mapping: Dict[str, str]) -> str:
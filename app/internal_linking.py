@@ -3,6 +3,7 @@ import re
 from typing import Dict, List, Set, Any
 from bs4 import BeautifulSoup
 from app.config import PILAR_POSTS
+from app.urlnorm import canonical_url
 
 logger = logging.getLogger(__name__)
 
@@ -33,13 +34,14 @@ def add_internal_links(
     other_options = []
 
     current_cat_set = set(current_post_categories or [])
+    pilar_keys = {canonical_url(url) for url in PILAR_POSTS}
 
     for post_data in all_link_options:
         # Skip if the post has no keywords to match
         if not post_data.get('keywords'):
             continue
 
-        is_pilar = post_data['link'] in PILAR_POSTS
+        is_pilar = canonical_url(post_data['link']) in pilar_keys
         shares_category = current_cat_set and not current_cat_set.isdisjoint(post_data.get('categories', []))
 
         if is_pilar:
@@ -74,7 +76,7 @@ def add_internal_links(
                 break
 
             url = link_option['link']
-            if url in used_urls:
+            if canonical_url(url) in used_urls:
                 continue
 
             # Iterate through all keywords for this link option (title, tags)
@@ -88,7 +90,7 @@ def add_internal_links(
                     node.replace_with(BeautifulSoup(new_html, 'html.parser'))
                     
                     links_inserted += 1
-                    used_urls.add(url)
+                    used_urls.add(canonical_url(url))
                     modified_in_node = True # Mark that we modified this node
                     
                     priority = "PILAR" if link_option in pilar_options else "CATEGORY" if link_option in category_options else "OTHER"
@@ -0,0 +1,152 @@
+"""
+Lightweight alternates (AMP/lite) of heavy publisher pages.
+
+The full pages of some publishers are several megabytes of scripts and widgets
+that `_pre_clean_html` then has to tear down. Most of them also publish an AMP
+version of every article. The resolver maps an article URL to that version,
+either from a known per-domain URL template or by reading only the <head> of the
+page and looking for <link rel="amphtml">. A discovered URL is turned into a
+template for its domain, so later articles from the same domain skip the <head>
+request. Domains without an alternate, or whose lite pages keep failing the
+quality check, are left alone for a while.
+"""
+
+import logging
+import re
+import time
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+
+import requests
+
+from .config import LITE_PAGE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+PATH_PLACEHOLDER = '{path}'
+
+_LINK_TAG_RE = re.compile(rb'<link\b[^>]*>', re.IGNORECASE)
+_AMPHTML_REL_RE = re.compile(rb'''\brel\s*=\s*["']?amphtml\b''', re.IGNORECASE)
+_HREF_RE = re.compile(rb'''\bhref\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))''', re.IGNORECASE)
+_HEAD_END = b'</head>'
+
+
+def _host(url: str) -> str:
+    return (urlparse(url).hostname or '').lower().replace('www.', '', 1)
+
+
+def find_amphtml_link(head: bytes, base_url: str) -> Optional[str]:
+    """Absolute URL of the <link rel="amphtml"> in an HTML fragment, if any."""
+    for tag in _LINK_TAG_RE.findall(head):
+        if not _AMPHTML_REL_RE.search(tag):
+            continue
+        match = _HREF_RE.search(tag)
+        if match:
+            href = next(g for g in match.groups() if g is not None).decode('utf-8', 'replace').strip()
+            if href:
+                return urljoin(base_url, href)
+    return None
+
+
+def learn_template(url: str, lite_url: str) -> Optional[str]:
+    """
+    Turns one (article URL, lite URL) pair into a per-domain template, e.g.
+    https://ge.globo.com/google/amp/futebol/x.ghtml -> https://ge.globo.com/google/amp{path}.
+
+    Returns None when the lite URL is not derived from the article path.
+    """
+    path = urlparse(url).path
+    if len(path) <= 1:
+        return None
+    index = lite_url.find(path)
+    if index < 0:
+        return None
+    return lite_url[:index] + PATH_PLACEHOLDER + lite_url[index + len(path):]
+
+
+class LitePageResolver:
+    """Finds the AMP/lite alternate of an article URL and remembers what works per domain."""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = dict(LITE_PAGE_CONFIG)
+        self.config.update(config or {})
+        self.templates: Dict[str, str] = dict(self.config.get('url_templates') or {})
+        self.learned: Dict[str, str] = {}
+        self.failures: Dict[str, int] = {}
+        # Domains not to try again before the given timestamp
+        self.retry_at: Dict[str, float] = {}
+
+    def _domain_key(self, host: str, mapping: Dict[str, Any]) -> Optional[str]:
+        for domain in mapping:
+            if host == domain or host.endswith('.' + domain):
+                return domain
+        return None
+
+    def applies_to(self, url: str) -> bool:
+        """Whether the URL belongs to one of the heavy domains configured by default."""
+        return self._domain_key(_host(url), dict.fromkeys(self.config.get('domains') or [])) is not None
+
+    def _backoff(self, host: str, now: float) -> None:
+        self.retry_at[host] = now + self.config['retry_after_hours'] * 3600.0
+
+    def resolve(self, url: str, session: requests.Session, timeout: float = 10.0,
+                now: Optional[float] = None) -> Tuple[Optional[str], str]:
+        """
+        Returns:
+            (lite_url, how): how is 'template', 'learned' or 'discovered' when a lite
+            URL was found, otherwise 'cooldown' or 'no_alternate'.
+        """
+        now = time.time() if now is None else now
+        host = _host(url)
+        if self.retry_at.get(host, 0) > now:
+            return None, 'cooldown'
+
+        path = urlparse(url).path
+        template_domain = self._domain_key(host, self.templates)
+        if template_domain:
+            return self.templates[template_domain].replace(PATH_PLACEHOLDER, path), 'template'
+        if host in self.learned:
+            return self.learned[host].replace(PATH_PLACEHOLDER, path), 'learned'
+
+        lite_url = self._discover(url, session, timeout)
+        if not lite_url or lite_url == url:
+            self._backoff(host, now)
+            return None, 'no_alternate'
+        template = learn_template(url, lite_url)
+        if template:
+            self.learned[host] = template
+            logger.info(f"Learned lite page template for {host}: {template}")
+        return lite_url, 'discovered'
+
+    def _discover(self, url: str, session: requests.Session, timeout: float) -> Optional[str]:
+        """Downloads the page only up to </head> (capped) and looks for <link rel="amphtml">."""
+        limit = self.config['head_max_bytes']
+        head = b''
+        try:
+            with session.get(url, timeout=timeout, stream=True, allow_redirects=True) as resp:
+                resp.raise_for_status()
+                for chunk in resp.iter_content(chunk_size=16384):
+                    head += chunk
+                    if _HEAD_END in head.lower() or len(head) >= limit:
+                        break
+                base_url = resp.url or url
+        except requests.RequestException as e:
+            logger.debug(f"Lite page discovery failed for {url}: {e}")
+            return None
+        end = head.lower().find(_HEAD_END)
+        return find_amphtml_link(head[:end] if end >= 0 else head, base_url)
+
+    def record_result(self, url: str, ok: bool, now: Optional[float] = None) -> None:
+        """Tracks lite pages that fail to fetch or to pass the quality check, per domain."""
+        host = _host(url)
+        if ok:
+            self.failures.pop(host, None)
+            return
+        self.failures[host] = self.failures.get(host, 0) + 1
+        if self.failures[host] >= self.config['max_failures']:
+            logger.warning(f"Lite pages of {host} failed {self.failures[host]} times in a row; "
+                           f"using full pages for {self.config['retry_after_hours']}h.")
+            self.failures.pop(host, None)
+            # A learned template may have been a one-off; rediscover after the pause
+            self.learned.pop(host, None)
+            self._backoff(host, time.time() if now is None else now)
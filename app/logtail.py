@@ -0,0 +1,125 @@
+"""
+Incremental log tailing for the dashboard.
+
+The tailer remembers the byte offset it has already consumed and, on each
+refresh, reads and parses only the bytes appended since then. The first read
+starts a bounded distance from the end of the file, so the cost of a refresh
+does not depend on how big the log has grown. Rotation/truncation is detected
+via the file identity and size.
+"""
+
+import logging
+import os
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+LOG_LEVELS = {'DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'}
+
+
+def parse_log_line(line: str) -> Optional[Dict[str, str]]:
+    """
+    Parses a line written by either of the app's log formats:
+      '<asctime> - <levelname> - <module> - <message>'  (app.main)
+      '<asctime> - <name> - <levelname> - <message>'    (logging_conf / logging_config)
+    """
+    line = line.strip()
+    if not line or ' - ' not in line:
+        return None
+    parts = line.split(' - ', 3)
+    if len(parts) != 4:
+        return None
+    timestamp, second, third, message = parts
+    if second in LOG_LEVELS:
+        level, logger_name = second, third
+    else:
+        logger_name, level = second, third
+    return {
+        'timestamp': timestamp,
+        'logger': logger_name,
+        'level': level,
+        'message': message,
+    }
+
+
+class LogTailer:
+    """Keeps the last `max_entries` parsed log lines, reading only what was appended."""
+
+    def __init__(self, path: Path, max_entries: int = 200, backfill_bytes: int = 64 * 1024,
+                 max_read_bytes: int = 1024 * 1024):
+        self.path = Path(path)
+        self.backfill_bytes = backfill_bytes
+        self.max_read_bytes = max_read_bytes
+        self._entries: Deque[Tuple[int, Dict[str, str]]] = deque(maxlen=max_entries)
+        self._lock = threading.Lock()
+        self._offset = 0
+        self._identity: Optional[Tuple[int, int]] = None
+        self._partial = b''
+        self._skip_first_line = False
+        self._seq = 0
+
+    def _reset(self, size: int) -> None:
+        # Start close to the end; the first (probably partial) line is dropped below
+        self._offset = max(0, size - self.backfill_bytes)
+        self._partial = b''
+        self._skip_first_line = self._offset > 0
+
+    def refresh(self) -> int:
+        """Reads newly appended lines. Returns how many entries were added."""
+        with self._lock:
+            try:
+                st = os.stat(self.path)
+            except FileNotFoundError:
+                return 0
+            identity = (st.st_dev, st.st_ino)
+            if identity != self._identity or st.st_size < self._offset:
+                self._identity = identity
+                self._reset(st.st_size)
+            elif st.st_size - self._offset > self.max_read_bytes:
+                # Fell too far behind (e.g. a burst of logging); skip ahead instead of reading it all
+                self._reset(st.st_size)
+            if st.st_size == self._offset:
+                return 0
+
+            with open(self.path, 'rb') as f:
+                f.seek(self._offset)
+                chunk = f.read(st.st_size - self._offset)
+            self._offset += len(chunk)
+
+            data = self._partial + chunk
+            lines = data.split(b'\n')
+            self._partial = lines.pop()
+            if getattr(self, '_skip_first_line', False) and lines:
+                lines = lines[1:]
+                self._skip_first_line = False
+
+            added = 0
+            for raw in lines:
+                entry = parse_log_line(raw.decode('utf-8', errors='replace'))
+                if entry:
+                    self._seq += 1
+                    self._entries.append((self._seq, entry))
+                    added += 1
+            return added
+
+    def recent(self, limit: int = 50) -> List[Dict[str, str]]:
+        """Newest-first list of the most recent entries."""
+        self.refresh()
+        with self._lock:
+            items = list(self._entries)[-limit:]
+        return [entry for _, entry in reversed(items)]
+
+    def since(self, seq: int) -> Tuple[int, List[Dict[str, Any]]]:
+        """Entries appended after sequence number `seq` (oldest first) and the new high-water mark."""
+        self.refresh()
+        with self._lock:
+            new = [entry for s, entry in self._entries if s > seq]
+            return self._seq, new
+
+    @property
+    def last_seq(self) -> int:
+        with self._lock:
+            return self._seq
@@ -1,12 +1,17 @@
 import argparse
 import logging
+import signal
 import sys
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from apscheduler.events import EVENT_JOB_ERROR, EVENT_JOB_EXECUTED, EVENT_JOB_MISSED
+from apscheduler.executors.pool import ThreadPoolExecutor
 from apscheduler.schedulers.blocking import BlockingScheduler
 
-from app.pipeline import run_pipeline_cycle
+from app import heartbeat
+from app.pipeline import PipelineContext, run_feed_job, run_pipeline_cycle
+from app.polling import AdaptivePollingPolicy
 from app.store import Database
-from app.config import SCHEDULE_CONFIG
+from app.config import SCHEDULE_CONFIG, DASHBOARD_CONFIG, PIPELINE_ORDER, RSS_FEEDS
 
 # Configura o logging para exibir informações no terminal e salvar em um arquivo
 logging.basicConfig(
@@ -33,6 +38,10 @@ def initialize_database():
         logger.critical(f"Falha ao inicializar o banco de dados: {e}", exc_info=True)
         sys.exit(1)
 
+def _handle_sigterm(signum, frame):
+    """Converte SIGTERM (botão 'parar' do dashboard) em saída limpa, removendo o heartbeat."""
+    raise SystemExit(0)
+
 def main():
     """Função principal para executar o pipeline de conteúdo."""
     parser = argparse.ArgumentParser(description="Executa o pipeline de conteúdo VocMoney.")
@@ -44,6 +53,13 @@ def main():
     args = parser.parse_args()
 
     initialize_database()
+    signal.signal(signal.SIGTERM, _handle_sigterm)
+
+    writer = heartbeat.HeartbeatWriter(
+        interval=DASHBOARD_CONFIG.get('heartbeat_interval_seconds', 5),
+        mode='once' if args.once else 'scheduler',
+    )
+    writer.start()
 
     if args.once:
         logger.info("Executando um único ciclo do pipeline (--once).")
@@ -52,22 +68,85 @@ def main():
         except Exception as e:
             logger.critical(f"Erro crítico durante a execução do ciclo único: {e}", exc_info=True)
         finally:
+            writer.stop()
             logger.info("Ciclo único finalizado.")
     else:
-        # Agenda as execuções futuras
-        interval = SCHEDULE_CONFIG.get('check_interval_minutes', 15)
-        logger.info(f"Agendador iniciado. O pipeline será executado a cada {interval} minutos.")
+        # Um job por feed, com intervalo adaptativo (ver app/polling.py)
+        policy = AdaptivePollingPolicy()
+        scheduler = BlockingScheduler(
+            timezone='UTC',
+            # Um único worker: os feeds são processados em série, como no ciclo completo
+            executors={'default': ThreadPoolExecutor(1)},
+            job_defaults={
+                'coalesce': True,
+                'max_instances': 1,
+                # Com um único worker um feed pode esperar outro terminar; atrasado, mas nunca descartado
+                'misfire_grace_time': None,
+            },
+        )
 
-        scheduler = BlockingScheduler(timezone='UTC')
+        # Clientes (Gemini, WordPress, mapa de links, banco) criados uma vez e reaproveitados por todos os jobs
+        ctx = PipelineContext()
 
-        # Executa o ciclo uma vez imediatamente e depois a cada `interval` minutos.
-        scheduler.add_job(run_pipeline_cycle, 'interval', minutes=interval, next_run_time=datetime.now(timezone.utc))
+        def _run_feed(source_id):
+            interval = run_feed_job(source_id, policy, ctx)
+            if interval:
+                scheduler.reschedule_job(
+                    f"feed:{source_id}", trigger='interval',
+                    seconds=interval, jitter=policy.jitter_seconds(interval)
+                )
+
+        db = Database()
+        now = datetime.now(timezone.utc)
+        stagger = SCHEDULE_CONFIG.get('per_feed_delay_seconds', 15)
+        for i, source_id in enumerate(PIPELINE_ORDER):
+            feed_config = RSS_FEEDS.get(source_id)
+            if not feed_config:
+                logger.warning(f"Feed '{source_id}' sem configuração; não será agendado.")
+                continue
+            interval = db.get_feed_poll_state(source_id).get('interval_seconds') or policy.initial_interval(feed_config)
+            # O primeiro poll de cada feed é escalonado para não dispararem todos juntos
+            scheduler.add_job(
+                _run_feed, 'interval', args=[source_id], id=f"feed:{source_id}",
+                seconds=interval, jitter=policy.jitter_seconds(interval),
+                next_run_time=now + timedelta(seconds=i * stagger),
+            )
+            logger.info(f"Feed '{source_id}' agendado a cada {interval / 60:.1f} min (adaptativo).")
+        db.close()
+        logger.info(f"Agendador iniciado com {len(scheduler.get_jobs())} feeds.")
+
+        # Mantém o próximo horário de execução no heartbeat
+        def _update_next_run(event=None):
+            next_runs = [job.next_run_time for job in scheduler.get_jobs() if job.next_run_time]
+            heartbeat.set_next_run(min(next_runs) if next_runs else None)
+
+        scheduler.add_listener(_update_next_run, EVENT_JOB_EXECUTED | EVENT_JOB_ERROR | EVENT_JOB_MISSED)
+        _update_next_run()
+
+        # Comandos do dashboard: "executar agora" antecipa todos os feeds neste mesmo processo
+        def _handle_command(command):
+            if command == 'run_now':
+                logger.info("Execução imediata solicitada pelo dashboard.")
+                run_at = datetime.now(timezone.utc)
+                for job in scheduler.get_jobs():
+                    scheduler.modify_job(job.id, next_run_time=run_at)
+                heartbeat.set_next_run(run_at)
+            else:
+                logger.warning(f"Comando de controle desconhecido: {command}")
+
+        writer.on_command = _handle_command
 
         logger.info("Pressione Ctrl+C para sair.")
         try:
             scheduler.start()
         except (KeyboardInterrupt, SystemExit):
             logger.info("Agendador interrompido pelo usuário.")
+        finally:
+            if scheduler.running:
+                # Espera o job em andamento terminar antes de fechar o contexto que ele usa
+                scheduler.shutdown(wait=True)
+            ctx.close()
+            writer.stop()
 
 if __name__ == "__main__":
     main()
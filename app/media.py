@@ -1,230 +1,458 @@
 """
-Media handling module for images and videos
+Media candidates of a page, collected in one walk.
+
+`collect_media()` traverses the tree once and records everything the
+extractor needs about media: the sized <img> of the first <article> (the
+featured-image fallback after og:image and JSON-LD, which come from the
+page's `DocumentMetadata`), body image
+candidates (img attributes and srcsets, <picture> sources, lazy-load data-*
+attributes, inline background images, figure images, <noscript> fallbacks),
+YouTube iframes and blocks, twitter embeds and the `data-img-url` divs that
+become figures. Every candidate keeps its position in document order.
+
+Before, each of these was its own selector pass over the article (five for
+body images alone, each <noscript> re-parsed with a new BeautifulSoup), and
+the featured image, video and figure helpers walked the tree again.
+<noscript> bodies are now parsed only when body images are asked for, and
+only if they contain an <img>. The URL filters below are precompiled into a
+few regexes and memoised per URL.
 """
 
 import logging
-import os
-import hashlib
-from typing import Optional, Dict, Any
-from urllib.parse import urlparse, urljoin
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qs, urljoin, urlparse
 
-import requests
-from PIL import Image
-import io
+from bs4 import BeautifulSoup, Tag
 
-from . import wordpress
+from .doc_metadata import DocumentMetadata
 
 logger = logging.getLogger(__name__)
 
+BAD_IMAGE_KEYWORDS = {
+    'author', 'autor', 'avatar', 'byline', 'perfil', 'profile',
+    'placeholder', 'logo', 'logomarca', 'brand', 'marca',
+    'icon', 'favicon', 'sprite', 'comment', 'user', 'usuario', 'usuário'
+}
+
+BAD_IMAGE_DOMAINS = {
+    'gravatar.com', 'twimg.com', 'facebook.com', 'fbcdn.net',
+    'gstatic.com', 'googleusercontent.com',
+    # Adicionados conforme sugestão para bloquear trackers e placeholders
+    "schema.org", "scorecardresearch.com", "doubleclick.net",
+    "quantserve.com", "chartbeat.com", "google-analytics.com"
+}
+
+JUNK_IMAGE_PATTERNS = (
+    "placeholder", "sprite", "icon", "emoji", ".svg",
+    # From user suggestion to filter out non-content images
+    "cta", "read-more", "share", "logo", "banner"
+)
+
+# aceita query ?width=1200&height=630 e sufixos -1200x630.jpg
+DIM_SUFFIX_RE = re.compile(r'-(\d{2,5})x(\d{2,5})(?=\.[a-z]{3,4})(?:\?.*)?$', re.IGNORECASE)
+
+YOUTUBE_DOMAINS = (
+    "youtube.com", "www.youtube.com", "m.youtube.com",
+    "youtu.be", "www.youtu.be",
+)
+
+_YT_RE = re.compile(r"(?:youtube\.com/(?:embed/|shorts/|v/)|youtu\.be/)([A-Za-z0-9_-]{11})")
+_YT_THUMB_RE = re.compile(r"/([A-Za-z0-9_-]{11})/hqdefault")
+
+PRIORITY_CDN_DOMAINS = (
+    "static1.srcdn.com",              # ScreenRant
+    "static1.colliderimages.com",     # Collider
+    "static1.cbrimages.com",          # CBR
+    "static1.moviewebimages.com",     # MovieWeb
+    "static0.gamerantimages.com", "static1.gamerantimages.com",
+    "static2.gamerantimages.com", "static3.gamerantimages.com",  # GameRant
+    "static1.thegamerimages.com",     # TheGamer
+)
+
+# The keyword, domain and filename lists, each compiled into one alternation
+_BAD_KEYWORD_RE = re.compile('|'.join(re.escape(k) for k in sorted(BAD_IMAGE_KEYWORDS)))
+_BAD_DOMAIN_RE = re.compile('(?:' + '|'.join(re.escape(d) for d in sorted(BAD_IMAGE_DOMAINS)) + ')$')
+_JUNK_FILENAME_RE = re.compile('|'.join(re.escape(p) for p in JUNK_IMAGE_PATTERNS))
+_STYLE_URL_RE = re.compile(r"url\((.*?)\)")
+
+# Attributes holding the real URL of a lazy-loaded <img>, in order of preference
+IMG_SRC_ATTRS = ("src", "data-src", "data-original", "data-lazy-src", "data-image", "data-img-url")
+# Lazy-load attributes of any element
+DATA_IMAGE_ATTRS = ("data-img-url", "data-image", "data-src", "data-original")
+
+
+def _guess_dimensions_from_url(url: str) -> Tuple[Optional[int], Optional[int]]:
+    try:
+        p = urlparse(url)
+        q = parse_qs(p.query or '')
+        w = q.get('width') or q.get('w')
+        h = q.get('height') or q.get('h')
+        if w and h:
+            return int(w[0]), int(h[0])
+        m = DIM_SUFFIX_RE.search(p.path)
+        if m:
+            return int(m.group(1)), int(m.group(2))
+    except Exception:
+        pass
+    return None, None
+
+
+def _is_bad_domain(url: str) -> bool:
+    try:
+        return _BAD_DOMAIN_RE.search(urlparse(url).hostname or '') is not None
+    except Exception:
+        return False
+
 
-class MediaHandler:
-    """Handle media files (images/videos) according to pipeline configuration"""
-    
-    def __init__(self, pipeline_config: Dict[str, Any], wp_client: 'wordpress.WordPressClient'):
-        self.config = pipeline_config
-        self.wp_client = wp_client
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
-    
-    def _validate_image_url(self, url: str) -> bool:
-        """Validate if URL points to a valid image"""
-        if not url:
-            return False
-        
-        # Check file extension
-        parsed = urlparse(url)
-        path = parsed.path.lower()
-        valid_extensions = ('.jpg', '.jpeg', '.png', '.gif', '.webp')
-        
-        if not any(path.endswith(ext) for ext in valid_extensions):
-            return False
-        
-        # Skip very small images (likely icons/ads)
-        if any(size in url.lower() for size in ['16x16', '32x32', '64x64', 'icon', 'favicon']):
-            return False
-        
+def _parse_srcset(srcset: str):
+    """Retorna a URL com maior largura declarada em um srcset."""
+    best = None
+    best_w = -1
+    for part in (srcset or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        tokens = part.split()
+        url = tokens[0]
+        w = 0
+        if len(tokens) > 1 and tokens[1].endswith("w"):
+            try:
+                w = int(tokens[1][:-1])
+            except Exception:
+                w = 0
+        if w >= best_w:
+            best_w = w
+            best = url
+    return best
+
+
+def _has_bad_keyword(url: str) -> bool:
+    return _BAD_KEYWORD_RE.search(url.lower()) is not None
+
+
+def _is_junk_filename(url: str) -> bool:
+    """Checks if the image filename suggests it's a non-content image."""
+    try:
+        name = urlparse(url).path.rsplit("/", 1)[-1].lower()
+        return _JUNK_FILENAME_RE.search(name) is not None
+    except Exception:
+        return False  # Fail safe
+
+
+def _passes_min_size(url: str, min_w: int = 600, min_h: int = 315) -> bool:
+    w, h = _guess_dimensions_from_url(url)
+    if w is None or h is None:
+        # Sem dimensão explícita: aceita provisoriamente (muitos sites não expõem)
         return True
-    
-    def _head_is_image(self, url: str, timeout: int = 8) -> bool:
+    if w < min_w or h < min_h:
+        return False
+    # evita quase-quadradas/estranhas como avatar 150x150
+    ar = w / h if h else 0
+    return 0.6 <= ar <= 2.2
+
+
+@lru_cache(maxsize=8192)
+def is_valid_article_image(url: str) -> bool:
+    if not url or url.startswith('data:'):
+        return False
+    if _is_bad_domain(url):
+        return False
+    if _has_bad_keyword(url):
+        return False
+    if _is_junk_filename(url):
+        return False
+    if not _passes_min_size(url):
+        return False
+    return True
+
+
+def pick_featured_image(candidates: list[str]) -> Optional[str]:
+    """Retorna a primeira imagem que passa no filtro."""
+    for u in candidates:
+        if is_valid_article_image(u):
+            return u
+    return None
+
+
+def _abs(u: str, base: str) -> Optional[str]:
+    if not u:
+        return None
+    u = u.strip()
+    if not u or u.startswith("data:"):
+        return None
+    return urljoin(base, u)
+
+
+def _extract_from_style(style_attr: str) -> Optional[str]:
+    if not style_attr:
+        return None
+    m = _STYLE_URL_RE.search(style_attr)
+    if not m:
+        return None
+    url = m.group(1).strip()
+    if url.startswith("'") and url.endswith("'"):
+        return url[1:-1]
+    if url.startswith('"') and url.endswith('"'):
+        return url[1:-1]
+    return url
+
+
+def youtube_id(url: str, og_image: Optional[str] = None) -> Optional[str]:
+    """
+    Extracts a YouTube video ID from an embed, shorts, youtu.be or watch URL.
+    `og_image` (the page's og:image) is the fallback: its thumbnail path
+    often ends with .../<ID>/hqdefault.jpg.
+    """
+    if not url:
+        return None
+    m = _YT_RE.search(url)
+    if m:
+        return m.group(1)
+    try:
+        pu = urlparse(url)
+        if "youtube.com" in pu.netloc and pu.path == "/watch":
+            q = parse_qs(pu.query)
+            if "v" in q and len(q["v"][0]) == 11:
+                return q["v"][0]
+    except Exception:
+        pass
+    if og_image:
+        mm = _YT_THUMB_RE.search(og_image)
+        if mm:
+            return mm.group(1)
+    return None
+
+
+class MediaItem(NamedTuple):
+    """A media candidate: what it is, the raw URL or ID, and its position in document order."""
+    kind: str
+    value: str
+    position: int
+
+
+class PageMedia:
+    """What `collect_media()` found in one walk; the derived views are computed on demand."""
+
+    def __init__(self, base_url: str, soup: Tag, metadata: Optional[DocumentMetadata] = None):
+        self.base_url = base_url
+        self._soup = soup
+        self._metadata = metadata
+        # (src, width, height) of every <img> in the first <article>
+        self.article_images: List[Tuple[str, str, str]] = []
+        # Body image candidates under the article root: img, srcset, source, data, background, figure
+        self.images: List[MediaItem] = []
+        self.noscripts: List[Tuple[int, str]] = []
+        # iframe srcs and YouTube blocks (`.youtube[id]`, `[data-youtube-id]`), resolved in `videos()`
+        self.iframes: List[MediaItem] = []
+        self.youtube_blocks: List[MediaItem] = []
+        self.twitter_embeds: List[Tag] = []
+        self.data_img_divs: List[Tag] = []
+
+    @property
+    def metadata(self) -> DocumentMetadata:
+        if self._metadata is None:
+            self._metadata = DocumentMetadata.from_soup(self._soup)
+        return self._metadata
+
+    def image_candidates(self) -> List[MediaItem]:
+        """Body image candidates, <noscript> fallbacks included, in document order."""
+        items = list(self.images)
+        for position, markup in self.noscripts:
+            if '<img' not in markup:
+                continue
+            try:
+                inner = BeautifulSoup(markup, "html.parser")
+            except Exception:
+                continue
+            for img in inner.find_all("img"):
+                src = img.get("src") or img.get("data-src") or img.get("data-original")
+                if src:
+                    items.append(MediaItem('noscript', src, position))
+        items.sort(key=lambda item: item.position)
+        return items
+
+    def body_images(self) -> List[str]:
+        """Valid absolute image URLs of the article body, known CDNs first (see `collect_images_from_article`)."""
+        dedup: Dict[str, int] = {}
+        for item in self.image_candidates():
+            abs_u = _abs(item.value, self.base_url)
+            if not abs_u or not is_valid_article_image(abs_u):
+                continue
+            u = abs_u.rstrip("/")
+            pref = 0 if urlparse(u).netloc in PRIORITY_CDN_DOMAINS else 1
+            dedup[u] = min(dedup.get(u, pref), pref)
+        ordered = sorted(dedup.items(), key=lambda kv: (kv[1], kv[0]))
+        return [u for u, _ in ordered]
+
+    def youtube_ids(self) -> List[str]:
+        og_image = self.metadata.og('image') if self.iframes else None
+        ids = [youtube_id(item.value, og_image) for item in self.iframes]
+        ids += [item.value for item in self.youtube_blocks]
+        seen, ordered = set(), []
+        for v in ids:
+            if v and v not in seen:
+                seen.add(v)
+                ordered.append(v)
+        return ordered
+
+    def videos(self) -> List[Dict[str, str]]:
+        ordered = self.youtube_ids()
+        if ordered:
+            logger.info(f"Found {len(ordered)} unique YouTube videos.")
+        return [{"id": v, "embed_url": f"https://www.youtube.com/embed/{v}",
+                 "watch_url": f"https://www.youtube.com/watch?v={v}"} for v in ordered]
+
+    def featured_image(self) -> Optional[str]:
         """
-        Performs a HEAD request to check if the URL points to a real image
-        and meets minimum size requirements.
+        Encontra a melhor imagem destacada de um artigo seguindo uma ordem de prioridade.
+        1. Metatag Open Graph (og:image) - Mais confiável.
+        2. Dados Estruturados JSON-LD - Muito confiável.
+        3. Maior imagem dentro da tag <article> - Bom fallback.
         """
-        if not url:
-            return False
-        try:
-            # Use the class's session for consistent headers
-            response = self.session.head(url, allow_redirects=True, timeout=timeout)
-            response.raise_for_status()  # Will raise for 4xx/5xx responses
-            
-            content_type = response.headers.get('Content-Type', '')
-            content_length = int(response.headers.get('Content-Length', '0') or 0)
-            
-            if content_type.startswith('image/') and content_length > 5 * 1024:  # 5KB
-                logger.debug(f"HEAD check passed for {url} (Type: {content_type}, Size: {content_length})")
-                return True
-            else:
-                logger.warning(f"HEAD check failed for {url}. Content-Type: '{content_type}', Size: {content_length} bytes.")
-                return False
-        except requests.exceptions.RequestException as e:
-            logger.warning(f"HEAD request for image failed: {url} ({e})")
-            return False
-        except Exception as e:
-            logger.error(f"Unexpected error during image HEAD check for {url}: {e}", exc_info=True)
-            return False
-
-    def _download_image(self, url: str) -> Optional[bytes]:
-        """Download image from URL"""
-        try:
-            logger.debug(f"Downloading image: {url}")
-            
-            response = self.session.get(url, timeout=15, stream=True)
-            response.raise_for_status()
-            
-            # Check content type
-            content_type = response.headers.get('content-type', '')
-            if not content_type.startswith('image/'):
-                logger.warning(f"URL does not return image content: {url}")
-                return None
-            
-            # Download with size limit (10MB)
-            max_size = 10 * 1024 * 1024
-            content = b''
-            
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
-                    content += chunk
-                    if len(content) > max_size:
-                        logger.warning(f"Image too large, skipping: {url}")
-                        return None
-            
-            return content
-            
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Error downloading image {url}: {str(e)}")
-            return None
-    
-    def _validate_image_content(self, image_data: bytes) -> bool:
-        """Validate downloaded image content"""
-        try:
-            with Image.open(io.BytesIO(image_data)) as img:
-                # Check minimum dimensions
-                width, height = img.size
-                if width < 100 or height < 100:
-                    logger.debug("Image too small, skipping")
-                    return False
-                
-                # Check if it's a reasonable image
-                if width > 5000 or height > 5000:
-                    logger.debug("Image too large, skipping")
-                    return False
-                
-                return True
-                
-        except Exception as e:
-            logger.error(f"Error validating image: {str(e)}")
-            return False
-    
-    def _upload_to_wordpress(self, image_data: bytes, filename: str) -> Optional[int]:
-        """Upload image to WordPress media library"""
-        try:
-            # Generate filename if not provided
-            if not filename:
-                filename = f"image_{hashlib.md5(image_data).hexdigest()[:8]}.jpg"
-            
-            # Clean filename
-            filename = os.path.basename(filename)
-            if not filename.lower().endswith(('.jpg', '.jpeg', '.png', '.gif', '.webp')):
-                filename += '.jpg'
-            
-            media_id = self.wp_client.upload_media(image_data, filename)
-            if media_id:
-                logger.info(f"Successfully uploaded image to WordPress: {filename} (ID: {media_id})")
-                return media_id
-            
-        except Exception as e:
-            logger.error(f"Error uploading image to WordPress: {str(e)}")
-        
+        # --- Prioridade 1: Metatag Open Graph (og:image) ---
+        og_image = self.metadata.og('image')
+        if og_image:
+            logger.info("✅ Imagem encontrada com sucesso via Open Graph (og:image).")
+            return urljoin(self.base_url, og_image)
+
+        # --- Prioridade 2: Dados Estruturados (JSON-LD) ---
+        data = self.metadata.first_json_ld()
+        if data:
+            try:
+                # O JSON-LD pode ser uma lista (com @graph) ou um objeto.
+                if isinstance(data, list):
+                    data = data[0]
+                image_data = data.get('image')
+                if image_data:
+                    # A imagem pode ser uma lista, um objeto ou uma string.
+                    image_url = None
+                    if isinstance(image_data, list):
+                        image_data = image_data[0]
+                    if isinstance(image_data, dict) and image_data.get('url'):
+                        image_url = image_data['url']
+                    elif isinstance(image_data, str):
+                        image_url = image_data
+                    if image_url:
+                        logger.info("✅ Imagem encontrada com sucesso via JSON-LD.")
+                        return urljoin(self.base_url, image_url)
+            except (KeyError, TypeError, IndexError, AttributeError):
+                # Ignora erros se o JSON-LD estiver mal formatado ou não tiver a imagem.
+                pass
+
+        # --- Prioridade 3: Maior imagem dentro da tag <article> (Fallback) ---
+        max_area = 0
+        best_image_url = None
+        for src, width_str, height_str in self.article_images:
+            # Garante que width e height são numéricos antes de converter
+            if width_str.isdigit() and height_str.isdigit():
+                area = int(width_str) * int(height_str)
+                if area > max_area:
+                    max_area = area
+                    best_image_url = src
+        if best_image_url:
+            logger.warning("⚠️ Imagem encontrada via método de fallback (maior imagem no artigo).")
+            return urljoin(self.base_url, best_image_url)
+
+        logger.warning(f"❌ Nenhuma imagem destacada confiável foi encontrada para {self.base_url}.")
         return None
-    
-    def handle_main_image(self, image_url: str) -> Optional[int]:
-        """Handle main/featured image according to configuration"""
-        if not image_url or not self._validate_image_url(image_url):
-            return None
-        
-        images_mode = self.config.get('images_mode', 'hotlink')
-        
-        if images_mode == 'hotlink':
-            logger.debug("Using hotlink mode for main image. No upload needed.")
-            return None  # WordPress will use the URL directly
-        
-        elif images_mode == 'download_upload':
-            # Perform HEAD check before attempting to download and upload
-            if not self._head_is_image(image_url):
-                logger.info(f"Featured image candidate failed HEAD check, skipping upload: {image_url}")
-                return None
-
-            logger.info(f"Downloading and uploading main image: {image_url}")
-            
-            # Download image
-            image_data = self._download_image(image_url)
-            if not image_data:
-                return None
-            
-            # Validate content
-            if not self._validate_image_content(image_data):
-                return None
-            
-            # Generate filename from URL
-            parsed_url = urlparse(image_url)
-            filename = os.path.basename(parsed_url.path)
-            
-            # Upload to WordPress
-            return self._upload_to_wordpress(image_data, filename)
-        
-        else:
-            logger.warning(f"Unknown images_mode: {images_mode}")
-            return None
-    
-    def process_content_images(self, content: str) -> str:
-        """Process images in content according to configuration"""
-        images_mode = self.config.get('images_mode', 'hotlink')
-        
-        if images_mode == 'hotlink':
-            return content  # No processing needed
-        
-        elif images_mode == 'download_upload':
-            # For now, keep original URLs in content
-            # Advanced implementation would replace img src URLs with WordPress media URLs
-            return content
-        
-        return content
-    
-    def get_attribution_text(self, source_url: str) -> str:
-        """Generate attribution text for source"""
-        attribution_policy = self.config.get('attribution_policy', 'Via {domain}')
-        
-        try:
-            parsed = urlparse(source_url)
-            domain = parsed.netloc
-            
-            # Clean domain (remove www.)
-            if domain.startswith('www.'):
-                domain = domain[4:]
-            
-            return attribution_policy.format(domain=domain)
-            
-        except Exception:
-            return f"Via {source_url}"
-    
-    def add_attribution(self, content: str, source_url: str) -> str:
-        """Add attribution to content"""
-        attribution = self.get_attribution_text(source_url)
-        
-        # Add attribution at the end of content
-        if content and attribution:
-            content = f"{content}\n\n<p><em>{attribution}</em></p>"
-        
-        return content
+
+
+def _attr_str(value: Any) -> str:
+    return ' '.join(value) if isinstance(value, list) else (value or '')
+
+
+def collect_media(soup: Tag, base_url: str = '', root: Optional[Tag] = None,
+                  metadata: Optional[DocumentMetadata] = None) -> PageMedia:
+    """
+    Walks `soup` once and returns its media candidates.
+
+    Args:
+        soup: Page (or fragment) to scan; the first <article>, videos and
+            twitter embeds are taken from all of it.
+        base_url: URL the relative candidates resolve against.
+        root: Article body (see `_find_article_body`); body images and
+            `data-img-url` divs are only collected under it. None skips them.
+        metadata: The page's `DocumentMetadata`, if already built; otherwise it
+            is built from `soup` the first time it is needed.
+    """
+    media = PageMedia(base_url, soup, metadata)
+    article: Optional[Tag] = None
+    position = 0
+    # (node, inside root, inside the first <article>, inside <picture>, figures still waiting for an <img>)
+    stack: List[Tuple[Tag, bool, bool, bool, Tuple[list, ...]]] = [
+        (child, root is soup, False, False, ()) for child in reversed(soup.contents) if isinstance(child, Tag)
+    ]
+    while stack:
+        el, in_root, in_article, in_picture, figures = stack.pop()
+        position += 1
+        name = el.name
+        attrs = el.attrs
+        if el is root:
+            in_root = True
+        if name == 'article' and article is None:
+            article = el
+            in_article = True
+
+        if name == 'iframe':
+            media.iframes.append(MediaItem('iframe', attrs.get('src', ''), position))
+        elif name == 'blockquote' and 'twitter-tweet' in (attrs.get('class') or ()):
+            media.twitter_embeds.append(el)
+
+        if attrs:
+            classes = attrs.get('class') or ()
+            if 'data-youtube-id' in attrs or ('id' in attrs and ('w-youtube' in classes or 'youtube' in classes)):
+                vid = attrs.get('id') or attrs.get('data-youtube-id')
+                if vid:
+                    media.youtube_blocks.append(MediaItem('youtube', vid, position))
+
+        if name == 'img':
+            if in_article:
+                article_src = attrs.get('src') or attrs.get('data-src')
+                if article_src:
+                    media.article_images.append((article_src, attrs.get('width', '0'), attrs.get('height', '0')))
+            if in_root:
+                # The first <img> of each open <figure>
+                for waiting in figures:
+                    if not waiting:
+                        waiting.append(el)
+                        figure_src = attrs.get('src') or (_parse_srcset(attrs['srcset']) if attrs.get('srcset') else None)
+                        if figure_src:
+                            media.images.append(MediaItem('figure', figure_src, position))
+                if attrs.get('aria-hidden') != 'true':
+                    cand = next((attrs[a] for a in IMG_SRC_ATTRS if attrs.get(a)), None)
+                    if cand:
+                        media.images.append(MediaItem('img', cand, position))
+                    elif attrs.get('srcset'):
+                        srcset_best = _parse_srcset(attrs['srcset'])
+                        if srcset_best:
+                            media.images.append(MediaItem('srcset', srcset_best, position))
+
+        if in_root and attrs:
+            if name == 'source' and in_picture and 'srcset' in attrs:
+                source_best = _parse_srcset(_attr_str(attrs.get('srcset')))
+                if source_best:
+                    media.images.append(MediaItem('source', source_best, position))
+            if any(a in attrs for a in DATA_IMAGE_ATTRS):
+                cand = next((attrs[a] for a in DATA_IMAGE_ATTRS if attrs.get(a)), None)
+                if cand:
+                    media.images.append(MediaItem('data', cand, position))
+                if name == 'div' and 'data-img-url' in attrs:
+                    media.data_img_divs.append(el)
+            style = attrs.get('style')
+            if style and 'background-image' in style:
+                background = _extract_from_style(style)
+                if background:
+                    media.images.append(MediaItem('background', background, position))
+        if in_root and name == 'noscript':
+            markup = el.string
+            if markup:
+                media.noscripts.append((position, markup))
+
+        children = [child for child in el.contents if isinstance(child, Tag)]
+        if children:
+            child_figures = figures + ([],) if (in_root and name == 'figure') else figures
+            child_picture = in_picture or name == 'picture'
+            stack.extend((child, in_root, in_article, child_picture, child_figures) for child in reversed(children))
+    return media
@@ -0,0 +1,308 @@
+"""
+Latency and throughput metrics with incremental hourly rollups.
+
+Samples are recorded in memory (no I/O on the hot path) and periodically
+flushed to SQLite, where they are folded into fixed log-scaled histogram bins
+per (metric, label, hour). Percentiles are computed from the bins, so reading
+the performance panel costs the same no matter how much history exists.
+"""
+
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# --- Metric names used across the pipeline ---
+STAGE_FETCH = 'stage.fetch'
+STAGE_EXTRACT = 'stage.extract'
+STAGE_REWRITE = 'stage.rewrite'
+STAGE_PUBLISH = 'stage.publish'
+STAGE_ARTICLE = 'stage.article'
+GEMINI_LATENCY = 'gemini.latency'
+WORDPRESS_LATENCY = 'wordpress.latency'
+PUBLISH_LAG = 'feed.publish_lag'
+ARTICLES_PUBLISHED = 'articles.published'
+# Parsed Gemini answers, labelled 'clean', 'filled', 'repaired' or 'rejected' (see app/ai_response.py)
+AI_RESPONSE = 'ai.response'
+# Per-host HTTP counters (see app/transport.py), labelled by host name.
+# HTTP_BYTES samples are byte counts, not milliseconds: its sum is the bytes read.
+HTTP_LATENCY = 'http.latency'
+HTTP_BYTES = 'http.bytes'
+HTTP_ERRORS = 'http.errors'
+
+# Per-feed decision counters, labelled '<source_id>:<outcome>' (see `decision`)
+EXTRACT_PATH = 'decision.extract_path'
+LITE_PAGE = 'decision.lite_page'
+DUPLICATE = 'decision.duplicate'
+# 'passed', 'rejected:<rule>' (a Gemini call avoided), 'shadow:<rule>' or 'released' (see app/gating.py)
+GATE = 'decision.gate'
+
+STAGE_METRICS = (STAGE_FETCH, STAGE_EXTRACT, STAGE_REWRITE, STAGE_PUBLISH, STAGE_ARTICLE)
+DECISION_METRICS = (EXTRACT_PATH, LITE_PAGE, DUPLICATE, GATE)
+
+# Upper bounds (ms) of the histogram bins: ~1.5x apart, from 5ms up to 2 days.
+# The last bin is open-ended.
+BIN_BOUNDS_MS: List[float] = []
+_b = 5.0
+while _b < 2 * 24 * 3600 * 1000:
+    BIN_BOUNDS_MS.append(round(_b, 1))
+    _b *= 1.5
+del _b
+
+PERCENTILES = (0.50, 0.95, 0.99)
+
+
+def bin_index(value_ms: float) -> int:
+    """Returns the histogram bin for a value in milliseconds."""
+    return bisect.bisect_left(BIN_BOUNDS_MS, max(0.0, value_ms))
+
+
+def bin_range(index: int) -> Tuple[float, float]:
+    """Returns the (lower, upper) bounds in ms of a histogram bin."""
+    lower = BIN_BOUNDS_MS[index - 1] if index > 0 else 0.0
+    if index < len(BIN_BOUNDS_MS):
+        return lower, BIN_BOUNDS_MS[index]
+    return lower, lower * 1.5
+
+
+def hour_bucket(ts: datetime) -> str:
+    """Formats a (naive UTC) datetime as the start of its hourly rollup bucket."""
+    return ts.strftime('%Y-%m-%d %H:00:00')
+
+
+def percentiles_from_bins(bins: Dict[int, int], quantiles: Iterable[float] = PERCENTILES) -> Dict[str, Optional[float]]:
+    """
+    Estimates percentiles from histogram bin counts, interpolating linearly
+    inside the bin that contains the requested rank.
+    """
+    total = sum(bins.values())
+    result: Dict[str, Optional[float]] = {}
+    ordered = sorted(bins.items())
+    for q in quantiles:
+        key = f"p{int(round(q * 100))}"
+        if not total:
+            result[key] = None
+            continue
+        rank = q * total
+        seen = 0
+        for index, count in ordered:
+            if count <= 0:
+                continue
+            if seen + count >= rank:
+                lower, upper = bin_range(index)
+                fraction = (rank - seen) / count
+                result[key] = round(lower + (upper - lower) * fraction, 1)
+                break
+            seen += count
+        else:
+            result[key] = round(bin_range(ordered[-1][0])[1], 1)
+    return result
+
+
+class MetricsBuffer:
+    """Thread-safe in-memory buffer of raw samples waiting to be flushed."""
+
+    def __init__(self, max_samples: int = 10000):
+        self._lock = threading.Lock()
+        self._samples: List[Tuple[str, str, float, datetime]] = []
+        self.max_samples = max_samples
+        self.dropped = 0
+
+    def add(self, metric: str, value_ms: float, label: str = '') -> None:
+        with self._lock:
+            if len(self._samples) >= self.max_samples:
+                self.dropped += 1
+                return
+            self._samples.append((metric, label or '', float(value_ms), datetime.utcnow()))
+
+    def drain(self) -> List[Tuple[str, str, float, datetime]]:
+        with self._lock:
+            samples, self._samples = self._samples, []
+        return samples
+
+
+_buffer = MetricsBuffer()
+
+
+def record(metric: str, value_ms: float, label: str = '') -> None:
+    """Records a single sample (in milliseconds). Never touches the disk."""
+    _buffer.add(metric, value_ms, label)
+
+
+def incr(metric: str, label: str = '') -> None:
+    """Records an event occurrence; only the count of these samples is meaningful."""
+    _buffer.add(metric, 0.0, label)
+
+
+def decision(metric: str, source_id: str, outcome: str) -> None:
+    """Counts a per-feed decision (e.g. which extraction path an article took)."""
+    incr(metric, f"{source_id}:{outcome}")
+
+
+@contextmanager
+def timed(metric: str, label: str = ''):
+    """Context manager that records the elapsed wall time of its block."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(metric, (time.perf_counter() - start) * 1000.0, label)
+
+
+def aggregate_samples(samples: List[Tuple[str, str, float, datetime]]) -> Tuple[Dict, Dict]:
+    """
+    Folds raw samples into rollup deltas.
+
+    Returns:
+        (totals, histogram) where totals maps (metric, label, bucket) to
+        [count, sum_ms, max_ms] and histogram maps (metric, label, bucket, bin) to a count.
+    """
+    totals: Dict[Tuple[str, str, str], List[float]] = {}
+    histogram: Dict[Tuple[str, str, str, int], int] = {}
+    for metric, label, value, ts in samples:
+        bucket = hour_bucket(ts)
+        t = totals.setdefault((metric, label, bucket), [0, 0.0, 0.0])
+        t[0] += 1
+        t[1] += value
+        t[2] = max(t[2], value)
+        hkey = (metric, label, bucket, bin_index(value))
+        histogram[hkey] = histogram.get(hkey, 0) + 1
+    return totals, histogram
+
+
+def flush(db) -> int:
+    """
+    Flushes buffered samples into the database rollups.
+
+    Args:
+        db: A `Database` instance.
+
+    Returns:
+        The number of samples written.
+    """
+    samples = _buffer.drain()
+    if not samples:
+        return 0
+    totals, histogram = aggregate_samples(samples)
+    if not db.add_metric_rollups(totals, histogram):
+        logger.warning(f"Dropped {len(samples)} metric samples after a failed flush.")
+        return 0
+    return len(samples)
+
+
+def load_performance(conn, hours: int = 24) -> Dict[str, Any]:
+    """
+    Builds the performance panel data from the rollup tables.
+
+    Args:
+        conn: An open sqlite3 connection to the application database.
+        hours: Size of the look-back window.
+
+    Returns:
+        A JSON-serialisable dict with per-stage percentiles, throughput,
+        publication lag per feed, Gemini latency per key and WordPress latency.
+    """
+    since = hour_bucket(datetime.utcnow() - timedelta(hours=hours - 1))
+    cursor = conn.cursor()
+
+    cursor.execute(
+        """
+        SELECT metric, label, SUM(count), SUM(sum_ms), MAX(max_ms)
+        FROM metric_rollups WHERE bucket_start >= ?
+        GROUP BY metric, label
+        """,
+        (since,)
+    )
+    totals = {(r[0], r[1]): (r[2] or 0, r[3] or 0.0, r[4] or 0.0) for r in cursor.fetchall()}
+
+    cursor.execute(
+        """
+        SELECT metric, label, bin, SUM(count)
+        FROM metric_histogram WHERE bucket_start >= ?
+        GROUP BY metric, label, bin
+        """,
+        (since,)
+    )
+    bins: Dict[Tuple[str, str], Dict[int, int]] = {}
+    for metric, label, index, count in cursor.fetchall():
+        bins.setdefault((metric, label), {})[index] = count
+
+    def _summary(metric: str, label: str) -> Dict[str, Any]:
+        count, sum_ms, max_ms = totals.get((metric, label), (0, 0.0, 0.0))
+        out: Dict[str, Any] = {
+            'count': count,
+            'avg_ms': round(sum_ms / count, 1) if count else None,
+            'max_ms': round(max_ms, 1) if count else None,
+        }
+        out.update(percentiles_from_bins(bins.get((metric, label), {})))
+        return out
+
+    def _by_label(metric: str) -> Dict[str, Dict[str, Any]]:
+        return {label: _summary(m, label) for (m, label) in sorted(totals) if m == metric}
+
+    stages: Dict[str, Dict[str, Any]] = {}
+    for metric in STAGE_METRICS:
+        labels = [label for (m, label) in totals if m == metric]
+        merged: Dict[int, int] = {}
+        count, sum_ms, max_ms = 0, 0.0, 0.0
+        for label in labels:
+            c, s, mx = totals[(metric, label)]
+            count, sum_ms, max_ms = count + c, sum_ms + s, max(max_ms, mx)
+            for index, n in bins.get((metric, label), {}).items():
+                merged[index] = merged.get(index, 0) + n
+        stage = {
+            'count': count,
+            'avg_ms': round(sum_ms / count, 1) if count else None,
+            'max_ms': round(max_ms, 1) if count else None,
+        }
+        stage.update(percentiles_from_bins(merged))
+        stages[metric.split('.', 1)[1]] = stage
+
+    cursor.execute(
+        """
+        SELECT bucket_start, SUM(count) FROM metric_rollups
+        WHERE metric = ? AND bucket_start >= ?
+        GROUP BY bucket_start ORDER BY bucket_start
+        """,
+        (ARTICLES_PUBLISHED, since)
+    )
+    per_hour = [{'hour': r[0], 'articles': r[1]} for r in cursor.fetchall()]
+    published_total = sum(p['articles'] for p in per_hour)
+
+    http_by_host: Dict[str, Dict[str, Any]] = {}
+    for (metric, label), (count, total, _) in sorted(totals.items()):
+        if metric == HTTP_LATENCY:
+            host = http_by_host.setdefault(label, {'bytes': 0, 'errors': 0})
+            host.update(_summary(metric, label))
+        elif metric == HTTP_BYTES:
+            http_by_host.setdefault(label, {'bytes': 0, 'errors': 0})['bytes'] = int(total)
+        elif metric == HTTP_ERRORS:
+            host_name = label.rsplit(':', 1)[0]
+            http_by_host.setdefault(host_name, {'bytes': 0, 'errors': 0})['errors'] += count
+
+    decisions: Dict[str, Dict[str, Dict[str, int]]] = {}
+    for (metric, label), (count, _, _) in sorted(totals.items()):
+        if metric in DECISION_METRICS:
+            source_id, _, outcome = label.partition(':')
+            decisions.setdefault(metric.split('.', 1)[1], {}).setdefault(source_id, {})[outcome] = count
+
+    return {
+        'window_hours': hours,
+        'generated_at': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
+        'stages': stages,
+        'throughput': {
+            'published': published_total,
+            'articles_per_hour': round(published_total / hours, 2) if hours else 0,
+            'per_hour': per_hour,
+        },
+        'publish_lag_by_feed': _by_label(PUBLISH_LAG),
+        'gemini_latency_by_key': _by_label(GEMINI_LATENCY),
+        'wordpress_latency': _by_label(WORDPRESS_LATENCY),
+        'decisions': decisions,
+        'http_by_host': http_by_host,
+    }
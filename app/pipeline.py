@@ -1,11 +1,14 @@
 import logging
+import os
 import time
 import random
 import json
 import re
+import sqlite3
 from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
 from urllib.parse import urlparse, urljoin
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 
 from .config import (
     PIPELINE_ORDER,
@@ -15,6 +18,11 @@ from .config import (
     WORDPRESS_CATEGORIES,
     CATEGORY_ALIASES, # Import the new alias map
     PIPELINE_CONFIG,
+    METRICS_CONFIG,
+    DASHBOARD_CONFIG,
+    FEED_CONTENT_CONFIG,
+    LITE_PAGE_CONFIG,
+    ARCHIVE_CONFIG,
 )
 from .store import Database
 from .feeds import FeedReader
@@ -33,14 +41,22 @@ from .html_utils import (
 )
 from .ai_processor import AIProcessor
 from .internal_linking import add_internal_links
-from bs4 import BeautifulSoup
-from .cleaners import clean_html_for_globo_esporte
+from . import events, heartbeat, metrics
+from .polling import AdaptivePollingPolicy
+from .lite_pages import LitePageResolver
+from .archive import HtmlArchive
+from .extraction_cache import ExtractionCache
+from . import dedupe, gating
+from .urlnorm import canonical_url
+from .extract_pool import KIND_LITE, shared_pool
+from .selector_learning import SelectorLearner
+from .boilerplate import BoilerplateStore
 
 logger = logging.getLogger(__name__)
 
-CLEANER_FUNCTIONS = {
-    'globo.com': clean_html_for_globo_esporte,
-}
+
+# Shared across runs so discovered AMP templates and per-domain failures are remembered
+_lite_pages = LitePageResolver()
 
 def _get_article_url(article_data: Dict[str, Any]) -> Optional[str]:
     """
@@ -57,6 +73,26 @@ def _get_article_url(article_data: Dict[str, Any]) -> Optional[str]:
         return None
     return None
 
+def _publish_lag_ms(published: Any) -> Optional[float]:
+    """Milliseconds between the source publication time and now, if it can be parsed."""
+    if not published or not isinstance(published, str):
+        return None
+    try:
+        dt = datetime.fromisoformat(published.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    lag = (datetime.now(timezone.utc) - dt).total_seconds() * 1000.0
+    return lag if lag >= 0 else None
+
+def _stage_finished(db: Database, metric: str, started: float, article_db_id: int, source_id: str) -> None:
+    """Records the stage latency and emits a 'stage_finished' event for the dashboard stream."""
+    elapsed_ms = (time.perf_counter() - started) * 1000.0
+    metrics.record(metric, elapsed_ms, source_id)
+    db.record_event(events.STAGE_FINISHED, article_db_id, source_id,
+                    stage=metric.split('.', 1)[-1], elapsed_ms=round(elapsed_ms, 1))
+
 BAD_HOSTS = {"sb.scorecardresearch.com", "securepubads.g.doubleclick.net"}
 IMG_EXTS = (".jpg", ".jpeg", ".png", ".webp", ".gif")
 
@@ -92,14 +128,40 @@ def is_valid_upload_candidate(url: str) -> bool:
         return False
 
 
-def run_pipeline_cycle():
-    """Executes a full cycle of the content processing pipeline."""
-    logger.info("Starting new pipeline cycle.")
+def _feed_content_settings(feed_config: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Thresholds for the RSS-first fast path of a feed, or None when it is disabled."""
+    override = feed_config.get('feed_content', True)
+    if not FEED_CONTENT_CONFIG.get('enabled', True) or override is False:
+        return None
+    settings = {k: v for k, v in FEED_CONTENT_CONFIG.items() if k != 'enabled'}
+    if isinstance(override, dict):
+        settings.update(override)
+    return settings
 
-    # Load the internal link map once per cycle
+
+def _lite_page_settings(feed_config: Dict[str, Any], url: str) -> Optional[Dict[str, Any]]:
+    """Quality thresholds for the AMP/lite fetch mode of an article, or None when it does not apply."""
+    prefer_lite = feed_config.get('prefer_lite')
+    if not LITE_PAGE_CONFIG.get('enabled', True) or prefer_lite is False:
+        return None
+    if prefer_lite is None and not _lite_pages.applies_to(url):
+        return None
+    return {'min_chars': LITE_PAGE_CONFIG['min_chars'], 'min_paragraphs': LITE_PAGE_CONFIG['min_paragraphs']}
+
+
+ARTICLE_PUBLISHED = 'published'
+ARTICLE_PUBLISH_FAILED = 'publish_failed'
+ARTICLE_SKIPPED = 'skipped'
+
+
+LINK_MAP_PATH = 'data/internal_links.json'
+
+
+def _load_link_map() -> Dict[str, Any]:
+    """Loads the internal link map."""
     link_map = {}
     try:
-        with open('data/internal_links.json', 'r', encoding='utf-8') as f:
+        with open(LINK_MAP_PATH, 'r', encoding='utf-8') as f:
             link_map = json.load(f)
         if link_map:
             logger.info(f"Successfully loaded internal link map with {len(link_map)} terms.")
@@ -107,286 +169,634 @@ def run_pipeline_cycle():
         logger.warning("Internal link map 'data/internal_links.json' not found. Skipping internal linking.")
     except json.JSONDecodeError:
         logger.error("Error decoding 'data/internal_links.json'. Skipping internal linking.")
+    return link_map
 
-    db = Database()
-    feed_reader = FeedReader(user_agent=PIPELINE_CONFIG.get('publisher_name', 'Bot'))
-    extractor = ContentExtractor()
-    wp_client = WordPressClient(config=WORDPRESS_CONFIG, categories_map=WORDPRESS_CATEGORIES)
-    ai_processor = AIProcessor()
 
-    processed_articles_in_cycle = 0
+def _open_archive() -> Optional[HtmlArchive]:
+    if not ARCHIVE_CONFIG.get('enabled'):
+        return None
+    try:
+        return HtmlArchive(check_same_thread=False)
+    except (OSError, sqlite3.Error) as e:
+        logger.warning(f"HTML archive unavailable, pages will not be archived: {e}")
+        return None
+
+
+def _fetch_page(ctx: 'PipelineContext', url: str, article_db_id: int, kind: str = 'page'):
+    """
+    Fetches a page for an article, reusing a recent archived copy (retries, re-queued
+    articles) instead of downloading it again, and archives what was downloaded.
+    """
+    if ctx.archive:
+        archived = ctx.archive.get(article_id=article_db_id, url=url, kind=kind,
+                                   max_age_hours=ARCHIVE_CONFIG['reuse_max_age_hours'])
+        if archived is not None:
+            logger.info(f"Reusing archived copy of {url} ({archived.size} bytes, {archived.sha256[:12]}).")
+            return archived
+    page = ctx.extractor.fetch_page(url)
+    if ctx.archive and page and page.content:
+        ctx.archive.put(url, page.content, page.content_type, article_id=article_db_id, kind=kind)
+    return page
+
+
+class PipelineContext:
+    """
+    Clients shared by every feed processed in one run (a full cycle or a single
+    feed job). The scheduler keeps one context for the life of the process: each
+    feed job ends with `end_run()`, and `close()` only at shutdown. The context is
+    built in the main thread and used by the scheduler's worker, one run at a time.
+    """
+
+    def __init__(self):
+        self.link_map: Dict[str, Any] = {}
+        self._link_map_mtime: Optional[float] = None
+        self.reload_link_map()
+        self.db = Database(check_same_thread=False)
+        self.feed_reader = FeedReader(user_agent=PIPELINE_CONFIG.get('publisher_name', 'Bot'))
+        self.extractor = ContentExtractor()
+        self.wp_client = WordPressClient(config=WORDPRESS_CONFIG, categories_map=WORDPRESS_CATEGORIES)
+        self.ai_processor = AIProcessor()
+        self.archive = _open_archive()
+        self.extraction_cache = ExtractionCache(self.db)
+        self.stories = dedupe.StoryIndex(self.db)
+        self.selectors = SelectorLearner(self.db)
+        self.boilerplate = BoilerplateStore(self.db)
+        self.lease_owner = None
+
+    def acquire_lease(self) -> bool:
+        """Only one run may process feeds at a time, across processes and hosts sharing the database."""
+        owner = heartbeat.lease_owner()
+        ttl = SCHEDULE_CONFIG.get('cycle_lease_ttl_seconds', 600)
+        if not self.db.acquire_lease(heartbeat.CYCLE_LEASE, owner, ttl):
+            logger.warning("Another pipeline run holds the lease. Skipping this run.")
+            return False
+        self.lease_owner = owner
+        heartbeat.hold_lease(heartbeat.CYCLE_LEASE, owner, ttl)
+        return True
+
+    def reload_link_map(self) -> None:
+        """Loads the internal link map again when build_link_map.py rewrote it since the last load."""
+        try:
+            mtime = os.path.getmtime(LINK_MAP_PATH)
+        except OSError:
+            mtime = None
+        if mtime is None or mtime != self._link_map_mtime:
+            self.link_map = _load_link_map()
+            self._link_map_mtime = mtime
+
+    def end_run(self) -> None:
+        """Per-run upkeep: flushes metrics, prunes the caches, maintains the archive and releases the lease."""
+        metrics.flush(self.db)
+        self.db.prune_metric_rollups(datetime.utcnow() - timedelta(days=METRICS_CONFIG.get('retention_days', 30)))
+        self.db.prune_events(DASHBOARD_CONFIG.get('events_retention', 5000))
+        self.extraction_cache.prune()
+        self.stories.prune()
+        self.boilerplate.prune()
+        if self.archive:
+            self.archive.maintain()
+        if self.lease_owner:
+            heartbeat.drop_lease(heartbeat.CYCLE_LEASE)
+            self.db.release_lease(heartbeat.CYCLE_LEASE, self.lease_owner)
+            self.lease_owner = None
+
+    def close(self) -> None:
+        self.end_run()
+        self.db.close()
+        self.wp_client.close()
+        if self.archive:
+            self.archive.close()
+
+
+def _handle_duplicate(ctx: PipelineContext, source_id: str, feed_config: Dict[str, Any], article_db_id: int,
+                      url: str, duplicate: Dict[str, Any]) -> str:
+    """Marks a near-duplicate story DUPLICATE and, in 'merge' mode, credits its source on the published post."""
+    action = ctx.stories.config['action']
+    if action == dedupe.MERGE and duplicate.get('wp_post_id'):
+        note = dedupe.merge_note(feed_config.get('source_name') or urlparse(url).netloc, url)
+        if not ctx.wp_client.append_to_post(duplicate['wp_post_id'], note):
+            action = dedupe.SKIP
+    else:
+        action = dedupe.SKIP
+    reason = (f"Duplicate of article {duplicate['article_id']} ({duplicate['source_id']}, "
+              f"distance {duplicate['distance']}, {action})")
+    logger.info(f"Article {article_db_id} from {source_id}: {reason}. Skipping rewrite and publish.")
+    ctx.db.update_article_status(article_db_id, 'DUPLICATE', reason=reason)
+    metrics.decision(metrics.DUPLICATE, source_id, action)
+    return ARTICLE_SKIPPED
+
+
+def _gate_rejects(ctx: PipelineContext, source_id: str, feed_config: Dict[str, Any], article_db_id: int,
+                  url: str, extracted_data: Dict[str, Any], duplicate_distance: Optional[int]) -> bool:
+    """Runs the pre-AI gate; True when it rejects the article (REJECTED, no Gemini call)."""
+    settings = gating.gate_settings(feed_config)
+    if settings is None:
+        return False
+    if ctx.db.is_gate_released(article_db_id):
+        metrics.decision(metrics.GATE, source_id, 'released')
+        return False
+    verdict = gating.check(extracted_data, settings, duplicate_distance)
+    if not verdict.rejected:
+        metrics.decision(metrics.GATE, source_id, 'passed')
+        return False
+    enforce = settings['mode'] != gating.SHADOW
+    ctx.db.record_gate_rejection(article_db_id, source_id, url, extracted_data.get('title') or '',
+                                 verdict.rule, verdict.detail, verdict.signals, enforce=enforce)
+    metrics.decision(metrics.GATE, source_id, f"{'rejected' if enforce else 'shadow'}:{verdict.rule}")
+    if not enforce:
+        logger.info(f"Article {article_db_id} from {source_id} would be rejected ({verdict.rule}: {verdict.detail}); "
+                    f"shadow mode, rewriting anyway.")
+        return False
+    logger.info(f"Article {article_db_id} from {source_id} rejected before the AI: {verdict.rule} ({verdict.detail}).")
+    return True
+
+
+def _process_article(ctx: PipelineContext, source_id: str, feed_config: Dict[str, Any],
+                     article_data: Dict[str, Any]) -> str:
+    """
+    Runs one article through fetch → extract → rewrite → publish.
+
+    Returns:
+        ARTICLE_PUBLISHED, ARTICLE_PUBLISH_FAILED (reached WordPress but failed),
+        or ARTICLE_SKIPPED (stopped before the AI/WordPress stages).
+    """
+    db, extractor, ai_processor, wp_client, link_map = (
+        ctx.db, ctx.extractor, ctx.ai_processor, ctx.wp_client, ctx.link_map
+    )
+    category = feed_config['category']
+    article_db_id = article_data['db_id']
+
+    article_url_to_process = _get_article_url(article_data)
+    if not article_url_to_process:
+        logger.warning(f"Skipping article {article_data.get('id')} - missing/invalid URL.")
+        db.update_article_status(article_db_id, 'FAILED', reason="Missing/invalid URL")
+        return ARTICLE_SKIPPED
+
+    logger.info(f"Processing article: {article_data.get('title', 'N/A')} (DB ID: {article_db_id}) from {source_id}")
+    db.update_article_status(article_db_id, 'PROCESSING')
+    article_started = time.perf_counter()
+
+    # Step 1: Extract, straight from the feed entry when it carries the full article
+    extracted_data = None
+    fast_path = _feed_content_settings(feed_config)
+    if fast_path is not None:
+        heartbeat.set_stage('extract', source_id, article_db_id, article_url_to_process)
+        stage_started = time.perf_counter()
+        extracted_data, decision = extractor.extract_from_feed(article_data, article_url_to_process, **fast_path)
+        metrics.decision(metrics.EXTRACT_PATH, source_id, "feed" if extracted_data else f"page:{decision}")
+        if extracted_data:
+            logger.info(f"Using full content from the feed entry for {article_url_to_process}; skipping page fetch.")
+            _stage_finished(db, metrics.STAGE_EXTRACT, stage_started, article_db_id, source_id)
+        else:
+            logger.debug(f"Feed entry for {article_url_to_process} not usable ({decision}); fetching the page.")
+
+    # Step 1b: Heavy publisher pages, try their AMP/lite version with the lightweight cleaner
+    lite = None if extracted_data else _lite_page_settings(feed_config, article_url_to_process)
+    if lite is not None:
+        heartbeat.set_stage('fetch', source_id, article_db_id, article_url_to_process)
+        stage_started = time.perf_counter()
+        lite_url, how = _lite_pages.resolve(article_url_to_process, extractor.session)
+        lite_page = _fetch_page(ctx, lite_url, article_db_id, kind='lite') if lite_url else None
+        if lite_url:
+            _stage_finished(db, metrics.STAGE_FETCH, stage_started, article_db_id, source_id)
+        if lite_page and lite_page.content:
+            heartbeat.set_stage('extract', source_id, article_db_id, article_url_to_process)
+            stage_started = time.perf_counter()
+            extracted_data = ctx.extraction_cache.get(article_url_to_process, lite_page.content, kind='lite')
+            if extracted_data:
+                decision = 'used'
+            else:
+                extracted_data, decision = shared_pool().extract(lite_page.content, article_url_to_process,
+                                                                 lite_page.encoding, kind=KIND_LITE, **lite)
+                ctx.extraction_cache.put(article_url_to_process, lite_page.content, extracted_data, kind='lite')
+            _stage_finished(db, metrics.STAGE_EXTRACT, stage_started, article_db_id, source_id)
+        else:
+            decision = 'fetch_failed' if lite_url else how
+        if lite_url:
+            _lite_pages.record_result(article_url_to_process, bool(extracted_data))
+        metrics.decision(metrics.LITE_PAGE, source_id, decision)
+        if extracted_data:
+            logger.info(f"Extracted {article_url_to_process} from its lite page {lite_url} "
+                        f"({lite_page.size} bytes, found via {how}).")
+        else:
+            logger.info(f"Lite page not usable for {article_url_to_process} ({decision}); using the full page.")
+
+    if not extracted_data:
+        heartbeat.set_stage('fetch', source_id, article_db_id, article_url_to_process)
+        stage_started = time.perf_counter()
+        page = _fetch_page(ctx, article_url_to_process, article_db_id)
+        _stage_finished(db, metrics.STAGE_FETCH, stage_started, article_db_id, source_id)
+        if not page or not page.content:
+            db.update_article_status(article_db_id, 'FAILED', reason="Failed to fetch HTML")
+            return ARTICLE_SKIPPED
+
+        heartbeat.set_stage('extract', source_id, article_db_id, article_url_to_process)
+        stage_started = time.perf_counter()
+        extracted_data = ctx.extraction_cache.get(article_url_to_process, page.content)
+        if extracted_data:
+            logger.info(f"Using cached extraction for {article_url_to_process} (page unchanged).")
+        else:
+            # Cleaners and extractor run in a worker process (app/extract_pool.py); pages of sites
+            # without a profile use or teach the domain's learned selector (app/selector_learning.py),
+            # and every page drops and feeds the domain's boilerplate fingerprints (app/boilerplate.py)
+            learning = ctx.selectors.plan(article_url_to_process)
+            fingerprints = ctx.boilerplate.plan(article_url_to_process)
+            extracted_data, _ = shared_pool().extract(page.content, article_url_to_process, page.encoding,
+                                                      learning=learning, fingerprints=fingerprints)
+            ctx.selectors.observe(article_url_to_process, learning)
+            ctx.boilerplate.observe(article_url_to_process, fingerprints)
+            ctx.extraction_cache.put(article_url_to_process, page.content, extracted_data)
+        _stage_finished(db, metrics.STAGE_EXTRACT, stage_started, article_db_id, source_id)
+    if not extracted_data or not extracted_data.get('content'):
+        logger.warning(f"Failed to extract content from {article_data['url']}")
+        db.update_article_status(article_db_id, 'FAILED', reason="Extraction failed")
+        return ARTICLE_SKIPPED
+
+    # Step 1c: Drop stories another source already gave us, before spending Gemini quota on them
+    fingerprint = ctx.stories.fingerprint(extracted_data) if ctx.stories.enabled else None
+    nearest = None
+    if fingerprint is not None:
+        nearest = ctx.stories.nearest(fingerprint, article_db_id)
+        if nearest and nearest['duplicate']:
+            return _handle_duplicate(ctx, source_id, feed_config, article_db_id, article_url_to_process, nearest)
+        metrics.decision(metrics.DUPLICATE, source_id, 'unique')
+
+    # Step 1d: Cheap rules turn away articles not worth a Gemini call (app/gating.py)
+    if _gate_rejects(ctx, source_id, feed_config, article_db_id, article_url_to_process, extracted_data,
+                     nearest['distance'] if nearest else None):
+        return ARTICLE_SKIPPED
+
+    main_text = extracted_data.get('content', '')
+    body_images_html = extracted_data.get('images', [])
+    content_for_ai = main_text + "\n".join(body_images_html)
+
+    # Step 2: Rewrite content with AI
+    heartbeat.set_stage('rewrite', source_id, article_db_id, article_url_to_process)
+    stage_started = time.perf_counter()
+    rewritten_data, failure_reason = ai_processor.rewrite_content(
+        title=extracted_data.get('title'),
+        content_html=content_for_ai,
+        source_url=article_url_to_process,
+        category=category,
+        videos=extracted_data.get('videos', []),
+        images=extracted_data.get('images', []), # This is now a list of html tags, not urls
+        tags=[],  # Tags are generated by the AI in this flow
+        source_name=feed_config.get('source_name', ''),
+        domain=wp_client.get_domain(),
+        schema_original=extracted_data.get('schema_original'),
+        article_id=article_db_id,
+    )
+    _stage_finished(db, metrics.STAGE_REWRITE, stage_started, article_db_id, source_id)
+
+    if not rewritten_data:
+        reason = failure_reason or "AI processing failed"
+        # Check for the specific case where the key pool for the category is exhausted
+        if "pool is exhausted" in reason:
+            logger.warning(
+                f"{feed_config['category']} pool exhausted → marking article FAILED → moving on."
+            )
+        else:
+            logger.warning(f"Article '{article_data.get('title', 'N/A')}' marked as FAILED (Reason: {reason}). Continuing to next article.")
+        db.update_article_status(article_db_id, 'FAILED', reason=reason)
+        return ARTICLE_SKIPPED
+
+    # Step 3: Validate AI output and prepare content
+    title = rewritten_data.get("titulo_final", "").strip()
+    content_html = rewritten_data.get("conteudo_final", "").strip()
+
+    if not title or not content_html:
+        logger.error(f"AI output for {article_url_to_process} missing required fields (titulo_final/conteudo_final).")
+        db.update_article_status(article_db_id, 'FAILED', reason="AI output missing required fields")
+        return ARTICLE_SKIPPED
+
+    # Step 3.1: HTML Processing and Cleanup
+    # Defensive cleanup of common AI errors (e.g., leftover placeholders)
+    content_html = remove_broken_image_placeholders(content_html)
+    content_html = strip_naked_internal_links(content_html)
+
+    # 3.2: Ensure images from original article exist in content, injecting if AI removed them
+    content_html = merge_images_into_content(
+        content_html,
+        extracted_data.get('images', [])
+    )
+
+    # 3.3: Upload ONLY the featured image if it's valid
+    heartbeat.set_stage('publish', source_id, article_db_id, article_url_to_process)
+    publish_started = time.perf_counter()
+    urls_to_upload = []
+    featured_image_url = extracted_data.get('featured_image_url')
+    if featured_image_url and is_valid_upload_candidate(featured_image_url):
+        urls_to_upload.append(featured_image_url)
+        logger.info(f"Valid featured image found, preparing for upload: {featured_image_url}")
+    else:
+        logger.info("No valid featured image to upload. The post will not have a highlight.")
+
+    uploaded_src_map = {}
+    uploaded_id_map = {}
+    logger.info(f"Attempting to upload {len(urls_to_upload)} image(s).")
+    for url in urls_to_upload:
+        media = wp_client.upload_media_from_url(url, title)
+        if media and media.get("source_url") and media.get("id"):
+            k = canonical_url(url)
+            uploaded_src_map[k] = media["source_url"]
+            uploaded_id_map[k] = media["id"]
+
+    # 3.4: Rewrite image `src` to point to WordPress
+    content_html = rewrite_img_srcs_with_wp(content_html, uploaded_src_map)
+
+    # 3.5: Add credits to figures (currently disabled)
+    # content_html = add_credit_to_figures(content_html, extracted_data['source_url'])
+
+    # Só player do YouTube (oEmbed) e sem “Crédito: …”
+    content_html = strip_credits_and_normalize_youtube(content_html)
+
+    # Add credit line at the end of the post
+    source_name = RSS_FEEDS.get(source_id, {}).get('source_name', urlparse(article_url_to_process).netloc)
+    credit_line = f'<p><strong>Fonte:</strong> <a href="{article_url_to_process}" target="_blank" rel="noopener noreferrer">{source_name}</a></p>'
+    content_html += f"\n{credit_line}"
+
+    # Step 5: Prepare payload for WordPress
+
+    # 5.1: Combine fixed and AI-suggested categories
+    FIXED_CATEGORY_IDS = {8, 267} # Futebol, Notícias
+
+    final_category_ids = set(FIXED_CATEGORY_IDS)
+
+    # Get category from feed config (the main one)
+    main_category_id = WORDPRESS_CATEGORIES.get(category)
+    if main_category_id:
+        final_category_ids.add(main_category_id)
+
+    # Get AI suggested categories
+    suggested_categories = rewritten_data.get('categorias', [])
+    if suggested_categories and isinstance(suggested_categories, list):
+        # Expects a list of dicts like [{'nome': 'Barcelona'}, {'nome': 'Champions League'}]
+        suggested_names = [cat['nome'] for cat in suggested_categories if isinstance(cat, dict) and 'nome' in cat]
+
+        # Normalize category names using aliases
+        normalized_names = []
+        for name in suggested_names:
+            canonical_name = CATEGORY_ALIASES.get(name.lower(), name)
+            normalized_names.append(canonical_name)
+
+        if suggested_names != normalized_names:
+            logger.info(f"Normalized category names: {suggested_names} -> {normalized_names}")
+
+        if normalized_names:
+            logger.info(f"Resolving AI-suggested category names: {normalized_names}")
+            dynamic_category_ids = wp_client.resolve_category_names_to_ids(normalized_names)
+            if dynamic_category_ids:
+                final_category_ids.update(dynamic_category_ids)
+
+    # Step 4: Add internal links (now in the correct place)
+    if link_map:
+        logger.info("Attempting to add internal links with prioritization...")
+        content_html = add_internal_links(
+            html_content=content_html,
+            link_map_data=link_map,
+            current_post_categories=list(final_category_ids)
+        )
+
+    # 5.2: Determine featured media ID to avoid re-upload
+    featured_media_id = None
+    if featured_url := extracted_data.get('featured_image_url'):
+        k = canonical_url(featured_url)
+        featured_media_id = uploaded_id_map.get(k)
+    else:
+        logger.info("No suitable featured image found after filtering; proceeding without one.")
+    if not featured_media_id and uploaded_id_map:
+        featured_media_id = next(iter(uploaded_id_map.values()), None)
+
+    # 5.3: Set alt text for uploaded images
+    focus_kw = rewritten_data.get("focus_keyphrase", "")
+    # The AI is asked to provide a dict like: { "filename.jpg": "alt text" }
+    alt_map = rewritten_data.get("image_alt_texts", {})
+
+    if uploaded_id_map and (alt_map or focus_kw):
+        logger.info("Setting alt text for uploaded images.")
+        for original_url, media_id in uploaded_id_map.items():
+            # Extract filename from the original URL to match keys in alt_map
+            filename = urlparse(original_url).path.split('/')[-1]
+
+            # Try to get specific alt text from AI, fallback to a generic one
+            alt_text = alt_map.get(filename)
+            if not alt_text and focus_kw:
+                alt_text = f"{focus_kw} — foto ilustrativa"
+
+            if alt_text:
+                wp_client.set_media_alt_text(media_id, alt_text)
+
+    # 5.4: Prepare Yoast meta, including canonical URL to original source
+    yoast_meta = rewritten_data.get('yoast_meta', {})
+    yoast_meta['_yoast_wpseo_canonical'] = article_url_to_process
+
+    # Add related keyphrases if present
+    related_kws = rewritten_data.get('related_keyphrases')
+    if isinstance(related_kws, list) and related_kws:
+        # Yoast stores this as a JSON string of objects: [{"keyword": "phrase"}, ...]
+        yoast_meta['_yoast_wpseo_keyphrases'] = json.dumps([{"keyword": kw} for kw in related_kws])
+
+    post_payload = {
+        'title': title,
+        'slug': rewritten_data.get('slug'),
+        'content': content_html,
+        'excerpt': rewritten_data.get('meta_description', ''),
+        'categories': list(final_category_ids),
+        'tags': rewritten_data.get('tags_sugeridas', []),
+        'featured_media': featured_media_id,
+        'meta': yoast_meta,
+    }
+
+    wp_post_id = wp_client.create_post(post_payload)
+    _stage_finished(db, metrics.STAGE_PUBLISH, publish_started, article_db_id, source_id)
+
+    if wp_post_id:
+        db.save_processed_post(article_db_id, wp_post_id)
+        logger.info(f"Successfully published post {wp_post_id} for article DB ID {article_db_id}")
+        if fingerprint is not None:
+            ctx.stories.add(article_db_id, source_id, article_url_to_process, extracted_data.get('title') or title,
+                            fingerprint, wp_post_id)
+        metrics.record(metrics.STAGE_ARTICLE, (time.perf_counter() - article_started) * 1000.0, source_id)
+        metrics.incr(metrics.ARTICLES_PUBLISHED, source_id)
+        lag_ms = _publish_lag_ms(article_data.get('published'))
+        if lag_ms is not None:
+            metrics.record(metrics.PUBLISH_LAG, lag_ms, source_id)
+    else:
+        logger.error(f"Failed to publish post for {article_url_to_process}")
+        db.update_article_status(article_db_id, 'FAILED', reason="WordPress publishing failed")
+
+    metrics.flush(db)
+    return ARTICLE_PUBLISHED if wp_post_id else ARTICLE_PUBLISH_FAILED
+
+
+def _queued_articles(db: Database, source_id: str, new_articles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    The articles to process this run, at most max_articles_per_feed: due retries
+    first (a released gate rejection comes back DEFERRED), then NEW articles,
+    newest first. NEW ones left over by earlier runs are picked up for
+    backlog_max_age_hours; items read in this run keep their feed entry.
+    """
+    fresh = {article['db_id']: article for article in new_articles}
+    new_since = datetime.utcnow() - timedelta(hours=SCHEDULE_CONFIG.get('backlog_max_age_hours', 6))
+    rows = db.get_articles_to_process(source_id, SCHEDULE_CONFIG.get('max_articles_per_feed', 3), new_since=new_since)
+    return [fresh.get(row['id']) or {'db_id': row['id'], 'id': row['external_id'], 'url': row['url'],
+                                     'published': row['published_at']}
+            for row in rows]
+
+
+def process_feed(ctx: PipelineContext, source_id: str, validators: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Reads one feed and processes its new articles.
+
+    Args:
+        validators: Per-URL ETag/Last-Modified state for conditional requests,
+            updated in place (see `FeedReader.read_feeds`).
+
+    Returns:
+        A summary used by the adaptive poller: {'items', 'new', 'published',
+        'not_modified', 'skipped', 'error'}.
+    """
+    db = ctx.db
+    result = {'items': 0, 'new': 0, 'published': 0, 'not_modified': False, 'skipped': False, 'error': False}
+
+    # Check circuit breaker before processing
+    consecutive_failures = db.get_consecutive_failures(source_id)
+    if consecutive_failures >= 3:
+        logger.warning(f"Circuit open for feed {source_id} ({consecutive_failures} fails) → skipping this round.")
+        # Reset for the next cycle as per prompt "zere o contador na próxima"
+        db.reset_consecutive_failures(source_id)
+        result['skipped'] = True
+        return result
+
+    feed_config = RSS_FEEDS.get(source_id)
+    if not feed_config:
+        logger.warning(f"No configuration found for feed source: {source_id}")
+        result['skipped'] = True
+        return result
+
+    category = feed_config['category']
+    logger.info(f"Processing feed: {source_id} (Category: {category})")
+    heartbeat.set_stage('feeds', source_id)
 
     try:
-        for i, source_id in enumerate(PIPELINE_ORDER):
-            # Check circuit breaker before processing
-            consecutive_failures = db.get_consecutive_failures(source_id)
-            if consecutive_failures >= 3:
-                logger.warning(f"Circuit open for feed {source_id} ({consecutive_failures} fails) → skipping this round.")
-                # Reset for the next cycle as per prompt "zere o contador na próxima"
-                db.reset_consecutive_failures(source_id)
+        feed_items = ctx.feed_reader.read_feeds(feed_config, source_id, validators=validators)
+        result['items'] = len(feed_items)
+        result['not_modified'] = ctx.feed_reader.last_not_modified
+        new_articles = db.filter_new_articles(source_id, feed_items)
+        result['new'] = len(new_articles)
+        queued = _queued_articles(db, source_id, new_articles)
+
+        if not queued:
+            logger.info(f"No new articles found for {source_id}.")
+            return result
+
+        logger.info(f"Found {len(new_articles)} new articles for {source_id}")
+        earlier = sum(1 for article in queued if article not in new_articles)
+        if earlier:
+            logger.info(f"Also processing {earlier} queued article(s) of {source_id} from earlier runs.")
+
+        for article_data in queued:
+            try:
+                outcome = _process_article(ctx, source_id, feed_config, article_data)
+            except Exception as e:
+                logger.error(f"Error processing article {_get_article_url(article_data) or article_data.get('title', 'N/A')}: {e}", exc_info=True)
+                db.update_article_status(article_data['db_id'], 'FAILED', reason=str(e))
                 continue
 
-            feed_config = RSS_FEEDS.get(source_id)
-            if not feed_config:
-                logger.warning(f"No configuration found for feed source: {source_id}")
+            if outcome == ARTICLE_SKIPPED:
                 continue
+            if outcome == ARTICLE_PUBLISHED:
+                result['published'] += 1
 
-            category = feed_config['category']
-            logger.info(f"Processing feed: {source_id} (Category: {category})")
+            # Per-article delay to respect API rate limits.
+            delay = 120
+            logger.info(f"Sleeping for {delay}s (per-article delay).")
+            heartbeat.set_stage(heartbeat.SLEEP, source_id)
+            time.sleep(delay)
 
-            try:
-                feed_items = feed_reader.read_feeds(feed_config, source_id)
-                new_articles = db.filter_new_articles(source_id, feed_items)
-
-                if not new_articles:
-                    logger.info(f"No new articles found for {source_id}.")
-                    continue
-
-                logger.info(f"Found {len(new_articles)} new articles for {source_id}")
-
-                for article_data in new_articles[:SCHEDULE_CONFIG.get('max_articles_per_feed', 3)]:
-                    article_db_id = article_data['db_id']
-                    try:
-                        article_url_to_process = _get_article_url(article_data)
-                        if not article_url_to_process:
-                            logger.warning(f"Skipping article {article_data.get('id')} - missing/invalid URL.")
-                            db.update_article_status(article_db_id, 'FAILED', reason="Missing/invalid URL")
-                            continue
-
-                        logger.info(f"Processing article: {article_data.get('title', 'N/A')} (DB ID: {article_db_id}) from {source_id}")
-                        db.update_article_status(article_db_id, 'PROCESSING')
-                        
-                        html_content = extractor._fetch_html(article_url_to_process)
-                        if not html_content:
-                            db.update_article_status(article_db_id, 'FAILED', reason="Failed to fetch HTML")
-                            continue
-
-                        soup = BeautifulSoup(html_content, 'lxml')
-                        domain = urlparse(article_url_to_process).netloc.lower()
-                        
-                        # Clean the soup based on the domain
-                        for cleaner_domain, cleaner_func in CLEANER_FUNCTIONS.items():
-                            if cleaner_domain in domain:
-                                soup = cleaner_func(soup)
-                                logger.info(f"Applied cleaner for {cleaner_domain}")
-                                break
-
-                        extracted_data = extractor.extract(str(soup), url=article_url_to_process)
-                        if not extracted_data or not extracted_data.get('content'):
-                            logger.warning(f"Failed to extract content from {article_data['url']}")
-                            db.update_article_status(article_db_id, 'FAILED', reason="Extraction failed")
-                            continue
-
-                        main_text = extracted_data.get('content', '')
-                        body_images_html = extracted_data.get('images', [])
-                        content_for_ai = main_text + "\n".join(body_images_html)
-
-                        # Step 2: Rewrite content with AI
-                        rewritten_data, failure_reason = ai_processor.rewrite_content(
-                            title=extracted_data.get('title'),
-                            content_html=content_for_ai,
-                            source_url=article_url_to_process,
-                            category=category,
-                            videos=extracted_data.get('videos', []),
-                            images=extracted_data.get('images', []), # This is now a list of html tags, not urls
-                            tags=[],  # Tags are generated by the AI in this flow
-                            source_name=feed_config.get('source_name', ''),
-                            domain=wp_client.get_domain(),
-                            schema_original=extracted_data.get('schema_original')
-                        )
-
-                        if not rewritten_data:
-                            reason = failure_reason or "AI processing failed"
-                            # Check for the specific case where the key pool for the category is exhausted
-                            if "pool is exhausted" in reason:
-                                logger.warning(
-                                    f"{feed_config['category']} pool exhausted → marking article FAILED → moving on."
-                                )
-                            else:
-                                logger.warning(f"Article '{article_data.get('title', 'N/A')}' marked as FAILED (Reason: {reason}). Continuing to next article.")
-                            db.update_article_status(article_db_id, 'FAILED', reason=reason)
-                            continue
-
-                        # Step 3: Validate AI output and prepare content
-                        title = rewritten_data.get("titulo_final", "").strip()
-                        content_html = rewritten_data.get("conteudo_final", "").strip()
-
-                        if not title or not content_html:
-                            logger.error(f"AI output for {article_url_to_process} missing required fields (titulo_final/conteudo_final).")
-                            db.update_article_status(article_db_id, 'FAILED', reason="AI output missing required fields")
-                            continue
-
-                        # Step 3.1: HTML Processing and Cleanup
-                        # Defensive cleanup of common AI errors (e.g., leftover placeholders)
-                        content_html = remove_broken_image_placeholders(content_html)
-                        content_html = strip_naked_internal_links(content_html)
-
-                        # 3.2: Ensure images from original article exist in content, injecting if AI removed them
-                        content_html = merge_images_into_content(
-                            content_html,
-                            extracted_data.get('images', [])
-                        )
-                        
-                        # 3.3: Upload ONLY the featured image if it's valid
-                        urls_to_upload = []
-                        featured_image_url = extracted_data.get('featured_image_url')
-                        if featured_image_url and is_valid_upload_candidate(featured_image_url):
-                            urls_to_upload.append(featured_image_url)
-                            logger.info(f"Valid featured image found, preparing for upload: {featured_image_url}")
-                        else:
-                            logger.info("No valid featured image to upload. The post will not have a highlight.")
-
-                        uploaded_src_map = {}
-                        uploaded_id_map = {}
-                        logger.info(f"Attempting to upload {len(urls_to_upload)} image(s).")
-                        for url in urls_to_upload:
-                            media = wp_client.upload_media_from_url(url, title)
-                            if media and media.get("source_url") and media.get("id"):
-                                # Normalize URL to handle potential trailing slashes as keys
-                                k = url.rstrip('/')
-                                uploaded_src_map[k] = media["source_url"]
-                                uploaded_id_map[k] = media["id"]
-                        
-                        # 3.4: Rewrite image `src` to point to WordPress
-                        content_html = rewrite_img_srcs_with_wp(content_html, uploaded_src_map)
-
-                        # 3.5: Add credits to figures (currently disabled)
-                        # content_html = add_credit_to_figures(content_html, extracted_data['source_url'])
-
-                        # Só player do YouTube (oEmbed) e sem “Crédito: …”
-                        content_html = strip_credits_and_normalize_youtube(content_html)
-                        
-                        # Add credit line at the end of the post
-                        source_name = RSS_FEEDS.get(source_id, {}).get('source_name', urlparse(article_url_to_process).netloc)
-                        credit_line = f'<p><strong>Fonte:</strong> <a href="{article_url_to_process}" target="_blank" rel="noopener noreferrer">{source_name}</a></p>'
-                        content_html += f"\n{credit_line}"
-
-                        # Step 5: Prepare payload for WordPress
-
-                        # 5.1: Combine fixed and AI-suggested categories
-                        FIXED_CATEGORY_IDS = {8, 267} # Futebol, Notícias
-                        
-                        final_category_ids = set(FIXED_CATEGORY_IDS)
-
-                        # Get category from feed config (the main one)
-                        main_category_id = WORDPRESS_CATEGORIES.get(category)
-                        if main_category_id:
-                            final_category_ids.add(main_category_id)
-
-                        # Get AI suggested categories
-                        suggested_categories = rewritten_data.get('categorias', [])
-                        if suggested_categories and isinstance(suggested_categories, list):
-                            # Expects a list of dicts like [{'nome': 'Barcelona'}, {'nome': 'Champions League'}]
-                            suggested_names = [cat['nome'] for cat in suggested_categories if isinstance(cat, dict) and 'nome' in cat]
-                            
-                            # Normalize category names using aliases
-                            normalized_names = []
-                            for name in suggested_names:
-                                canonical_name = CATEGORY_ALIASES.get(name.lower(), name)
-                                normalized_names.append(canonical_name)
-                            
-                            if suggested_names != normalized_names:
-                                logger.info(f"Normalized category names: {suggested_names} -> {normalized_names}")
-
-                            if normalized_names:
-                                logger.info(f"Resolving AI-suggested category names: {normalized_names}")
-                                dynamic_category_ids = wp_client.resolve_category_names_to_ids(normalized_names)
-                                if dynamic_category_ids:
-                                    final_category_ids.update(dynamic_category_ids)
-
-                        # Step 4: Add internal links (now in the correct place)
-                        if link_map:
-                            logger.info("Attempting to add internal links with prioritization...")
-                            content_html = add_internal_links(
-                                html_content=content_html,
-                                link_map_data=link_map,
-                                current_post_categories=list(final_category_ids)
-                            )
-
-                        # 5.2: Determine featured media ID to avoid re-upload
-                        featured_media_id = None
-                        if featured_url := extracted_data.get('featured_image_url'):
-                            k = featured_url.rstrip('/')
-                            featured_media_id = uploaded_id_map.get(k)
-                        else:
-                            logger.info("No suitable featured image found after filtering; proceeding without one.")
-                        if not featured_media_id and uploaded_id_map:
-                            featured_media_id = next(iter(uploaded_id_map.values()), None)
-
-                        # 5.3: Set alt text for uploaded images
-                        focus_kw = rewritten_data.get("focus_keyphrase", "")
-                        # The AI is asked to provide a dict like: { "filename.jpg": "alt text" }
-                        alt_map = rewritten_data.get("image_alt_texts", {})
-
-                        if uploaded_id_map and (alt_map or focus_kw):
-                            logger.info("Setting alt text for uploaded images.")
-                            for original_url, media_id in uploaded_id_map.items():
-                                # Extract filename from the original URL to match keys in alt_map
-                                filename = urlparse(original_url).path.split('/')[-1]
-
-                                # Try to get specific alt text from AI, fallback to a generic one
-                                alt_text = alt_map.get(filename)
-                                if not alt_text and focus_kw:
-                                    alt_text = f"{focus_kw} — foto ilustrativa"
-
-                                if alt_text:
-                                    wp_client.set_media_alt_text(media_id, alt_text)
-
-                        # 5.4: Prepare Yoast meta, including canonical URL to original source
-                        yoast_meta = rewritten_data.get('yoast_meta', {})
-                        yoast_meta['_yoast_wpseo_canonical'] = article_url_to_process
-
-                        # Add related keyphrases if present
-                        related_kws = rewritten_data.get('related_keyphrases')
-                        if isinstance(related_kws, list) and related_kws:
-                            # Yoast stores this as a JSON string of objects: [{"keyword": "phrase"}, ...]
-                            yoast_meta['_yoast_wpseo_keyphrases'] = json.dumps([{"keyword": kw} for kw in related_kws])
-
-                        post_payload = {
-                            'title': title,
-                            'slug': rewritten_data.get('slug'),
-                            'content': content_html,
-                            'excerpt': rewritten_data.get('meta_description', ''),
-                            'categories': list(final_category_ids),
-                            'tags': rewritten_data.get('tags_sugeridas', []),
-                            'featured_media': featured_media_id,
-                            'meta': yoast_meta,
-                        }
-
-                        wp_post_id = wp_client.create_post(post_payload)
-
-                        if wp_post_id:
-                            db.save_processed_post(article_db_id, wp_post_id)
-                            logger.info(f"Successfully published post {wp_post_id} for article DB ID {article_db_id}")
-                            processed_articles_in_cycle += 1
-                        else:
-                            logger.error(f"Failed to publish post for {article_url_to_process}")
-                            db.update_article_status(article_db_id, 'FAILED', reason="WordPress publishing failed")
-
-                        # Per-article delay to respect API rate limits.
-                        delay = 120
-                        logger.info(f"Sleeping for {delay}s (per-article delay).")
-                        time.sleep(delay)
-
-                    except Exception as e:
-                        logger.error(f"Error processing article {article_url_to_process or article_data.get('title', 'N/A')}: {e}", exc_info=True)
-                        db.update_article_status(article_db_id, 'FAILED', reason=str(e))
-
-                # If we reach here without a feed-level exception, the processing was successful
-                db.reset_consecutive_failures(source_id)
+        # If we reach here without a feed-level exception, the processing was successful
+        db.reset_consecutive_failures(source_id)
 
-            except Exception as e:
-                logger.error(f"Error processing feed {source_id}: {e}", exc_info=True)
-                db.increment_consecutive_failures(source_id)
+    except Exception as e:
+        logger.error(f"Error processing feed {source_id}: {e}", exc_info=True)
+        db.increment_consecutive_failures(source_id)
+        result['error'] = True
+
+    return result
+
+
+def run_pipeline_cycle():
+    """Executes a full cycle of the content processing pipeline (every feed, in PIPELINE_ORDER)."""
+    logger.info("Starting new pipeline cycle.")
+    ctx = PipelineContext()
+    if not ctx.acquire_lease():
+        ctx.close()
+        return
+    heartbeat.cycle_started()
+
+    processed_articles_in_cycle = 0
+
+    try:
+        for i, source_id in enumerate(PIPELINE_ORDER):
+            result = process_feed(ctx, source_id)
+            processed_articles_in_cycle += result['published']
+            if result['skipped'] or not (result['new'] or result['error']):
+                continue
 
             # Per-feed delay before processing the next source
             if i < len(PIPELINE_ORDER) - 1:
                 next_feed = PIPELINE_ORDER[i + 1]
                 delay = SCHEDULE_CONFIG.get('per_feed_delay_seconds', 15)
                 logger.info(f"Finished feed '{source_id}'. Sleeping for {delay}s before next feed: {next_feed}")
+                heartbeat.set_stage(heartbeat.SLEEP, source_id)
                 time.sleep(delay)
 
     finally:
         logger.info(f"Pipeline cycle completed. Processed {processed_articles_in_cycle} articles.")
-        db.close()
-        wp_client.close()
+        heartbeat.cycle_finished()
+        ctx.close()
+
+
+def run_feed_job(source_id: str, policy: Optional[AdaptivePollingPolicy] = None,
+                 ctx: Optional[PipelineContext] = None) -> Optional[float]:
+    """
+    Scheduler entry point for a single feed.
+
+    Args:
+        ctx: The scheduler's long-lived context; the run only calls its
+            `end_run()`. Without one, a context is built and closed for the run.
+
+    Returns:
+        The next poll interval in seconds, or None when the run was skipped
+        because another run holds the lease.
+    """
+    policy = policy or AdaptivePollingPolicy()
+    owned = ctx is None
+    if owned:
+        ctx = PipelineContext()
+    else:
+        ctx.reload_link_map()
+    if not ctx.acquire_lease():
+        if owned:
+            ctx.close()
+        return None
+    heartbeat.cycle_started()
+
+    try:
+        state = ctx.db.get_feed_poll_state(source_id)
+        validators = state.get('validators') or {}
+        result = process_feed(ctx, source_id, validators=validators)
+
+        state = policy.update(state, result, time.time(), RSS_FEEDS.get(source_id, {}))
+        state['validators'] = validators
+        ctx.db.save_feed_poll_state(source_id, state)
+        logger.info(
+            f"Feed '{source_id}': {result['new']} new item(s){' (304)' if result['not_modified'] else ''}, "
+            f"rate ~{state.get('rate_per_hour') or 0:.2f}/h → next poll in {state['interval_seconds'] / 60:.1f} min."
+        )
+        return state['interval_seconds']
+    finally:
+        heartbeat.cycle_finished()
+        if owned:
+            ctx.close()
+        else:
+            ctx.end_run()
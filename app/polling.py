@@ -0,0 +1,91 @@
+"""
+Adaptive per-feed polling.
+
+Each feed gets its own scheduler job. After every poll the interval is
+recomputed from an exponentially weighted estimate of the feed's publication
+rate (new items per hour) and its recent history of empty/304 polls: busy
+feeds converge towards `target_items_per_poll` new items per poll, idle feeds
+back off geometrically, and every feed stays within its min/max bounds.
+"""
+
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+from .config import POLLING_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptivePollingPolicy:
+    """Computes the next poll interval of a feed from its poll history."""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = dict(POLLING_CONFIG)
+        self.config.update(config or {})
+
+    def bounds(self, feed_config: Dict[str, Any]) -> Tuple[float, float]:
+        """(min, max) interval in seconds, honouring a per-feed 'poll' override."""
+        poll = (feed_config or {}).get('poll', {})
+        low = poll.get('min_minutes', self.config['min_interval_minutes']) * 60.0
+        high = poll.get('max_minutes', self.config['max_interval_minutes']) * 60.0
+        return low, max(low, high)
+
+    def clamp(self, interval: float, feed_config: Dict[str, Any]) -> float:
+        low, high = self.bounds(feed_config)
+        return min(high, max(low, interval))
+
+    def initial_interval(self, feed_config: Dict[str, Any]) -> float:
+        return self.clamp(self.config['initial_interval_minutes'] * 60.0, feed_config)
+
+    def jitter_seconds(self, interval: float) -> int:
+        return int(interval * self.config['jitter_fraction'])
+
+    def update(self, state: Dict[str, Any], result: Dict[str, Any], now: float,
+               feed_config: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Folds one poll result (see `pipeline.process_feed`) into the feed state.
+
+        Returns:
+            A new state dict with 'interval_seconds' set to the next poll interval.
+        """
+        state = dict(state)
+        interval = state.get('interval_seconds') or self.initial_interval(feed_config)
+        backoff = self.config['backoff_factor']
+
+        if result.get('skipped') or result.get('error'):
+            # Circuit breaker or fetch/parse failure: poll less often, learn nothing about the rate
+            state['interval_seconds'] = self.clamp(interval * backoff, feed_config)
+            state['last_polled_at'] = now
+            return state
+
+        new_items = result.get('new', 0)
+        last_polled_at = state.get('last_polled_at')
+        rate = state.get('rate_per_hour') or 0.0
+        if last_polled_at:
+            # The first poll sees the whole backlog of the feed, so it does not count towards the rate
+            elapsed_hours = max(now - last_polled_at, 1.0) / 3600.0
+            alpha = self.config['ewma_alpha']
+            rate = alpha * (new_items / elapsed_hours) + (1 - alpha) * rate
+
+        if new_items:
+            state['empty_streak'] = 0
+            state['last_new_at'] = now
+        else:
+            state['empty_streak'] = (state.get('empty_streak') or 0) + 1
+        if result.get('not_modified'):
+            state['not_modified_streak'] = (state.get('not_modified_streak') or 0) + 1
+        else:
+            state['not_modified_streak'] = 0
+
+        _, high = self.bounds(feed_config)
+        target = 3600.0 * self.config['target_items_per_poll'] / rate if rate > 0 else high
+        if new_items:
+            # Fresh items: move towards the rate-based target, but at least speed up a step
+            interval = min(target, interval / backoff)
+        else:
+            interval = max(target, interval * backoff)
+
+        state['rate_per_hour'] = rate
+        state['interval_seconds'] = self.clamp(interval, feed_config)
+        state['last_polled_at'] = now
+        return state
@@ -8,6 +8,8 @@ import pytz
 import requests
 from bs4 import BeautifulSoup, Tag
 
+from . import transport
+
 logger = logging.getLogger(__name__)
 
 USER_AGENT = "Mozilla/5.0 (compatible; PythonNewsScraper/1.0; +https://github.com/)"
@@ -134,7 +136,7 @@ def scrape(source_key: str, url: str) -> List[Dict]:
         raise ValueError(f"Nenhum scraper encontrado para a fonte: {source_key}")
 
     try:
-        response = requests.get(url, headers={"User-Agent": USER_AGENT}, timeout=15)
+        response = transport.session(transport.PAGES, headers={"User-Agent": USER_AGENT}).get(url, timeout=15)
         response.raise_for_status()
         soup = BeautifulSoup(response.content, "lxml")
         return scraper_func(soup, url)
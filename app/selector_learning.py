@@ -0,0 +1,204 @@
+"""
+Learned per-domain content selectors.
+
+Outlets without a site profile (app/site_rules.py) go through the generic
+extractor: the heavy pre-clean, then trafilatura over the whole tree. Most of
+them render every article with the same template, so trafilatura's output
+keeps coming from the same DOM container. Each generic extraction reports
+which container that was (the deepest element holding the extracted
+paragraphs, as a CSS selector unique on the page) and `SelectorLearner`
+keeps the last `window` reports per domain:
+
+- learning: once one selector accounts for `confidence` of the recent pages,
+  and for at least `min_observations` of them, it is promoted;
+- promoted: the domain's pages are extracted from that container (one
+  selector lookup plus the usual cleanup) and trafilatura is skipped; every
+  `validate_every`-th page still runs trafilatura and the container text is
+  compared with its output;
+- a validation below `min_similarity`, or a page the selector no longer
+  matches, demotes the domain back to learning (the site changed template).
+
+The learner lives in the pipeline process and its state is kept in the
+database. Extraction workers only get the plan for one page (`plan()`, a
+small dict) and fill in its report, which travels back with the result
+(app/extract_pool.py) and is handed to `observe()`.
+"""
+
+import logging
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import soupsieve
+from bs4 import BeautifulSoup, Tag
+
+from . import site_rules
+from .config import SELECTOR_LEARNING_CONFIG
+from .store import Database
+
+logger = logging.getLogger(__name__)
+
+# Paragraphs shorter than this are too generic to locate (captions, bylines)
+MIN_PARAGRAPH_CHARS = 40
+MAX_PARAGRAPHS = 40
+MIN_MATCHED_PARAGRAPHS = 3
+# Share of the matched paragraphs the container must hold
+COVERAGE = 0.8
+
+# Numbers and hashes in ids/classes change from page to page (post-12345, css-1x2y3z)
+_UNSTABLE_TOKEN_RE = re.compile(r'\d{3,}|[0-9a-f]{8,}|^css-', re.I)
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def _key(text: str) -> str:
+    # Whitespace differs between the page and trafilatura's output; compare without it
+    return ''.join(text.split())
+
+
+def locate_container(soup: BeautifulSoup, content_html: str) -> Optional[Tag]:
+    """The deepest element of `soup` holding most of the paragraphs of an extraction, or None."""
+    wanted = set()
+    for p in BeautifulSoup(content_html, 'lxml').find_all('p'):
+        text = p.get_text()
+        if len(text.strip()) >= MIN_PARAGRAPH_CHARS:
+            wanted.add(_key(text))
+            if len(wanted) >= MAX_PARAGRAPHS:
+                break
+    if len(wanted) < MIN_MATCHED_PARAGRAPHS:
+        return None
+    matched = [p for p in soup.find_all('p') if _key(p.get_text()) in wanted]
+    if len(matched) < MIN_MATCHED_PARAGRAPHS:
+        return None
+
+    counts: Counter = Counter()
+    ancestors: Dict[int, Tag] = {}
+    for p in matched:
+        for parent in p.parents:
+            if parent.name in ('body', 'html', '[document]'):
+                break
+            counts[id(parent)] += 1
+            ancestors[id(parent)] = parent
+    needed = COVERAGE * len(matched)
+    qualifying = [ancestors[key] for key, count in counts.items() if count >= needed]
+    # Qualifying ancestors all hold most of the paragraphs, so they are nested: take the innermost
+    return max(qualifying, key=lambda el: sum(1 for _ in el.parents), default=None)
+
+
+def _stable(token: Any) -> bool:
+    return isinstance(token, str) and 0 < len(token) <= 40 and not _UNSTABLE_TOKEN_RE.search(token)
+
+
+def _own_selectors(el: Tag) -> List[str]:
+    """Selectors for `el` alone, most specific to the template first."""
+    options = []
+    if _stable(el.get('id')):
+        options.append(f"{el.name}#{soupsieve.escape(el['id'])}")
+    classes = [c for c in el.get('class', []) if _stable(c)]
+    options += [f"{el.name}.{soupsieve.escape(c)}" for c in classes]
+    if len(classes) > 1:
+        options.append(el.name + ''.join(f".{soupsieve.escape(c)}" for c in classes))
+    if el.name in ('article', 'main'):
+        options.append(el.name)
+    return options
+
+
+def container_selector(soup: BeautifulSoup, el: Tag) -> Optional[str]:
+    """A CSS selector matching exactly `el` in `soup`, built from stable ids/classes, or None."""
+    own = _own_selectors(el)
+    parent = el.parent
+    scoped = [f"{p} > {s}" for p in (_own_selectors(parent) if isinstance(parent, Tag) else []) for s in own or [el.name]]
+    for selector in own + scoped:
+        found = soup.select(selector, limit=2)
+        if len(found) == 1 and found[0] is el:
+            return selector
+    return None
+
+
+def learn_selector(soup: BeautifulSoup, content_html: str) -> Optional[str]:
+    """The selector of the container an extraction came from, when it can be pinned down."""
+    container = locate_container(soup, content_html)
+    return container_selector(soup, container) if container is not None else None
+
+
+@lru_cache(maxsize=512)
+def _compiled(selector: str) -> Optional[soupsieve.SoupSieve]:
+    try:
+        return soupsieve.compile(selector)
+    except soupsieve.SelectorSyntaxError:
+        logger.warning(f"Ignoring invalid learned selector {selector!r}.")
+        return None
+
+
+def select_container(soup: BeautifulSoup, selector: str) -> Optional[Tag]:
+    matcher = _compiled(selector)
+    return matcher.select_one(soup) if matcher is not None else None
+
+
+def similarity(a_html: str, b_html: str) -> float:
+    """Share of words two HTML fragments have in common (0-1, word multisets)."""
+    a = Counter(_WORD_RE.findall(BeautifulSoup(a_html, 'lxml').get_text(' ').lower()))
+    b = Counter(_WORD_RE.findall(BeautifulSoup(b_html, 'lxml').get_text(' ').lower()))
+    total = max(sum(a.values()), sum(b.values()))
+    return sum((a & b).values()) / total if total else 0.0
+
+
+def _domain(url: str) -> str:
+    return (urlsplit(url).hostname or '').lower().replace('www.', '', 1)
+
+
+class SelectorLearner:
+    """Per-domain learned selectors, kept in the application database."""
+
+    def __init__(self, db: Database, config: Optional[Dict[str, Any]] = None):
+        self.db = db
+        self.config = dict(SELECTOR_LEARNING_CONFIG)
+        self.config.update(config or {})
+        self._domains: Dict[str, Dict[str, Any]] = db.get_learned_selectors() if self.enabled else {}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.config['enabled'])
+
+    def promoted(self, url: str) -> Optional[str]:
+        return (self._domains.get(_domain(url)) or {}).get('selector')
+
+    def plan(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        What the extractor should do for this page: use `selector` (when one is
+        promoted), and whether to `validate` it against trafilatura. None when
+        learning is off or the site has its own extractor.
+        """
+        if not self.enabled:
+            return None
+        profile = site_rules.resolve(url)
+        if profile and (profile.extractor or profile.selector_extraction):
+            return None
+        state = self._domains.get(_domain(url)) or {}
+        selector = state.get('selector')
+        validate = bool(selector) and (state.get('uses', 0) + 1) % max(self.config['validate_every'], 1) == 0
+        return {'selector': selector, 'validate': validate, 'min_chars': self.config['min_chars']}
+
+    def observe(self, url: str, report: Optional[Dict[str, Any]]) -> None:
+        """Records the report of a page extracted with a `plan()`."""
+        if not self.enabled or not report:
+            return
+        domain = _domain(url)
+        state = self._domains.setdefault(domain, {'selector': None, 'recent': [], 'uses': 0})
+        if state.get('selector'):
+            score = report.get('similarity')
+            if report.get('missed') or (score is not None and score < self.config['min_similarity']):
+                why = 'no longer matches' if report.get('missed') else f'similarity {score:.2f}'
+                logger.warning(f"Demoting learned selector {state['selector']!r} for {domain} ({why}).")
+                state.update(selector=None, recent=[], uses=0)
+            elif report.get('fast_path') or score is not None:
+                state['uses'] = state.get('uses', 0) + 1
+        if not state.get('selector') and 'observed' in report:
+            recent = (state.get('recent', []) + [report['observed']])[-self.config['window']:]
+            state['recent'] = recent
+            best, count = (Counter(s for s in recent if s).most_common(1) or [(None, 0)])[0]
+            if best and count >= self.config['min_observations'] and count >= self.config['confidence'] * len(recent):
+                logger.info(f"Promoting learned selector {best!r} for {domain} ({count}/{len(recent)} recent pages).")
+                state.update(selector=best, uses=0)
+        self.db.save_learned_selector(domain, state)
@@ -0,0 +1,195 @@
+"""
+Per-site extraction rules.
+
+Every outlet with special handling has one `SiteProfile`: CSS selector sets
+(content, title, junk, images, related blocks) compiled once with soupsieve,
+plus optional hooks, which are a pre-extraction cleaner applied to the
+parsed page and a dedicated `ContentExtractor` method. `SiteRuleRegistry`
+indexes profiles by reversed domain labels ('br.com.lance'), so resolving a
+URL is a handful of dict lookups, independent of the number of profiles,
+and the most specific suffix wins (ge.globo.com over globo.com).
+
+Profiles are data. The built-in ones are `SITE_RULES` below; more can be
+added (or built-in ones replaced) without code in the JSON file at
+SITE_RULES_CONFIG['path']:
+
+    [{"name": "as", "domains": ["as.com"],
+      "content": "div.art__bo", "title": "h1.art__hdl__tl",
+      "junk": [".sumario", ".cont-art-tags"]}]
+
+A profile with a `content` selector (and no extractor hook) is extracted by
+selector; hooks are referenced by name (see `CLEANER_HOOKS`, and
+`extractor` names a `ContentExtractor` method).
+"""
+
+import json
+import logging
+import os
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+import soupsieve
+from bs4 import BeautifulSoup
+
+from .cleaners import clean_html_for_globo_esporte, clean_html_for_lance
+from .config import SITE_RULES_CONFIG
+
+logger = logging.getLogger(__name__)
+
+CLEANER_HOOKS: Dict[str, Callable[[BeautifulSoup], BeautifulSoup]] = {
+    'globo_esporte': clean_html_for_globo_esporte,
+    'lance': clean_html_for_lance,
+}
+
+SITE_RULES: List[Dict[str, Any]] = [
+    {
+        'name': 'ge',
+        'domains': ['ge.globo.com'],
+        'cleaner': 'globo_esporte',
+        'extractor': '_clean_html_for_ge',
+    },
+    {
+        'name': 'globo',
+        'domains': ['globo.com'],
+        'cleaner': 'globo_esporte',
+    },
+    {
+        'name': 'lance',
+        'domains': ['lance.com.br'],
+        'extractor': '_clean_html_for_lance_definitivo',
+    },
+    {
+        'name': 'infomoney',
+        'domains': ['infomoney.com.br'],
+        'related': [
+            '.single__related', '.article__related', '.post-related', '.related-posts',
+            '.rm-related', '.block-related', '.single__sidebar', '.article__sidebar',
+            'section.single__see-also', '.wp-block-infomoney-blocks-infomoney-read-more',
+        ],
+    },
+    {
+        'name': 'estadao',
+        'domains': ['estadao.com.br'],
+        'related': [
+            '.links-relacionados', '.mat-relacionadas', '.es-relacionadas',
+            '.stories-related', '.see-also', '.link-relacionado', '.box-relacionadas',
+        ],
+    },
+]
+
+SELECTOR_FIELDS = ('content', 'title', 'junk', 'images', 'related')
+
+
+def _compile(selectors: Union[None, str, Iterable[str]]) -> Optional[soupsieve.SoupSieve]:
+    """One compiled matcher for a selector or a list of alternatives."""
+    if not selectors:
+        return None
+    if not isinstance(selectors, str):
+        selectors = ', '.join(selectors)
+    return soupsieve.compile(selectors)
+
+
+def _host(url: str) -> str:
+    host = (urlsplit(url).hostname or '') if '//' in url else url
+    return host.lower().rstrip('.')
+
+
+class SiteProfile:
+    """The rules of one outlet. Selector fields hold compiled matchers (or None)."""
+
+    def __init__(self, name: str, domains: Iterable[str], content=None, title=None, junk=None,
+                 images=None, related=None, cleaner: Optional[str] = None, extractor: Optional[str] = None):
+        self.name = name
+        self.domains = [d.lower().replace('www.', '', 1) for d in domains]
+        self.content = _compile(content)
+        self.title = _compile(title)
+        self.junk = _compile(junk)
+        self.images = _compile(images)
+        self.related = _compile(related)
+        if cleaner and cleaner not in CLEANER_HOOKS:
+            raise ValueError(f"Site profile '{name}': unknown cleaner hook '{cleaner}'")
+        self.cleaner = CLEANER_HOOKS.get(cleaner) if cleaner else None
+        self.extractor = extractor
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'SiteProfile':
+        unknown = set(data) - set(SELECTOR_FIELDS) - {'name', 'domains', 'cleaner', 'extractor'}
+        if unknown:
+            raise ValueError(f"Site profile '{data.get('name')}': unknown fields {sorted(unknown)}")
+        return cls(**data)
+
+    @property
+    def selector_extraction(self) -> bool:
+        """Extracted with the content/title selectors rather than a hook or the generic extractor."""
+        return self.content is not None and not self.extractor
+
+    def remove_related(self, root) -> None:
+        if self.related is not None:
+            for el in self.related.select(root):
+                el.decompose()
+
+    def __repr__(self) -> str:
+        return f"SiteProfile({self.name!r}, {self.domains!r})"
+
+
+class SiteRuleRegistry:
+    """Site profiles indexed by reversed domain labels; the longest registered suffix of a host wins."""
+
+    def __init__(self, rules: Iterable[Dict[str, Any]] = ()):
+        self._by_suffix: Dict[Tuple[str, ...], SiteProfile] = {}
+        self._max_labels = 0
+        for rule in rules:
+            try:
+                self.register(SiteProfile.from_dict(rule))
+            except (ValueError, TypeError, soupsieve.SelectorSyntaxError) as e:
+                logger.error(f"Skipping invalid site rule {rule.get('name')!r}: {e}")
+
+    def register(self, profile: SiteProfile) -> None:
+        for domain in profile.domains:
+            key = tuple(reversed(domain.split('.')))
+            self._by_suffix[key] = profile
+            self._max_labels = max(self._max_labels, len(key))
+        self.resolve.cache_clear()
+
+    @lru_cache(maxsize=4096)
+    def resolve(self, url_or_host: str) -> Optional[SiteProfile]:
+        """The profile for a URL or host name, or None."""
+        labels = tuple(reversed(_host(url_or_host).split('.')))
+        for size in range(min(len(labels), self._max_labels), 0, -1):
+            profile = self._by_suffix.get(labels[:size])
+            if profile is not None:
+                return profile
+        return None
+
+    def profiles(self) -> List[SiteProfile]:
+        return list({id(p): p for p in self._by_suffix.values()}.values())
+
+
+def load_rules(path: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Built-in rules plus the ones in the JSON rules file, which replace built-ins of the same name."""
+    rules = {rule['name']: rule for rule in SITE_RULES}
+    path = path or SITE_RULES_CONFIG['path']
+    if path and os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for rule in json.load(f):
+                    rules[rule['name']] = rule
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.error(f"Could not load site rules from {path}: {e}")
+    return list(rules.values())
+
+
+_registry: Optional[SiteRuleRegistry] = None
+
+
+def registry() -> SiteRuleRegistry:
+    """The process-wide registry, built (and its selectors compiled) on first use."""
+    global _registry
+    if _registry is None:
+        _registry = SiteRuleRegistry(load_rules())
+    return _registry
+
+
+def resolve(url: str) -> Optional[SiteProfile]:
+    return registry().resolve(url)
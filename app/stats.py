@@ -0,0 +1,244 @@
+"""
+Read side of the dashboard statistics.
+
+All reads go through a small pool of read-only SQLite connections that are
+opened once and reused, and every query result sits behind a short TTL cache. Totals
+come from the `stats_counters` table that `Database` maintains in the same
+transaction as its writes, so no request ever runs a full `COUNT(*)` scan.
+"""
+
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+from .events import event_row_to_dict
+from .metrics import load_performance
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """A tiny thread-safe cache whose entries expire after `ttl` seconds."""
+
+    def __init__(self, ttl: float = 5.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data: Dict[Any, Tuple[float, Any]] = {}
+
+    def get_or_set(self, key: Any, loader: Callable[[], Any]) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            hit = self._data.get(key)
+            if hit and hit[0] > now:
+                return hit[1]
+        value = loader()
+        with self._lock:
+            self._data[key] = (now + self.ttl, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class StatsService:
+    """Cheap, cached, read-only statistics for the dashboard."""
+
+    def __init__(self, db_path: Path, ttl_seconds: float = 5.0, pool_size: int = 4):
+        self.db_path = Path(db_path)
+        self.cache = TTLCache(ttl_seconds)
+        self._pool: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(maxsize=pool_size)
+
+    def _open(self) -> sqlite3.Connection:
+        if not self.db_path.exists():
+            raise FileNotFoundError(f"Database not found at {self.db_path}")
+        uri = f"{self.db_path.resolve().as_uri()}?mode=ro"
+        # Web servers hand requests to arbitrary threads; the pool guarantees one user at a time
+        conn = sqlite3.connect(uri, uri=True, timeout=2, check_same_thread=False)
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Borrows a pooled read-only connection, returning it to the pool afterwards."""
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._open()
+        healthy = True
+        try:
+            yield conn
+        except sqlite3.Error:
+            healthy = False
+            raise
+        finally:
+            if healthy:
+                try:
+                    self._pool.put_nowait(conn)
+                    conn = None
+                except queue.Full:
+                    pass
+            if conn is not None:
+                conn.close()
+
+    def _query(self, sql: str, params: tuple = ()) -> List[tuple]:
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def close(self) -> None:
+        """Closes every pooled connection."""
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def _counters(self) -> Dict[str, int]:
+        return {name: value for name, value in self._query("SELECT name, value FROM stats_counters")}
+
+    def get_counters(self) -> Dict[str, int]:
+        """All materialised counters, e.g. {'posts': 10, 'posts:lance': 4, ...}."""
+        return self.cache.get_or_set('counters', self._counters)
+
+    def get_overview(self, check_interval_minutes: int = 15) -> Dict[str, Any]:
+        """Totals, recent posts, API usage and an estimate of the next cycle."""
+        return self.cache.get_or_set(('overview', check_interval_minutes),
+                                     lambda: self._overview(check_interval_minutes))
+
+    def _overview(self, check_interval_minutes: int) -> Dict[str, Any]:
+        counters = self._counters()
+
+        recent_posts = self._query('''
+            SELECT sa.source_id, sa.external_id, p.wp_post_id, p.created_at
+            FROM posts p
+            LEFT JOIN seen_articles sa ON sa.id = p.seen_article_id
+            ORDER BY p.created_at DESC
+            LIMIT 10
+        ''')
+
+        api_usage = self._query('''
+            SELECT api_type, SUM(usage_count) as usage_count
+            FROM api_usage
+            WHERE last_used > datetime('now', '-24 hours')
+            GROUP BY api_type
+        ''')
+
+        rows = self._query('''
+            SELECT MAX(inserted_at) FROM seen_articles
+            WHERE inserted_at > datetime('now', '-2 hours')
+        ''')
+        last_activity = rows[0][0] if rows and rows[0][0] else None
+
+        next_cycle = datetime.now() + timedelta(minutes=check_interval_minutes)
+        if last_activity:
+            try:
+                last_time = datetime.strptime(str(last_activity)[:19], '%Y-%m-%d %H:%M:%S')
+                candidate = last_time + timedelta(minutes=check_interval_minutes)
+                if candidate >= datetime.now():
+                    next_cycle = candidate
+            except (ValueError, TypeError):
+                pass
+
+        return {
+            'seen_articles': counters.get('seen_articles', 0),
+            'published_posts': counters.get('posts', 0),
+            'failures': counters.get('failures', 0),
+            'recent_posts': [tuple(r) for r in recent_posts],
+            'api_usage': dict(api_usage),
+            'next_cycle': next_cycle.strftime('%H:%M:%S'),
+        }
+
+    def get_feed_stats(self, source_ids: List[str]) -> Dict[str, Dict[str, int]]:
+        """Per-feed article counts for the last 24h and published totals, in one grouped query."""
+        return self.cache.get_or_set(('feeds', tuple(source_ids)), lambda: self._feed_stats(source_ids))
+
+    def _feed_stats(self, source_ids: List[str]) -> Dict[str, Dict[str, int]]:
+        recent = dict(self._query('''
+            SELECT source_id, COUNT(*) FROM seen_articles
+            WHERE inserted_at > strftime('%Y-%m-%d %H:%M:%f', 'now', '-24 hours')
+            GROUP BY source_id
+        '''))
+        counters = self._counters()
+        return {
+            source_id: {
+                'recent_articles': recent.get(source_id, 0),
+                'published_posts': counters.get(f'posts:{source_id}', 0),
+            }
+            for source_id in source_ids
+        }
+
+    def get_performance(self, hours: int) -> Dict[str, Any]:
+        """Stage latency/throughput rollups (see `app.metrics.load_performance`)."""
+        def _load():
+            with self.connection() as conn:
+                return load_performance(conn, hours=hours)
+        return self.cache.get_or_set(('performance', hours), _load)
+
+    def get_last_event_id(self) -> int:
+        """Id of the newest pipeline event (not cached: it is the stream's starting point)."""
+        rows = self._query("SELECT COALESCE(MAX(id), 0) FROM pipeline_events")
+        return rows[0][0] if rows else 0
+
+    def get_events_after(self, last_id: int, limit: int = 100) -> List[Dict[str, Any]]:
+        """Pipeline events newer than `last_id`, oldest first (primary-key range scan)."""
+        rows = self._query('''
+            SELECT id, event_type, source_id, article_id, payload, created_at
+            FROM pipeline_events WHERE id > ? ORDER BY id LIMIT ?
+        ''', (last_id, limit))
+        return [event_row_to_dict(r) for r in rows]
+
+    def get_gate_rejections(self, limit: int = 100, rule: str | None = None,
+                            unreviewed: bool = False) -> List[Dict[str, Any]]:
+        """Recent pre-AI gate rejections, newest first, with the article's current status (not cached: reviewed live)."""
+        where, params = [], []
+        if rule:
+            where.append("g.rule = ?")
+            params.append(rule)
+        if unreviewed:
+            where.append("g.review IS NULL")
+        with self.connection() as conn:
+            conn.row_factory = sqlite3.Row
+            try:
+                rows = conn.execute(f'''
+                    SELECT g.id, g.article_id, g.source_id, g.url, g.title, g.rule, g.detail, g.signals, g.mode,
+                           g.review, g.created_at, g.reviewed_at, a.status AS article_status
+                    FROM gate_rejections g LEFT JOIN seen_articles a ON a.id = g.article_id
+                    {'WHERE ' + ' AND '.join(where) if where else ''}
+                    ORDER BY g.id DESC LIMIT ?
+                ''', (*params, limit)).fetchall()
+            finally:
+                conn.row_factory = None
+        rejections = []
+        for row in rows:
+            rejection = dict(row)
+            rejection['signals'] = json.loads(rejection['signals']) if rejection['signals'] else {}
+            rejections.append(rejection)
+        return rejections
+
+    def get_heartbeat(self) -> Dict[str, Any] | None:
+        """The scheduler's heartbeat row (not cached: status must reflect the latest beat)."""
+        with self.connection() as conn:
+            conn.row_factory = sqlite3.Row
+            try:
+                row = conn.execute("SELECT * FROM process_heartbeat WHERE id = 1").fetchone()
+            finally:
+                conn.row_factory = None
+        return dict(row) if row else None
+
+    def get_lease(self, name: str) -> Dict[str, Any] | None:
+        """The named lease if it is currently held (not expired), else None."""
+        rows = self._query(
+            "SELECT owner, acquired_at, expires_at FROM cycle_lease WHERE name = ? AND expires_at > ?",
+            (name, time.time())
+        )
+        if not rows:
+            return None
+        owner, acquired_at, expires_at = rows[0]
+        return {'owner': owner, 'acquired_at': acquired_at, 'expires_at': expires_at}
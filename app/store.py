@@ -5,24 +5,30 @@ Database management for the application using SQLite.
 
 import sqlite3
 import hashlib
+import json
 import logging
+import time
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import List, Dict, Any
 
 from .config import PIPELINE_ORDER
+from . import events
+from .urlnorm import canonical_url
 
 logger = logging.getLogger(__name__)
 
 class Database:
     """Handles all database operations for the application."""
 
-    def __init__(self, db_path: str = 'data/app.db'):
+    def __init__(self, db_path: str = 'data/app.db', check_same_thread: bool = True):
         """
         Initializes the database connection.
 
         Args:
             db_path: The path to the SQLite database file.
+            check_same_thread: False for a connection handed to another thread
+                (never used by two threads at once).
         """
         db_file = Path(db_path)
         db_file.parent.mkdir(parents=True, exist_ok=True)
@@ -30,8 +36,11 @@ class Database:
         self.db_path = db_path
         self.conn = None
         try:
-            self.conn = sqlite3.connect(self.db_path, detect_types=sqlite3.PARSE_DECLTYPES, timeout=10)
+            self.conn = sqlite3.connect(self.db_path, detect_types=sqlite3.PARSE_DECLTYPES, timeout=10,
+                                        check_same_thread=check_same_thread)
             self.conn.row_factory = sqlite3.Row
+            # WAL lets the dashboard's read-only connections run without blocking pipeline writes
+            self.conn.execute("PRAGMA journal_mode=WAL")
         except sqlite3.Error as e:
             logger.critical(f"Database connection error: {e}")
             raise
@@ -56,12 +65,25 @@ class Database:
                     url TEXT,
                     published_at DATETIME,
                     inserted_at DATETIME DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now')),
-                    status TEXT DEFAULT 'NEW', -- NEW, PROCESSING, REWRITTEN, PUBLISHED, FAILED, DEFERRED
+                    status TEXT DEFAULT 'NEW', -- NEW, PROCESSING, REWRITTEN, PUBLISHED, FAILED, DEFERRED, DUPLICATE, REJECTED
                     retry_at DATETIME,
                     fail_reason TEXT,
+                    fail_count INTEGER NOT NULL DEFAULT 0,
+                    url_key TEXT,
                     UNIQUE(source_id, external_id)
                 )
             ''')
+            # Bancos criados antes da coluna fail_count (usada ao adiar um artigo com DEFERRED)
+            columns = {row[1] for row in cursor.execute("PRAGMA table_info(seen_articles)")}
+            if 'fail_count' not in columns:
+                cursor.execute("ALTER TABLE seen_articles ADD COLUMN fail_count INTEGER NOT NULL DEFAULT 0")
+            # URL canônica (app/urlnorm.py): o mesmo artigo não entra duas vezes, mesmo por outro feed/URL
+            if 'url_key' not in columns:
+                cursor.execute("ALTER TABLE seen_articles ADD COLUMN url_key TEXT")
+                rows = cursor.execute("SELECT id, url FROM seen_articles WHERE url IS NOT NULL").fetchall()
+                cursor.executemany("UPDATE seen_articles SET url_key = ? WHERE id = ?",
+                                   [(canonical_url(row[1]), row[0]) for row in rows])
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_seen_articles_url_key ON seen_articles (url_key)")
             # Tabela para rastrear posts publicados no WordPress
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS posts (
@@ -121,12 +143,618 @@ class Database:
                     failed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
             ''')
+
+            # Rollups horárias de métricas (totais + histograma) para o painel de performance
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS metric_rollups (
+                    metric TEXT NOT NULL,
+                    label TEXT NOT NULL DEFAULT '',
+                    bucket_start TEXT NOT NULL,
+                    count INTEGER NOT NULL DEFAULT 0,
+                    sum_ms REAL NOT NULL DEFAULT 0,
+                    max_ms REAL NOT NULL DEFAULT 0,
+                    PRIMARY KEY (metric, label, bucket_start)
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS metric_histogram (
+                    metric TEXT NOT NULL,
+                    label TEXT NOT NULL DEFAULT '',
+                    bucket_start TEXT NOT NULL,
+                    bin INTEGER NOT NULL,
+                    count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (metric, label, bucket_start, bin)
+                )
+            ''')
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_metric_rollups_bucket ON metric_rollups (bucket_start)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_metric_histogram_bucket ON metric_histogram (bucket_start)")
+
+            # Contadores materializados para o dashboard (atualizados na mesma transação das escritas)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS stats_counters (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            # Eventos do pipeline consumidos pelo stream SSE do dashboard
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS pipeline_events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    event_type TEXT NOT NULL,
+                    source_id TEXT,
+                    article_id INTEGER,
+                    payload TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            # Heartbeat do processo agendador (linha única, lida pelo dashboard)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS process_heartbeat (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    pid INTEGER,
+                    hostname TEXT,
+                    mode TEXT,
+                    started_at TEXT,
+                    stage TEXT,
+                    stage_since TEXT,
+                    source_id TEXT,
+                    article_id INTEGER,
+                    article_url TEXT,
+                    cycle_started_at TEXT,
+                    next_run_at TEXT,
+                    updated_at TEXT
+                )
+            ''')
+            # Lease do ciclo: garante um único ciclo por vez entre processos/hosts
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS cycle_lease (
+                    name TEXT PRIMARY KEY,
+                    owner TEXT NOT NULL,
+                    acquired_at REAL NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            ''')
+            # Canal de controle dashboard -> agendador (ex.: 'run_now')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS control_commands (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    command TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    consumed_at REAL
+                )
+            ''')
+            # Estado do polling adaptativo por feed
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS feed_poll_state (
+                    source_id TEXT PRIMARY KEY,
+                    interval_seconds REAL,
+                    rate_per_hour REAL DEFAULT 0,
+                    empty_streak INTEGER DEFAULT 0,
+                    not_modified_streak INTEGER DEFAULT 0,
+                    last_polled_at REAL,
+                    last_new_at REAL,
+                    validators TEXT
+                )
+            ''')
+            # Cache de resultados de extração (chave: URL normalizada + hash do HTML + versão do extrator)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS extraction_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    result BLOB NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            ''')
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_extraction_cache_access ON extraction_cache (last_access)")
+            # Impressões digitais (SimHash) das matérias publicadas recentemente, para detectar duplicatas
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS story_fingerprints (
+                    article_id INTEGER PRIMARY KEY,
+                    source_id TEXT NOT NULL,
+                    url TEXT,
+                    title TEXT,
+                    simhash INTEGER NOT NULL,
+                    wp_post_id INTEGER,
+                    created_at REAL NOT NULL
+                )
+            ''')
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_story_fingerprints_created ON story_fingerprints (created_at)")
+            # Impressões digitais de blocos repetidos por domínio (app/boilerplate.py)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS boilerplate_fingerprints (
+                    domain TEXT NOT NULL,
+                    fingerprint TEXT NOT NULL,
+                    score REAL NOT NULL,
+                    last_seen REAL NOT NULL,
+                    PRIMARY KEY (domain, fingerprint)
+                )
+            ''')
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_boilerplate_last_seen ON boilerplate_fingerprints (last_seen)")
+            # Artigos barrados pelo filtro antes da IA (app/gating.py), para auditoria de falsos positivos
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS gate_rejections (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    article_id INTEGER NOT NULL,
+                    source_id TEXT,
+                    url TEXT,
+                    title TEXT,
+                    rule TEXT NOT NULL,
+                    detail TEXT,
+                    signals TEXT,
+                    mode TEXT NOT NULL, -- enforce, shadow
+                    review TEXT, -- NULL, released (falso positivo, artigo volta para a fila), confirmed
+                    created_at REAL NOT NULL,
+                    reviewed_at REAL
+                )
+            ''')
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_gate_rejections_article ON gate_rejections (article_id)")
+            # Seletores de conteúdo aprendidos por domínio (estado JSON de app/selector_learning.py)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS learned_selectors (
+                    domain TEXT PRIMARY KEY,
+                    state TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            ''')
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_seen_articles_inserted_source ON seen_articles (inserted_at, source_id)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_posts_created_at ON posts (created_at)")
+            cursor.execute("SELECT COUNT(*) FROM stats_counters")
+            if cursor.fetchone()[0] == 0:
+                self._backfill_counters(cursor)
             self.conn.commit()
             logger.info("Database initialized successfully.")
         except sqlite3.Error as e:
             logger.error(f"Database initialization failed: {e}", exc_info=True)
             raise
 
+    @staticmethod
+    def _bump_counter(cursor, name: str, delta: int = 1) -> None:
+        """Adjusts a materialised counter. Must run inside the caller's transaction."""
+        if not delta:
+            return
+        cursor.execute(
+            "INSERT INTO stats_counters (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, delta)
+        )
+
+    @staticmethod
+    def _add_event(cursor, event_type: str, article_id: int | None = None,
+                   source_id: str | None = None, payload: Dict[str, Any] | None = None) -> None:
+        """Appends a pipeline event. Must run inside the caller's transaction."""
+        if source_id is None and article_id is not None:
+            cursor.execute(
+                "INSERT INTO pipeline_events (event_type, source_id, article_id, payload) "
+                "SELECT ?, source_id, id, ? FROM seen_articles WHERE id = ?",
+                (event_type, json.dumps(payload or {}), article_id)
+            )
+            if cursor.rowcount:
+                return
+        cursor.execute(
+            "INSERT INTO pipeline_events (event_type, source_id, article_id, payload) VALUES (?, ?, ?, ?)",
+            (event_type, source_id, article_id, json.dumps(payload or {}))
+        )
+
+    def record_event(self, event_type: str, article_id: int | None = None,
+                     source_id: str | None = None, **payload: Any) -> None:
+        """Records a pipeline event for the dashboard's live stream."""
+        try:
+            cursor = self._get_cursor()
+            self._add_event(cursor, event_type, article_id, source_id, payload)
+            self.conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Failed to record pipeline event '{event_type}': {e}")
+            self.conn.rollback()
+
+    def prune_events(self, keep: int) -> int:
+        """Keeps only the newest `keep` pipeline events."""
+        try:
+            cursor = self._get_cursor()
+            cursor.execute(
+                "DELETE FROM pipeline_events WHERE id <= (SELECT COALESCE(MAX(id), 0) FROM pipeline_events) - ?",
+                (keep,)
+            )
+            deleted = cursor.rowcount
+            self.conn.commit()
+            return deleted
+        except sqlite3.Error as e:
+            logger.error(f"Failed to prune pipeline events: {e}")
+            self.conn.rollback()
+            return 0
+
+    HEARTBEAT_COLUMNS = ('pid', 'hostname', 'mode', 'started_at', 'stage', 'stage_since', 'source_id',
+                         'article_id', 'article_url', 'cycle_started_at', 'next_run_at', 'updated_at')
+
+    def write_heartbeat(self, row: Dict[str, Any]) -> None:
+        """Upserts the single heartbeat row."""
+        values = [row.get(col) for col in self.HEARTBEAT_COLUMNS]
+        columns = ', '.join(self.HEARTBEAT_COLUMNS)
+        placeholders = ', '.join('?' for _ in self.HEARTBEAT_COLUMNS)
+        updates = ', '.join(f"{col} = excluded.{col}" for col in self.HEARTBEAT_COLUMNS)
+        try:
+            cursor = self._get_cursor()
+            cursor.execute(
+                f"INSERT INTO process_heartbeat (id, {columns}) VALUES (1, {placeholders}) "
+                f"ON CONFLICT(id) DO UPDATE SET {updates}",
+                values
+            )
+            self.conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Failed to write heartbeat: {e}")
+            self.conn.rollback()
+
+    def clear_heartbeat(self, pid: int) -> None:
+        """Removes the heartbeat row if it still belongs to `pid`."""
+        try:
+            cursor = self._get_cursor()
+            cursor.execute("DELETE FROM process_heartbeat WHERE id = 1 AND pid = ?", (pid,))
+            self.conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Failed to clear heartbeat: {e}")
+            self.conn.rollback()
+
+    def acquire_lease(self, name: str, owner: str, ttl_seconds: float) -> bool:
+        """
+        Takes the named lease if it is free, expired or already ours.
+
+        Returns:
+            True if `owner` holds the lease after the call.
+        """
+        now = time.time()
+        try:
+            cursor = self._get_cursor()
+            cursor.execute(
+                """
+                INSERT INTO cycle_lease (name, owner, acquired_at, expires_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET
+                    owner = excluded.owner,
+                    acquired_at = excluded.acquired_at,
+                    expires_at = excluded.expires_at
+                WHERE cycle_lease.expires_at < ? OR cycle_lease.owner = excluded.owner
+                """,
+                (name, owner, now, now + ttl_seconds, now)
+            )
+            acquired = cursor.rowcount == 1
+            self.conn.commit()
+            return acquired
+        except sqlite3.Error as e:
+            logger.error(f"Failed to acquire lease '{name}': {e}")
+            self.conn.rollback()
+            return False
+
+    def renew_lease(self, name: str, owner: str, ttl_seconds: float) -> bool:
+        """Extends a lease we hold. Returns False if it was lost."""
+        try:
+            cursor = self._get_cursor()
+            cursor.execute(
+                "UPDATE cycle_lease SET expires_at = ? WHERE name = ? AND owner = ?",
+                (time.time() + ttl_seconds, name, owner)
+            )
+            renewed = cursor.rowcount == 1
+            self.conn.commit()
+            return renewed
+        except sqlite3.Error as e:
+            logger.error(f"Failed to renew lease '{name}': {e}")
+            self.conn.rollback()
+            return False
+
+    def release_lease(self, name: str, owner: str) -> None:
+        """Releases a lease we hold."""
+        try:
+            cursor = self._get_cursor()
+            cursor.execute("DELETE FROM cycle_lease WHERE name = ? AND owner = ?", (name, owner))
+            self.conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Failed to release lease '{name}': {e}")
+            self.conn.rollback()
+
+    def enqueue_command(self, command: str) -> int | None:
+        """Queues a control command for the running scheduler."""
+        try:
+            cursor = self._get_cursor()
+            cursor.execute("INSERT INTO control_commands (command, created_at) VALUES (?, ?)", (command, time.time()))
+            self.conn.commit()
+            return cursor.lastrowid
+        except sqlite3.Error as e:
+            logger.error(f"Failed to enqueue command '{command}': {e}")
+            self.conn.rollback()
+            return None
+
+    def consume_commands(self, max_age_seconds: float = 600) -> List[str]:
+        """Marks pending control commands as consumed and returns them, oldest first. Old ones are dropped."""
+        now = time.time()
+        try:
+            cursor = self._get_cursor()
+            cursor.execute(
+                "SELECT id, command, created_at FROM control_commands WHERE consumed_at IS NULL ORDER BY id"
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                return []
+            cursor.executemany("UPDATE control_commands SET consumed_at = ? WHERE id = ?",
+                               [(now, row['id']) for row in rows])
+            cursor.execute("DELETE FROM control_commands WHERE consumed_at < ?", (now - max_age_seconds,))
+            self.conn.commit()
+            return [row['command'] for row in rows if now - row['created_at'] <= max_age_seconds]
+        except sqlite3.Error as e:
+            logger.error(f"Failed to read control commands: {e}")
+            self.conn.rollback()
+            return []
+
+    POLL_STATE_COLUMNS = ('interval_seconds', 'rate_per_hour', 'empty_streak', 'not_modified_streak',
+                          'last_polled_at', 'last_new_at')
+
+    def get_feed_poll_state(self, source_id: str) -> Dict[str, Any]:
+        """Adaptive polling state of a feed ({} if it was never polled by the scheduler)."""
+        try:
+            cursor = self._get_cursor()
+            cursor.execute("SELECT * FROM feed_poll_state WHERE source_id = ?", (source_id,))
+            row = cursor.fetchone()
+            if not row:
+                return {}
+            state = {col: row[col] for col in self.POLL_STATE_COLUMNS}
+            state['validators'] = json.loads(row['validators']) if row['validators'] else {}
+            return state
+        except (sqlite3.Error, ValueError) as e:
+            logger.error(f"Failed to read poll state for '{source_id}': {e}")
+            return {}
+
+    def save_feed_poll_state(self, source_id: str, state: Dict[str, Any]) -> None:
+        """Upserts the adaptive polling state of a feed."""
+        values = [state.get(col) for col in self.POLL_STATE_COLUMNS]
+        columns = ', '.join(self.POLL_STATE_COLUMNS)
+        placeholders = ', '.join('?' for _ in self.POLL_STATE_COLUMNS)
+        updates = ', '.join(f"{col} = excluded.{col}" for col in self.POLL_STATE_COLUMNS + ('validators',))
+        try:
+            cursor = self._get_cursor()
+            cursor.execute(
+                f"INSERT INTO feed_poll_state (source_id, {columns}, validators) VALUES (?, {placeholders}, ?) "
+                f"ON CONFLICT(source_id) DO UPDATE SET {updates}",
+                [source_id, *values, json.dumps(state.get('validators') or {})]
+            )
+            self.conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Failed to save poll state for '{source_id}': {e}")
+            self.conn.rollback()
+
+    def get_cached_extraction(self, cache_key: str, min_created_at: float) -> bytes | None:
+        """Packed extraction result for the key, if cached after `min_created_at`; refreshes its LRU stamp."""
+        try:
+            cursor = self._get_cursor()
+            cursor.execute(
+                "SELECT result FROM extraction_cache WHERE cache_key = ? AND created_at >= ?",
+                (cache_key, min_created_at)
+            )
+            row = cursor.fetchone()
+            if not row:
+                return None
+            cursor.execute("UPDATE extraction_cache SET last_access = ? WHERE cache_key = ?", (time.time(), cache_key))
+            self.conn.commit()
+            return row[0]
+        except sqlite3.Error as e:
+            logger.error(f"Failed to read extraction cache: {e}")
+            self.conn.rollback()
+            return None
+
+    def save_cached_extraction(self, cache_key: str, url: str, result: bytes) -> None:
+        """Stores (or replaces) a packed extraction result."""
+        now = time.time()
+        try:
+            cursor = self._get_cursor()
+            cursor.execute(
+                "INSERT OR REPLACE INTO extraction_cache (cache_key, url, result, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (cache_key, url, result, now, now)
+            )
+            self.conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Failed to write extraction cache: {e}")
+            self.conn.rollback()
+
+    def prune_extraction_cache(self, min_created_at: float, max_entries: int) -> int:
+        """Drops expired entries, then the least recently used ones above `max_entries`."""
+        try:
+            cursor = self._get_cursor()
+            cursor.execute("DELETE FROM extraction_cache WHERE created_at < ?", (min_created_at,))
+            deleted = cursor.rowcount
+            cursor.execute(
+                "DELETE FROM extraction_cache WHERE cache_key IN ("
+                "SELECT cache_key FROM extraction_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (max_entries,)
+            )
+            deleted += cursor.rowcount
+            self.conn.commit()
+            return deleted
+        except sqlite3.Error as e:
+            logger.error(f"Failed to prune extraction cache: {e}")
+            self.conn.rollback()
+            return 0
+
+    def get_story_fingerprints(self, since: float) -> List[Dict[str, Any]]:
+        """Fingerprints of stories published after `since` (epoch seconds)."""
+        try:
+            cursor = self._get_cursor()
+            cursor.execute(
+                "SELECT article_id, source_id, url, title, simhash, wp_post_id, created_at "
+                "FROM story_fingerprints WHERE created_at >= ?", (since,)
+            )
+            return [dict(row) for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            logger.error(f"Failed to read story fingerprints: {e}")
+            return []
+
+    def save_story_fingerprint(self, article_id: int, source_id: str, url: str, title: str,
+                               simhash: int, wp_post_id: int | None = None) -> None:
+        try:
+            cursor = self._get_cursor()
+            cursor.execute(
+                "INSERT OR REPLACE INTO story_fingerprints "
+                "(article_id, source_id, url, title, simhash, wp_post_id, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (article_id, source_id, url, title, simhash, wp_post_id, time.time())
+            )
+            self.conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Failed to save story fingerprint for article {article_id}: {e}")
+            self.conn.rollback()
+
+    def prune_story_fingerprints(self, before: float) -> int:
+        try:
+            cursor = self._get_cursor()
+            cursor.execute("DELETE FROM story_fingerprints WHERE created_at < ?", (before,))
+            deleted = cursor.rowcount
+            self.conn.commit()
+            return deleted
+        except sqlite3.Error as e:
+            logger.error(f"Failed to prune story fingerprints: {e}")
+            self.conn.rollback()
+            return 0
+
+    def record_gate_rejection(self, article_id: int, source_id: str, url: str, title: str, rule: str,
+                              detail: str, signals: Dict[str, Any], enforce: bool = True) -> None:
+        """Logs a gate rejection; when enforced, the article is also marked REJECTED (one Gemini call avoided)."""
+        try:
+            cursor = self._get_cursor()
+            cursor.execute(
+                "INSERT INTO gate_rejections (article_id, source_id, url, title, rule, detail, signals, mode, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (article_id, source_id, url, title, rule, detail, json.dumps(signals, default=str),
+                 'enforce' if enforce else 'shadow', time.time())
+            )
+            if enforce:
+                cursor.execute("UPDATE seen_articles SET status = 'REJECTED', fail_reason = ? WHERE id = ?",
+                               (f"Gate: {rule} ({detail})", article_id))
+                self._bump_counter(cursor, 'gemini_calls_avoided')
+                self._bump_counter(cursor, f'gemini_calls_avoided:{source_id}')
+                self._add_event(cursor, events.ARTICLE_REJECTED, article_id, payload={'rule': rule, 'detail': detail})
+            self.conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Failed to record gate rejection of article {article_id}: {e}")
+            self.conn.rollback()
+
+    def is_gate_released(self, article_id: int) -> bool:
+        """Whether a rejection of the article was reviewed as a false reject (it then skips the gate)."""
+        try:
+            cursor = self._get_cursor()
+            cursor.execute("SELECT 1 FROM gate_rejections WHERE article_id = ? AND review = 'released' LIMIT 1",
+                           (article_id,))
+            return cursor.fetchone() is not None
+        except sqlite3.Error as e:
+            logger.error(f"Failed to read gate rejections of article {article_id}: {e}")
+            return False
+
+    def review_gate_rejection(self, rejection_id: int, verdict: str) -> bool:
+        """
+        Records the review of a rejection: 'released' (a false reject: the article
+        goes back to the queue as a retry due now, see `get_articles_to_process`,
+        and skips the gate) or 'confirmed'. False if unknown.
+        """
+        if verdict not in ('released', 'confirmed'):
+            raise ValueError(f"Unknown gate review verdict: {verdict!r}")
+        try:
+            cursor = self._get_cursor()
+            cursor.execute("UPDATE gate_rejections SET review = ?, reviewed_at = ? WHERE id = ?",
+                           (verdict, time.time(), rejection_id))
+            if not cursor.rowcount:
+                self.conn.rollback()
+                return False
+            if verdict == 'released':
+                cursor.execute(
+                    "UPDATE seen_articles SET status = 'DEFERRED', retry_at = ?, fail_reason = NULL "
+                    "WHERE status = 'REJECTED' AND id = (SELECT article_id FROM gate_rejections WHERE id = ?)",
+                    (datetime.utcnow(), rejection_id)
+                )
+                self._bump_counter(cursor, 'gate_false_rejects')
+            self.conn.commit()
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Failed to review gate rejection {rejection_id}: {e}")
+            self.conn.rollback()
+            return False
+
+    def get_learned_selectors(self) -> Dict[str, Dict[str, Any]]:
+        """Learned content selector state of every domain."""
+        try:
+            cursor = self._get_cursor()
+            cursor.execute("SELECT domain, state FROM learned_selectors")
+            return {row['domain']: json.loads(row['state']) for row in cursor.fetchall()}
+        except (sqlite3.Error, ValueError) as e:
+            logger.error(f"Failed to read learned selectors: {e}")
+            return {}
+
+    def save_learned_selector(self, domain: str, state: Dict[str, Any]) -> None:
+        """Upserts the learned content selector state of a domain."""
+        try:
+            cursor = self._get_cursor()
+            cursor.execute(
+                "INSERT OR REPLACE INTO learned_selectors (domain, state, updated_at) VALUES (?, ?, ?)",
+                (domain, json.dumps(state), time.time())
+            )
+            self.conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Failed to save learned selector for '{domain}': {e}")
+            self.conn.rollback()
+
+    def get_boilerplate_fingerprints(self, domain: str) -> Dict[str, List[float]]:
+        """Boilerplate fingerprints of a domain: fingerprint -> [score, last_seen]."""
+        try:
+            cursor = self._get_cursor()
+            cursor.execute("SELECT fingerprint, score, last_seen FROM boilerplate_fingerprints WHERE domain = ?",
+                           (domain,))
+            return {row['fingerprint']: [row['score'], row['last_seen']] for row in cursor.fetchall()}
+        except sqlite3.Error as e:
+            logger.error(f"Failed to read boilerplate fingerprints for '{domain}': {e}")
+            return {}
+
+    def save_boilerplate_fingerprints(self, domain: str, rows: List[tuple], dropped: List[str]) -> None:
+        """Upserts (fingerprint, score, last_seen) rows of a domain and deletes the `dropped` fingerprints."""
+        try:
+            cursor = self._get_cursor()
+            cursor.executemany(
+                "INSERT OR REPLACE INTO boilerplate_fingerprints (domain, fingerprint, score, last_seen) "
+                "VALUES (?, ?, ?, ?)",
+                [(domain, *row) for row in rows]
+            )
+            cursor.executemany("DELETE FROM boilerplate_fingerprints WHERE domain = ? AND fingerprint = ?",
+                               [(domain, fp) for fp in dropped])
+            self.conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Failed to save boilerplate fingerprints for '{domain}': {e}")
+            self.conn.rollback()
+
+    def prune_boilerplate_fingerprints(self, before: float) -> int:
+        try:
+            cursor = self._get_cursor()
+            cursor.execute("DELETE FROM boilerplate_fingerprints WHERE last_seen < ?", (before,))
+            deleted = cursor.rowcount
+            self.conn.commit()
+            return deleted
+        except sqlite3.Error as e:
+            logger.error(f"Failed to prune boilerplate fingerprints: {e}")
+            self.conn.rollback()
+            return 0
+
+    def _backfill_counters(self, cursor) -> None:
+        """Seeds the counters from the existing tables (runs once, on an empty counters table)."""
+        logger.info("Backfilling dashboard counters from existing tables...")
+        cursor.execute("SELECT source_id, COUNT(*) FROM seen_articles GROUP BY source_id")
+        for source_id, count in cursor.fetchall():
+            self._bump_counter(cursor, 'seen_articles', count)
+            self._bump_counter(cursor, f'seen_articles:{source_id}', count)
+        cursor.execute('''
+            SELECT sa.source_id, COUNT(*) FROM posts p
+            JOIN seen_articles sa ON sa.id = p.seen_article_id
+            GROUP BY sa.source_id
+        ''')
+        for source_id, count in cursor.fetchall():
+            self._bump_counter(cursor, f'posts:{source_id}', count)
+        cursor.execute("SELECT COUNT(*) FROM posts")
+        self._bump_counter(cursor, 'posts', cursor.fetchone()[0])
+        cursor.execute("SELECT COUNT(*) FROM failures")
+        self._bump_counter(cursor, 'failures', cursor.fetchone()[0])
+        # Guarantees the table is non-empty so the backfill never runs twice
+        self._bump_counter(cursor, 'counters_version', 1)
+
     def filter_new_articles(self, source_id: str, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
         Filters a list of feed items, returning only those not already in the database.
@@ -148,22 +776,33 @@ class Database:
                 if not ext_id:
                     url = item.get("url") or ""
                     if url:
-                        ext_id = hashlib.sha256(url.encode("utf-8")).hexdigest()
+                        ext_id = hashlib.sha256(canonical_url(url).encode("utf-8")).hexdigest()
                         item["id"] = ext_id  # Add it back to the item for later use
                         logger.warning(f"Item for source '{source_id}' missing 'id'. Generated from URL: {item.get('title')}")
                     else:
                         logger.warning(f"Item for source '{source_id}' missing both 'id' and 'url', skipping: {item.get('title', 'No Title')}")
                         continue
 
+                url_key = canonical_url(item.get('url') or '') or None
                 cursor.execute("SELECT id FROM seen_articles WHERE source_id = ? AND external_id = ?", (source_id, ext_id))
-                if cursor.fetchone() is None:
-                    # Item is new, insert it.
-                    cursor.execute(
-                        "INSERT INTO seen_articles (source_id, external_id, url, published_at) VALUES (?, ?, ?, ?)",
-                        (source_id, ext_id, item.get('url'), item.get('published'))
-                    )
-                    item['db_id'] = cursor.lastrowid
-                    new_articles.append(item)
+                if cursor.fetchone() is not None:
+                    continue
+                if url_key:
+                    # Same article under another ID or feed, or a variant of its URL
+                    cursor.execute("SELECT source_id FROM seen_articles WHERE url_key = ? LIMIT 1", (url_key,))
+                    seen = cursor.fetchone()
+                    if seen:
+                        logger.debug(f"Item '{item.get('title')}' already seen via '{seen[0]}' ({url_key}), skipping.")
+                        continue
+                # Item is new, insert it.
+                cursor.execute(
+                    "INSERT INTO seen_articles (source_id, external_id, url, published_at, url_key) VALUES (?, ?, ?, ?, ?)",
+                    (source_id, ext_id, item.get('url'), item.get('published'), url_key)
+                )
+                item['db_id'] = cursor.lastrowid
+                new_articles.append(item)
+            self._bump_counter(cursor, 'seen_articles', len(new_articles))
+            self._bump_counter(cursor, f'seen_articles:{source_id}', len(new_articles))
             self.conn.commit()
         except sqlite3.Error as e:
             logger.error(f"Database error filtering new articles for {source_id}: {e}", exc_info=True)
@@ -190,6 +829,13 @@ class Database:
                 "INSERT INTO posts (seen_article_id, wp_post_id) VALUES (?, ?)",
                 (article_db_id, wp_post_id)
             )
+            cursor.execute("SELECT source_id FROM seen_articles WHERE id = ?", (article_db_id,))
+            row = cursor.fetchone()
+            self._bump_counter(cursor, 'posts')
+            if row:
+                self._bump_counter(cursor, f"posts:{row['source_id']}")
+            self._add_event(cursor, events.POST_PUBLISHED, article_db_id, row['source_id'] if row else None,
+                            {'wp_post_id': wp_post_id})
             self.conn.commit()
             logger.info(f"Successfully recorded published post for article DB ID {article_db_id} (WP Post ID: {wp_post_id}).")
         except sqlite3.IntegrityError:
@@ -267,22 +913,39 @@ class Database:
                         (status, reason, article_id))
                 else:
                     cursor.execute("UPDATE seen_articles SET status = ? WHERE id = ?", (status, article_id))
+            if status == 'FAILED':
+                cursor.execute(
+                    "INSERT INTO failures (source_id, article_url, error_message) "
+                    "SELECT source_id, url, ? FROM seen_articles WHERE id = ?",
+                    (reason, article_id)
+                )
+                self._bump_counter(cursor, 'failures', cursor.rowcount)
+                self._add_event(cursor, events.ARTICLE_FAILED, article_id, payload={'reason': reason})
+            elif status == 'PROCESSING':
+                self._add_event(cursor, events.ARTICLE_CLAIMED, article_id)
             self.conn.commit()
         except sqlite3.Error as e:
             logger.error(f"Failed to update article status for id {article_id}: {e}")
+            self.conn.rollback()
 
-    def get_articles_to_process(self, source_id: str, limit: int) -> list:
-        """Gets new or deferred articles for a given feed source."""
+    def get_articles_to_process(self, source_id: str, limit: int, new_since: datetime | None = None) -> list:
+        """
+        Gets new or deferred articles for a given feed source.
+
+        Args:
+            new_since: When given, NEW articles inserted before it are left out
+                (deferred ones are always returned once due).
+        """
         try:
             cursor = self._get_cursor()
             now = datetime.utcnow()
             # Prioritizes deferred articles that are ready for retry, then new ones.
             cursor.execute("""
-                SELECT id, external_id, url, status FROM seen_articles
-                WHERE source_id = ? AND (status = 'NEW' OR (status = 'DEFERRED' AND retry_at < ?))
-                ORDER BY status DESC, published_at DESC
+                SELECT id, external_id, url, status, published_at FROM seen_articles
+                WHERE source_id = ? AND ((status = 'NEW' AND inserted_at >= ?) OR (status = 'DEFERRED' AND retry_at < ?))
+                ORDER BY status = 'DEFERRED' DESC, published_at DESC
                 LIMIT ?
-            """, (source_id, now, limit))
+            """, (source_id, new_since or datetime.min, now, limit))
             return cursor.fetchall()
         except sqlite3.Error as e:
             logger.error(f"Failed to get articles to process for source_id '{source_id}': {e}")
@@ -314,6 +977,23 @@ class Database:
 
             placeholders = ','.join('?' for _ in article_ids_to_delete)
 
+            # Keep the materialised counters in step with the rows being removed
+            cursor.execute(
+                f"SELECT source_id, COUNT(*) FROM seen_articles WHERE id IN ({placeholders}) GROUP BY source_id",
+                article_ids_to_delete
+            )
+            for source_id, count in cursor.fetchall():
+                self._bump_counter(cursor, 'seen_articles', -count)
+                self._bump_counter(cursor, f'seen_articles:{source_id}', -count)
+            cursor.execute(
+                f"SELECT sa.source_id, COUNT(*) FROM posts p JOIN seen_articles sa ON sa.id = p.seen_article_id "
+                f"WHERE p.seen_article_id IN ({placeholders}) GROUP BY sa.source_id",
+                article_ids_to_delete
+            )
+            for source_id, count in cursor.fetchall():
+                self._bump_counter(cursor, 'posts', -count)
+                self._bump_counter(cursor, f'posts:{source_id}', -count)
+
             cursor.execute(f"DELETE FROM posts WHERE seen_article_id IN ({placeholders})", article_ids_to_delete)
             cursor.execute(f"DELETE FROM seen_articles WHERE id IN ({placeholders})", article_ids_to_delete)
 
@@ -325,6 +1005,61 @@ class Database:
             self.conn.rollback()
             return 0
 
+    def add_metric_rollups(self, totals: Dict, histogram: Dict) -> bool:
+        """
+        Merges pre-aggregated metric deltas into the hourly rollup tables.
+
+        Args:
+            totals: {(metric, label, bucket_start): [count, sum_ms, max_ms]}
+            histogram: {(metric, label, bucket_start, bin): count}
+
+        Returns:
+            True if the deltas were committed.
+        """
+        try:
+            cursor = self._get_cursor()
+            cursor.executemany(
+                """
+                INSERT INTO metric_rollups (metric, label, bucket_start, count, sum_ms, max_ms)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(metric, label, bucket_start) DO UPDATE SET
+                    count = count + excluded.count,
+                    sum_ms = sum_ms + excluded.sum_ms,
+                    max_ms = MAX(max_ms, excluded.max_ms)
+                """,
+                [(m, l, b, int(t[0]), t[1], t[2]) for (m, l, b), t in totals.items()]
+            )
+            cursor.executemany(
+                """
+                INSERT INTO metric_histogram (metric, label, bucket_start, bin, count)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(metric, label, bucket_start, bin) DO UPDATE SET
+                    count = count + excluded.count
+                """,
+                [(m, l, b, i, c) for (m, l, b, i), c in histogram.items()]
+            )
+            self.conn.commit()
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Failed to write metric rollups: {e}")
+            self.conn.rollback()
+            return False
+
+    def prune_metric_rollups(self, cutoff_time: datetime) -> int:
+        """Deletes metric rollup buckets older than the cutoff time."""
+        try:
+            cursor = self._get_cursor()
+            cutoff = cutoff_time.strftime('%Y-%m-%d %H:00:00')
+            cursor.execute("DELETE FROM metric_histogram WHERE bucket_start < ?", (cutoff,))
+            cursor.execute("DELETE FROM metric_rollups WHERE bucket_start < ?", (cutoff,))
+            deleted = cursor.rowcount
+            self.conn.commit()
+            return deleted
+        except sqlite3.Error as e:
+            logger.error(f"Failed to prune metric rollups: {e}")
+            self.conn.rollback()
+            return 0
+
     def close(self):
         """Closes the database connection."""
         if self.conn:
@@ -1,5 +1,3 @@
-import re
-import json
 import logging
 import requests
 from bs4 import BeautifulSoup
@@ -7,28 +5,30 @@ from urllib.parse import urljoin, urlparse
 from datetime import datetime, timezone
 from email.utils import format_datetime
 
+from . import transport
+from .doc_metadata import DocumentMetadata
+from .urlnorm import canonical_url, clean_url
+
 logger = logging.getLogger(__name__)
 
 DEFAULT_UA = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)'
 
 def _request(url, timeout=15):
     """Makes a request with a default user-agent."""
-    return requests.get(url, timeout=timeout, headers={'User-Agent': DEFAULT_UA})
+    return transport.session(transport.PAGES, headers={'User-Agent': DEFAULT_UA}).get(url, timeout=timeout)
 
 def _clean_url(url):
     """Removes common tracking parameters and fragments from a URL."""
-    url = re.sub(r'(\?|&)(utm_[^=]+|gclid|fbclid)=[^&]+', '', url)
-    url = url.split('#')[0]
-    url = re.sub(r'\s+', '', url)
-    return url
+    return clean_url(url)
 
 def _dedupe_keep_order(seq):
-    """Deduplicates a sequence while preserving order."""
+    """Deduplicates (title, url) pairs by canonical URL, keeping the first of each."""
     seen = set()
     out = []
     for x in seq:
-        if x not in seen:
-            seen.add(x)
+        key = canonical_url(x[1]) or x
+        if key not in seen:
+            seen.add(key)
             out.append(x)
     return out
 
@@ -43,32 +43,25 @@ def extract_links_via_jsonld(list_url, limit=12):
         return []
 
     items = []
-    for tag in soup.find_all('script', type='application/ld+json'):
-        try:
-            data = json.loads(tag.string or '')
-        except Exception:
-            continue
-
-        blobs = data if isinstance(data, list) else [data]
-        for blob in blobs:
-            if isinstance(blob, dict) and blob.get('@type') in ('NewsArticle', 'BlogPosting', 'Article'):
-                title = (blob.get('headline') or '').strip()
-                href  = (blob.get('url') or '').strip()
-                if title and href:
-                    full_url = urljoin(list_url, href) if href.startswith('/') else href
-                    items.append((title, full_url))
-
-            if isinstance(blob, dict) and blob.get('@type') == 'ItemList':
-                for it in blob.get('itemListElement') or []:
-                    if isinstance(it, dict):
-                        href = (it.get('url') or '').strip()
-                        name = (it.get('name') or '').strip()
-                        if not href and isinstance(it.get('item'), dict):
-                            href = (it['item'].get('url') or '').strip()
-                            name = name or (it['item'].get('name') or '').strip()
-                        if href and name:
-                            full_url = urljoin(list_url, href) if href.startswith('/') else href
-                            items.append((name, full_url))
+    for blob in DocumentMetadata.from_soup(soup).json_ld_objects:
+        if isinstance(blob, dict) and blob.get('@type') in ('NewsArticle', 'BlogPosting', 'Article'):
+            title = (blob.get('headline') or '').strip()
+            href  = (blob.get('url') or '').strip()
+            if title and href:
+                full_url = urljoin(list_url, href) if href.startswith('/') else href
+                items.append((title, full_url))
+
+        if isinstance(blob, dict) and blob.get('@type') == 'ItemList':
+            for it in blob.get('itemListElement') or []:
+                if isinstance(it, dict):
+                    href = (it.get('url') or '').strip()
+                    name = (it.get('name') or '').strip()
+                    if not href and isinstance(it.get('item'), dict):
+                        href = (it['item'].get('url') or '').strip()
+                        name = name or (it['item'].get('name') or '').strip()
+                    if href and name:
+                        full_url = urljoin(list_url, href) if href.startswith('/') else href
+                        items.append((name, full_url))
 
     # Clean and deduplicate results
     clean_items = _dedupe_keep_order([(t, _clean_url(h)) for t, h in items])
@@ -0,0 +1,145 @@
+"""
+Shared HTTP transport.
+
+Every outbound request goes through a `TransportSession` built by `session()`.
+Sessions of the same host class share one `HTTPAdapter`, so keep-alive pools
+(one per host, sized by TRANSPORT_CONFIG) survive across clients and pipeline
+runs. The host class also sets the retry, backoff and default-timeout policy.
+Each request additionally:
+
+- waits for a per-host slot, so no host gets more than `max_per_host`
+  concurrent requests from this process;
+- negotiates every compression urllib3 can decode here (gzip/deflate, plus
+  br/zstd when `brotli`/`zstandard` are installed);
+- records per-host latency, bytes and error counters in `metrics`.
+
+Host classes:
+    pages      publisher article pages and their lite/AMP versions
+    feeds      RSS feeds and sitemaps
+    media      image downloads
+    wordpress  our WordPress REST API
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+from urllib3.util.retry import Retry
+
+from . import metrics
+from .config import TRANSPORT_CONFIG
+
+logger = logging.getLogger(__name__)
+
+PAGES = 'pages'
+FEEDS = 'feeds'
+MEDIA = 'media'
+WORDPRESS = 'wordpress'
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_lock = threading.Lock()
+_adapters: Dict[str, HTTPAdapter] = {}
+_host_slots: Dict[str, threading.BoundedSemaphore] = {}
+
+
+def _policy(host_class: str) -> Dict[str, Any]:
+    classes = TRANSPORT_CONFIG['classes']
+    if host_class not in classes:
+        raise ValueError(f"Unknown host class: {host_class}")
+    return classes[host_class]
+
+
+def _adapter(host_class: str) -> HTTPAdapter:
+    """The shared adapter (and so the connection pools) of a host class."""
+    with _lock:
+        adapter = _adapters.get(host_class)
+        if adapter is None:
+            policy = _policy(host_class)
+            retries = policy['retries']
+            # Only idempotent methods are retried; a POST that timed out may have been applied
+            retry = Retry(
+                total=retries, connect=retries, read=retries, status=retries,
+                backoff_factor=policy['backoff_factor'],
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+                respect_retry_after_header=True,
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(
+                pool_connections=TRANSPORT_CONFIG['pool_connections'],
+                pool_maxsize=TRANSPORT_CONFIG['pool_maxsize'],
+                max_retries=retry,
+            )
+            _adapters[host_class] = adapter
+        return adapter
+
+
+def _host_slot(host: str) -> threading.BoundedSemaphore:
+    with _lock:
+        slot = _host_slots.get(host)
+        if slot is None:
+            slot = _host_slots[host] = threading.BoundedSemaphore(TRANSPORT_CONFIG['max_per_host'])
+        return slot
+
+
+def _error_kind(error: requests.RequestException) -> str:
+    if isinstance(error, requests.Timeout):
+        return 'timeout'
+    if isinstance(error, requests.ConnectionError):
+        return 'connection'
+    return 'other'
+
+
+def record_bytes(url: str, size: int) -> None:
+    """Counts body bytes read from a streamed response (non-streamed ones are counted automatically)."""
+    metrics.record(metrics.HTTP_BYTES, float(size), urlparse(url).hostname or '')
+
+
+class TransportSession(requests.Session):
+    """A `requests.Session` bound to a host class of the shared transport."""
+
+    def __init__(self, host_class: str):
+        super().__init__()
+        self.host_class = host_class
+        policy = _policy(host_class)
+        self.default_timeout = (policy['connect_timeout'], policy['read_timeout'])
+        self.headers['Accept-Encoding'] = ACCEPT_ENCODING
+        adapter = _adapter(host_class)
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+
+    def request(self, method, url, *args, **kwargs):
+        kwargs.setdefault('timeout', self.default_timeout)
+        host = urlparse(url).hostname or ''
+        started = time.perf_counter()
+        # The slot covers the request and response headers; a streamed body is read after it
+        with _host_slot(host):
+            try:
+                response = super().request(method, url, *args, **kwargs)
+            except requests.RequestException as e:
+                metrics.incr(metrics.HTTP_ERRORS, f"{host}:{_error_kind(e)}")
+                raise
+        metrics.record(metrics.HTTP_LATENCY, (time.perf_counter() - started) * 1000.0, host)
+        if response.status_code >= 400:
+            metrics.incr(metrics.HTTP_ERRORS, f"{host}:{response.status_code}")
+        if not kwargs.get('stream'):
+            metrics.record(metrics.HTTP_BYTES, float(len(response.content or b'')), host)
+        return response
+
+    def close(self) -> None:
+        # The adapters and their pools are shared by every session of the host class
+        pass
+
+
+def session(host_class: str, headers: Optional[Dict[str, str]] = None) -> TransportSession:
+    """A session for `host_class` ('pages', 'feeds', 'media' or 'wordpress')."""
+    s = TransportSession(host_class)
+    if headers:
+        s.headers.update(headers)
+    return s
@@ -0,0 +1,93 @@
+"""
+URL identity.
+
+`canonical_url` is the one key used wherever the pipeline asks "have we seen
+this article/image already?": feed item dedupe, the seen-articles table, the
+extraction cache, the page archive, image upload maps and internal links.
+It folds the variants publishers hand out for the same document:
+
+- scheme and host case, default ports, 'www.' and mobile/AMP hosts
+  ('m.', 'mobile.', 'amp.');
+- AMP paths ('/amp', '/amp/...', '/google/amp/...', '.amp', '.amp.html')
+  and AMP query flags ('amp=1', 'outputType=amp');
+- tracking parameters (utm_*, fbclid, gclid, ...), parameter order,
+  fragments and trailing slashes.
+
+The result is an identity key, not a URL to fetch: the scheme is always
+https and mobile/AMP hosts are folded into the main one. Use `clean_url` to
+tidy a URL that will be fetched or published. Both are LRU-cached, since the
+same URLs come back on every poll.
+"""
+
+import re
+from functools import lru_cache
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+_TRACKING_PREFIXES = ('utm_', 'mc_', 'pk_', '_hs')
+_TRACKING_PARAMS = frozenset({
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'yclid', 'igshid', 'cmpid', 'ref', 'ref_src',
+    '_ga', '_gl', 'ito', 'xtor', 'ocid', 'spm',
+})
+# Query flags that only select the AMP rendering of the same document
+_AMP_PARAMS = {'amp': None, 'outputtype': 'amp', 'output': 'amp'}
+_VARIANT_HOST_PREFIXES = ('www.', 'm.', 'mobile.', 'amp.')
+_AMP_PATH_RE = re.compile(r'^/(?:google/)?amp(?=/)|/amp/?$|\.amp(?=\.html?$)|\.amp$', re.IGNORECASE)
+_SLASHES_RE = re.compile(r'/{2,}')
+
+_CACHE_SIZE = 8192
+
+
+def _is_tracking(key: str) -> bool:
+    key = key.lower()
+    return key.startswith(_TRACKING_PREFIXES) or key in _TRACKING_PARAMS
+
+
+def _is_amp_flag(key: str, value: str) -> bool:
+    expected = _AMP_PARAMS.get(key.lower(), '')
+    return expected is None or (expected != '' and value.lower() == expected)
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def clean_url(url: str) -> str:
+    """`url` without whitespace, fragment and tracking parameters; otherwise unchanged."""
+    url = re.sub(r'\s+', '', url or '')
+    if not url:
+        return ''
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not _is_tracking(k)]
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ''))
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def canonical_url(url: str) -> str:
+    """Identity key of `url` (see the module docstring); '' for an empty URL."""
+    url = (url or '').strip()
+    if not url:
+        return ''
+    if url.startswith('//'):
+        url = 'https:' + url
+    parts = urlsplit(url)
+    if not parts.netloc:
+        # Not an absolute URL: only strip what is safe
+        return clean_url(url).rstrip('/') or url
+
+    host = (parts.hostname or '').lower().rstrip('.')
+    for prefix in _VARIANT_HOST_PREFIXES:
+        if host.startswith(prefix) and host.count('.') > 1:
+            host = host[len(prefix):]
+            break
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+
+    path = _SLASHES_RE.sub('/', parts.path or '/')
+    path = _AMP_PATH_RE.sub('', path).rstrip('/') or '/'
+
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not _is_tracking(k) and not _is_amp_flag(k, v)
+    )
+    return urlunsplit(('https', host, path, urlencode(query), ''))
+
+
+def same_document(a: str, b: str) -> bool:
+    return bool(a and b) and canonical_url(a) == canonical_url(b)
@@ -1,11 +1,12 @@
 import logging
 import requests
-import time
 import json
 import re 
 from typing import Dict, Any, Optional, List
 from urllib.parse import urlparse
 
+from . import metrics, transport
+
 logger = logging.getLogger(__name__)
 
 def _slugify(name: str) -> str:
@@ -28,7 +29,9 @@ class WordPressClient:
         self.user = config.get('user')
         self.password = config.get('password')
         self.categories_map = categories_map
-        self.session = requests.Session()
+        self.session = transport.session(transport.WORDPRESS)
+        # Image downloads go to the source sites, not to WordPress: other policy, no credentials
+        self.media_session = transport.session(transport.MEDIA)
         if self.user and self.password:
             self.session.auth = (self.user, self.password)
         self.session.headers.update({'User-Agent': 'VocMoney-Pipeline/1.0'})
@@ -47,7 +50,8 @@ class WordPressClient:
         params = {"search": name, "per_page": 100}
 
         try:
-            r = self.session.get(tags_endpoint, params=params, timeout=20)
+            with metrics.timed(metrics.WORDPRESS_LATENCY, 'tags'):
+                r = self.session.get(tags_endpoint, params=params, timeout=20)
             r.raise_for_status()
             items = r.json()
             
@@ -69,7 +73,8 @@ class WordPressClient:
         payload = {"name": name, "slug": _slugify(name)}
         
         try:
-            r = self.session.post(tags_endpoint, json=payload, timeout=20)
+            with metrics.timed(metrics.WORDPRESS_LATENCY, 'tags'):
+                r = self.session.post(tags_endpoint, json=payload, timeout=20)
             
             if r.status_code in (200, 201):
                 tag_id = int(r.json()['id'])
@@ -125,7 +130,8 @@ class WordPressClient:
         params = {"search": name, "per_page": 100}
 
         try:
-            r = self.session.get(endpoint, params=params, timeout=20)
+            with metrics.timed(metrics.WORDPRESS_LATENCY, 'categories'):
+                r = self.session.get(endpoint, params=params, timeout=20)
             r.raise_for_status()
             items = r.json()
             
@@ -148,7 +154,8 @@ class WordPressClient:
         payload = {"name": name, "slug": _slugify(name)}
         
         try:
-            r = self.session.post(endpoint, json=payload, timeout=20)
+            with metrics.timed(metrics.WORDPRESS_LATENCY, 'categories'):
+                r = self.session.post(endpoint, json=payload, timeout=20)
             
             if r.status_code in (200, 201):
                 cat_id = int(r.json()['id'])
@@ -196,41 +203,38 @@ class WordPressClient:
         logger.info(f"Resolved category names {cleaned_names} to IDs: {cat_ids}")
         return cat_ids
 
-    def upload_media_from_url(self, image_url: str, alt_text: str = "", max_attempts: int = 3) -> Optional[Dict[str, Any]]:
+    def upload_media_from_url(self, image_url: str, alt_text: str = "") -> Optional[Dict[str, Any]]:
         """
-        Downloads an image and uploads it to WordPress with a retry mechanism.
+        Downloads an image and uploads it to WordPress.
+
+        Retries are the shared transport's (app/transport.py): the download is
+        retried on network errors, 429 and 5xx; the upload POST only when the
+        connection could not be made, since a timed-out upload may have been stored.
         """
-        last_err = None
-        for attempt in range(1, max_attempts + 1):
-            try:
-                # 1. Download the image with a reasonable timeout
-                img_response = requests.get(image_url, timeout=25)
-                img_response.raise_for_status()
-                content_type = img_response.headers.get('Content-Type', 'image/jpeg')
-                # Sanitize filename
-                filename = (urlparse(image_url).path.split('/')[-1] or "image.jpg").split("?")[0]
-
-                # 2. Upload to WordPress
-                media_endpoint = f"{self.api_url}/media"
-                headers = {
-                    'Content-Disposition': f'attachment; filename="{filename}"',
-                    'Content-Type': content_type,
-                }
+        try:
+            # 1. Download the image with a reasonable timeout
+            img_response = self.media_session.get(image_url, timeout=25)
+            img_response.raise_for_status()
+            content_type = img_response.headers.get('Content-Type', 'image/jpeg')
+            # Sanitize filename
+            filename = (urlparse(image_url).path.split('/')[-1] or "image.jpg").split("?")[0]
+
+            # 2. Upload to WordPress
+            media_endpoint = f"{self.api_url}/media"
+            headers = {
+                'Content-Disposition': f'attachment; filename="{filename}"',
+                'Content-Type': content_type,
+            }
+            with metrics.timed(metrics.WORDPRESS_LATENCY, 'media'):
                 wp_response = self.session.post(media_endpoint, headers=headers, data=img_response.content, timeout=40)
-                wp_response.raise_for_status()
-                logger.info(f"Successfully uploaded image: {image_url}")
-                return wp_response.json() # Success
-
-            except (requests.Timeout, requests.ConnectionError) as e:
-                last_err = e
-                logger.warning(f"Upload attempt {attempt}/{max_attempts} for '{image_url}' failed with network error: {e}. Retrying in {2*attempt}s...")
-                time.sleep(2 * attempt)  # Simple backoff
-            except Exception as e:
-                last_err = e
-                logger.error(f"Upload of '{image_url}' failed with non-retriable error: {e}")
-                break # Don't retry on WP errors (4xx, 5xx) or other issues
-
-        logger.error(f"Final failure to upload image '{image_url}' after {attempt} attempt(s): {last_err}")
+            wp_response.raise_for_status()
+            logger.info(f"Successfully uploaded image: {image_url}")
+            return wp_response.json() # Success
+
+        except (requests.Timeout, requests.ConnectionError) as e:
+            logger.error(f"Upload of '{image_url}' failed with network error (after the transport's retries): {e}")
+        except Exception as e:
+            logger.error(f"Upload of '{image_url}' failed: {e}")
         return None
 
     def set_media_alt_text(self, media_id: int, alt_text: str) -> bool:
@@ -240,7 +244,8 @@ class WordPressClient:
         try:
             endpoint = f"{self.api_url}/media/{media_id}"
             payload = {"alt_text": alt_text}
-            r = self.session.post(endpoint, json=payload, timeout=20)
+            with metrics.timed(metrics.WORDPRESS_LATENCY, 'media'):
+                r = self.session.post(endpoint, json=payload, timeout=20)
             r.raise_for_status()
             logger.info(f"Successfully set alt text for media ID {media_id}.")
             return True
@@ -290,7 +295,8 @@ class WordPressClient:
             except Exception as log_e:
                 logger.warning(f"Could not serialize payload for logging: {log_e}")
 
-            response = self.session.post(posts_endpoint, json=payload, timeout=60)
+            with metrics.timed(metrics.WORDPRESS_LATENCY, 'posts'):
+                response = self.session.post(posts_endpoint, json=payload, timeout=60)
             
             if not response.ok:
                 logger.error(f"WordPress post creation failed with status {response.status_code}: {response.text}")
@@ -301,6 +307,24 @@ class WordPressClient:
             logger.error(f"Failed to create WordPress post: {e}", exc_info=False)
             return None
 
+    def append_to_post(self, post_id: int, html: str) -> bool:
+        """Appends an HTML fragment to the content of an existing post."""
+        try:
+            endpoint = f"{self.api_url}/posts/{post_id}"
+            resp = self.session.get(endpoint, params={"context": "edit", "_fields": "content"}, timeout=20)
+            resp.raise_for_status()
+            current = (resp.json().get('content') or {}).get('raw') or ''
+            if html in current:
+                return True
+            with metrics.timed(metrics.WORDPRESS_LATENCY, 'posts'):
+                r = self.session.post(endpoint, json={"content": f"{current}\n{html}"}, timeout=60)
+            r.raise_for_status()
+            logger.info(f"Appended {len(html)} characters to post {post_id}.")
+            return True
+        except (requests.RequestException, ValueError) as e:
+            logger.warning(f"Failed to update post {post_id}: {e}")
+            return False
+
     def get_published_posts(self, fields: List[str], max_posts: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         Fetches published posts, handling pagination, with an optional limit.
@@ -0,0 +1,182 @@
+"""
+Micro-benchmark of the junk-removal step (_pre_clean_html + _remove_forbidden_blocks).
+
+Samples are the pages kept in the raw HTML archive (app/archive.py), up to
+--per-domain pages for each feed site, or the .html files of --dir. Every page
+is parsed once; each round cleans a fresh copy of the tree, so parsing is not
+timed. The single-pass plans are compared with the previous multi-pass
+cleaner (one select() per selector, get_text() per candidate container),
+reproduced below as the baseline, and the two outputs are checked to match.
+
+    python -m benchmarks.bench_cleaning --per-domain 20 --rounds 5
+    python -m benchmarks.bench_cleaning --dir samples/ --rounds 10
+"""
+
+import argparse
+import copy
+import os
+import re
+import statistics
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from bs4 import BeautifulSoup
+
+from app import site_rules
+from app.extractor import (FORBIDDEN_BLOCKS_PLAN, FORBIDDEN_LABELS, FORBIDDEN_TEXT_EXACT, LEIA_HEADING_RE,
+                           PRE_CLEAN_PLAN, make_soup)
+
+LEGACY_SELECTORS = (
+    ".cta-middle", ".infomoney-read-more", ".read-more", ".post__related",
+    ".sharing", ".share", ".social", ".banner", ".ads", ".advertisement",
+    "[data-ad]", "[data-ad-slot]",
+    ".sponsored", ".paid-content", ".partner", ".outbrain", ".taboola",
+    '[class*="srdb"]', '[class*="rating"]', '.review', '.score', '.meter',
+    'header', 'footer', 'nav', 'aside',
+    '[class*="related"]', '[id*="related"]',
+    "[class*='relacionad']", "[class*='relaciona']", "[class*='recommend']",
+    "[class*='veja-tambem']", "[class*='leia-tambem']", "[id*='relacionad']",
+    "[id*='leia']", "section[aria-label*='Leia']", "section[aria-label*='Relacionad']",
+    '[class*="trending"]', '[id*="trending"]', 'div.widget',
+    '[class*="sidebar"]', '[id*="sidebar"]',
+    '[class*="recommended"]',
+    '[class*="screen-hub"]', '[class*="screenhub"]',
+    '[class*="most-popular"]', '[id*="most-popular"]',
+    '[class*="popular"]', '[id*="popular"]',
+    '[class*="newsletter"]', '[id*="newsletter"]',
+    '[class*="ad-"]', '[id*="ad-"]', '[class*="advert"]', '[id*="advert"]',
+    '.comments', '#comments',
+    '.author', '.author-box', '.post-author', '.byline', '.entry-author',
+    '.avatar', '.author__image', '.author-profile',
+    '.subscribe',
+)
+HEADING_RE = re.compile("^h[1-6]$")
+
+
+def legacy_clean(soup: BeautifulSoup, url: str) -> None:
+    """The multi-pass cleaner the plans replaced."""
+    for h in reversed(soup.find_all(HEADING_RE)):
+        heading_text = h.get_text(" ", strip=True)
+        if heading_text and LEIA_HEADING_RE.search(heading_text):
+            parent_container = h.find_parent(('section', 'aside', 'div'))
+            if parent_container and len(parent_container.find_all(HEADING_RE)) <= 2:
+                parent_container.decompose()
+            else:
+                next_sibling = h.find_next_sibling()
+                if next_sibling and next_sibling.name in ("div", "ul", "section", "ol"):
+                    next_sibling.decompose()
+                h.decompose()
+    profile = site_rules.resolve(url)
+    if profile:
+        profile.remove_related(soup)
+    for a in soup.select("a"):
+        cls = " ".join(a.get("class", [])).lower()
+        if any(k in cls for k in ["relacion", "related", "leia", "veja"]) or a.get("data-gtm-cta") in ("related", "see_more"):
+            a.decompose()
+    for sel in LEGACY_SELECTORS:
+        for el in soup.select(sel):
+            el.decompose()
+    for text_node in soup.find_all(string=lambda t: isinstance(t, str) and "powered by srdb" in t.lower()):
+        p = text_node.find_parent()
+        if p:
+            p.decompose()
+
+    for t in soup.find_all(string=True):
+        s = (t or "").strip()
+        if s and s in FORBIDDEN_TEXT_EXACT and t.parent is not None:
+            t.parent.decompose()
+    candidates = []
+    for tag in soup.find_all(["div", "section", "aside", "ul", "ol"]):
+        text = " ".join(tag.get_text(separator="\n").split())
+        lbl_count = sum(1 for lbl in FORBIDDEN_LABELS
+                        if re.search(rf"(^|\n)\s*{re.escape(lbl)}\s*(\n|$|:)", text, flags=re.I))
+        if lbl_count >= 2:
+            candidates.append(tag)
+    for c in candidates:
+        c.decompose()
+    for tag in soup.find_all(["p", "li", "span", "h3", "h4"]):
+        if not tag.parent:
+            continue
+        s = (tag.get_text() or "").strip().rstrip(':').strip()
+        if s in FORBIDDEN_TEXT_EXACT or s in FORBIDDEN_LABELS:
+            tag.decompose()
+
+
+def plan_clean(soup: BeautifulSoup, url: str) -> None:
+    profile = site_rules.resolve(url)
+    PRE_CLEAN_PLAN.apply(soup, extra=profile.related if profile else None)
+    FORBIDDEN_BLOCKS_PLAN.apply(soup)
+
+
+def archive_samples(per_domain: int) -> Iterator[Tuple[str, bytes, Optional[str]]]:
+    from app.archive import HtmlArchive
+    from app.config import ARCHIVE_CONFIG
+
+    if not os.path.isdir(ARCHIVE_CONFIG['path']):
+        return
+    archive = HtmlArchive()
+    try:
+        domains = list(archive.stats()['domains'])
+        for domain in domains:
+            for page in archive.iter_corpus(domain=domain, kind='page', limit=per_domain):
+                yield page.url, page.content, page.encoding
+    finally:
+        archive.close()
+
+
+def dir_samples(path: str) -> Iterator[Tuple[str, bytes, Optional[str]]]:
+    # File names stand in for URLs: 'ge.globo.com_noticia.html' -> https://ge.globo.com/noticia.html
+    for name in sorted(os.listdir(path)):
+        if name.endswith(('.html', '.htm')):
+            with open(os.path.join(path, name), 'rb') as f:
+                yield 'https://' + name.replace('_', '/', 1), f.read(), None
+
+
+def time_rounds(fn, soup: BeautifulSoup, url: str, rounds: int) -> Tuple[float, BeautifulSoup]:
+    timings = []
+    cleaned = soup
+    for _ in range(rounds):
+        cleaned = copy.copy(soup)
+        started = time.perf_counter()
+        fn(cleaned, url)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), cleaned
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--dir', help="directory of saved .html pages instead of the archive")
+    parser.add_argument('--per-domain', type=int, default=20)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    samples = dir_samples(args.dir) if args.dir else archive_samples(args.per_domain)
+    per_domain: Dict[str, List[Tuple[float, float]]] = defaultdict(list)
+    mismatches = 0
+    for url, content, encoding in samples:
+        soup = make_soup(content, encoding)
+        legacy_t, legacy_soup = time_rounds(legacy_clean, soup, url, args.rounds)
+        plan_t, plan_soup = time_rounds(plan_clean, soup, url, args.rounds)
+        if str(legacy_soup) != str(plan_soup):
+            mismatches += 1
+            print(f"MISMATCH {url}")
+        per_domain[urlparse(url).netloc.lower().replace('www.', '')].append((legacy_t, plan_t))
+
+    if not per_domain:
+        print("No sample pages (the archive is empty; run the pipeline with HTML_ARCHIVE on, or pass --dir).")
+        return 1
+    print(f"{'domain':<28}{'pages':>6}{'multi-pass ms':>15}{'plan ms':>10}{'speedup':>9}")
+    for domain, rows in sorted(per_domain.items()):
+        legacy_ms = statistics.mean(r[0] for r in rows) * 1000
+        plan_ms = statistics.mean(r[1] for r in rows) * 1000
+        print(f"{domain:<28}{len(rows):>6}{legacy_ms:>15.2f}{plan_ms:>10.2f}{legacy_ms / plan_ms:>8.1f}x")
+    if mismatches:
+        print(f"{mismatches} page(s) cleaned differently")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
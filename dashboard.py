@@ -5,18 +5,14 @@ Dashboard web para o sistema de automação RSS-para-WordPress
 
 import os
 import sys
-import sqlite3
 import json
-from datetime import datetime, timedelta
 from pathlib import Path
-from flask import Flask, render_template, jsonify, request, redirect, url_for, flash
+from flask import Flask, Response, render_template, jsonify, request, redirect, url_for, flash
 import logging
+import signal
+import socket
 import subprocess
-try:
-    import psutil
-except ImportError:
-    psutil = None
-from collections import deque
+import time
 
 # Load environment variables
 try:
@@ -39,7 +35,7 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 # Import application modules
 try:
-    from app.config import RSS_FEEDS, PIPELINE_ORDER, SCHEDULE_CONFIG
+    from app.config import RSS_FEEDS, PIPELINE_ORDER, SCHEDULE_CONFIG, METRICS_CONFIG, DASHBOARD_CONFIG
 except ImportError:
     # Define empty fallbacks to allow the app to start, but show an error.
     print("="*80)
@@ -49,7 +45,13 @@ except ImportError:
     print(" - PIPELINE_ORDER (list)")
     print(" - SCHEDULE_CONFIG (dict)")
     print("="*80)
-    RSS_FEEDS, PIPELINE_ORDER, SCHEDULE_CONFIG = {}, [], {}
+    RSS_FEEDS, PIPELINE_ORDER, SCHEDULE_CONFIG, METRICS_CONFIG, DASHBOARD_CONFIG = {}, [], {}, {}, {}
+
+from app import heartbeat
+from app.events import event_stream
+from app.logtail import LogTailer
+from app.stats import StatsService
+from app.store import Database
 
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
@@ -58,77 +60,13 @@ BASE_DIR = Path(__file__).resolve().parent
 DB_PATH = BASE_DIR / 'data' / 'app.db'
 LOG_FILE_PATH = BASE_DIR / 'logs' / 'app.log'
 
+stats_service = StatsService(DB_PATH, ttl_seconds=DASHBOARD_CONFIG.get('stats_cache_ttl_seconds', 5))
+log_tailer = LogTailer(LOG_FILE_PATH, backfill_bytes=DASHBOARD_CONFIG.get('log_backfill_bytes', 64 * 1024))
+
 def get_db_stats():
-    """Get statistics from database"""
+    """Get statistics from database (materialised counters behind a TTL cache)"""
     try:
-        if not DB_PATH.exists():
-            raise FileNotFoundError(f"Database not found at {DB_PATH}")
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-
-        # Get article counts
-        cursor.execute('SELECT COUNT(*) FROM seen_articles')
-        seen_count = cursor.fetchone()[0]
-
-        cursor.execute('SELECT COUNT(*) FROM posts')
-        published_count = cursor.fetchone()[0]
-
-        cursor.execute('SELECT COUNT(*) FROM failures')
-        failure_count = cursor.fetchone()[0]
-
-        # Get recent posts
-        cursor.execute('''
-            SELECT source_id, external_id, wp_post_id, created_at 
-            FROM posts 
-            ORDER BY created_at DESC 
-            LIMIT 10
-        ''')
-        recent_posts = cursor.fetchall()
-
-        # Get API usage stats
-        cursor.execute('''
-            SELECT api_type, SUM(usage_count) as usage_count
-            FROM api_usage 
-            WHERE last_used > datetime('now', '-24 hours')
-            GROUP BY api_type
-        ''')
-        api_usage = cursor.fetchall()
-
-        # Calculate next cycle time based on last activity or 15 minutes from now
-        cursor.execute('''
-            SELECT MAX(inserted_at) FROM seen_articles 
-            WHERE inserted_at > datetime('now', '-2 hours')
-        ''')
-        row = cursor.fetchone()
-        last_activity = row[0] if row and row[0] else None
-
-        check_interval = SCHEDULE_CONFIG.get('check_interval', 15)
-
-        if last_activity:
-            try:
-                # SQLite datetime format is 'YYYY-MM-DD HH:MM:SS'
-                last_time = datetime.strptime(last_activity, '%Y-%m-%d %H:%M:%S')
-                next_cycle = last_time + timedelta(minutes=check_interval)
-                # If next cycle is in the past, schedule for 15 minutes from now
-                if next_cycle < datetime.now():
-                    next_cycle = datetime.now() + timedelta(minutes=check_interval)
-            except (ValueError, TypeError):
-                next_cycle = datetime.now() + timedelta(minutes=check_interval)
-        else:
-            next_cycle = datetime.now() + timedelta(minutes=check_interval)
-            
-        next_cycle_str = next_cycle.strftime('%H:%M:%S')
-
-        conn.close()
-
-        return {
-            'seen_articles': seen_count,
-            'published_posts': published_count,
-            'failures': failure_count,
-            'recent_posts': recent_posts,
-            'api_usage': dict(api_usage),
-            'next_cycle': next_cycle_str
-        }
+        return stats_service.get_overview(SCHEDULE_CONFIG.get('check_interval_minutes', 15))
     except Exception as e:
         logging.error(f"Error getting database stats: {e}")
         return {
@@ -140,134 +78,118 @@ def get_db_stats():
             'next_cycle': 'N/A'
         }
 
-def get_recent_logs():
-    """Get recent log entries"""
+def get_performance_stats(hours=None):
+    """Get stage latency/throughput percentiles from the pre-aggregated rollups"""
+    hours = hours or METRICS_CONFIG.get('dashboard_window_hours', 24)
+    try:
+        return stats_service.get_performance(hours)
+    except Exception as e:
+        logging.error(f"Error getting performance stats: {e}")
+        return {
+            'window_hours': hours,
+            'generated_at': None,
+            'stages': {},
+            'throughput': {'published': 0, 'articles_per_hour': 0, 'per_hour': []},
+            'publish_lag_by_feed': {},
+            'gemini_latency_by_key': {},
+            'wordpress_latency': {},
+            'decisions': {},
+            'http_by_host': {},
+        }
+
+def get_recent_logs(limit=50):
+    """Get recent log entries (newest first), reading only what was appended since the last call"""
     try:
-        log_file = LOG_FILE_PATH
-        if not log_file.exists():
-            return []
-
-        with open(log_file, 'r', encoding='utf-8') as f:
-            # Use deque for a memory-efficient way to get the last 50 lines.
-            recent_lines = deque(f, 50)
-
-        logs = []
-        for line in recent_lines:
-            line = line.strip()
-            if line and ' - ' in line:
-                try:
-                    parts = line.split(' - ', 3)
-                    if len(parts) == 4:
-                        timestamp = parts[0]
-                        logger_name = parts[1]
-                        level = parts[2]
-                        message = parts[3]
-
-                        logs.append({
-                            'timestamp': timestamp,
-                            'logger': logger_name,
-                            'level': level,
-                            'message': message
-                        })
-                except Exception:
-                    pass
-
-        return list(reversed(logs))
+        return log_tailer.recent(limit)
     except Exception as e:
         logging.error(f"Error reading logs: {e}")
         return []
 
-def find_main_process():
-    """Finds the running main.py or app.main module process."""
-    if not psutil:
-        return None
-    current_pid = os.getpid()
-    for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
-        if proc.pid == current_pid:
-            continue
-        try:
-            cmdline = proc.info.get('cmdline')
-            if cmdline:
-                cmd_str = ' '.join(cmdline)
-                # Avoid matching the dashboard process itself
-                if 'dashboard.py' in cmd_str:
-                    continue
-                
-                # Check for `python main.py`
-                if any('main.py' in arg for arg in cmdline):
-                    return proc
-                
-                # Check for `python -m app.main`
-                if '-m' in cmdline and any('app.main' in arg for arg in cmdline):
-                    return proc
-
-        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-            continue
-    return None
-
-def _get_system_status():
-    """Determines the system status by checking for a running process and recent logs."""
-    if not psutil:
-        logging.warning("psutil not installed, status check will be limited.")
-        return "Unknown (psutil not installed)"
-
-    # 1. Check if the main process is actively running
-    if find_main_process():
-        return "Running"
-
-    # 2. If not running, check for recent activity in logs (e.g., a completed --once run)
+def get_heartbeat_status():
+    """Status of the scheduler process, read from its single heartbeat row"""
     try:
-        logs = get_recent_logs()
-        if logs:
-            last_log = logs[0]  # Logs are reversed, so this is the newest
-            # Check if the last log is recent
-            last_log_time = datetime.strptime(last_log['timestamp'].split(',')[0], '%Y-%m-%d %H:%M:%S')
-            if (datetime.now() - last_log_time) < timedelta(minutes=5):
-                 if any(keyword in last_log['message'].lower() for keyword in [
-                    "processing feed",
-                    "found new articles",
-                    "published to wordpress",
-                    "pipeline run finished"
-                ]):
-                    return "Processing"
+        row = stats_service.get_heartbeat()
     except Exception as e:
-        logging.error(f"Error checking logs for system status: {e}")
-
-    # 3. If no process and no recent activity, it's stopped
-    return "Stopped"
+        logging.error(f"Error reading heartbeat: {e}")
+        row = None
+    return heartbeat.evaluate(
+        row,
+        stale_after=DASHBOARD_CONFIG.get('heartbeat_stale_seconds', 30),
+        stage_timeout=DASHBOARD_CONFIG.get('stage_timeout_seconds', 900),
+    )
 
 @app.route('/')
 def dashboard():
     """Main dashboard page"""
     stats = get_db_stats()
     logs = get_recent_logs()
-    system_status = _get_system_status()
+    system = get_heartbeat_status()
 
     return render_template('dashboard.html', 
                          stats=stats, 
                          logs=logs[:20], # Show latest 20 logs
-                         system_status=system_status)
+                         system_status=system['status'],
+                         system=system)
 
 @app.route('/api/stats')
 def api_stats():
     """API endpoint for statistics"""
     return jsonify(get_db_stats())
 
+@app.route('/performance')
+def performance_page():
+    """Stage latency and throughput panel"""
+    hours = request.args.get('hours', type=int)
+    return render_template('performance.html', perf=get_performance_stats(hours))
+
+@app.route('/api/performance')
+def api_performance():
+    """API endpoint for performance rollups (JSON, for scraping)"""
+    hours = request.args.get('hours', type=int)
+    return jsonify(get_performance_stats(hours))
+
 @app.route('/api/logs')
 def api_logs():
     """API endpoint for logs"""
     return jsonify(get_recent_logs())
 
+@app.route('/api/events')
+def api_events():
+    """Server-Sent Events stream of pipeline events and new log lines"""
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+    stream = event_stream(
+        stats_service,
+        log_tailer,
+        last_event_id=last_event_id,
+        poll_seconds=DASHBOARD_CONFIG.get('stream_poll_seconds', 1),
+        keepalive_seconds=DASHBOARD_CONFIG.get('stream_keepalive_seconds', 15),
+    )
+    return Response(stream, mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/api/system/status')
 def api_system_status():
     """Get system status"""
-    status_str = _get_system_status()
+    hb_status = get_heartbeat_status()
+    hb = hb_status['heartbeat'] or {}
     stats = get_db_stats()
 
     status = {
-        'running': status_str in ["Running", "Processing"],
-        'status_text': status_str,
-        'next_run': stats.get('next_cycle', 'N/A'),
+        'running': hb_status['status'] in ["Running", "Processing", "Stuck"],
+        'status_text': hb_status['status'],
+        'reason': hb_status['reason'],
+        'pid': hb.get('pid'),
+        'stage': hb.get('stage'),
+        'source_id': hb.get('source_id'),
+        'article_id': hb.get('article_id'),
+        'article_url': hb.get('article_url'),
+        'cycle_started_at': hb.get('cycle_started_at'),
+        'heartbeat_at': hb.get('updated_at'),
+        'next_run': hb.get('next_run_at') or stats.get('next_cycle', 'N/A'),
         'jobs': []
     }
     return jsonify(status)
@@ -275,17 +197,13 @@ def api_system_status():
 @app.route('/api/system/start', methods=['POST'])
 def api_start_system():
     """Start the automation system"""
-    if not psutil:
-        return jsonify({'success': False, 'message': 'psutil não está instalado. Não é possível controlar o processo.'})
-
-    if find_main_process():
+    if get_heartbeat_status()['status'] != 'Stopped':
         return jsonify({'success': False, 'message': 'O sistema já está em execução.'})
 
     try:
-        # Start main.py as a background process
+        # Start the scheduler as a background process
         python_executable = sys.executable
-        main_script_path = BASE_DIR / 'main.py'
-        subprocess.Popen([python_executable, str(main_script_path)], cwd=BASE_DIR)
+        subprocess.Popen([python_executable, '-m', 'app.main'], cwd=BASE_DIR)
         return jsonify({'success': True, 'message': 'Sistema iniciado com sucesso.'})
     except Exception as e:
         logging.error(f"Failed to start system: {e}")
@@ -294,20 +212,28 @@ def api_start_system():
 @app.route('/api/system/stop', methods=['POST'])
 def api_stop_system():
     """Stop the automation system"""
-    if not psutil:
-        return jsonify({'success': False, 'message': 'psutil não está instalado. Não é possível controlar o processo.'})
-
-    proc = find_main_process()
-    if not proc:
+    hb_status = get_heartbeat_status()
+    hb = hb_status['heartbeat']
+    if not hb or hb_status['status'] == 'Stopped':
         return jsonify({'success': False, 'message': 'O sistema não parece estar em execução.'})
+    if hb.get('hostname') != socket.gethostname():
+        return jsonify({'success': False, 'message': f"O sistema está rodando em outro host ({hb.get('hostname')})."})
 
+    pid = hb['pid']
     try:
-        proc.terminate()
-        proc.wait(timeout=5) # Wait for process to terminate
-        return jsonify({'success': True, 'message': 'Sistema parado com sucesso.'})
-    except psutil.TimeoutExpired:
-        proc.kill()
+        os.kill(pid, signal.SIGTERM)
+        deadline = time.monotonic() + 5  # Wait for process to terminate
+        while time.monotonic() < deadline:
+            if heartbeat.pid_alive(pid) is False:
+                return jsonify({'success': True, 'message': 'Sistema parado com sucesso.'})
+            time.sleep(0.2)
+        os.kill(pid, getattr(signal, 'SIGKILL', signal.SIGTERM))
         return jsonify({'success': True, 'message': 'Sistema forçadamente parado.'})
+    except (ProcessLookupError, OSError) as e:
+        if heartbeat.pid_alive(pid) is False:
+            return jsonify({'success': True, 'message': 'Sistema parado com sucesso.'})
+        logging.error(f"Failed to stop system: {e}")
+        return jsonify({'success': False, 'message': f'Falha ao parar o sistema: {e}'})
     except Exception as e:
         logging.error(f"Failed to stop system: {e}")
         return jsonify({'success': False, 'message': f'Falha ao parar o sistema: {e}'})
@@ -316,7 +242,25 @@ def api_stop_system():
 def api_run_now():
     """Force a pipeline run now"""
     try:
-        # Run the pipeline once using the --once flag
+        if stats_service.get_lease(heartbeat.CYCLE_LEASE):
+            return jsonify({'success': False, 'message': 'Um ciclo do pipeline já está em execução.'})
+    except Exception as e:
+        logging.error(f"Error reading cycle lease: {e}")
+
+    hb_status = get_heartbeat_status()
+    hb = hb_status['heartbeat'] or {}
+    try:
+        if hb_status['status'] in ('Running', 'Processing') and hb.get('mode') == 'scheduler':
+            # The scheduler picks the command up on its next heartbeat and runs the job in-process
+            db = Database(str(DB_PATH))
+            try:
+                queued = db.enqueue_command('run_now')
+            finally:
+                db.close()
+            if queued:
+                return jsonify({'success': True, 'message': 'Execução solicitada ao agendador em execução.'})
+
+        # No scheduler alive: run the pipeline once (the cycle lease still prevents overlaps)
         python_executable = sys.executable
         subprocess.Popen(
             [python_executable, '-m', 'app.main', '--once'],
@@ -327,54 +271,64 @@ def api_run_now():
         logging.error(f"Failed to run-now: {e}")
         return jsonify({'success': False, 'message': f'Falha ao iniciar execução única: {e}'})
 
+@app.route('/api/gate/rejections')
+def api_gate_rejections():
+    """Pre-AI gate rejections, for auditing false rejects"""
+    counters = stats_service.get_counters()
+    return jsonify({
+        'rejections': stats_service.get_gate_rejections(
+            limit=request.args.get('limit', 100, type=int),
+            rule=request.args.get('rule'),
+            unreviewed=request.args.get('unreviewed') == '1',
+        ),
+        'gemini_calls_avoided': counters.get('gemini_calls_avoided', 0),
+        'false_rejects': counters.get('gate_false_rejects', 0),
+    })
+
+@app.route('/api/gate/rejections/<int:rejection_id>/review', methods=['POST'])
+def api_review_gate_rejection(rejection_id):
+    """Review a gate rejection: 'released' (false reject, requeued past the gate) or 'confirmed'"""
+    verdict = (request.get_json(silent=True) or {}).get('verdict') or request.form.get('verdict', 'released')
+    if verdict not in ('released', 'confirmed'):
+        return jsonify({'success': False, 'message': f'Veredito inválido: {verdict}'}), 400
+    try:
+        db = Database(str(DB_PATH))
+        try:
+            reviewed = db.review_gate_rejection(rejection_id, verdict)
+        finally:
+            db.close()
+    except Exception as e:
+        logging.error(f"Failed to review gate rejection {rejection_id}: {e}")
+        return jsonify({'success': False, 'message': f'Falha ao revisar a rejeição: {e}'})
+    if not reviewed:
+        return jsonify({'success': False, 'message': 'Rejeição não encontrada.'}), 404
+    message = 'Artigo liberado e devolvido à fila.' if verdict == 'released' else 'Rejeição confirmada.'
+    return jsonify({'success': True, 'message': message})
+
 @app.route('/feeds')
 def feeds_page():
     """Feeds management page"""
     feed_stats = []
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-
-        for source_id in PIPELINE_ORDER:
-            config = RSS_FEEDS.get(source_id)
-            if not config:
-                continue
-
-            cursor.execute('''
-                SELECT COUNT(*) FROM seen_articles 
-                WHERE source_id = ? AND inserted_at > datetime('now', '-24 hours')
-            ''', (source_id,))
-            recent_count = cursor.fetchone()[0]
-
-            cursor.execute('''
-                SELECT COUNT(*) FROM posts 
-                WHERE source_id = ?
-            ''', (source_id,))
-            published_count = cursor.fetchone()[0]
-
-            feed_stats.append({
-                'id': source_id,
-                'name': source_id.replace('_', ' ').title(),
-                'url': config.get('urls', ['N/A'])[0],
-                'category': config['category'],
-                'recent_articles': recent_count,
-                'published_posts': published_count
-            })
-
-        conn.close()
+        counts = stats_service.get_feed_stats(PIPELINE_ORDER)
     except Exception as e:
         logging.error(f"Error getting feed stats: {e}")
         # Fallback with no stats on DB error
-        for source_id in PIPELINE_ORDER:
-            config = RSS_FEEDS.get(source_id, {})
-            feed_stats.append({
-                'id': source_id,
-                'name': source_id.replace('_', ' ').title(),
-                'url': config.get('urls', ['N/A'])[0],
-                'category': config.get('category', 'N/A'),
-                'recent_articles': 0,
-                'published_posts': 0
-            })
+        counts = {}
+
+    for source_id in PIPELINE_ORDER:
+        config = RSS_FEEDS.get(source_id)
+        if not config:
+            continue
+        feed_counts = counts.get(source_id, {})
+        feed_stats.append({
+            'id': source_id,
+            'name': source_id.replace('_', ' ').title(),
+            'url': config.get('urls', ['N/A'])[0],
+            'category': config.get('category', 'N/A'),
+            'recent_articles': feed_counts.get('recent_articles', 0),
+            'published_posts': feed_counts.get('published_posts', 0)
+        })
 
     return render_template('feeds.html', feeds=feed_stats)
 
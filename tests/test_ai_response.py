@@ -0,0 +1,71 @@
+"""
+Unit tests for the tolerant Gemini response parsing
+"""
+
+import json
+import unittest
+
+from app.ai_response import complete_article, loads_lenient, repair_json
+
+ANSWER = {
+    'titulo_final': 'Flamengo vence Palmeiras por 3x1 e assume a liderança',
+    'conteudo_final': '<p>O Flamengo venceu o Palmeiras por 3 a 1 no Maracanã.</p><p>Pedro marcou dois gols.</p>',
+    'meta_description': 'Flamengo vence o Palmeiras no Maracanã e assume a liderança do Brasileirão.',
+    'focus_keyphrase': 'Flamengo vence Palmeiras',
+    'tags_sugeridas': ['Flamengo', 'Palmeiras', 'Pedro'],
+}
+
+
+class TestAIResponse(unittest.TestCase):
+    """Test cases for app.ai_response"""
+
+    def test_loads_fenced_and_sloppy_json(self):
+        text = 'Aqui está:\n```json\n{"a": [1, 2,], "b": "linha\nquebrada",}\n```'
+        self.assertEqual(loads_lenient(text), ({'a': [1, 2], 'b': 'linha\nquebrada'}, True))
+        self.assertEqual(loads_lenient('{"a": 1}'), ({'a': 1}, False))
+        self.assertEqual(loads_lenient('não é json')[0], None)
+
+    def test_repairs_truncated_answers(self):
+        full = json.dumps(ANSWER, ensure_ascii=False)
+        # Cut inside the body string: the string and object are closed
+        cut = full[:full.index('Pedro marcou')]
+        self.assertTrue(repair_json(cut)['conteudo_final'].endswith('Maracanã.</p><p>'))
+        # Cut inside a key, after a colon or inside a literal: back to the last whole element
+        self.assertEqual(repair_json('{"a": 1, "tit'), {'a': 1})
+        self.assertEqual(repair_json('{"a": 1, "b":'), {'a': 1})
+        self.assertEqual(repair_json('{"a": [true, fal'), {'a': [True]})
+        self.assertEqual(repair_json('{"a": "x\\'), {'a': 'x'})
+
+    def test_truncated_body_is_trimmed_and_fields_derived(self):
+        full = json.dumps({'titulo_final': ANSWER['titulo_final'], 'conteudo_final': ANSWER['conteudo_final']},
+                          ensure_ascii=False)
+        data, repaired = loads_lenient(full[:full.index('dois gols')])
+        self.assertTrue(repaired)
+        reason, filled = complete_article(data, repaired=repaired)
+        self.assertIsNone(reason)
+        self.assertEqual(data['conteudo_final'], '<p>O Flamengo venceu o Palmeiras por 3 a 1 no Maracanã.</p>')
+        self.assertEqual(data['meta_description'], 'O Flamengo venceu o Palmeiras por 3 a 1 no Maracanã.')
+        self.assertEqual(data['slug'], 'flamengo-vence-palmeiras-por-3x1-e-assume-a-lideranca')
+        self.assertEqual(data['yoast_meta']['_yoast_wpseo_title'], ANSWER['titulo_final'])
+        self.assertEqual(data['tags_sugeridas'], [])
+        self.assertIn('slug', filled)
+
+    def test_yoast_and_alt_texts(self):
+        data = dict(ANSWER, image_alt_texts=[{'arquivo': 'gol.jpg', 'alt': 'Pedro comemora'}, {'arquivo': 'x.jpg'}],
+                    yoast_meta={'_yoast_wpseo_title': 'Título do Yoast'})
+        self.assertEqual(complete_article(data)[0], None)
+        yoast = data['yoast_meta']
+        self.assertEqual(yoast['_yoast_wpseo_title'], 'Título do Yoast')
+        self.assertEqual(yoast['_yoast_wpseo_metadesc'], ANSWER['meta_description'])
+        self.assertEqual(yoast['_yoast_wpseo_focuskw'], 'Flamengo vence Palmeiras')
+        self.assertEqual(yoast['_yoast_news_keywords'], 'Flamengo, Palmeiras, Pedro')
+        self.assertEqual(data['image_alt_texts'], {'gol.jpg': 'Pedro comemora'})
+
+        # Only the title and the body cannot be derived
+        self.assertEqual(complete_article(dict(ANSWER, titulo_final=' '))[0], "missing 'titulo_final'")
+        self.assertEqual(complete_article(dict(ANSWER, conteudo_final=''))[0], "missing 'conteudo_final'")
+        self.assertIsNone(complete_article(dict(ANSWER, conteudo_final=''), require_content=False)[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+"""
+Unit tests for the raw HTML archive
+"""
+
+import os
+import tempfile
+import unittest
+
+from app import archive as archive_module
+from app.archive import HtmlArchive
+from app.store import Database
+
+
+def _page(n: int) -> bytes:
+    chrome = ''.join(f'<li><a href="/secao/{i}">Seção {i}</a></li>' for i in range(60))
+    return (
+        '<html><head><meta charset="utf-8"><title>Notícia</title></head><body>'
+        f'<nav><ul>{chrome}</ul></nav><article><h1>Matéria {n}</h1>'
+        f'<p>Texto exclusivo da matéria número {n} com alguns detalhes {n * 7}.</p></article>'
+        f'<footer><ul>{chrome}</ul></footer></body></html>'
+    ).encode('utf-8')
+
+
+class TestHtmlArchive(unittest.TestCase):
+    """Test cases for app.archive.HtmlArchive"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.archive = HtmlArchive(self.tmpdir.name, config={'train_min_samples': 5, 'retrain_every': 50})
+        # Exercise the fallback codec regardless of what is installed
+        self._zstandard = archive_module.zstandard
+        archive_module.zstandard = None
+
+    def tearDown(self):
+        archive_module.zstandard = self._zstandard
+        self.archive.close()
+        self.tmpdir.cleanup()
+
+    def test_round_trip_and_dedupe(self):
+        body = _page(1)
+        sha = self.archive.put('https://ge.globo.com/a.ghtml', body, 'text/html; charset=utf-8', article_id=7)
+        again = self.archive.put('https://www.ge.globo.com/a.ghtml?utm=x', body, 'text/html', article_id=8)
+        self.assertEqual(sha, again)
+        objects = self.archive.conn.execute("SELECT COUNT(*) FROM objects").fetchone()[0]
+        self.assertEqual(objects, 1)
+
+        page = self.archive.get(article_id=7)
+        self.assertEqual(page.content, body)
+        self.assertEqual(page.encoding, 'utf-8')
+        self.assertEqual(self.archive.get(url='https://www.ge.globo.com/a.ghtml?utm=x').article_id, 8)
+        self.assertIsNone(self.archive.get(article_id=7, kind='lite'))
+        self.assertIsNone(self.archive.get(article_id=7, max_age_hours=-1))
+
+    def test_trained_dictionary_shrinks_new_objects(self):
+        for n in range(5):
+            self.archive.put(f'https://ge.globo.com/{n}.ghtml', _page(n), 'text/html', article_id=n)
+        before = self.archive.conn.execute(
+            "SELECT stored_size FROM objects ORDER BY created_at LIMIT 1").fetchone()[0]
+
+        created = self.archive.train_dictionaries()
+        self.assertIn('ge.globo.com', created)
+        self.assertEqual(self.archive.train_dictionaries(), {})
+
+        self.archive.put('https://ge.globo.com/new.ghtml', _page(99), 'text/html', article_id=99)
+        row = self.archive.conn.execute(
+            "SELECT stored_size, dict_id FROM objects ORDER BY created_at DESC LIMIT 1").fetchone()
+        self.assertEqual(row['dict_id'], created['ge.globo.com'])
+        self.assertLess(row['stored_size'], before)
+        # Old and new objects both decode
+        self.assertEqual(self.archive.get(article_id=99).content, _page(99))
+        self.assertEqual(self.archive.get(article_id=0).content, _page(0))
+
+    def test_eviction_and_corpus(self):
+        for n in range(6):
+            self.archive.put(f'https://lance.com.br/{n}.html', _page(n), 'text/html', article_id=n)
+        self.archive.get(article_id=0)  # recently used, survives eviction
+        total = self.archive.conn.execute("SELECT SUM(stored_size) FROM objects").fetchone()[0]
+        self.archive.config['max_bytes'] = total // 2
+
+        self.assertGreater(self.archive.evict(), 0)
+        self.assertIsNotNone(self.archive.get(article_id=0))
+        self.assertIsNone(self.archive.get(article_id=1))
+        stored = self.archive.conn.execute("SELECT SUM(stored_size) FROM objects").fetchone()[0]
+        self.assertLessEqual(stored, total // 2)
+
+        corpus = list(self.archive.iter_corpus(domain='lance.com.br'))
+        self.assertTrue(corpus)
+        self.assertTrue(all(p.content.startswith(b'<html>') for p in corpus))
+        self.assertEqual(list(self.archive.iter_corpus(domain='marca.com')), [])
+
+    def test_zlib_fallback_is_logged_once(self):
+        archive_module._zlib_fallback_logged = False
+        with self.assertLogs(archive_module.logger, 'WARNING') as logs:
+            for sub in ('a', 'b'):
+                HtmlArchive(os.path.join(self.tmpdir.name, sub)).close()
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn('zlib', logs.output[0])
+
+
+class TestFailCountMigration(unittest.TestCase):
+    """Older databases get the fail_count column used when deferring an article"""
+
+    def test_adds_missing_column(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'app.db')
+            db = Database(path)
+            db.conn.execute(
+                "CREATE TABLE seen_articles (id INTEGER PRIMARY KEY AUTOINCREMENT, source_id TEXT NOT NULL, "
+                "external_id TEXT NOT NULL, url TEXT, published_at DATETIME, inserted_at DATETIME, "
+                "status TEXT DEFAULT 'NEW', retry_at DATETIME, fail_reason TEXT, UNIQUE(source_id, external_id))"
+            )
+            db.initialize()
+            try:
+                columns = {row[1] for row in db.conn.execute("PRAGMA table_info(seen_articles)")}
+            finally:
+                db.close()
+        self.assertIn('fail_count', columns)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+"""
+Unit tests for the per-domain boilerplate fingerprints
+"""
+
+import os
+import tempfile
+import time
+import unittest
+
+from bs4 import BeautifulSoup
+
+from app.boilerplate import BoilerplateStore, fingerprint_blocks, remove_boilerplate
+from app.extractor import ContentExtractor
+from app.store import Database
+
+DAY = 86400.0
+
+
+def page(n: int) -> str:
+    return (
+        '<html><body><div class="menu"><a href="/">Início</a><a href="/esportes">Esportes</a>'
+        '<a href="/mercado">Mercado de transferências</a></div>'
+        f'<article><h1>Matéria {n}</h1><p>Texto exclusivo da matéria {n}, '
+        f'{"único desta página " * n}com detalhes da rodada.</p></article>'
+        '<div class="newsletter"><p>Assine a nossa newsletter e receba as notícias do dia às 7h.</p></div>'
+        f'<footer><p>© 20{n:02d} Exemplo Comunicação. Todos os direitos reservados.</p></footer></body></html>'
+    )
+
+
+def blocks(html: str) -> dict:
+    """Fingerprints of the test page's blocks, by selector."""
+    soup = BeautifulSoup(html, 'lxml')
+    fingerprints = {id(el): fp for el, fp in fingerprint_blocks(soup)}
+    return {sel: fingerprints.get(id(soup.select_one(sel))) for sel in ('div.menu', 'div.newsletter', 'footer', 'article > p')}
+
+
+class TestBoilerplate(unittest.TestCase):
+    """Test cases for app.boilerplate"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db = Database(os.path.join(self.tmpdir.name, 'app.db'))
+        self.db.initialize()
+        self.config = {'enabled': True, 'min_pages': 2.5, 'half_life_days': 7, 'min_score': 0.05, 'ttl_days': 30,
+                       'max_per_domain': 50, 'max_report': 400, 'min_chars': 30, 'max_chars': 3000}
+        self.store = BoilerplateStore(self.db, config=self.config)
+
+    def tearDown(self):
+        self.db.close()
+        self.tmpdir.cleanup()
+
+    def test_fingerprints_ignore_digits_and_whitespace(self):
+        first, second = blocks(page(1)), blocks(page(2).replace('</a><a', '</a>\n  <a'))
+        for selector in ('div.menu', 'div.newsletter', 'footer'):
+            self.assertEqual(first[selector], second[selector], selector)
+        self.assertNotEqual(first['article > p'], second['article > p'])
+
+    def test_repeated_blocks_are_learned_and_removed(self):
+        url = 'https://www.exemplo.com.br/noticia/{}'
+        now = time.time()
+        for n in range(1, 4):
+            plan = self.store.plan(url.format(n))
+            remove_boilerplate(BeautifulSoup(page(n), 'lxml'), plan)
+            self.store.observe(url.format(n), plan, now=now)
+        self.assertEqual(len(self.store.known(url.format(9), now=now)), 5)
+
+        # Persisted, and decayed: after two half-lives a count of 3 is below min_pages
+        store = BoilerplateStore(self.db, config=self.config)
+        self.assertEqual(len(store.known(url.format(9), now=now)), 5)
+        self.assertEqual(store.known(url.format(9), now=now + 14 * DAY), [])
+
+        plan = self.store.plan(url.format(4))
+        soup = BeautifulSoup(page(4), 'lxml')
+        self.assertEqual(remove_boilerplate(soup, plan), 3)
+        text = soup.get_text(' ', strip=True)
+        self.assertIn('Texto exclusivo da matéria 4', text)
+        for gone in ('Mercado', 'newsletter', 'direitos'):
+            self.assertNotIn(gone, text)
+
+    def test_store_is_bounded(self):
+        url = 'https://exemplo.com.br/a'
+        now = 1_000_000.0
+        self.store.observe(url, {'seen': ['keep']}, now=now)
+        self.store.observe(url, {'seen': ['keep']}, now=now + 1)
+        self.store.observe(url, {'seen': [f'fp{i}' for i in range(60)]}, now=now + 2)
+        entries = self.db.get_boilerplate_fingerprints('exemplo.com.br')
+        self.assertEqual(len(entries), 50)
+        self.assertIn('keep', entries)
+
+        self.assertEqual(self.store.prune(now=now + 31 * DAY), 50)
+        self.assertEqual(self.store.known(url, now=now + 31 * DAY), [])
+
+    def test_extractor_drops_known_blocks_first(self):
+        soup = BeautifulSoup(page(1), 'lxml')
+        known = [fp for el, fp in fingerprint_blocks(soup) if 'newsletter' in el.get('class', [])]
+        plan = {'known': known}
+        ContentExtractor().extract(page(5), 'https://exemplo.com.br/noticia/5', fingerprints=plan)
+        self.assertEqual(plan['removed'], 1)
+        self.assertIn(known[0], plan['seen'])
+
+
+if __name__ == '__main__':
+    unittest.main()
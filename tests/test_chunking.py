@@ -0,0 +1,53 @@
+"""
+Unit tests for the chunked rewrite section splitting
+"""
+
+import unittest
+
+from app.chunking import estimate_tokens, split_sections, stitch
+
+PARAGRAPH = "<p>{}: " + "O time controlou a posse e criou chances pelos lados do campo. " * 6 + "</p>"
+
+
+def article(sections: int, paragraphs: int = 4) -> str:
+    html = ''
+    for s in range(sections):
+        html += f'<h2>Parte {s}</h2>' + ''.join(PARAGRAPH.format(f'{s}.{p}') for p in range(paragraphs))
+    return f'<div class="conteudo">{html}</div>'
+
+
+class TestChunking(unittest.TestCase):
+    """Test cases for app.chunking"""
+
+    def test_sections_start_at_headings(self):
+        html = article(4)
+        section_tokens = estimate_tokens(article(1)) + 100
+        sections = split_sections(html, section_tokens=section_tokens, max_sections=6)
+        self.assertEqual(len(sections), 4)
+        for s, section in enumerate(sections):
+            self.assertTrue(section.startswith(f'<h2>Parte {s}</h2>'), section[:40])
+        # Nothing lost or reordered, wrapper unwrapped
+        self.assertEqual(''.join(sections), html[len('<div class="conteudo">'):-len('</div>')])
+
+    def test_paragraph_boundaries_and_limits(self):
+        html = ''.join(PARAGRAPH.format(p) for p in range(12))
+        sections = split_sections(html, section_tokens=estimate_tokens(PARAGRAPH) * 3, max_sections=6)
+        self.assertEqual(len(sections), 4)
+        self.assertTrue(all(s.startswith('<p>') and s.endswith('</p>') for s in sections))
+
+        # Sections grow instead of going over max_sections
+        self.assertEqual(len(split_sections(html, section_tokens=10, max_sections=3)), 3)
+        # A block bigger than a section is never cut
+        huge = '<p>' + 'palavra ' * 2000 + '</p>'
+        self.assertEqual(split_sections(huge, section_tokens=100), [huge])
+
+    def test_stitch_keeps_order_and_metadata(self):
+        metadata = {'titulo_final': 'Título', 'conteudo_final': '', 'slug': 'titulo'}
+        result = stitch(metadata, ['<p>um</p>', ' <h2>dois</h2><p>dois</p>\n', '<p>três</p>'])
+        self.assertEqual(result['conteudo_final'], '<p>um</p>\n<h2>dois</h2><p>dois</p>\n<p>três</p>')
+        self.assertEqual(result['slug'], 'titulo')
+        self.assertEqual(metadata['conteudo_final'], '')
+
+
+if __name__ == '__main__':
+    unittest.main()
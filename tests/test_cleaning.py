@@ -0,0 +1,67 @@
+"""
+Unit tests for the single-pass cleaning plans
+"""
+
+import unittest
+
+from bs4 import BeautifulSoup
+
+from app.cleaning import CleaningPlan
+from app.extractor import LEIA_HEADING_RE, ContentExtractor
+
+PAGE = """
+<html><body>
+<header>Menu</header>
+<article>
+  <p>Primeiro parágrafo da notícia.</p>
+  <div class="share-bar"><a href="#">Compartilhar</a></div>
+  <div class="ad-slot" data-ad="1"><p>Publicidade</p></div>
+  <p>Leia mais em <a class="link-Relacionado" href="/b">outra matéria</a> hoje.</p>
+  <section aria-label="Leia também"><ul><li>Outra</li></ul></section>
+  <div class="box"><h3>Leia também</h3><ul><li>Link</li></ul></div>
+  <div class="grid"><h2>Placar</h2><h2>Escalação</h2><h2>Veja também</h2><ul><li>Vídeo</li></ul><p>Resumo final.</p></div>
+  <div class="widget">Widget</div>
+  <p>Ratings powered by SRDB</p>
+  <p>Segundo parágrafo da notícia.</p>
+</article>
+<footer>Rodapé</footer>
+</body></html>
+"""
+
+
+class TestCleaningPlan(unittest.TestCase):
+    """Test cases for app.cleaning"""
+
+    def test_pre_clean_removes_junk_in_one_walk(self):
+        soup = BeautifulSoup(PAGE, 'lxml')
+        ContentExtractor._pre_clean_html(None, soup, 'https://example.com/noticia')
+        text = soup.get_text(" ", strip=True)
+        for gone in ('Menu', 'Rodapé', 'Publicidade', 'outra matéria', 'Outra', 'Link',
+                     'Veja também', 'Vídeo', 'Widget', 'SRDB'):
+            self.assertNotIn(gone, text)
+        for kept in ('Primeiro parágrafo', 'Compartilhar', 'Placar', 'Resumo final', 'Segundo parágrafo'):
+            self.assertIn(kept, text)
+
+    def test_site_related_blocks_use_the_same_walk(self):
+        html = '<div><p>Texto</p><div class="single__related"><p>Relacionada</p></div></div>'
+        soup = BeautifulSoup(html, 'lxml')
+        ContentExtractor._pre_clean_html(None, soup, 'https://www.infomoney.com.br/mercados/a/')
+        self.assertEqual(soup.get_text(" ", strip=True), 'Texto')
+
+    def test_forbidden_blocks(self):
+        html = ('<div><p>Texto</p><p>Director:</p><span>Your comment has not been saved</span>'
+                '<ul><li>Cast</li><li>Elenco completo</li></ul><p>Cast of thousands</p></div>')
+        soup = BeautifulSoup(html, 'lxml')
+        ContentExtractor._remove_forbidden_blocks(None, soup)
+        self.assertEqual(soup.get_text("|", strip=True), 'Texto|Elenco completo|Cast of thousands')
+
+    def test_root_is_never_a_candidate(self):
+        soup = BeautifulSoup('<div class="related"><p>Texto</p><p class="share">x</p></div>', 'lxml')
+        root = soup.find('div')
+        removed = CleaningPlan(classes=('related', 'share'), heading_re=LEIA_HEADING_RE).apply(root)
+        self.assertEqual(removed, 1)
+        self.assertEqual(str(root), '<div class="related"><p>Texto</p></div>')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+"""
+Unit tests for the cycle lease and the dashboard control channel
+"""
+
+import os
+import tempfile
+import time
+import unittest
+
+from app import heartbeat
+from app.stats import StatsService
+from app.store import Database
+
+
+class TestCycleLease(unittest.TestCase):
+    """Test cases for Database lease and control command helpers"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'app.db')
+        self.db = Database(self.db_path)
+        self.db.initialize()
+        # A second connection plays the other process
+        self.other = Database(self.db_path)
+
+    def tearDown(self):
+        self.other.close()
+        self.db.close()
+        self.tmpdir.cleanup()
+
+    def test_only_one_holder(self):
+        self.assertTrue(self.db.acquire_lease('cycle', 'a', 60))
+        self.assertFalse(self.other.acquire_lease('cycle', 'b', 60))
+        # Re-acquiring our own lease is allowed
+        self.assertTrue(self.db.acquire_lease('cycle', 'a', 60))
+        self.assertTrue(self.db.renew_lease('cycle', 'a', 60))
+        self.assertFalse(self.other.renew_lease('cycle', 'b', 60))
+
+        self.db.release_lease('cycle', 'a')
+        self.assertTrue(self.other.acquire_lease('cycle', 'b', 60))
+
+    def test_expired_lease_can_be_taken(self):
+        self.assertTrue(self.db.acquire_lease('cycle', 'a', -1))
+        self.assertTrue(self.other.acquire_lease('cycle', 'b', 60))
+        self.assertFalse(self.db.renew_lease('cycle', 'a', 60))
+
+        stats = StatsService(self.db_path, ttl_seconds=0)
+        try:
+            self.assertEqual(stats.get_lease('cycle')['owner'], 'b')
+            self.assertIsNone(stats.get_lease('other'))
+        finally:
+            stats.close()
+
+    def test_writer_renews_held_leases_and_runs_commands(self):
+        owner = heartbeat.lease_owner()
+        self.assertTrue(self.db.acquire_lease(heartbeat.CYCLE_LEASE, owner, 1))
+        heartbeat.hold_lease(heartbeat.CYCLE_LEASE, owner, 60)
+        self.db.enqueue_command('run_now')
+
+        received = []
+        writer = heartbeat.HeartbeatWriter(self.db_path, interval=60, on_command=received.append)
+        try:
+            writer.renew_leases(self.other)
+            writer.poll_commands(self.other)
+            writer.poll_commands(self.other)
+        finally:
+            heartbeat.drop_lease(heartbeat.CYCLE_LEASE)
+
+        self.assertEqual(received, ['run_now'])
+        row = self.db.conn.execute("SELECT expires_at FROM cycle_lease").fetchone()
+        self.assertGreater(row['expires_at'], time.time() + 30)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+"""
+Unit tests for the asynchronous AI debug recorder
+"""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from app.debug_recorder import DebugRecorder
+
+
+class TestDebugRecorder(unittest.TestCase):
+    """Test cases for app.debug_recorder"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.config = {'enabled': True, 'path': self.tmpdir.name, 'sample_rate': 0.0, 'segment_bytes': 4096,
+                       'max_segments': 3, 'max_bytes': 1024 * 1024, 'queue_size': 1000, 'compress_level': 6}
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_failures_are_kept_in_full_and_successes_sampled(self):
+        recorder = DebugRecorder(self.config)
+        try:
+            self.assertFalse(recorder.record('rewrite', 7, response='{"ok": 1}', prompt='P'))
+            self.assertTrue(recorder.record('rewrite', 7, response='{"tru', prompt='P', error='truncated',
+                                            failed=True, key_index=2))
+            recorder.config['sample_rate'] = 1.0
+            self.assertTrue(recorder.record('section 1/2', 8, response='{"ok": 2}', prompt='P'))
+            self.assertTrue(recorder.flush())
+        finally:
+            recorder.close()
+
+        failure, = recorder.find(7)
+        self.assertEqual((failure['response'], failure['prompt'], failure['error'], failure['key_index']),
+                         ('{"tru', 'P', 'truncated', 2))
+        success, = recorder.find(8)
+        self.assertEqual(success['response'], '{"ok": 2}')
+        self.assertNotIn('prompt', success)
+        self.assertFalse(recorder.record('rewrite', 9, failed=True))
+
+    def test_segments_are_a_ring_buffer(self):
+        recorder = DebugRecorder(dict(self.config, sample_rate=1.0))
+        noise = ''.join(f'{n:08x}' for n in range(3000))
+        try:
+            for article_id in range(12):
+                recorder.record('rewrite', article_id, response=noise[article_id:] + noise[:article_id])
+                self.assertTrue(recorder.flush())
+        finally:
+            recorder.close()
+
+        segments = sorted(Path(self.tmpdir.name).glob('seg-*.jsonl.gz'))
+        self.assertLessEqual(len(segments), 3)
+        self.assertEqual(recorder.stats()['segments'], len(segments))
+        self.assertEqual(recorder.find(0), [])
+        self.assertEqual(len(recorder.find(11)), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
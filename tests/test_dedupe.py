@@ -0,0 +1,80 @@
+"""
+Unit tests for near-duplicate story detection
+"""
+
+import os
+import tempfile
+import unittest
+
+from app.dedupe import StoryIndex, hamming, merge_note, simhash
+from app.store import Database
+
+BASE = (
+    "O Flamengo venceu o Palmeiras por dois a um neste domingo no Maracanã pela rodada do Campeonato "
+    "Brasileiro. Pedro abriu o placar no primeiro tempo após cruzamento de Arrascaeta, Veiga empatou "
+    "de pênalti logo no início da etapa final e Bruno Henrique marcou o gol da vitória aos quarenta "
+    "minutos. Com o resultado o time carioca assumiu a liderança da competição com três pontos de "
+    "vantagem sobre o rival paulista, que volta a campo na quarta-feira contra o Bahia em casa. O "
+    "técnico elogiou a entrega do elenco e disse que a equipe ainda pode evoluir muito na temporada."
+)
+REWORDED = BASE.replace("neste domingo", "na tarde deste domingo").replace("muito", "bastante")
+OTHER = (
+    "O Real Madrid anunciou nesta segunda-feira a contratação de um zagueiro de vinte anos que estava "
+    "no futebol francês. O acordo vale por cinco temporadas e a multa rescisória é de um bilhão de "
+    "euros. O jogador fará exames médicos na capital espanhola antes de ser apresentado no Santiago "
+    "Bernabéu, e deve estrear apenas depois da pausa para as datas Fifa do mês que vem, segundo o clube, "
+    "que ainda busca um lateral esquerdo e um meio-campista antes do fechamento da janela de transferências."
+)
+
+
+class TestDedupe(unittest.TestCase):
+    """Test cases for app.dedupe"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db = Database(os.path.join(self.tmpdir.name, 'app.db'))
+        self.db.initialize()
+        self.index = StoryIndex(self.db, config={'enabled': True, 'min_tokens': 20, 'max_distance': 10,
+                                                 'window_hours': 24})
+
+    def tearDown(self):
+        self.db.close()
+        self.tmpdir.cleanup()
+
+    def test_simhash_distance(self):
+        title = "Flamengo vence o Palmeiras e assume a liderança"
+        a = simhash(BASE, title)
+        self.assertEqual(a, simhash(BASE, title))
+        self.assertLessEqual(hamming(a, simhash(REWORDED, title)), 10)
+        self.assertGreater(hamming(a, simhash(OTHER, "Real Madrid contrata zagueiro")), 10)
+        self.assertIsNone(simhash(''))
+
+    def test_find_duplicate_within_window(self):
+        published = {'title': 'Flamengo vence o Palmeiras', 'content': f'<p>{BASE}</p>'}
+        fp = self.index.fingerprint(published)
+        # Fingerprints at or above 2**63 must survive the signed SQLite column
+        self.index.add(1, 'lance', 'https://lance.com.br/a', published['title'], fp | 1 << 63, wp_post_id=50)
+        self.assertIsNone(self.index.find_duplicate(fp | 1 << 63, 1))
+
+        dup = self.index.fingerprint({'title': 'Flamengo vence o Palmeiras', 'content': f'<p>{REWORDED}</p>'})
+        match = self.index.find_duplicate(dup | 1 << 63, 2)
+        self.assertEqual(match['article_id'], 1)
+        self.assertEqual(match['wp_post_id'], 50)
+
+        other = self.index.fingerprint({'title': 'Real Madrid contrata zagueiro', 'content': f'<p>{OTHER}</p>'})
+        self.assertIsNone(self.index.find_duplicate(other, 3))
+        self.assertIsNone(self.index.fingerprint({'title': 'Curta', 'content': '<p>Pouco texto.</p>'}))
+
+        self.db.conn.execute("UPDATE story_fingerprints SET created_at = 0")
+        self.db.conn.commit()
+        self.assertIsNone(self.index.find_duplicate(dup | 1 << 63, 2))
+        self.assertEqual(self.index.prune(), 1)
+
+    def test_merge_note_escapes(self):
+        note = merge_note('AS "Diario"', 'https://as.com/a?x=1&y=2')
+        self.assertIn('&amp;y=2', note)
+        self.assertIn('AS &quot;Diario&quot;', note)
+
+
+if __name__ == '__main__':
+    unittest.main()
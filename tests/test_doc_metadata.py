@@ -0,0 +1,71 @@
+"""
+Unit tests for the per-document metadata cache
+"""
+
+import unittest
+
+from bs4 import BeautifulSoup
+
+from app.doc_metadata import DocumentMetadata, parse_json_ld
+from app.media import collect_media
+
+PAGE = """
+<html><head>
+<title>Título da página</title>
+<meta property="og:title" content="Título OG">
+<meta property="og:image" content="/og.jpg">
+<meta name="twitter:card" content="summary_large_image">
+<meta property="twitter:image" content="/tw.jpg">
+<meta name="description" content="Resumo da notícia">
+<meta property="og:description" content="Resumo OG">
+<script type="application/ld+json">{"@context": "https://schema.org", "@graph": [
+  {"@type": "WebPage", "name": "Página"},
+  {"@type": ["NewsArticle", "Article"], "headline": "Manchete", "image": {"url": "/ld.jpg"},},
+]}</script>
+<script type="application/ld+json">{not json</script>
+<script type="application/ld+json">[{"@type": "BreadcrumbList"}, "x"]</script>
+</head><body><p>Texto</p></body></html>
+"""
+URL = 'https://example.com/noticia/a.html'
+
+
+class TestDocumentMetadata(unittest.TestCase):
+    """Test cases for app.doc_metadata"""
+
+    def test_meta_tags_are_indexed(self):
+        meta = DocumentMetadata.from_soup(BeautifulSoup(PAGE, 'lxml'))
+        self.assertEqual(meta.title, 'Título da página')
+        self.assertEqual(meta.title_text(), 'Título OG')
+        self.assertEqual(meta.og('image'), '/og.jpg')
+        self.assertEqual(meta.twitter('card'), 'summary_large_image')
+        self.assertEqual(meta.twitter('image'), '/tw.jpg')
+        self.assertEqual(meta.description(), 'Resumo da notícia')
+
+        bare = DocumentMetadata.from_soup(BeautifulSoup('<p>x</p>', 'lxml'))
+        self.assertEqual(bare.title_text(), 'No Title Found')
+        self.assertEqual(bare.description(), '')
+        self.assertIsNone(bare.article())
+
+    def test_json_ld_is_parsed_once_and_indexed(self):
+        meta = DocumentMetadata.from_soup(BeautifulSoup(PAGE, 'lxml'))
+        self.assertEqual(len(meta.json_ld), 3)
+        self.assertIsNone(meta.json_ld[1])
+        self.assertEqual(len(meta.json_ld_objects), 2)
+        self.assertEqual(meta.article()['headline'], 'Manchete')
+        self.assertEqual([i.get('name') for i in meta.of_type('WebPage')], ['Página'])
+        self.assertEqual(len(meta.of_type('BreadcrumbList')), 1)
+
+    def test_trailing_commas_are_forgiven(self):
+        self.assertEqual(parse_json_ld('{"a": [1, 2,],}'), {'a': [1, 2]})
+        self.assertIsNone(parse_json_ld('{"a": '))
+        self.assertIsNone(parse_json_ld(None))
+
+    def test_featured_image_reads_the_shared_metadata(self):
+        soup = BeautifulSoup(PAGE, 'lxml')
+        meta = DocumentMetadata.from_soup(soup)
+        self.assertIs(collect_media(soup, URL, metadata=meta).metadata, meta)
+        self.assertEqual(collect_media(soup, URL, metadata=meta).featured_image(), 'https://example.com/og.jpg')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+"""
+Unit tests for the extraction process pool
+"""
+
+import time
+import unittest
+
+from app.extract_pool import KIND_LITE, ExtractionPool
+
+PARAGRAPH = ("O técnico confirmou a escalação para a partida de domingo e explicou as mudanças no meio-campo "
+             "depois da sequência de jogos fora de casa. ")
+PAGE = (
+    '<html><head><title>Jogo decisivo</title><meta property="og:title" content="Jogo decisivo"></head><body>'
+    '<nav>Menu</nav><article><h1>Jogo decisivo</h1>'
+    + ''.join(f'<p>{PARAGRAPH * 3} Parágrafo {n}.</p>' for n in range(6))
+    + '</article><footer>Rodapé</footer></body></html>'
+).encode('utf-8')
+
+
+class TestExtractionPool(unittest.TestCase):
+    """Test cases for app.extract_pool"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.pool = ExtractionPool(workers=2, task_timeout=60, max_tasks_per_child=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.close()
+
+    def test_workers_match_inline_extraction(self):
+        url = 'https://example.com/noticia.html'
+        inline = ExtractionPool(workers=0)
+        expected, decision = inline.extract(PAGE, url, 'utf-8')
+        self.assertEqual(decision, 'used')
+
+        # More tasks than max_tasks_per_child, so workers are recycled along the way
+        results = list(self.pool.map([(PAGE, url, 'utf-8')] * 5))
+        self.assertEqual(len(results), 5)
+        for result, decision in results:
+            self.assertEqual(decision, 'used')
+            self.assertEqual(result['content'], expected['content'])
+            self.assertEqual(result['title'], expected['title'])
+
+        lite, lite_decision = self.pool.extract(PAGE, url, 'utf-8', kind=KIND_LITE, min_chars=200, min_paragraphs=2)
+        self.assertEqual(lite_decision, 'used')
+        self.assertIn('Parágrafo 5', lite['content'])
+
+    def test_learning_report_comes_back_from_the_worker(self):
+        learning = {'selector': None, 'validate': False, 'min_chars': 300}
+        result, decision = self.pool.extract(PAGE, 'https://example.com/noticia.html', 'utf-8', learning=learning)
+        self.assertEqual(decision, 'used')
+        self.assertEqual(learning['observed'], 'article')
+
+    def test_timeout_restarts_workers(self):
+        pool = ExtractionPool(workers=1, task_timeout=0.5)
+        try:
+            started = time.monotonic()
+            future = pool._get_executor().submit(time.sleep, 30)
+            self.assertEqual(pool.result(future, 'slow'), (None, 'timeout'))
+            self.assertLess(time.monotonic() - started, 20)
+            pool.task_timeout = 60
+            result, decision = pool.extract(PAGE, 'https://example.com/a', 'utf-8')
+            self.assertEqual(decision, 'used')
+        finally:
+            pool.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
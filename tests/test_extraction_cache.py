@@ -0,0 +1,66 @@
+"""
+Unit tests for the extraction result cache
+"""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app import extraction_cache
+from app.extraction_cache import ExtractionCache
+from app.store import Database
+
+HTML = b'<html><body><article><p>Texto</p></article></body></html>'
+RESULT = {
+    'title': 'Título', 'content': '<p>Texto</p>', 'excerpt': '', 'featured_image_url': 'https://img/1.jpg',
+    'images': [], 'videos': [{'id': 'abc'}], 'source_url': 'https://ge.globo.com/a', 'schema_original': None,
+}
+
+
+class TestExtractionCache(unittest.TestCase):
+    """Test cases for app.extraction_cache"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db = Database(os.path.join(self.tmpdir.name, 'app.db'))
+        self.db.initialize()
+        self.cache = ExtractionCache(self.db, config={'enabled': True, 'ttl_hours': 1, 'max_entries': 2})
+
+    def tearDown(self):
+        self.db.close()
+        self.tmpdir.cleanup()
+
+    def test_hit_requires_same_page_and_version(self):
+        self.cache.put('https://ge.globo.com/a', HTML, RESULT)
+        hit = self.cache.get('https://www.ge.globo.com/a/?utm_medium=rss', HTML)
+        self.assertEqual(hit['videos'], RESULT['videos'])
+        self.assertEqual(hit['source_url'], 'https://www.ge.globo.com/a/?utm_medium=rss')
+
+        self.assertIsNone(self.cache.get('https://ge.globo.com/a', HTML + b' '))
+        self.assertIsNone(self.cache.get('https://ge.globo.com/a', HTML, kind='lite'))
+        with patch.object(extraction_cache, 'EXTRACTOR_VERSION', 999):
+            self.assertIsNone(self.cache.get('https://ge.globo.com/a', HTML))
+
+    def test_failed_extractions_are_not_cached(self):
+        self.cache.put('https://ge.globo.com/a', HTML, None)
+        self.cache.put('https://ge.globo.com/a', HTML, {'content': ''})
+        self.assertIsNone(self.cache.get('https://ge.globo.com/a', HTML))
+
+    def test_ttl_and_lru_pruning(self):
+        for n in range(3):
+            self.cache.put(f'https://ge.globo.com/{n}', HTML, RESULT)
+        self.db.conn.execute("UPDATE extraction_cache SET last_access = 0 WHERE url LIKE '%/1'")
+        self.db.conn.commit()
+        self.assertEqual(self.cache.prune(), 1)
+        self.assertIsNone(self.cache.get('https://ge.globo.com/1', HTML))
+        self.assertIsNotNone(self.cache.get('https://ge.globo.com/0', HTML))
+
+        self.db.conn.execute("UPDATE extraction_cache SET created_at = 0")
+        self.db.conn.commit()
+        self.assertIsNone(self.cache.get('https://ge.globo.com/0', HTML))
+        self.assertEqual(self.cache.prune(), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
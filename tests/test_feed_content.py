@@ -0,0 +1,80 @@
+"""
+Unit tests for the RSS-first extraction fast path
+"""
+
+import unittest
+
+import feedparser
+
+from app.extractor import ContentExtractor
+from app.feeds import normalize_item
+
+PARAGRAPH = "<p>" + "O time entrou em campo com uma proposta ofensiva e dominou a partida desde o início. " * 3 + "</p>"
+
+FEED = """<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0" xmlns:content="http://purl.org/rss/1.0/modules/content/"
+     xmlns:media="http://search.yahoo.com/mrss/">
+  <channel>
+    <title>Exemplo</title>
+    <item>
+      <title>Artigo completo</title>
+      <link>https://example.com/artigo-completo</link>
+      <guid>https://example.com/artigo-completo</guid>
+      <description>Resumo curto do artigo.</description>
+      <content:encoded><![CDATA[{full}<figure><img src="https://cdn.example.com/body-1200x675.jpg"></figure>]]></content:encoded>
+      <media:content url="https://cdn.example.com/capa-1200x675.jpg" medium="image" />
+    </item>
+    <item>
+      <title>Só resumo</title>
+      <link>https://example.com/so-resumo</link>
+      <description>Resumo curto do artigo.</description>
+    </item>
+    <item>
+      <title>Sem imagem</title>
+      <link>https://example.com/sem-imagem</link>
+      <content:encoded><![CDATA[{full}]]></content:encoded>
+    </item>
+  </channel>
+</rss>
+""".replace("{full}", PARAGRAPH * 6)
+
+
+class TestFeedContentFastPath(unittest.TestCase):
+    """Test cases for ContentExtractor.extract_from_feed"""
+
+    @classmethod
+    def setUpClass(cls):
+        entries = feedparser.parse(FEED.encode('utf-8')).entries
+        cls.items = [normalize_item(e) for e in entries]
+        cls.extractor = ContentExtractor()
+
+    def test_full_entry_is_used(self):
+        item = self.items[0]
+        result, decision = self.extractor.extract_from_feed(item, item['url'])
+
+        self.assertEqual(decision, 'used')
+        self.assertEqual(result['title'], 'Artigo completo')
+        self.assertEqual(result['featured_image_url'], 'https://cdn.example.com/capa-1200x675.jpg')
+        self.assertEqual(len(result['images']), 1)
+        self.assertIn('body-1200x675.jpg', result['images'][0])
+        # Images travel separately; the body keeps only the text
+        self.assertNotIn('<img', result['content'])
+        self.assertGreaterEqual(result['content'].count('<p>'), 6)
+
+    def test_incomplete_entries_fall_back(self):
+        _, decision = self.extractor.extract_from_feed(self.items[1], self.items[1]['url'])
+        self.assertEqual(decision, 'no_content')
+
+        _, decision = self.extractor.extract_from_feed(self.items[2], self.items[2]['url'])
+        self.assertEqual(decision, 'no_image')
+
+        result, decision = self.extractor.extract_from_feed(self.items[2], self.items[2]['url'], require_image=False)
+        self.assertEqual(decision, 'used')
+        self.assertIsNone(result['featured_image_url'])
+
+        _, decision = self.extractor.extract_from_feed(self.items[0], self.items[0]['url'], min_chars=100000)
+        self.assertEqual(decision, 'too_short')
+
+
+if __name__ == '__main__':
+    unittest.main()
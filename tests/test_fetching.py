@@ -0,0 +1,94 @@
+"""
+Unit tests for bounded streaming fetches
+"""
+
+import unittest
+from unittest.mock import MagicMock
+
+from app.extractor import make_soup
+from app.fetching import (
+    HTML_CONTENT_TYPES,
+    ArticleEndScanner,
+    FetchRejected,
+    fetch_bounded,
+)
+
+BODY = ("x" * 3000).encode()
+PAGE = (b'<html><head><meta property="og:title" content="T"></head><body>'
+        b'<article class="card">teaser</article>'
+        b'<article><p>' + BODY + b'</p><article>nested</article><p>more</p></article>'
+        b'<section class="comments">' + b'c' * 50000 + b'</section></body></html>')
+
+
+def _session(body, headers=None, chunk=100, status=200):
+    response = MagicMock(status_code=status, url='https://example.com/a',
+                         headers=headers or {'Content-Type': 'text/html; charset=utf-8'})
+    response.iter_content.return_value = [body[i:i + chunk] for i in range(0, len(body), chunk)]
+    session = MagicMock()
+    session.get.return_value = response
+    return session
+
+
+class TestArticleEndScanner(unittest.TestCase):
+    """Test cases for ArticleEndScanner"""
+
+    def test_stops_after_main_article_across_chunk_boundaries(self):
+        for chunk in (7, 100, len(PAGE)):
+            scanner = ArticleEndScanner(min_article_bytes=2048)
+            consumed = 0
+            for i in range(0, len(PAGE), chunk):
+                consumed = i + chunk
+                if scanner.feed(PAGE[i:i + chunk]):
+                    break
+            else:
+                self.fail("scanner never stopped")
+            end = PAGE.index(b'<p>more</p></article>') + len(b'<p>more</p></article>')
+            self.assertGreaterEqual(consumed, end)
+            self.assertLess(consumed, end + chunk)
+
+
+class TestFetchBounded(unittest.TestCase):
+    """Test cases for fetch_bounded"""
+
+    def test_early_abort_keeps_the_article(self):
+        session = _session(PAGE)
+        page = fetch_bounded(session, 'https://example.com/a', allowed_types=HTML_CONTENT_TYPES,
+                             stop_at_article_end=True)
+        self.assertEqual(page.truncated, 'article_end')
+        self.assertLess(page.size, 5000)
+        self.assertEqual(page.encoding, 'utf-8')
+        session.get.return_value.close.assert_called_once()
+        _, kwargs = session.get.call_args
+        self.assertTrue(kwargs['stream'])
+
+        soup = make_soup(page.content, page.encoding)
+        self.assertIn('more', soup.find_all('article')[1].get_text())
+
+        full = fetch_bounded(_session(PAGE), 'https://example.com/a')
+        self.assertIsNone(full.truncated)
+        self.assertEqual(full.content, PAGE)
+
+    def test_caps_and_gating(self):
+        page = fetch_bounded(_session(PAGE), 'https://example.com/a', max_bytes=1000)
+        self.assertEqual((page.truncated, page.size), ('max_bytes', 1000))
+
+        with self.assertRaises(FetchRejected):
+            fetch_bounded(_session(PAGE, {'Content-Type': 'application/pdf'}), 'https://example.com/a',
+                          allowed_types=HTML_CONTENT_TYPES)
+        with self.assertRaises(FetchRejected):
+            fetch_bounded(_session(PAGE, {'Content-Type': 'text/html', 'Content-Length': '999999'}),
+                          'https://example.com/a', max_bytes=1000)
+
+        not_modified = fetch_bounded(_session(b'', status=304), 'https://example.com/a')
+        self.assertEqual((not_modified.status_code, not_modified.content), (304, b''))
+
+    def test_declared_charset_reaches_the_parser(self):
+        body = '<html><body><p>Ação São Paulo</p></body></html>'.encode('latin-1')
+        page = fetch_bounded(_session(body, {'Content-Type': 'text/html; charset=ISO-8859-1'}), 'https://example.com/a')
+        self.assertEqual(page.encoding, 'ISO-8859-1')
+        self.assertEqual(make_soup(page.content, page.encoding).p.get_text(), 'Ação São Paulo')
+        self.assertEqual(page.text(), body.decode('latin-1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
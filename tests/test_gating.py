@@ -0,0 +1,128 @@
+"""
+Unit tests for the pre-AI article gate
+"""
+
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from app import gating
+from app.stats import StatsService
+from app.store import Database
+
+PT = ("O técnico do time confirmou nesta sexta-feira a escalação para o clássico de domingo, e explicou "
+      "que a mudança no meio-campo foi pedida pelos jogadores depois da derrota fora de casa. ")
+EN = ("The manager confirmed on Friday that the team will travel without two starters, and he said "
+      "that the decision was taken after the defeat at home on Tuesday night. ")
+
+
+def article(paragraph: str = PT, paragraphs: int = 4, title: str = 'Técnico confirma escalação', **extra) -> dict:
+    return dict({'title': title, 'content': ''.join(f'<p>{paragraph * 2}</p>' for _ in range(paragraphs)),
+                 'videos': []}, **extra)
+
+
+class TestGating(unittest.TestCase):
+    """Test cases for app.gating"""
+
+    def setUp(self):
+        self.settings = gating.gate_settings({'language': 'pt'})
+
+    def test_full_article_passes(self):
+        verdict = gating.check(article(), self.settings, duplicate_distance=20)
+        self.assertFalse(verdict.rejected)
+        self.assertEqual(verdict.signals['language'], 'pt')
+        self.assertEqual(verdict.signals['paragraphs'], 4)
+
+    def test_rules(self):
+        cases = {
+            'title_deny': article(title='Onde assistir Flamengo x Palmeiras ao vivo'),
+            'paywall': article(paragraphs=2, content=f'<p>{PT * 2}</p><p>Conteúdo exclusivo para assinantes.</p>'),
+            'video_only': article(paragraphs=1, videos=['https://www.youtube.com/embed/abc']),
+            'min_words': article(paragraphs=1),
+            'min_paragraphs': article(content=f'<ul><li>{PT * 10}</li></ul>'),
+            'language': article(EN),
+        }
+        for rule, extracted in cases.items():
+            with self.subTest(rule=rule):
+                self.assertEqual(gating.check(extracted, self.settings).rule, rule)
+
+    def test_feed_overrides(self):
+        settings = gating.gate_settings({'language': 'en', 'gate': {'min_words': 20, 'title_deny': [r'^Podcast']}})
+        self.assertIn(r'^Podcast', settings['title_deny'])
+        self.assertGreater(len(settings['title_deny']), 1)
+        self.assertFalse(gating.check(article(EN, paragraphs=2), settings).rejected)
+        self.assertEqual(gating.check(article(EN, title='Podcast: the week'), settings).rule, 'title_deny')
+        self.assertIsNone(gating.gate_settings({'gate': False}))
+
+        # Shadow unless a feed opts in to dropping articles
+        self.assertEqual(gating.gate_settings({})['mode'], gating.SHADOW)
+        self.assertEqual(gating.gate_settings({'gate': {'mode': gating.ENFORCE}})['mode'], gating.ENFORCE)
+
+        settings = gating.gate_settings({'language': 'pt', 'gate': {'max_duplicate_distance': 8}})
+        self.assertEqual(gating.check(article(), settings, duplicate_distance=6).rule, 'duplicate')
+        self.assertFalse(gating.check(article(), settings, duplicate_distance=12).rejected)
+
+    def test_language_needs_enough_text(self):
+        self.assertEqual(gating.detect_language('o time e a torcida'.split())[0], None)
+        language, hits = gating.detect_language([w.lower() for w in EN.split()] * 3)
+        self.assertEqual(language, 'en')
+        self.assertGreater(hits['en'], hits['pt'])
+
+
+class TestGateRejections(unittest.TestCase):
+    """Test cases for the gate_rejections audit trail in app.store"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db = Database(os.path.join(self.tmpdir.name, 'app.db'))
+        self.db.initialize()
+        self.db.filter_new_articles('lance', [{'id': 'ext-1', 'url': 'https://www.lance.com.br/a.html'}])
+        self.article_id = self.db.get_articles_to_process('lance', 10)[0]['id']
+
+    def tearDown(self):
+        self.db.close()
+        self.tmpdir.cleanup()
+
+    def status(self) -> str:
+        return self.db._get_cursor().execute(
+            "SELECT status FROM seen_articles WHERE id = ?", (self.article_id,)).fetchone()[0]
+
+    def test_release_requeues_the_article(self):
+        self.db.record_gate_rejection(self.article_id, 'lance', 'https://www.lance.com.br/a.html', 'Onde assistir',
+                                      'title_deny', 'title matches', {'words': 80})
+        self.assertEqual(self.status(), 'REJECTED')
+        self.assertEqual(self.db.get_articles_to_process('lance', 10), [])
+        self.assertFalse(self.db.is_gate_released(self.article_id))
+
+        row = self.db._get_cursor().execute("SELECT id, signals FROM gate_rejections").fetchone()
+        self.assertEqual(json.loads(row['signals']), {'words': 80})
+        self.assertTrue(self.db.review_gate_rejection(row['id'], 'released'))
+        self.assertEqual(self.status(), 'DEFERRED')
+        self.assertEqual([r['id'] for r in self.db.get_articles_to_process('lance', 10)], [self.article_id])
+        self.assertTrue(self.db.is_gate_released(self.article_id))
+        self.assertFalse(self.db.review_gate_rejection(row['id'] + 1, 'released'))
+
+        counters = dict(self.db._get_cursor().execute("SELECT name, value FROM stats_counters").fetchall())
+        self.assertEqual(counters['gemini_calls_avoided'], 1)
+        self.assertEqual(counters['gate_false_rejects'], 1)
+
+        stats = StatsService(Path(self.tmpdir.name) / 'app.db', ttl_seconds=0)
+        try:
+            rejection, = stats.get_gate_rejections()
+            self.assertEqual((rejection['rule'], rejection['review'], rejection['article_status']),
+                             ('title_deny', 'released', 'DEFERRED'))
+            self.assertEqual(stats.get_gate_rejections(unreviewed=True), [])
+        finally:
+            stats.close()
+
+    def test_shadow_rejection_leaves_the_article(self):
+        self.db.record_gate_rejection(self.article_id, 'lance', 'https://www.lance.com.br/a.html', 'Onde assistir',
+                                      'min_words', '80 words', {}, enforce=False)
+        self.assertEqual(self.status(), 'NEW')
+        self.assertEqual(self.db._get_cursor().execute("SELECT mode FROM gate_rejections").fetchone()[0], 'shadow')
+
+
+if __name__ == '__main__':
+    unittest.main()
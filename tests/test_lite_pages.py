@@ -0,0 +1,126 @@
+"""
+Unit tests for the AMP/lite page fetch mode
+"""
+
+import unittest
+from unittest.mock import MagicMock
+
+from app.extractor import ContentExtractor
+from app.lite_pages import LitePageResolver, find_amphtml_link, learn_template
+
+CONFIG = {
+    'domains': ['lance.com.br'],
+    'url_templates': {'ge.globo.com': 'https://ge.globo.com/google/amp{path}'},
+    'head_max_bytes': 4096,
+    'retry_after_hours': 1,
+    'max_failures': 2,
+}
+
+HEAD = (b'<html><head><title>x</title>'
+        b'<link rel="canonical" href="https://www.lance.com.br/futebol/noticia.html">'
+        b'<link href="/futebol/noticia.html/amp" rel="amphtml"></head><body>')
+
+SENTENCE = "O técnico confirmou a escalação para o clássico de domingo no estádio lotado. "
+AMP_PAGE = f"""<html><head>
+<title>Título do AMP</title>
+<meta property="og:title" content="Clássico no domingo">
+<meta property="og:image" content="https://cdn.example.com/capa-1200x675.jpg">
+<script async src="https://cdn.ampproject.org/v0.js"></script>
+<style amp-custom>body {{ color: red }}</style>
+</head><body>
+<header><nav><a href="/">Home</a></nav></header>
+<amp-sidebar id="menu"><p>Menu lateral com muitos links e texto suficiente para contar.</p></amp-sidebar>
+<article>
+  <h1>Clássico no domingo</h1>
+  {''.join(f'<p>{SENTENCE * 4}</p>' for _ in range(5))}
+  <amp-img src="https://cdn.example.com/corpo-1200x675.jpg" width="1200" height="675"></amp-img>
+  <amp-ad type="doubleclick"><p>Publicidade</p></amp-ad>
+  <h2>Leia também</h2>
+  <amp-youtube data-videoid="dQw4w9WgXcQ" layout="responsive"></amp-youtube>
+</article>
+<footer><p>Rodapé</p></footer>
+</body></html>"""
+
+
+def _streaming_session(body, url):
+    response = MagicMock(url=url)
+    response.iter_content.return_value = [body[i:i + 64] for i in range(0, len(body), 64)]
+    response.__enter__.return_value = response
+    session = MagicMock()
+    session.get.return_value = response
+    return session
+
+
+class TestLitePageResolver(unittest.TestCase):
+    """Test cases for LitePageResolver"""
+
+    def test_helpers(self):
+        url = 'https://www.lance.com.br/futebol/noticia.html'
+        self.assertEqual(find_amphtml_link(HEAD, url), 'https://www.lance.com.br/futebol/noticia.html/amp')
+        self.assertIsNone(find_amphtml_link(b'<link rel="canonical" href="/x">', url))
+        self.assertEqual(learn_template(url, 'https://www.lance.com.br/futebol/noticia.html/amp'),
+                         'https://www.lance.com.br{path}/amp')
+        self.assertIsNone(learn_template(url, 'https://amp.example.com/123'))
+
+    def test_template_discovery_and_learning(self):
+        resolver = LitePageResolver(CONFIG)
+        self.assertTrue(resolver.applies_to('https://www.lance.com.br/a.html'))
+        self.assertFalse(resolver.applies_to('https://www.example.com/a.html'))
+
+        self.assertEqual(resolver.resolve('https://ge.globo.com/futebol/x.ghtml', MagicMock()),
+                         ('https://ge.globo.com/google/amp/futebol/x.ghtml', 'template'))
+
+        url = 'https://www.lance.com.br/futebol/noticia.html'
+        session = _streaming_session(HEAD + b'<p>' + b'x' * 10000 + b'</p>', url)
+        self.assertEqual(resolver.resolve(url, session), (url + '/amp', 'discovered'))
+        # Discovery streams the page instead of downloading it whole
+        _, kwargs = session.get.call_args
+        self.assertTrue(kwargs['stream'])
+        self.assertEqual(resolver.resolve('https://www.lance.com.br/outra.html', session),
+                         ('https://www.lance.com.br/outra.html/amp', 'learned'))
+        self.assertEqual(session.get.call_count, 1)
+
+    def test_no_alternate_and_failures_back_off(self):
+        resolver = LitePageResolver(CONFIG)
+        url = 'https://marca.com/futbol/noticia.html'
+        session = _streaming_session(b'<html><head></head><body>', url)
+        self.assertEqual(resolver.resolve(url, session, now=0), (None, 'no_alternate'))
+        self.assertEqual(resolver.resolve(url, session, now=60), (None, 'cooldown'))
+        head = b'<head><link rel="amphtml" href="https://marca.com/amp/futbol/noticia.html"></head>'
+        self.assertEqual(resolver.resolve(url, _streaming_session(head, url), now=3601)[1], 'discovered')
+
+        resolver.record_result(url, False, now=4000)
+        self.assertEqual(resolver.resolve(url, session, now=4000)[1], 'learned')
+        resolver.record_result(url, False, now=4000)
+        self.assertEqual(resolver.resolve(url, session, now=4000), (None, 'cooldown'))
+        self.assertNotIn('marca.com', resolver.learned)
+
+
+class TestExtractLite(unittest.TestCase):
+    """Test cases for ContentExtractor.extract_lite"""
+
+    def test_lightweight_profile(self):
+        url = 'https://www.lance.com.br/futebol/noticia.html'
+        result, decision = ContentExtractor().extract_lite(AMP_PAGE, url)
+
+        self.assertEqual(decision, 'used')
+        self.assertEqual(result['title'], 'Clássico no domingo')
+        self.assertEqual(result['source_url'], url)
+        self.assertEqual(result['featured_image_url'], 'https://cdn.example.com/capa-1200x675.jpg')
+        self.assertEqual(len(result['images']), 1)
+        self.assertIn('corpo-1200x675.jpg', result['images'][0])
+        self.assertEqual([v['id'] for v in result['videos']], ['dQw4w9WgXcQ'])
+        self.assertEqual(result['content'].count('<p>'), 5)
+        for junk in ('Menu lateral', 'Publicidade', 'Leia também', 'Rodapé', 'color: red'):
+            self.assertNotIn(junk, result['content'])
+
+    def test_quality_check_falls_back(self):
+        url = 'https://www.lance.com.br/futebol/noticia.html'
+        _, decision = ContentExtractor().extract_lite(AMP_PAGE, url, min_chars=100000)
+        self.assertEqual(decision, 'too_short')
+        _, decision = ContentExtractor().extract_lite('<html><body><div></div></body></html>', url)
+        self.assertEqual(decision, 'no_content')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+"""
+Unit tests for the incremental log tailer and the dashboard event stream
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from app.events import event_stream
+from app.logtail import LogTailer, parse_log_line
+from app.stats import StatsService
+from app.store import Database
+
+
+def _line(n, level='INFO'):
+    return f"2025-01-01 10:00:{n:02d},000 - {level} - pipeline - message {n}\n"
+
+
+class TestLogTailer(unittest.TestCase):
+    """Test cases for LogTailer"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'app.log')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _append(self, text):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(text)
+
+    def test_parse_both_formats(self):
+        main_fmt = parse_log_line("2025-01-01 10:00:00,000 - WARNING - pipeline - hello - world")
+        conf_fmt = parse_log_line("2025-01-01 10:00:00,000 - app.pipeline - ERROR - boom")
+        self.assertEqual((main_fmt['level'], main_fmt['logger'], main_fmt['message']),
+                         ('WARNING', 'pipeline', 'hello - world'))
+        self.assertEqual((conf_fmt['level'], conf_fmt['logger']), ('ERROR', 'app.pipeline'))
+        self.assertIsNone(parse_log_line("Traceback (most recent call last):"))
+
+    def test_first_read_is_bounded(self):
+        self._append(''.join(_line(i % 60) for i in range(5000)))
+        tailer = LogTailer(self.path, max_entries=50, backfill_bytes=1024)
+
+        tailer.refresh()
+
+        # Only the last ~1 KB was parsed, and the partial first line was dropped
+        self.assertLess(tailer.last_seq, 30)
+        self.assertEqual(tailer.recent(1)[0]['message'], f'message {4999 % 60}')
+
+    def test_incremental_and_partial_lines(self):
+        self._append(_line(1))
+        tailer = LogTailer(self.path)
+        self.assertEqual(tailer.refresh(), 1)
+        self.assertEqual(tailer.refresh(), 0)
+
+        # A line without its newline yet must wait for the rest of it
+        self._append(_line(2)[:20])
+        self.assertEqual(tailer.refresh(), 0)
+        self._append(_line(2)[20:] + _line(3, 'ERROR'))
+        seq, entries = tailer.since(1)
+
+        self.assertEqual(seq, 3)
+        self.assertEqual([e['message'] for e in entries], ['message 2', 'message 3'])
+        self.assertEqual(tailer.recent(2)[0]['level'], 'ERROR')
+
+    def test_rotation(self):
+        self._append(_line(1) + _line(2))
+        tailer = LogTailer(self.path)
+        tailer.refresh()
+
+        os.rename(self.path, self.path + '.1')
+        self._append(_line(9))
+        tailer.refresh()
+
+        self.assertEqual(tailer.recent(1)[0]['message'], 'message 9')
+
+
+class TestEventStream(unittest.TestCase):
+    """Pipeline events recorded by Database reach the SSE stream"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'app.db')
+        self.log_path = os.path.join(self.tmpdir.name, 'app.log')
+        self.db = Database(self.db_path)
+        self.db.initialize()
+        self.stats = StatsService(self.db_path, ttl_seconds=0)
+
+    def tearDown(self):
+        self.stats.close()
+        self.db.close()
+        self.tmpdir.cleanup()
+
+    def test_stream_emits_pipeline_events_and_logs(self):
+        items = [{'id': 'a', 'url': 'https://example.com/a', 'title': 'A'}]
+        article_id = self.db.filter_new_articles('lance', items)[0]['db_id']
+        self.db.update_article_status(article_id, 'PROCESSING')
+        self.db.record_event('stage_finished', article_id, 'lance', stage='fetch', elapsed_ms=12.5)
+        self.db.save_processed_post(article_id, 77)
+        with open(self.log_path, 'w', encoding='utf-8') as f:
+            f.write(_line(1))
+
+        stream = event_stream(self.stats, LogTailer(self.log_path), last_event_id=0,
+                              poll_seconds=0, max_seconds=5)
+        messages = [next(stream) for _ in range(4)]
+        stream.close()
+
+        self.assertTrue(messages[0].startswith('retry:'))
+        payloads = [json.loads(m.split('data: ', 1)[1]) for m in messages[1:]]
+        self.assertEqual([p['type'] for p in payloads], ['article_claimed', 'stage_finished', 'post_published'])
+        self.assertEqual(payloads[0]['source_id'], 'lance')
+        self.assertEqual(payloads[1]['data'], {'stage': 'fetch', 'elapsed_ms': 12.5})
+        self.assertEqual(payloads[2]['data'], {'wp_post_id': 77})
+        # The log line existed before the stream started, so it is not replayed
+        self.assertIn('id: 3', messages[3])
+
+    def test_prune_events_keeps_newest(self):
+        for i in range(5):
+            self.db.record_event('stage_finished', None, 'lance', n=i)
+        self.db.prune_events(2)
+        events = self.stats.get_events_after(0)
+        self.assertEqual([e['data']['n'] for e in events], [3, 4])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+"""
+Unit tests for the single-walk media collector
+"""
+
+import unittest
+
+from bs4 import BeautifulSoup
+
+from app.extractor import ContentExtractor, collect_images_from_article
+from app.media import collect_media, is_valid_article_image, youtube_id
+
+PAGE = """
+<html><head>
+<script type="application/ld+json">{"image": {"url": "/ld.jpg"}}</script>
+</head><body>
+<aside><img src="/sidebar-1200x800.jpg"></aside>
+<article>
+  <img src="/a/capa.jpg" width="1200" height="800">
+  <figure><img srcset="/f/p.jpg 300w, /f/g.jpg 1200w" aria-hidden="true"></figure>
+  <img data-lazy-src="https://static1.srcdn.com/lazy.jpg">
+  <picture><source srcset="/pic-800.webp 800w"><img src="/pic.jpg"></picture>
+  <div style="background-image: url('/bg.jpg')"></div>
+  <div data-img-url="/galeria/1.jpg">Legenda da foto</div>
+  <noscript>&lt;img src="/ns.jpg"&gt;</noscript>
+  <img src="/perfil/autor.jpg"><img src="/thumb.jpg?w=150&amp;h=150"><img src="data:image/gif;base64,R0l">
+  <iframe src="https://www.youtube.com/embed/abcdefghijk?rel=0"></iframe>
+  <div class="youtube" id="ABCDEFGHIJK"></div>
+  <blockquote class="twitter-tweet"><p>tweet</p></blockquote>
+</article>
+</body></html>
+"""
+URL = 'https://example.com/noticia/a.html'
+
+
+class TestMediaCollector(unittest.TestCase):
+    """Test cases for app.media"""
+
+    def test_one_walk_collects_every_kind(self):
+        soup = BeautifulSoup(PAGE, 'lxml')
+        media = collect_media(soup, URL, root=soup.find('article'))
+
+        self.assertEqual(media.body_images(), [
+            'https://static1.srcdn.com/lazy.jpg',
+            'https://example.com/a/capa.jpg', 'https://example.com/bg.jpg', 'https://example.com/f/g.jpg',
+            'https://example.com/galeria/1.jpg', 'https://example.com/ns.jpg',
+            'https://example.com/pic-800.webp', 'https://example.com/pic.jpg',
+        ])
+        self.assertEqual(collect_images_from_article(soup, URL), media.body_images())
+        positions = [item.position for item in media.image_candidates()]
+        self.assertEqual(positions, sorted(positions))
+        self.assertEqual([v['id'] for v in media.videos()], ['abcdefghijk', 'ABCDEFGHIJK'])
+        self.assertEqual([str(t.p) for t in media.twitter_embeds], ['<p>tweet</p>'])
+        self.assertEqual(media.featured_image(), 'https://example.com/ld.jpg')
+
+    def test_featured_image_priority(self):
+        og = '<meta property="og:image" content="/og.jpg">'
+        soup = BeautifulSoup(PAGE.replace('<head>', '<head>' + og), 'lxml')
+        self.assertEqual(ContentExtractor._pick_featured_image(None, soup, URL), 'https://example.com/og.jpg')
+        soup = BeautifulSoup(PAGE.replace('application/ld+json', 'text/plain'), 'lxml')
+        self.assertEqual(collect_media(soup, URL).featured_image(), 'https://example.com/a/capa.jpg')
+
+    def test_data_img_divs_become_figures(self):
+        soup = BeautifulSoup(PAGE, 'lxml')
+        media = collect_media(soup, URL, root=soup.find('article'))
+        ContentExtractor._convert_data_img_to_figure(None, soup, media)
+        figure = soup.find('img', src='/galeria/1.jpg').parent
+        self.assertEqual(figure.name, 'figure')
+        self.assertEqual(figure.figcaption.get_text(), 'Legenda da foto')
+
+    def test_url_filters(self):
+        self.assertTrue(is_valid_article_image('https://cdn.site.com/foto-1200x675.jpg'))
+        for url in ('https://secure.gravatar.com/a.jpg', 'https://site.com/logo-clube.png',
+                    'https://site.com/i/share.jpg', 'https://site.com/a.jpg?width=150&height=150', 'data:image/png;base64,x', ''):
+            self.assertFalse(is_valid_article_image(url), url)
+        self.assertEqual(youtube_id('https://youtu.be/abcdefghijk'), 'abcdefghijk')
+        self.assertEqual(youtube_id('https://www.youtube.com/watch?v=abcdefghijk&t=3'), 'abcdefghijk')
+        self.assertEqual(youtube_id('https://player.site/v/1', og_image='https://i.ytimg.com/vi/ZZZZZZZZZZZ/hqdefault.jpg'),
+                         'ZZZZZZZZZZZ')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+"""
+Unit tests for the metrics rollups
+"""
+
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from app import metrics
+from app.store import Database
+
+
+class TestMetrics(unittest.TestCase):
+    """Test cases for histogram percentiles and incremental rollups"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'app.db')
+        self.db = Database(self.db_path)
+        self.db.initialize()
+        metrics._buffer.drain()
+
+    def tearDown(self):
+        self.db.close()
+        self.tmpdir.cleanup()
+
+    def test_percentiles_from_bins(self):
+        """Percentiles fall inside the bin that holds the requested rank."""
+        bins = {}
+        for value in range(1, 101):
+            idx = metrics.bin_index(value * 10.0)
+            bins[idx] = bins.get(idx, 0) + 1
+
+        result = metrics.percentiles_from_bins(bins)
+
+        for key, exact in (('p50', 500.0), ('p95', 950.0), ('p99', 990.0)):
+            lower, upper = metrics.bin_range(metrics.bin_index(exact))
+            self.assertGreaterEqual(result[key], lower)
+            self.assertLessEqual(result[key], upper)
+
+    def test_empty_bins(self):
+        """No samples means no percentiles."""
+        self.assertEqual(metrics.percentiles_from_bins({}), {'p50': None, 'p95': None, 'p99': None})
+
+    def test_flush_is_incremental(self):
+        """Two flushes into the same hour merge into one rollup row."""
+        metrics.record(metrics.STAGE_FETCH, 100.0, 'lance')
+        metrics.record(metrics.STAGE_FETCH, 300.0, 'lance')
+        self.assertEqual(metrics.flush(self.db), 2)
+        metrics.record(metrics.STAGE_FETCH, 200.0, 'lance')
+        metrics.incr(metrics.ARTICLES_PUBLISHED, 'lance')
+        self.assertEqual(metrics.flush(self.db), 2)
+
+        conn = sqlite3.connect(self.db_path)
+        try:
+            rows = conn.execute(
+                "SELECT count, sum_ms, max_ms FROM metric_rollups WHERE metric = ?",
+                (metrics.STAGE_FETCH,)
+            ).fetchall()
+            self.assertEqual(rows, [(3, 600.0, 300.0)])
+
+            perf = metrics.load_performance(conn, hours=1)
+        finally:
+            conn.close()
+
+        self.assertEqual(perf['stages']['fetch']['count'], 3)
+        self.assertEqual(perf['stages']['fetch']['avg_ms'], 200.0)
+        self.assertEqual(perf['throughput']['published'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+"""
+Unit tests for the per-article pipeline stages
+"""
+
+import importlib.util
+import os
+import sys
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from app.store import Database
+
+HAS_GEMINI = importlib.util.find_spec('google') is not None and \
+    importlib.util.find_spec('google.generativeai') is not None
+
+EXTRACTED = {
+    'title': 'Técnico confirma escalação',
+    'content': '<p>O técnico confirmou a escalação para o clássico de domingo.</p>',
+    'images': [],
+    'videos': [],
+}
+REWRITTEN = {
+    'titulo_final': 'Técnico confirma escalação para o clássico',
+    'conteudo_final': '<p>O técnico confirmou a escalação.</p>',
+    'meta_description': 'O técnico confirmou a escalação para o clássico de domingo.',
+    'focus_keyphrase': 'escalação do clássico',
+    'tags_sugeridas': ['clássico'],
+    'yoast_meta': {},
+}
+
+
+def setUpModule():
+    # app.pipeline imports the Gemini client; the AI processor is mocked here, so a
+    # stand-in client lets these tests run without google-generativeai installed
+    if not HAS_GEMINI:
+        sys.modules.setdefault('app.ai_client_gemini', mock.MagicMock())
+
+
+class TestProcessArticle(unittest.TestCase):
+    """Test cases for app.pipeline._process_article"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db = Database(os.path.join(self.tmpdir.name, 'app.db'))
+        self.db.initialize()
+        self.article, = self.db.filter_new_articles('lance', [{'id': 'ext-1', 'url': 'https://www.lance.com.br/a.html'}])
+
+    def tearDown(self):
+        self.db.close()
+        self.tmpdir.cleanup()
+
+    def test_successful_publish_is_published(self):
+        from app import pipeline
+
+        wp_client = mock.Mock()
+        wp_client.get_domain.return_value = 'exemplo.com.br'
+        wp_client.create_post.return_value = 321
+        ctx = SimpleNamespace(
+            db=self.db,
+            extractor=mock.Mock(**{'extract_from_feed.return_value': (dict(EXTRACTED), 'used')}),
+            ai_processor=mock.Mock(**{'rewrite_content.return_value': (dict(REWRITTEN), None)}),
+            wp_client=wp_client,
+            link_map={},
+            stories=SimpleNamespace(enabled=False),
+        )
+        feed_config = {'category': 'futebol', 'source_name': 'Lance', 'gate': False}
+
+        outcome = pipeline._process_article(ctx, 'lance', feed_config, self.article)
+
+        self.assertEqual(outcome, pipeline.ARTICLE_PUBLISHED)
+        wp_client.create_post.assert_called_once()
+        status = self.db._get_cursor().execute(
+            "SELECT status FROM seen_articles WHERE id = ?", (self.article['db_id'],)).fetchone()[0]
+        self.assertNotEqual(status, 'FAILED')
+
+
+class TestProcessFeed(unittest.TestCase):
+    """Test cases for app.pipeline.process_feed"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db = Database(os.path.join(self.tmpdir.name, 'app.db'))
+        self.db.initialize()
+
+    def tearDown(self):
+        self.db.close()
+        self.tmpdir.cleanup()
+
+    def test_released_rejection_is_processed_on_the_next_poll(self):
+        from app import pipeline
+
+        article, = self.db.filter_new_articles('lance', [{'id': 'ext-1', 'url': 'https://www.lance.com.br/a.html'}])
+        self.db.record_gate_rejection(article['db_id'], 'lance', article['url'], EXTRACTED['title'],
+                                      'min_words', 'too short', {'words': 10})
+        rejection_id = self.db._get_cursor().execute("SELECT id FROM gate_rejections").fetchone()[0]
+        self.assertTrue(self.db.review_gate_rejection(rejection_id, 'released'))
+
+        wp_client = mock.Mock()
+        wp_client.get_domain.return_value = 'exemplo.com.br'
+        wp_client.create_post.return_value = 321
+        ctx = SimpleNamespace(
+            db=self.db,
+            # The URL is already seen, so the feed has nothing new for it
+            feed_reader=mock.Mock(**{'read_feeds.return_value': [], 'last_not_modified': False}),
+            extractor=mock.Mock(**{'extract_from_feed.return_value': (dict(EXTRACTED), 'used')}),
+            ai_processor=mock.Mock(**{'rewrite_content.return_value': (dict(REWRITTEN), None)}),
+            wp_client=wp_client,
+            link_map={},
+            stories=SimpleNamespace(enabled=False),
+        )
+        # Enforced, the gate would reject the short body again
+        feed_config = {'category': 'futebol', 'source_name': 'Lance', 'gate': {'mode': 'enforce'}}
+
+        with mock.patch.dict(pipeline.RSS_FEEDS, {'lance': feed_config}), mock.patch.object(pipeline.time, 'sleep'):
+            result = pipeline.process_feed(ctx, 'lance')
+
+        self.assertEqual((result['new'], result['published']), (0, 1))
+        wp_client.create_post.assert_called_once()
+        status = self.db._get_cursor().execute(
+            "SELECT status FROM seen_articles WHERE id = ?", (article['db_id'],)).fetchone()[0]
+        self.assertEqual(status, 'PUBLISHED')
+
+
+class TestRunFeedJob(unittest.TestCase):
+    """Test cases for app.pipeline.run_feed_job"""
+
+    def test_scheduler_context_is_reused(self):
+        from app import pipeline
+
+        ctx = mock.Mock(**{'acquire_lease.return_value': True, 'db.get_feed_poll_state.return_value': {}})
+        result = {'items': 2, 'new': 1, 'published': 1, 'not_modified': False, 'skipped': False, 'error': False}
+
+        with mock.patch.object(pipeline, 'process_feed', return_value=result) as process_feed, \
+                mock.patch.object(pipeline, 'PipelineContext') as context_class:
+            for _ in range(2):
+                self.assertGreater(pipeline.run_feed_job('lance', ctx=ctx), 0)
+
+        context_class.assert_not_called()
+        self.assertTrue(all(call.args[0] is ctx for call in process_feed.call_args_list))
+        self.assertEqual((ctx.reload_link_map.call_count, ctx.end_run.call_count), (2, 2))
+        ctx.close.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+"""
+Unit tests for the adaptive per-feed polling policy and conditional feed requests
+"""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+from app.feeds import FeedReader
+from app.polling import AdaptivePollingPolicy
+from app.store import Database
+
+CONFIG = {
+    'min_interval_minutes': 2,
+    'max_interval_minutes': 60,
+    'initial_interval_minutes': 15,
+    'target_items_per_poll': 1,
+    'ewma_alpha': 0.5,
+    'backoff_factor': 1.5,
+    'jitter_fraction': 0.1,
+}
+
+
+def _result(new=0, not_modified=False, error=False):
+    return {'items': new, 'new': new, 'published': 0, 'not_modified': not_modified,
+            'skipped': False, 'error': error}
+
+
+class TestAdaptivePollingPolicy(unittest.TestCase):
+    """Test cases for AdaptivePollingPolicy"""
+
+    def setUp(self):
+        self.policy = AdaptivePollingPolicy(CONFIG)
+
+    def _poll(self, state, new, now, feed_config=None, **kwargs):
+        return self.policy.update(state, _result(new, **kwargs), now, feed_config or {})
+
+    def test_busy_feed_speeds_up(self):
+        state = self._poll({}, 20, now=0)  # first poll: backlog, no rate yet
+        now = 0
+        for _ in range(6):
+            now += state['interval_seconds']
+            state = self._poll(state, 3, now)
+        self.assertLessEqual(state['interval_seconds'], 10 * 60)
+        self.assertGreater(state['rate_per_hour'], 0)
+        self.assertEqual(state['empty_streak'], 0)
+
+    def test_idle_feed_backs_off_to_max(self):
+        state, now = {}, 0
+        for _ in range(12):
+            state = self._poll(state, 0, now, not_modified=True)
+            now += state['interval_seconds']
+        self.assertEqual(state['interval_seconds'], 60 * 60)
+        self.assertEqual(state['empty_streak'], 12)
+        self.assertEqual(state['not_modified_streak'], 12)
+
+    def test_per_feed_bounds_and_errors(self):
+        feed_config = {'poll': {'min_minutes': 10, 'max_minutes': 20}}
+        state = self._poll({'interval_seconds': 600, 'last_polled_at': 0}, 50, 600, feed_config)
+        self.assertEqual(state['interval_seconds'], 600)
+
+        state = self.policy.update(state, _result(error=True), 1200, feed_config)
+        self.assertEqual(state['interval_seconds'], 900)
+        self.assertEqual(self.policy.jitter_seconds(900), 90)
+
+
+class TestConditionalFeedRequests(unittest.TestCase):
+    """FeedReader sends ETag/Last-Modified and reports 304s"""
+
+    def _response(self, status, content=b'', headers=None):
+        response = MagicMock(status_code=status, headers=headers or {}, url='https://example.com/rss')
+        response.iter_content.return_value = [content]
+        response.raise_for_status = MagicMock()
+        return response
+
+    def test_etag_round_trip(self):
+        reader = FeedReader(user_agent='test')
+        reader.session = MagicMock()
+        rss = b'<rss><channel><item><title>A</title><link>https://example.com/a</link></item></channel></rss>'
+        reader.session.get.return_value = self._response(200, rss, {'ETag': '"v1"', 'Content-Type': 'application/rss+xml'})
+        feed_config = {'urls': ['https://example.com/rss']}
+        validators = {}
+
+        items = reader.read_feeds(feed_config, 'example', validators=validators)
+        self.assertEqual(len(items), 1)
+        self.assertFalse(reader.last_not_modified)
+        self.assertEqual(validators['https://example.com/rss']['etag'], '"v1"')
+
+        reader.session.get.return_value = self._response(304)
+        items = reader.read_feeds(feed_config, 'example', validators=validators)
+        self.assertEqual(items, [])
+        self.assertTrue(reader.last_not_modified)
+        _, kwargs = reader.session.get.call_args
+        self.assertEqual(kwargs['headers'], {'If-None-Match': '"v1"'})
+
+    def test_poll_state_persistence(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db = Database(os.path.join(tmpdir, 'app.db'))
+            db.initialize()
+            try:
+                self.assertEqual(db.get_feed_poll_state('lance'), {})
+                db.save_feed_poll_state('lance', {'interval_seconds': 300.0, 'rate_per_hour': 2.5,
+                                                  'validators': {'u': {'etag': 'x'}}})
+                state = db.get_feed_poll_state('lance')
+            finally:
+                db.close()
+        self.assertEqual(state['interval_seconds'], 300.0)
+        self.assertEqual(state['validators'], {'u': {'etag': 'x'}})
+
+
+if __name__ == '__main__':
+    unittest.main()
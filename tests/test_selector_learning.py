@@ -0,0 +1,98 @@
+"""
+Unit tests for the learned per-domain content selectors
+"""
+
+import os
+import tempfile
+import unittest
+
+from bs4 import BeautifulSoup
+
+from app.extractor import ContentExtractor
+from app.selector_learning import SelectorLearner, learn_selector, similarity
+from app.store import Database
+
+PARAGRAPH = ("<p>Parágrafo {} da matéria, com texto suficiente para o trafilatura considerar "
+             "conteúdo real do artigo e não ruído de navegação.</p>")
+
+
+def page(n: int, body_class: str = 'materia-corpo') -> str:
+    paragraphs = "".join(PARAGRAPH.format(n * 10 + i) for i in range(8))
+    return (f'<html><head><title>Matéria {n}</title></head><body><div class="topo"><a href="/">Home</a></div>'
+            f'<div class="layout"><div class="{body_class} post-{n}4567"><h2>Intertítulo</h2>{paragraphs}</div>'
+            f'<div class="lateral"><p>Mais lidas</p></div></div></body></html>')
+
+
+class TestSelectorLearning(unittest.TestCase):
+    """Test cases for app.selector_learning"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db = Database(os.path.join(self.tmpdir.name, 'app.db'))
+        self.db.initialize()
+        self.config = {'enabled': True, 'window': 4, 'min_observations': 3, 'confidence': 0.75,
+                       'validate_every': 3, 'min_similarity': 0.8, 'min_chars': 300}
+        self.learner = SelectorLearner(self.db, config=self.config)
+
+    def tearDown(self):
+        self.db.close()
+        self.tmpdir.cleanup()
+
+    def test_container_selector_skips_page_specific_classes(self):
+        soup = BeautifulSoup(page(1), 'lxml')
+        content = "".join(str(p) for p in soup.select('div.materia-corpo p'))
+        self.assertEqual(learn_selector(soup, content), 'div.materia-corpo')
+        self.assertIsNone(learn_selector(soup, '<p>curto</p>'))
+        self.assertGreater(similarity(content, content + '<p>extra</p>'), 0.9)
+
+    def test_promotion_validation_and_demotion(self):
+        url = 'https://www.exemplo.com.br/noticia'
+        self.learner.observe(url, {'observed': 'div.materia-corpo'})
+        self.learner.observe(url, {'observed': None})
+        self.assertIsNone(self.learner.plan(url)['selector'])
+        self.learner.observe(url, {'observed': 'div.materia-corpo'})
+        self.learner.observe(url, {'observed': 'div.materia-corpo'})
+        self.assertEqual(self.learner.plan(url)['selector'], 'div.materia-corpo')
+
+        # Kept in the database
+        learner = SelectorLearner(self.db, config=self.config)
+        self.assertEqual(learner.promoted('https://exemplo.com.br/outra'), 'div.materia-corpo')
+
+        plans = []
+        for _ in range(3):
+            plan = learner.plan(url)
+            plans.append(plan['validate'])
+            learner.observe(url, {'similarity': 0.95, 'observed': 'div.materia-corpo'} if plan['validate']
+                            else {'fast_path': True})
+        self.assertEqual(plans, [False, False, True])
+
+        learner.observe(url, {'similarity': 0.3, 'observed': 'div.novo-corpo'})
+        self.assertIsNone(learner.promoted(url))
+        self.assertEqual(self.db.get_learned_selectors()['exemplo.com.br']['recent'], ['div.novo-corpo'])
+
+    def test_sites_with_their_own_extractor_are_not_planned(self):
+        self.assertIsNone(self.learner.plan('https://lance.com.br/futebol/a.html'))
+        self.assertIsNone(SelectorLearner(self.db, config={'enabled': False}).plan('https://exemplo.com.br/a'))
+
+    def test_extractor_learns_then_uses_the_container(self):
+        extractor = ContentExtractor()
+        learning = {'selector': None, 'validate': False, 'min_chars': 300}
+        extractor.extract(page(1), 'https://exemplo.com.br/a', learning=learning)
+        self.assertEqual(learning['observed'], 'div.materia-corpo')
+
+        learning = {'selector': 'div.materia-corpo', 'validate': False, 'min_chars': 300}
+        result = extractor.extract(page(2), 'https://exemplo.com.br/b', learning=learning)
+        self.assertTrue(learning['fast_path'])
+        self.assertNotIn('observed', learning)
+        self.assertIn('Parágrafo 27', result['content'])
+        self.assertNotIn('Mais lidas', result['content'])
+
+        learning = {'selector': 'div.materia-corpo', 'validate': False, 'min_chars': 300}
+        result = extractor.extract(page(3, 'novo-corpo'), 'https://exemplo.com.br/c', learning=learning)
+        self.assertTrue(learning['missed'])
+        self.assertEqual(learning['observed'], 'div.novo-corpo')
+        self.assertIn('Parágrafo 37', result['content'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+"""
+Unit tests for the site rule registry
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from bs4 import BeautifulSoup
+
+from app.extractor import ContentExtractor
+from app.site_rules import SiteRuleRegistry, load_rules
+
+PARAGRAPH = "O clube confirmou a contratação do atacante, que assina contrato até o fim de 2027. "
+
+
+class TestSiteRules(unittest.TestCase):
+    """Test cases for app.site_rules"""
+
+    def test_longest_suffix_wins(self):
+        registry = SiteRuleRegistry(load_rules(path=os.devnull))
+        self.assertEqual(registry.resolve('https://ge.globo.com/futebol/a.ghtml').name, 'ge')
+        self.assertEqual(registry.resolve('https://oglobo.globo.com/esportes/a').name, 'globo')
+        self.assertEqual(registry.resolve('https://www.lance.com.br/a.html').name, 'lance')
+        self.assertEqual(registry.resolve('infomoney.com.br').name, 'infomoney')
+        self.assertIsNone(registry.resolve('https://notglobo.com/a'))
+        self.assertIsNone(registry.resolve('https://marca.com/a.html'))
+        self.assertIsNotNone(registry.resolve('https://ge.globo.com/a').cleaner)
+
+    def test_rules_file_adds_and_replaces_profiles(self):
+        rules = [
+            {'name': 'as', 'domains': ['as.com'], 'content': 'div.art__bo', 'title': 'h1',
+             'junk': ['.sumario', '.tags']},
+            {'name': 'estadao', 'domains': ['estadao.com.br'], 'related': '.outros'},
+            {'name': 'broken', 'domains': ['x.com'], 'content': 'div[', 'title': 'h1'},
+        ]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'site_rules.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(rules, f)
+            registry = SiteRuleRegistry(load_rules(path))
+
+        profile = registry.resolve('https://as.com/futbol/a.html')
+        self.assertTrue(profile.selector_extraction)
+        soup = BeautifulSoup('<div class="art__bo"><p>a</p><div class="sumario">x</div></div>', 'lxml')
+        self.assertEqual(len(profile.junk.select(soup)), 1)
+        self.assertIsNotNone(registry.resolve('estadao.com.br').related)
+        self.assertIsNone(registry.resolve('x.com'))
+
+    def test_selector_profile_drives_extraction(self):
+        registry = SiteRuleRegistry([
+            {'name': 'as', 'domains': ['as.com'], 'content': 'div.art__bo', 'title': 'h1.tit',
+             'junk': '.sumario', 'images': 'div.art__bo img'},
+        ])
+        html = (
+            '<html><head><meta property="og:title" content="OG"></head><body><h1 class="tit">Fichaje</h1>'
+            f'<div class="art__bo"><p>{PARAGRAPH}</p><div class="sumario">Índice</div>'
+            '<img src="/fotos/jugador-1200x800.jpg"></div></body></html>'
+        )
+        from app import site_rules
+        previous, site_rules._registry = site_rules._registry, registry
+        try:
+            result = ContentExtractor().extract(html, 'https://as.com/futbol/fichaje.html')
+        finally:
+            site_rules._registry = previous
+        self.assertEqual(result['title'], 'Fichaje')
+        self.assertNotIn('Índice', result['content'])
+        self.assertIn('https://as.com/fotos/jugador-1200x800.jpg', result['images'] + [result['featured_image_url']])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+"""
+Unit tests for the materialised dashboard counters
+"""
+
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from app.stats import StatsService
+from app.store import Database
+
+
+class TestStatsCounters(unittest.TestCase):
+    """Counters maintained by Database writes must match the real row counts"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'app.db')
+        self.db = Database(self.db_path)
+        self.db.initialize()
+        self.stats = StatsService(self.db_path, ttl_seconds=0)
+
+    def tearDown(self):
+        self.stats.close()
+        self.db.close()
+        self.tmpdir.cleanup()
+
+    def _items(self, prefix, n):
+        return [{'id': f'{prefix}-{i}', 'url': f'https://example.com/{prefix}/{i}', 'title': str(i)} for i in range(n)]
+
+    def test_counters_follow_writes(self):
+        lance = self.db.filter_new_articles('lance', self._items('l', 3))
+        marca = self.db.filter_new_articles('marca', self._items('m', 2))
+        # Already-seen items must not be counted twice
+        self.db.filter_new_articles('lance', self._items('l', 3))
+
+        self.db.save_processed_post(lance[0]['db_id'], 101)
+        self.db.save_processed_post(marca[0]['db_id'], 102)
+        self.db.update_article_status(lance[1]['db_id'], 'FAILED', reason='Extraction failed')
+
+        overview = self.stats.get_overview()
+        self.assertEqual(overview['seen_articles'], 5)
+        self.assertEqual(overview['published_posts'], 2)
+        self.assertEqual(overview['failures'], 1)
+        self.assertEqual(overview['recent_posts'][0][2], 102)
+
+        feeds = self.stats.get_feed_stats(['lance', 'marca', 'cbs_nba'])
+        self.assertEqual(feeds['lance'], {'recent_articles': 3, 'published_posts': 1})
+        self.assertEqual(feeds['marca'], {'recent_articles': 2, 'published_posts': 1})
+        self.assertEqual(feeds['cbs_nba'], {'recent_articles': 0, 'published_posts': 0})
+
+        # Cleanup removes PUBLISHED/FAILED rows and must decrement the counters too
+        self.db.cleanup_old_entries(datetime.utcnow() + timedelta(days=1))
+        counters = self.stats.get_counters()
+        self.assertEqual(counters['seen_articles'], 2)
+        self.assertEqual(counters['posts'], 0)
+        self.assertEqual(counters['posts:lance'], 0)
+
+    def test_backfill_from_existing_rows(self):
+        self.db.filter_new_articles('lance', self._items('l', 2))
+        self.db.conn.execute("DELETE FROM stats_counters")
+        self.db.conn.commit()
+
+        self.db.initialize()
+
+        self.assertEqual(self.stats.get_counters()['seen_articles:lance'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+Unit tests for the shared HTTP transport
+"""
+
+import os
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app import metrics, transport
+from app.store import Database
+
+
+class _Handler(BaseHTTPRequestHandler):
+    seen_headers = []
+
+    def do_GET(self):
+        _Handler.seen_headers.append(dict(self.headers))
+        status, body = (200, b'hello') if self.path == '/ok' else (404, b'nope')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestTransport(unittest.TestCase):
+    """Test cases for app.transport"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        cls.base = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        metrics._buffer.drain()
+
+    def test_sessions_share_pools_per_host_class(self):
+        a = transport.session(transport.PAGES)
+        b = transport.session(transport.PAGES, headers={'User-Agent': 'x'})
+        feeds = transport.session(transport.FEEDS)
+        self.assertIs(a.get_adapter('https://example.com'), b.get_adapter('https://example.com'))
+        self.assertIsNot(a.get_adapter('https://example.com'), feeds.get_adapter('https://example.com'))
+        # Closing one client's session does not tear down the shared pools
+        a.close()
+        self.assertIs(b.get_adapter('http://x'), transport._adapters[transport.PAGES])
+
+        retry = b.get_adapter('https://example.com').max_retries
+        self.assertFalse(retry.is_retry('POST', 503))
+        self.assertTrue(retry.is_retry('GET', 503))
+        self.assertEqual(b.default_timeout, (5, 20))
+        with self.assertRaises(ValueError):
+            transport.session('unknown')
+
+    def test_per_host_counters(self):
+        s = transport.session(transport.PAGES)
+        self.assertEqual(s.get(f"{self.base}/ok").text, 'hello')
+        self.assertEqual(s.get(f"{self.base}/missing").status_code, 404)
+        self.assertIn('gzip', _Handler.seen_headers[-1].get('Accept-Encoding', ''))
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db = Database(os.path.join(tmpdir, 'app.db'))
+            db.initialize()
+            try:
+                metrics.flush(db)
+                perf = metrics.load_performance(db.conn)
+            finally:
+                db.close()
+        host = perf['http_by_host']['127.0.0.1']
+        self.assertEqual(host['count'], 2)
+        self.assertEqual(host['bytes'], 9)
+        self.assertEqual(host['errors'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
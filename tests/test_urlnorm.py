@@ -0,0 +1,70 @@
+"""
+Unit tests for URL canonicalisation
+"""
+
+import os
+import tempfile
+import unittest
+
+from app.feeds import normalize_item
+from app.html_utils import rewrite_img_srcs_with_wp
+from app.store import Database
+from app.urlnorm import canonical_url, clean_url
+
+
+class TestCanonicalUrl(unittest.TestCase):
+    """Test cases for app.urlnorm"""
+
+    def test_variants_fold_to_one_key(self):
+        key = 'https://ge.globo.com/futebol/noticia/2025/01/01/jogo.ghtml'
+        for variant in (
+            'http://GE.globo.com/futebol/noticia/2025/01/01/jogo.ghtml',
+            'https://www.ge.globo.com:443/futebol//noticia/2025/01/01/jogo.ghtml#comentarios',
+            'https://ge.globo.com/google/amp/futebol/noticia/2025/01/01/jogo.ghtml',
+            'https://ge.globo.com/futebol/noticia/2025/01/01/jogo.ghtml?utm_source=rss&fbclid=x',
+            ' https://m.ge.globo.com/futebol/noticia/2025/01/01/jogo.ghtml/ ',
+        ):
+            self.assertEqual(canonical_url(variant), key, variant)
+
+    def test_amp_variants(self):
+        self.assertEqual(canonical_url('https://www.lance.com.br/futebol/noticia.html/amp'),
+                         'https://lance.com.br/futebol/noticia.html')
+        self.assertEqual(canonical_url('https://as.com/futbol/noticia.amp.html'), 'https://as.com/futbol/noticia.html')
+        self.assertEqual(canonical_url('https://marca.com/a.html?amp=1&id=2'), 'https://marca.com/a.html?id=2')
+        self.assertEqual(canonical_url('https://site.com/a?outputType=amp'), 'https://site.com/a')
+
+    def test_keeps_meaningful_parts(self):
+        self.assertEqual(canonical_url('https://img.com/p.jpg?w=800&h=600'), 'https://img.com/p.jpg?h=600&w=800')
+        self.assertNotEqual(canonical_url('https://img.com/A.jpg'), canonical_url('https://img.com/a.jpg'))
+        self.assertEqual(canonical_url('https://site.com:8080/x'), 'https://site.com:8080/x')
+        self.assertEqual(canonical_url(''), '')
+        key = canonical_url('https://www.site.com/a/?utm_medium=x')
+        self.assertEqual(canonical_url(key), key)
+
+    def test_clean_url_only_strips_tracking(self):
+        self.assertEqual(clean_url('http://m.site.com/a/?utm_source=x&id=3#top'), 'http://m.site.com/a/?id=3')
+
+    def test_image_map_matches_variants(self):
+        html = '<p><img src="http://www.cdn.com/foto.jpg/"></p>'
+        out = rewrite_img_srcs_with_wp(html, {canonical_url('https://cdn.com/foto.jpg'): 'https://wp.site/foto.jpg'})
+        self.assertIn('https://wp.site/foto.jpg', out)
+
+    def test_seen_articles_dedupe_on_canonical_url(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db = Database(os.path.join(tmpdir, 'app.db'))
+            db.initialize()
+            try:
+                first = db.filter_new_articles('lance', [normalize_item({'link': 'https://lance.com.br/a.html'})])
+                again = db.filter_new_articles('lance', [normalize_item({'link': 'https://www.lance.com.br/a.html?utm_source=rss'})])
+                other_feed = db.filter_new_articles('lance_br', [normalize_item({'guid': 'x1', 'link': 'https://lance.com.br/a.html/amp'})])
+                fresh = db.filter_new_articles('lance', [normalize_item({'link': 'https://lance.com.br/b.html'})])
+            finally:
+                db.close()
+        self.assertEqual(len(first), 1)
+        self.assertEqual(again, [])
+        self.assertEqual(other_feed, [])
+        self.assertEqual(len(fresh), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
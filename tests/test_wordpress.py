@@ -4,6 +4,9 @@ Unit tests for the wordpress module
 
 import unittest
 from unittest.mock import Mock, patch
+
+import requests
+
 from app.wordpress import WordPressClient
 
 class TestWordPressClient(unittest.TestCase):
@@ -45,7 +48,7 @@ class TestWordPressClient(unittest.TestCase):
         self.assertIn(99, resolved_ids)
         self.assertEqual(len(resolved_ids), 3)
 
-    @patch('requests.get')
+    @patch('requests.Session.get')
     @patch('requests.Session.post')
     def test_upload_media_from_url_success(self, mock_wp_post, mock_requests_get):
         """Test successful media upload from a URL."""
@@ -70,6 +73,18 @@ class TestWordPressClient(unittest.TestCase):
         mock_requests_get.assert_called_once_with(image_url, timeout=25)
         mock_wp_post.assert_called_once()
 
+    @patch('requests.Session.get')
+    @patch('requests.Session.post')
+    def test_upload_media_from_url_leaves_retries_to_the_transport(self, mock_wp_post, mock_requests_get):
+        """A network error is not retried again on top of the transport's retries."""
+        mock_requests_get.side_effect = requests.ConnectionError("connection reset")
+
+        result = self.client.upload_media_from_url('https://example.com/image.jpg')
+
+        self.assertIsNone(result)
+        mock_requests_get.assert_called_once()
+        mock_wp_post.assert_not_called()
+
     @patch('requests.Session.post')
     def test_set_media_alt_text(self, mock_post):
         """Test setting alt text for a media item."""